@@ -18,8 +18,10 @@ def create_app():
     # Configuración secreta de la aplicación
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'clave_secreta_por_defecto')
     
-    # Desactivar caché de plantillas (para desarrollo)
-    app.config['TEMPLATES_AUTO_RELOAD'] = True
+    # Recargar las plantillas solo en modo debug (None: Flask sigue a app.debug,
+    # también con app.run(debug=True)); en producción quedan compiladas
+    # (ver precarga.py) y no se revisa el archivo en cada render
+    app.config['TEMPLATES_AUTO_RELOAD'] = None
     
     # Registrar blueprints (rutas)
     from ecosmart_advisor.app.routes import main_bp, diagnostico_bp, chatbot_bp, api_bp
@@ -0,0 +1,155 @@
+"""
+Precarga de la aplicación en el proceso maestro de gunicorn.
+
+Con preload_app = True la aplicación se importa una sola vez en el maestro
+y los workers nacen por fork. Todo lo que se prepare antes del fork
+(módulos importados, plantillas compiladas, índices del chatbot, grilla
+de climatología, nomenclador e instantánea del carrusel) lo comparten los
+workers por copy-on-write, en lugar de que cada uno lo cargue durante sus
+primeras solicitudes.
+
+Al terminar se congela el recolector de basura (gc.freeze) para que las
+recolecciones de los workers no escriban sobre los objetos heredados y
+las páginas sigan compartidas.
+"""
+import gc
+import time
+import logging
+import importlib
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Módulos que el resto del código importa recién dentro de las funciones
+MODULOS_DIFERIDOS = [
+    "ecosmart_advisor.app.services.optimizador",
+    "ecosmart_advisor.app.services.baterias",
+    "ecosmart_advisor.app.services.incertidumbre",
+    "ecosmart_advisor.app.services.ai_engine",
+    "ecosmart_advisor.chatbot.ai_chatbot",
+]
+
+
+def _importar_modulos(app):
+    for nombre in MODULOS_DIFERIDOS:
+        importlib.import_module(nombre)
+    return len(MODULOS_DIFERIDOS)
+
+
+def _compilar_plantillas(app):
+    # get_template compila y deja la plantilla en la caché del entorno Jinja
+    compiladas = 0
+    for nombre in app.jinja_env.list_templates(extensions=['html']):
+        try:
+            app.jinja_env.get_template(nombre)
+            compiladas += 1
+        except Exception as e:
+            logger.warning(f"No se pudo compilar la plantilla {nombre}: {str(e)}")
+    return compiladas
+
+
+def _indices_chatbot(app):
+    # Los índices se construyen al importar el módulo
+    from ecosmart_advisor.chatbot import chatbot
+    return len(chatbot._INDICE)
+
+
+def _cargar_climatologia(app):
+    from ecosmart_advisor.app.services import climatologia
+    return climatologia.cargar_grilla().shape
+
+
+def _cargar_nomenclador(app):
+    from ecosmart_advisor.app.services import localidades
+    return len(localidades.obtener_nomenclador())
+
+
+def _preparar_carrusel(app):
+    """
+    Publica la instantánea del carrusel que dejó otro proceso o, si no hay,
+    la predeterminada con las variantes de las imágenes locales. No inicia
+    el hilo de reconstrucción: cada worker inicia el suyo después del fork.
+    """
+    from ecosmart_advisor.app.services import carousel_content, imagenes
+    if carousel_content.cargar_instantanea_compartida() == 0.0 and imagenes.disponible():
+        datos = carousel_content.datos_locales()
+        for valores in datos.values():
+            valores['imagen'] = imagenes.preparar_imagen(valores['imagen_url'])
+        carousel_content._instantanea = carousel_content._congelar(datos)
+    return len(carousel_content._instantanea)
+
+
+ETAPAS = [
+    ('modulos', _importar_modulos),
+    ('plantillas', _compilar_plantillas),
+    ('chatbot', _indices_chatbot),
+    ('climatologia', _cargar_climatologia),
+    ('nomenclador', _cargar_nomenclador),
+    ('carrusel', _preparar_carrusel),
+]
+
+
+def precalentar(app, congelar=True):
+    """
+    Prepara en el proceso actual todo lo que los workers van a compartir
+
+    Args:
+        app (Flask): Aplicación creada con create_app
+        congelar (bool): Congelar los objetos actuales con gc.freeze (antes del fork)
+
+    Returns:
+        dict: Segundos y resultado de cada etapa, total y memoria del proceso
+    """
+    if congelar:
+        # Evitar huecos en las páginas mientras se cargan los datos
+        gc.disable()
+
+    informe = {'etapas': {}}
+    inicio = time.perf_counter()
+    for nombre, etapa in ETAPAS:
+        comienzo = time.perf_counter()
+        try:
+            resultado = etapa(app)
+        except Exception as e:
+            logger.error(f"Error en la precarga ({nombre}): {str(e)}")
+            resultado = None
+        informe['etapas'][nombre] = {'segundos': round(time.perf_counter() - comienzo, 4), 'resultado': resultado}
+    informe['segundos'] = round(time.perf_counter() - inicio, 4)
+
+    if congelar:
+        gc.collect()
+        gc.freeze()
+        gc.enable()
+        informe['objetos_congelados'] = gc.get_freeze_count()
+
+    informe['memoria'] = informe_memoria()
+    logger.info(f"Precarga completada en {informe['segundos']:.2f} s: " +
+                ", ".join(f"{n} {e['segundos'] * 1000:.0f} ms" for n, e in informe['etapas'].items()) +
+                f"; memoria del proceso: {informe['memoria']}")
+    return informe
+
+
+def informe_memoria():
+    """
+    Memoria del proceso según /proc/self/smaps_rollup (Linux)
+
+    Returns:
+        dict: 'rss', 'pss', 'compartida' y 'privada' en MB, o {} si no está disponible.
+              En un worker, 'compartida' es la memoria que no duplica respecto del maestro.
+    """
+    try:
+        with open('/proc/self/smaps_rollup') as archivo:
+            campos = {}
+            for linea in archivo:
+                partes = linea.split()
+                if len(partes) == 3 and partes[2] == 'kB':
+                    campos[partes[0].rstrip(':')] = int(partes[1])
+    except OSError:
+        return {}
+    return {
+        'rss': round(campos.get('Rss', 0) / 1024, 1),
+        'pss': round(campos.get('Pss', 0) / 1024, 1),
+        'compartida': round((campos.get('Shared_Clean', 0) + campos.get('Shared_Dirty', 0)) / 1024, 1),
+        'privada': round((campos.get('Private_Clean', 0) + campos.get('Private_Dirty', 0)) / 1024, 1),
+    }
@@ -3,13 +3,18 @@ Módulo de rutas para la aplicación EcoSmart Advisor
 """
 import os
 import json
-import requests
-from flask import Blueprint, render_template, request, jsonify, current_app, session
+import uuid
+from flask import Blueprint, render_template, request, jsonify, current_app, session, Response, stream_with_context, send_file, abort
 from ecosmart_advisor.app.services.clima_api import obtener_datos_clima
 from ecosmart_advisor.app.services.energia_calculo import calcular_recomendacion, calcular_estimacion_sin_kwh
 from ecosmart_advisor.app.services.simulador import simular_instalacion
+from ecosmart_advisor.app.services import tareas
+from ecosmart_advisor.app.services.cache import CacheEscalonada
+from ecosmart_advisor.app.services.simulacion_lote import simular_lote, barrido_capacidad, SIMULACION_LOTE_MAX
+from ecosmart_advisor.app.services.geocodificacion import geocodificar, ErrorGeocodificacion
 from ecosmart_advisor.app.services.carousel_simple import generar_datos_carrusel as generar_datos_carrusel_simple
-from ecosmart_advisor.app.services.carousel_content import generar_datos_carrusel as generar_datos_carrusel_content
+from ecosmart_advisor.app.services.carousel_content import obtener_carrusel
+from ecosmart_advisor.app.services import imagenes
 
 import os
 import logging
@@ -40,13 +45,27 @@ def generar_respuesta_ia_fallback(pregunta, historial_conversacion=None):
         ]
     }
 
+def generar_respuesta_ia_stream_fallback(pregunta, historial_conversacion=None):
+    """Versión por eventos de la función de fallback (una sola parte)"""
+    resultado = generar_respuesta_ia_fallback(pregunta, historial_conversacion)
+    yield 'token', {'texto': resultado['respuesta']}
+    yield 'sugerencias', {'sugerencias': resultado['sugerencias']}
+    yield 'fin', {'respuesta': resultado['respuesta'], 'origen': 'reglas'}
+
 # Intentar importar el nuevo chatbot mejorado con IA
 try:
-    from ecosmart_advisor.chatbot.ai_chatbot import generar_respuesta_ia
+    from ecosmart_advisor.chatbot.ai_chatbot import generar_respuesta_ia, generar_respuesta_ia_stream, iniciar_precarga
     USAR_IA_CHATBOT = True
 except ImportError:
     # Si falla la importación, usar la función de fallback
     generar_respuesta_ia = generar_respuesta_ia_fallback
+    generar_respuesta_ia_stream = generar_respuesta_ia_stream_fallback
+    iniciar_precarga = lambda: None
+
+# Respuestas del chatbot transmitidas por streaming: la cookie de sesión se envía
+# antes del primer fragmento, así que la respuesta completa se guarda aquí y se
+# agrega al historial en la siguiente consulta
+_respuestas_chatbot = CacheEscalonada("chatbot_respuestas", max_entradas=256, ttl=3600, max_entradas_disco=5000)
 
 # Blueprint principal
 main_bp = Blueprint('main', __name__)
@@ -56,43 +75,34 @@ def index():
     """Ruta principal de la aplicación"""
     logger = logging.getLogger('index')
     
-    # Generar datos actualizados para el carrusel utilizando carousel_content
-    logger.info("Generando datos del carrusel para la página principal")
-    
-    # Verificar si tenemos la clave API de Unsplash configurada
-    unsplash_key = os.environ.get("UNSPLASH_API_KEY")
-    if unsplash_key:
-        logger.info(f"UNSPLASH_API_KEY configurada (longitud: {len(unsplash_key)})")
-    else:
-        logger.warning("UNSPLASH_API_KEY no está configurada o está vacía")
-    
     try:
-        # Intentamos usar la versión de carousel_content que obtiene imágenes filtradas
-        logger.info("Intentando generar datos con carousel_content...")
-        carousel_data = generar_datos_carrusel_content()
-        carousel_categories = list(carousel_data.keys())
-        logger.info(f"Carrusel data obtenida correctamente: {carousel_categories}")
-        
-        # Verificar si tenemos alguna imagen de Unsplash o solo imágenes locales
-        imagen_ejemplo = carousel_data[carousel_categories[0]].get('imagen_url', '')
-        es_local = imagen_ejemplo.startswith('/static/')
-        
-        if es_local:
-            logger.info("Usando imágenes locales (las imágenes remotas fallaron o no están disponibles)")
-        else:
-            logger.info("Usando imágenes filtradas de Unsplash sobre energías renovables")
-            
+        # Última instantánea del carrusel, reconstruida en segundo plano
+        # (la página no espera a Deepseek ni a Unsplash)
+        carousel_data = obtener_carrusel()
     except Exception as e:
-        logger.error(f"Error al generar datos con carousel_content: {str(e)}")
+        logger.error(f"Error al obtener datos del carrusel: {str(e)}")
         
         # En caso de error, usamos la versión simple como fallback
         logger.info("Usando sistema de carrusel simple como fallback")
         carousel_data = generar_datos_carrusel_simple()
-        carousel_categories = list(carousel_data.keys())
-        logger.info(f"Carrusel simple data obtenida: {carousel_categories}")
     
     return render_template('index.html', carousel_data=carousel_data)
 
+@main_bp.route('/img/<nombre>')
+def imagen_optimizada(nombre):
+    """
+    Sirve una variante optimizada de las imágenes del carrusel. El nombre
+    incluye el hash del contenido, así que la respuesta es inmutable.
+    """
+    ruta = imagenes.ruta_variante(nombre)
+    if ruta is None:
+        abort(404)
+    respuesta = send_file(ruta, mimetype=imagenes.TIPOS[nombre.rsplit('.', 1)[1]],
+                          max_age=imagenes.IMAGENES_MAX_AGE, conditional=True, etag=True)
+    respuesta.cache_control.public = True
+    respuesta.cache_control.immutable = True
+    return respuesta
+
 # Blueprint para el diagnóstico
 diagnostico_bp = Blueprint('diagnostico', __name__, url_prefix='/diagnostico')
 
@@ -104,6 +114,9 @@ def diagnostico():
     POST: Procesa los datos y muestra recomendaciones
     """
     if request.method == 'POST':
+        # El plazo para esperar a la IA se cuenta desde el inicio de la solicitud
+        limite = tareas.limite_desde()
+        
         # Obtener datos del formulario
         datos = {
             'ubicacion': request.form.get('ubicacion'),
@@ -136,7 +149,7 @@ def diagnostico():
         clima['descripcion_ubicacion'] = datos.get('descripcion_ubicacion', '')
         
         # Calcular recomendación
-        recomendacion = calcular_recomendacion(datos, clima)
+        recomendacion = calcular_recomendacion(datos, clima, limite)
         
         return render_template('resultado_diagnostico.html', 
                               recomendacion=recomendacion,
@@ -149,12 +162,13 @@ def diagnostico():
 @diagnostico_bp.route('/api', methods=['POST'])
 def diagnostico_api():
     """API para el diagnóstico (para uso con AJAX)"""
+    limite = tareas.limite_desde()
     datos = request.json
     if not datos or 'ubicacion' not in datos:
         return jsonify({"error": "Se requiere ubicación para el diagnóstico"}), 400
     
     clima = obtener_datos_clima(datos['ubicacion'])
-    recomendacion = calcular_recomendacion(datos, clima)
+    recomendacion = calcular_recomendacion(datos, clima, limite)
     return jsonify(recomendacion)
 
 # Rutas simples para el simulador sin Blueprint
@@ -172,6 +186,7 @@ def simulador():
     logger.setLevel(logging.DEBUG)
     
     if request.method == 'POST':
+        limite = tareas.limite_desde()
         try:
             # Registrar información detallada
             logger.info("=== INICIO PROCESAMIENTO DE SIMULACIÓN ===")
@@ -266,7 +281,7 @@ def simulador():
                                      error=f"El consumo mensual debe ser un número válido.")
             
             logger.info("Llamando a simular_instalacion...")
-            resultados = simular_instalacion(datos_simulacion)
+            resultados = simular_instalacion(datos_simulacion, limite)
             
             if not resultados:
                 logger.error("La función simular_instalacion devolvió resultados vacíos o nulos")
@@ -311,6 +326,7 @@ def simulador_api():
     import logging
     logger = logging.getLogger('simulador_api')
     logger.setLevel(logging.DEBUG)
+    limite = tareas.limite_desde()
     
     try:
         # Intentar obtener datos JSON, con manejo de errores mejorado
@@ -351,10 +367,29 @@ def simulador_api():
             if campo not in datos or not datos[campo]:
                 logger.warning(f"Campo requerido faltante: {campo}, usando valor por defecto")
                 datos[campo] = valores_defecto[campo]
+        
+        # Rechazar opciones de Monte Carlo inválidas antes de simular
+        if datos.get('monte_carlo'):
+            from ecosmart_advisor.app.services.incertidumbre import validar_opciones
+            try:
+                validar_opciones(datos['monte_carlo'])
+            except ValueError as e:
+                logger.warning(f"Opciones de Monte Carlo rechazadas: {str(e)}")
+                return jsonify({"error": str(e)}), 400
+        
+        # Rechazar capacidades de batería inválidas antes de despachar
+        bateria = datos.get('bateria')
+        if isinstance(bateria, dict) and 'capacidad_kwh' in bateria:
+            from ecosmart_advisor.app.services.baterias import validar_capacidades
+            try:
+                validar_capacidades(bateria['capacidad_kwh'])
+            except ValueError as e:
+                logger.warning(f"Capacidades de batería rechazadas: {str(e)}")
+                return jsonify({"error": str(e)}), 400
             
         # Ejecutar simulación con manejo robusto de errores
         logger.info("Ejecutando simulación...")
-        resultados = simular_instalacion(datos)
+        resultados = simular_instalacion(datos, limite)
         
         # Verificar si hay error en resultados
         if isinstance(resultados, dict) and 'error' in resultados:
@@ -373,6 +408,58 @@ def simulador_api():
             "tipo": "error_general"
         }), 500
 
+@main_bp.route('/simulador/api/batch', methods=['POST'])
+def simulador_api_lote():
+    """API para simular muchos escenarios en una sola petición"""
+    import logging
+    logger = logging.getLogger('simulador_api')
+    
+    datos = request.get_json(silent=True)
+    escenarios = datos.get('escenarios') if isinstance(datos, dict) else datos
+    if not isinstance(escenarios, list) or not escenarios:
+        return jsonify({"error": "Se esperaba una lista de escenarios en 'escenarios'"}), 400
+    if len(escenarios) > SIMULACION_LOTE_MAX:
+        return jsonify({"error": f"El lote supera el máximo de {SIMULACION_LOTE_MAX} escenarios"}), 413
+    
+    try:
+        resultados = simular_lote(escenarios)
+        logger.info(f"Lote de {len(resultados)} escenarios simulado con éxito")
+        return jsonify({"resultados": resultados, "total": len(resultados)})
+    except Exception as e:
+        import traceback
+        logger.error(f"Error general en simulación por lotes: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            "error": f"Error en la simulación: {str(e)}",
+            "tipo": "error_general"
+        }), 500
+
+@main_bp.route('/simulador/api/sweep', methods=['POST'])
+def simulador_api_barrido():
+    """API con las curvas de resultados en función de la capacidad de cada tipo de instalación"""
+    import logging
+    logger = logging.getLogger('simulador_api')
+    
+    datos = request.get_json(silent=True) or {}
+    try:
+        resultado = barrido_capacidad(
+            datos.get('ubicacion', '-34.61,-58.38'),
+            datos.get('consumo_mensual', 300),
+            rangos=datos.get('rangos'),
+            descripcion_ubicacion=datos.get('descripcion_ubicacion')
+        )
+        return jsonify(resultado)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        import traceback
+        logger.error(f"Error general en barrido de capacidad: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            "error": f"Error en la simulación: {str(e)}",
+            "tipo": "error_general"
+        }), 500
+
 # Blueprint para las APIs
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
@@ -406,59 +493,17 @@ def geocode():
         if not q:
             return jsonify({'error': 'Parámetro de búsqueda requerido'}), 400
             
-        # Preprocesar la consulta para optimizar resultados para Argentina
-        if 'argentina' not in q.lower() and len(q.split(',')) > 1:
-            q = f"{q}, Argentina"
-        
-        logging.info(f"Consulta a OpenCage: {q}")
-            
-        # Construir URL de la API
-        url = 'https://api.opencagedata.com/geocode/v1/json'
-        params = {
-            'q': q,
-            'key': api_key,
-            'limit': limit,
-            'countrycode': 'ar',  # Priorizar Argentina
-            'language': 'es',     # Respuestas en español
-            'no_annotations': 1   # Respuestas más ligeras
-        }
-        
-        # Realizar la solicitud a OpenCage
-        response = requests.get(url, params=params)
-        data = response.json()
-        
-        # Verificar si hay errores
-        if 'error' in data:
-            logging.error(f"Error de OpenCage: {data['error']}")
+        # Consulta con caché y agrupación de consultas simultáneas idénticas
+        try:
+            results = geocodificar(q, limit, api_key)
+        except ErrorGeocodificacion as e:
+            logging.error(f"Error de OpenCage: {str(e)}")
             return jsonify({
                 'error': 'Error en API de OpenCage',
-                'message': data.get('error', {}).get('message', 'Error desconocido')
+                'message': str(e)
             }), 500
         
-        # Log para ver la respuesta completa 
-        logging.info(f"Respuesta de OpenCage: {len(data.get('results', []))} resultados")
-        
-        # Simplificar la respuesta para mejorar rendimiento
-        results = []
-        if 'results' in data:
-            for result in data['results']:
-                simplified = {
-                    'formatted': result['formatted'],
-                    'lat': result['geometry']['lat'],
-                    'lng': result['geometry']['lng'],
-                    'confidence': result.get('confidence', 0)
-                }
-                # Agregar componentes de dirección si están disponibles
-                if 'components' in result:
-                    comp = result['components']
-                    simplified['components'] = {
-                        'street': comp.get('road', ''),
-                        'number': comp.get('house_number', ''),
-                        'city': comp.get('city', comp.get('town', comp.get('village', ''))),
-                        'state': comp.get('state', ''),
-                        'country': comp.get('country', '')
-                    }
-                results.append(simplified)
+        logging.info(f"Respuesta de geocodificación: {len(results)} resultados")
                 
         return jsonify({'results': results})
         
@@ -486,6 +531,33 @@ def chatbot():
     from flask import redirect, url_for
     return redirect(url_for('main.index'))
 
+@chatbot_bp.before_app_request
+def precargar_chatbot():
+    """Precarga en segundo plano las respuestas frecuentes, una vez por worker"""
+    iniciar_precarga()
+
+def _historial_chatbot():
+    """
+    Historial de conversación de la sesión, completado con la última respuesta
+    transmitida por streaming si quedó pendiente
+
+    Returns:
+        list: Mensajes {'rol', 'contenido'} (como máximo los últimos 10)
+    """
+    historial = session.get('historial_chatbot', [])
+    pendiente = session.pop('respuesta_pendiente', None)
+    if pendiente:
+        respuesta = _respuestas_chatbot.obtener(pendiente)
+        if respuesta:
+            historial.append({"rol": "asistente", "contenido": respuesta})
+            historial = historial[-10:]
+        session['historial_chatbot'] = historial
+    return historial
+
+def _evento_sse(evento, datos):
+    """Formatea un evento Server-Sent Events"""
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
 @chatbot_bp.route('/consulta', methods=['POST'])
 def consulta_chatbot():
     """Procesa consultas al chatbot"""
@@ -504,9 +576,7 @@ def consulta_chatbot():
             })
         
         # Obtener historial de conversación de la sesión (si está disponible)
-        historial = []
-        if 'historial_chatbot' in session:
-            historial = session['historial_chatbot']
+        historial = _historial_chatbot()
         
         try:
             # Usamos la función generar_respuesta_ia en cualquier caso (puede ser la original o la fallback)
@@ -559,4 +629,46 @@ def consulta_chatbot():
                 "¿Cuánto cuesta instalar paneles solares?",
                 "¿Qué es un termotanque solar?"
             ]
-        })
\ No newline at end of file
+        })
+
+@chatbot_bp.route('/consulta/stream', methods=['POST'])
+def consulta_chatbot_stream():
+    """
+    Procesa consultas al chatbot y transmite la respuesta por Server-Sent Events
+    a medida que la IA la genera: eventos 'token' con cada fragmento de texto,
+    'sugerencias' con las preguntas sugeridas y 'fin' con la respuesta completa
+    """
+    datos = request.get_json(silent=True) or {}
+    pregunta = (datos.get('pregunta') or '').strip()
+    historial = _historial_chatbot()
+    
+    if not pregunta:
+        texto = '¿En qué puedo ayudarte con las energías renovables?'
+        eventos = iter([('token', {'texto': texto}), ('sugerencias', {'sugerencias': []}),
+                        ('fin', {'respuesta': texto, 'origen': 'reglas'})])
+    else:
+        eventos = generar_respuesta_ia_stream(pregunta, list(historial))
+        
+        # La sesión se guarda antes de empezar a transmitir; la respuesta se
+        # agrega al historial en la próxima consulta
+        pendiente = uuid.uuid4().hex
+        historial.append({"rol": "usuario", "contenido": pregunta})
+        session['historial_chatbot'] = historial[-10:]
+        session['respuesta_pendiente'] = pendiente
+    
+    def transmitir():
+        try:
+            for evento, contenido in eventos:
+                if evento == 'fin' and pregunta:
+                    _respuestas_chatbot.guardar(pendiente, contenido['respuesta'])
+                yield _evento_sse(evento, contenido)
+        except Exception as e:
+            logging.error(f"Error al transmitir respuesta del chatbot: {str(e)}")
+            texto = "Lo siento, pero estoy teniendo problemas para procesar tu pregunta. Por favor, intenta nuevamente."
+            yield _evento_sse('error', {'respuesta': texto})
+    
+    return Response(
+        stream_with_context(transmitir()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
\ No newline at end of file
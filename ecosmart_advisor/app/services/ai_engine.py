@@ -376,101 +376,55 @@ def generar_recomendacion_simple(datos_usuario, datos_clima, resultados_tecnicos
         "consideraciones_especiales": "Esta es una recomendación general. Para un análisis más detallado, considere consultar con un instalador local que pueda evaluar factores específicos de su propiedad."
     }
 
-def analizar_combinacion_optima(opciones_viables, consumo_mensual, presupuesto=None):
+def analizar_combinacion_optima(opciones_viables, consumo_mensual, presupuesto=None, clima=None,
+                                superficie_disponible=None, objetivo='cobertura'):
     """
-    Analiza la combinación óptima de sistemas de energía renovable
+    Analiza la combinación óptima de sistemas de energía renovable, buscando
+    los tamaños de cada tecnología viable (y de una batería) con el
+    optimizador híbrido
     
     Args:
         opciones_viables (list): Lista de opciones viables
         consumo_mensual (float): Consumo mensual en kWh
         presupuesto (float, optional): Presupuesto disponible
+        clima (dict, optional): Datos climáticos de la ubicación
+        superficie_disponible (float, optional): Superficie disponible en m²
+        objetivo (str): Objetivo del usuario (cobertura, ahorro, ambiental o equilibrado)
         
     Returns:
         dict: Combinación óptima recomendada
     """
+    from ecosmart_advisor.app.services.optimizador import optimizar_sistema_hibrido
+    from ecosmart_advisor.app.services.simulador import clima_por_defecto
+    
     # Si no hay opciones viables, no hay combinación posible
     if not opciones_viables:
         return None
     
-    # Si solo hay una opción, es la única posible
-    if len(opciones_viables) == 1:
-        return {
-            'sistemas': [opciones_viables[0]['tipo']],
-            'cobertura_total': opciones_viables[0]['cobertura'],
-            'detalles': [opciones_viables[0]]
-        }
-    
-    # Para cada opción, calcular la relación costo-beneficio
-    for opcion in opciones_viables:
-        if 'ahorro_anual' in opcion and opcion.get('costo_estimado', 0) > 0:
-            opcion['retorno_inversion'] = opcion['costo_estimado'] / opcion['ahorro_anual']
-            opcion['costo_beneficio'] = opcion['cobertura'] / opcion['costo_estimado'] * 100
-        else:
-            opcion['retorno_inversion'] = 99  # Valor alto para indicar que no se puede calcular
-            opcion['costo_beneficio'] = 0
-    
-    # Buscar combinaciones posibles
-    mejores_combinaciones = []
-    
-    # Probar combinación de solar + termotanque si ambos existen
-    solar = next((op for op in opciones_viables if op['tipo'] == 'solar'), None)
-    termotanque = next((op for op in opciones_viables if op['tipo'] == 'termotanque_solar'), None)
-    
-    if solar and termotanque:
-        costo_combinado = solar.get('costo_estimado', 0) + termotanque.get('costo_estimado', 0)
-        
-        # Solo considerar si está dentro del presupuesto o no hay presupuesto especificado
-        if presupuesto is None or costo_combinado <= presupuesto:
-            cobertura_combinada = min(100, solar['cobertura'] + termotanque['cobertura'])
-            
-            mejores_combinaciones.append({
-                'sistemas': ['solar', 'termotanque_solar'],
-                'cobertura_total': cobertura_combinada,
-                'costo_total': costo_combinado,
-                'costo_beneficio': cobertura_combinada / costo_combinado * 100 if costo_combinado > 0 else 0,
-                'detalles': [solar, termotanque]
-            })
-    
-    # Probar combinación de eólica + termotanque si ambos existen
-    eolica = next((op for op in opciones_viables if op['tipo'] == 'eolica'), None)
-    
-    if eolica and termotanque:
-        costo_combinado = eolica.get('costo_estimado', 0) + termotanque.get('costo_estimado', 0)
-        
-        # Solo considerar si está dentro del presupuesto
-        if presupuesto is None or costo_combinado <= presupuesto:
-            cobertura_combinada = min(100, eolica['cobertura'] + termotanque['cobertura'])
-            
-            mejores_combinaciones.append({
-                'sistemas': ['eolica', 'termotanque_solar'],
-                'cobertura_total': cobertura_combinada,
-                'costo_total': costo_combinado,
-                'costo_beneficio': cobertura_combinada / costo_combinado * 100 if costo_combinado > 0 else 0,
-                'detalles': [eolica, termotanque]
-            })
-    
-    # También considerar sistemas individuales como opciones
-    for opcion in opciones_viables:
-        costo = opcion.get('costo_estimado', 0)
-        
-        # Solo considerar si está dentro del presupuesto
-        if presupuesto is None or costo <= presupuesto:
-            mejores_combinaciones.append({
-                'sistemas': [opcion['tipo']],
-                'cobertura_total': opcion['cobertura'],
-                'costo_total': costo,
-                'costo_beneficio': opcion.get('costo_beneficio', 0),
-                'detalles': [opcion]
-            })
+    tipos_viables = {opcion['tipo'] for opcion in opciones_viables}
+    resultado = optimizar_sistema_hibrido(
+        clima or clima_por_defecto(),
+        consumo_mensual,
+        superficie_disponible=superficie_disponible,
+        presupuesto=presupuesto,
+        objetivo=objetivo,
+        tecnologias=tipos_viables | {'bateria'},
+        max_resultados=1
+    )
     
     # Si no hay combinaciones dentro del presupuesto
-    if not mejores_combinaciones:
+    if not resultado['combinaciones']:
         return None
     
-    # Ordenar por cobertura total o por costo-beneficio si hay presupuesto
-    if presupuesto:
-        mejores_combinaciones.sort(key=lambda x: x['costo_beneficio'], reverse=True)
-    else:
-        mejores_combinaciones.sort(key=lambda x: x['cobertura_total'], reverse=True)
-    
-    return mejores_combinaciones[0]
\ No newline at end of file
+    mejor = resultado['combinaciones'][0]
+    return {
+        'sistemas': mejor['tipos'],
+        'cobertura_total': mejor['cobertura'],
+        'costo_total': mejor['costo_total'],
+        'costo_beneficio': mejor['cobertura'] / mejor['costo_total'] * 100 if mejor['costo_total'] > 0 else 0,
+        'tamanos': mejor['tamanos'],
+        'van_usd': mejor['van_usd'],
+        'co2_evitado': mejor['co2_evitado'],
+        'descripcion': mejor['detalle'],
+        'detalles': [opcion for opcion in opciones_viables if opcion['tipo'] in mejor['tipos']]
+    }
@@ -5,7 +5,8 @@ más precisas y personalizadas sobre sistemas de energía renovable.
 """
 import os
 import json
-import requests
+from ecosmart_advisor.app.services import http_cliente
+from ecosmart_advisor.app.services import llm_cache
 import logging
 from dotenv import load_dotenv
 
@@ -35,8 +36,9 @@ def evaluar_factores_energia_renovable(datos_usuario, clima):
         dict: Factores ajustados y recomendaciones para cada tipo de energía
     """
     try:
-        # Preparar información para la consulta
-        prompt = construir_prompt_evaluacion(datos_usuario, clima)
+        # Preparar información para la consulta con los datos cuantizados, para
+        # que diagnósticos casi idénticos compartan la respuesta en caché
+        prompt = construir_prompt_evaluacion(llm_cache.canonicalizar(datos_usuario), llm_cache.canonicalizar(clima))
         
         # Preparar payload para la API de Deepseek
         headers = {
@@ -55,11 +57,15 @@ def evaluar_factores_energia_renovable(datos_usuario, clima):
             "max_tokens": 2000
         }
         
-        # Realizar la petición a la API
-        response = requests.post(DEEPSEEK_API_URL, json=payload, headers=headers)
-        
-        # Verificar la respuesta
-        if response.status_code == 200:
+        def consultar_deepseek():
+            # Realizar la petición a la API
+            response = http_cliente.post(DEEPSEEK_API_URL, json=payload, headers=headers, timeout=30)
+            
+            # Verificar la respuesta
+            if response.status_code != 200:
+                logger.error(f"Error en la petición a Deepseek: {response.status_code} - {response.text}")
+                return None
+            
             data = response.json()
             content = data['choices'][0]['message']['content']
             
@@ -69,15 +75,14 @@ def evaluar_factores_energia_renovable(datos_usuario, clima):
             
             if start_index >= 0 and end_index > start_index:
                 json_content = content[start_index:end_index]
-                resultado = json.loads(json_content)
-                return resultado
-            else:
-                # Si no podemos encontrar JSON válido, devolver un mensaje de error
-                logger.error("Error al procesar la respuesta de Deepseek: No se encontró JSON válido")
-                return generar_respuesta_fallback()
-        else:
-            logger.error(f"Error en la petición a Deepseek: {response.status_code} - {response.text}")
-            return generar_respuesta_fallback()
+                return json.loads(json_content)
+            
+            # Si no podemos encontrar JSON válido, devolver un mensaje de error
+            logger.error("Error al procesar la respuesta de Deepseek: No se encontró JSON válido")
+            return None
+        
+        resultado = llm_cache.consultar('diagnostico', payload, consultar_deepseek)
+        return resultado if resultado is not None else generar_respuesta_fallback()
         
     except Exception as e:
         logger.error(f"Error al procesar la recomendación con Deepseek: {str(e)}")
@@ -187,6 +192,7 @@ def generar_respuesta_fallback():
         dict: Respuesta predeterminada con valores conservadores
     """
     return {
+        "respaldo": True,
         "mejor_opcion": "solar",
         "justificacion": "Recomendación generada con valores por defecto debido a un error en la consulta a la IA.",
         "opciones": {
@@ -0,0 +1,342 @@
+"""
+Simulador de almacenamiento en baterías acoplado a la generación horaria.
+
+Construye un perfil de consumo de 8760 horas a partir de los mismos datos
+que usa `calcular_estimacion_sin_kwh` (tipo de vivienda y equipos), lo
+enfrenta al perfil horario de generación y despacha una batería con la
+estrategia de autoconsumo: los excedentes cargan la batería, los déficits
+la descargan y lo que no entra o no alcanza se intercambia con la red.
+
+La recurrencia del estado de carga e(t) = min(max(e(t-1) + Δ(t), mínimo), máximo)
+es secuencial, pero cada paso es una función "desplazar y recortar" y la
+composición de dos de ellas es otra del mismo tipo. Eso permite resolver el
+año completo con un barrido de prefijos (log2(8760) = 14 operaciones
+vectorizadas) en lugar de 8760 iteraciones en Python, y evaluar muchos
+tamaños de batería a la vez.
+"""
+import os
+import numpy as np
+from dotenv import load_dotenv
+from ecosmart_advisor.app.services import motor_solar
+from ecosmart_advisor.app.services import motor_eolico
+from ecosmart_advisor.app.services.energia_calculo import (
+    CONSUMOS_BASE_VIVIENDA, CONSUMOS_ADICIONALES_EQUIPO, calcular_estimacion_sin_kwh
+)
+
+# Cargar variables de entorno
+load_dotenv()
+
+DIAS_ANIO = 365
+
+# Máximo de capacidades de batería a comparar en una simulación
+BATERIA_MAX_CAPACIDADES = int(os.environ.get("BATERIA_MAX_CAPACIDADES", "20"))
+
+# Parámetros típicos de una batería de litio domiciliaria
+EFICIENCIA_IDA_VUELTA = 0.90
+SOC_MINIMO = 0.10  # Fracción de la capacidad que no se descarga (profundidad de descarga del 90%)
+TASA_C = 0.5  # Potencia máxima de carga y descarga en kW por kWh de capacidad
+
+# Perfiles diarios relativos (hora 0 a 23)
+PERFIL_RESIDENCIAL = np.array([
+    0.55, 0.45, 0.40, 0.40, 0.40, 0.50, 0.80, 1.10, 1.10, 0.85, 0.75, 0.75,
+    0.85, 0.85, 0.75, 0.75, 0.85, 1.10, 1.50, 1.80, 1.85, 1.60, 1.20, 0.80
+])
+PERFIL_COMERCIAL = np.array([
+    0.30, 0.30, 0.30, 0.30, 0.30, 0.35, 0.50, 0.90, 1.50, 1.70, 1.75, 1.75,
+    1.60, 1.70, 1.75, 1.70, 1.60, 1.40, 1.00, 0.60, 0.45, 0.40, 0.35, 0.30
+])
+PERFIL_REFRIGERACION = np.array([
+    0.30, 0.25, 0.20, 0.20, 0.20, 0.20, 0.20, 0.30, 0.40, 0.60, 0.90, 1.20,
+    1.50, 1.80, 2.00, 2.10, 2.10, 2.00, 1.80, 1.60, 1.40, 1.10, 0.70, 0.45
+])
+PERFIL_CALEFACCION = np.array([
+    1.00, 0.90, 0.90, 0.90, 0.95, 1.10, 1.60, 1.80, 1.40, 0.90, 0.70, 0.60,
+    0.55, 0.55, 0.55, 0.60, 0.75, 1.00, 1.40, 1.70, 1.70, 1.60, 1.40, 1.20
+])
+PERFIL_PISCINA = np.array([0.0] * 9 + [1.0] * 8 + [0.0] * 7)
+
+# Equipos con consumo estacional y su perfil diario
+EQUIPOS_VERANO = {'aire_acondicionado': PERFIL_REFRIGERACION, 'piscina': PERFIL_PISCINA}
+EQUIPOS_INVIERNO = {'calefaccion_electrica': PERFIL_CALEFACCION, 'bomba_calor': PERFIL_CALEFACCION}
+VIVIENDAS_COMERCIALES = {'oficina', 'comercio'}
+
+
+def _peso_estacional(latitud, verano):
+    """
+    Peso de cada mes (media 1) para un consumo concentrado en verano o en invierno
+    """
+    meses = np.arange(1, 13)
+    enero_es_verano = latitud is None or latitud < 0
+    mes_pico = 1.0 if enero_es_verano == verano else 7.0
+    peso = np.maximum(np.cos(2 * np.pi * (meses - mes_pico) / 12), 0.0) + 0.05
+    return peso / peso.mean()
+
+
+def _distribuir(consumo_mensual, perfil_diario, peso_mensual=None):
+    """
+    Reparte un consumo mensual medio en las 8760 horas del año
+    """
+    peso_dia = np.ones(DIAS_ANIO) if peso_mensual is None else peso_mensual[motor_solar.MES_DEL_DIA]
+    energia_dia = consumo_mensual * 12 * peso_dia / peso_dia.sum()
+    return (energia_dia[:, None] * (perfil_diario / perfil_diario.sum())).reshape(-1)
+
+
+def perfil_consumo(tipo_vivienda='casa_mediana', equipos=(), consumo_mensual=None, latitud=None):
+    """
+    Perfil horario de consumo del hogar o comercio
+
+    Args:
+        tipo_vivienda (str): Tipo de vivienda, como en calcular_estimacion_sin_kwh
+        equipos (list): Equipos eléctricos, como en calcular_estimacion_sin_kwh
+        consumo_mensual (float, optional): Consumo medio real en kWh/mes; si se
+                                           indica, el perfil se escala a ese valor
+        latitud (float, optional): Latitud del sitio, define el hemisferio
+
+    Returns:
+        numpy.ndarray: Consumo de cada hora del año en kWh (8760)
+    """
+    equipos = list(equipos or [])
+    perfil_base = PERFIL_COMERCIAL if tipo_vivienda in VIVIENDAS_COMERCIALES else PERFIL_RESIDENCIAL
+
+    # Consumo sin estacionalidad: base de la vivienda y equipos de uso regular
+    constante = CONSUMOS_BASE_VIVIENDA.get(tipo_vivienda, 350) + sum(
+        CONSUMOS_ADICIONALES_EQUIPO.get(e, 0) for e in equipos
+        if e not in EQUIPOS_VERANO and e not in EQUIPOS_INVIERNO
+    )
+    perfil = _distribuir(constante, perfil_base)
+
+    for equipo in equipos:
+        for estacionales, verano in ((EQUIPOS_VERANO, True), (EQUIPOS_INVIERNO, False)):
+            if equipo in estacionales:
+                perfil += _distribuir(CONSUMOS_ADICIONALES_EQUIPO[equipo], estacionales[equipo],
+                                      _peso_estacional(latitud, verano))
+
+    if consumo_mensual:
+        perfil *= consumo_mensual / calcular_estimacion_sin_kwh(tipo_vivienda, equipos)
+    return perfil
+
+
+def perfil_generacion(tipo_instalacion, capacidad_kw, clima):
+    """
+    Perfil horario de generación de la instalación
+
+    Args:
+        tipo_instalacion (str): 'solar' o 'eolica'
+        capacidad_kw (float): Capacidad instalada en kW
+        clima (dict): Datos climáticos del sitio
+
+    Returns:
+        numpy.ndarray: Generación de cada hora del año en kWh (8760)
+    """
+    from ecosmart_advisor.app.services.simulador import obtener_clima_mensual, obtener_viento_mensual
+
+    if tipo_instalacion == 'solar':
+        latitud, radiacion_mensual, temperatura_mensual = obtener_clima_mensual(clima)
+        return motor_solar.simular_fv(capacidad_kw, latitud, radiacion_mensual, temperatura_mensual,
+                                      incluir_horario=True)['horario']
+    if tipo_instalacion == 'eolica':
+        # Sin serie horaria de viento: la generación de cada mes se reparte en sus horas
+        velocidad_mensual, k_mensual = obtener_viento_mensual(clima)
+        generacion_mes = motor_eolico.simular_eolico(velocidad_mensual, capacidad_kw, k=k_mensual,
+                                                     mensual=True)['generacion'][:, 0]
+        horas_mes = motor_solar.DIAS_MES * 24
+        return np.repeat(generacion_mes / horas_mes, horas_mes)
+    raise ValueError(f"Tipo de instalación sin generación eléctrica: {tipo_instalacion}")
+
+
+def recurrencia_acotada(delta, minimo, maximo, inicial):
+    """
+    Resuelve e(t) = min(max(e(t-1) + delta(t), minimo), maximo) para todo t
+    con un barrido de prefijos vectorizado.
+
+    Cada paso es f(x) = recortar(x + a, l, h) y la composición de dos pasos es
+    recortar(x + a1 + a2, recortar(l1 + a2, l2, h2), recortar(h1 + a2, l2, h2)),
+    de modo que tras log2(T) duplicaciones cada posición contiene la
+    composición de todos los pasos previos.
+
+    Args:
+        delta (numpy.ndarray): Variación sin recortar (..., T)
+        minimo (float o array): Límite inferior (broadcast con delta[..., :1])
+        maximo (float o array): Límite superior
+        inicial (float o array): Valor antes del primer paso
+
+    Returns:
+        numpy.ndarray: e(t) para cada paso, con la forma de delta
+    """
+    a = np.array(delta, dtype=np.float64)
+    l = np.array(np.broadcast_to(minimo, a.shape), dtype=np.float64)
+    h = np.array(np.broadcast_to(maximo, a.shape), dtype=np.float64)
+
+    paso = 1
+    while paso < a.shape[-1]:
+        previo_a, previo_l, previo_h = a[..., :-paso], l[..., :-paso], h[..., :-paso]
+        actual_a, actual_l, actual_h = a[..., paso:], l[..., paso:], h[..., paso:]
+        nuevo_l = np.minimum(np.maximum(previo_l + actual_a, actual_l), actual_h)
+        nuevo_h = np.minimum(np.maximum(previo_h + actual_a, actual_l), actual_h)
+        nuevo_a = previo_a + actual_a
+        a[..., paso:], l[..., paso:], h[..., paso:] = nuevo_a, nuevo_l, nuevo_h
+        paso *= 2
+
+    inicial = np.asarray(inicial, dtype=np.float64)
+    return np.minimum(np.maximum(inicial + a, l), h)
+
+
+def simular_bateria(generacion, consumo, capacidad_kwh, potencia_kw=None,
+                    eficiencia=EFICIENCIA_IDA_VUELTA, soc_minimo=SOC_MINIMO, incluir_horario=False):
+    """
+    Despacha una o varias baterías durante un año con estrategia de autoconsumo
+
+    Args:
+        generacion (array): Generación horaria en kWh (8760), o una fila por sistema
+        consumo (array): Consumo horario en kWh (8760), o una fila por sistema
+        capacidad_kwh (float o array): Capacidad nominal de cada batería (o de cada sistema)
+        potencia_kw (float o array, optional): Potencia máxima de carga/descarga
+                                               (por defecto TASA_C por kWh)
+        eficiencia (float): Eficiencia de ida y vuelta
+        soc_minimo (float): Estado de carga mínimo (fracción de la capacidad)
+        incluir_horario (bool): Si es True incluye los flujos hora a hora
+
+    Returns:
+        dict: Indicadores anuales con la forma de `capacidad_kwh`
+    """
+    generacion = np.asarray(generacion, dtype=np.float64)
+    consumo = np.asarray(consumo, dtype=np.float64)
+    capacidad = np.maximum(np.asarray(capacidad_kwh, dtype=np.float64), 0.0)
+    potencia = TASA_C * capacidad if potencia_kw is None else np.asarray(potencia_kw, dtype=np.float64)
+    eficiencia_carga = eficiencia_descarga = np.sqrt(eficiencia)
+
+    neto = generacion - consumo
+    excedente = np.maximum(neto, 0.0)
+    deficit = np.maximum(-neto, 0.0)
+
+    # Variación del estado de carga si la batería nunca se llenara ni vaciara
+    potencia_horaria = potencia[..., None]
+    delta = (np.minimum(excedente, potencia_horaria) * eficiencia_carga
+             - np.minimum(deficit, potencia_horaria) / eficiencia_descarga)
+    minimo = capacidad * soc_minimo
+    energia = recurrencia_acotada(delta, minimo[..., None], capacidad[..., None], minimo[..., None])
+
+    # Flujos reales a partir de los cambios del estado de carga (el año arranca con la batería vacía)
+    inicial = np.broadcast_to(minimo[..., None], energia.shape[:-1] + (1,))
+    previo = np.concatenate([inicial, energia[..., :-1]], axis=-1)
+    cambio = energia - previo
+    carga = np.maximum(cambio, 0.0) / eficiencia_carga  # Energía tomada del excedente
+    descarga = np.maximum(-cambio, 0.0) * eficiencia_descarga  # Energía entregada al consumo
+    exportacion = np.maximum(excedente - carga, 0.0)
+    importacion = np.maximum(deficit - descarga, 0.0)
+
+    generacion_anual = generacion.sum(axis=-1)
+    consumo_anual = consumo.sum(axis=-1)
+    importacion_anual = importacion.sum(axis=-1)
+    exportacion_anual = exportacion.sum(axis=-1)
+    capacidad_util = capacidad - minimo
+    importacion_diaria = importacion.reshape(importacion.shape[:-1] + (DIAS_ANIO, 24)).sum(axis=-1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        resultado = {
+            'capacidad_kwh': capacidad,
+            'generacion_anual': generacion_anual,
+            'consumo_anual': consumo_anual,
+            'autoconsumo': consumo_anual - importacion_anual,  # kWh cubiertos sin la red
+            'importacion_red': importacion_anual,
+            'exportacion_red': exportacion_anual,
+            # Parte de la generación aprovechada en el lugar (%)
+            'tasa_autoconsumo': np.where(generacion_anual > 0,
+                                         (generacion_anual - exportacion_anual) / generacion_anual * 100, 0.0),
+            # Parte del consumo cubierta por la instalación (%)
+            'autosuficiencia': np.where(consumo_anual > 0,
+                                        (consumo_anual - importacion_anual) / consumo_anual * 100, 0.0),
+            'energia_descargada': descarga.sum(axis=-1),
+            'ciclos_equivalentes': np.where(capacidad_util > 0,
+                                            descarga.sum(axis=-1) / eficiencia_descarga / capacidad_util, 0.0),
+            # Días de consumo medio que cubre la batería llena sin generación
+            'dias_autonomia': capacidad_util * eficiencia_descarga / (consumo_anual / DIAS_ANIO),
+            'dias_sin_red': (importacion_diaria < 1e-6).sum(axis=-1)
+        }
+    if incluir_horario:
+        resultado.update({
+            'energia_almacenada': energia,
+            'importacion': importacion,
+            'exportacion': exportacion,
+            'carga': carga,
+            'descarga': descarga
+        })
+    return resultado
+
+
+def resumen_bateria(resultado, indice=()):
+    """
+    Convierte una batería de `simular_bateria` en un dict serializable
+    """
+    def valor(clave, decimales=1):
+        dato = np.asarray(resultado[clave])
+        return round(float(dato if dato.ndim == 0 else dato[indice]), decimales)
+
+    return {
+        'capacidad_kwh': valor('capacidad_kwh'),
+        'autoconsumo_kwh': valor('autoconsumo'),
+        'importacion_red_kwh': valor('importacion_red'),
+        'exportacion_red_kwh': valor('exportacion_red'),
+        'tasa_autoconsumo': valor('tasa_autoconsumo'),  # Porcentaje
+        'autosuficiencia': valor('autosuficiencia'),  # Porcentaje
+        'ciclos_equivalentes': valor('ciclos_equivalentes', 0),
+        'dias_autonomia': valor('dias_autonomia', 2),
+        'dias_sin_red': int(valor('dias_sin_red', 0))
+    }
+
+
+def validar_capacidades(capacidades_kwh):
+    """
+    Convierte y valida las capacidades de batería recibidas en una petición
+
+    Args:
+        capacidades_kwh (float o list): Capacidades en kWh
+
+    Returns:
+        np.ndarray: Capacidades como vector
+
+    Raises:
+        ValueError: Si no son números finitos y positivos o superan BATERIA_MAX_CAPACIDADES
+    """
+    try:
+        capacidades = np.atleast_1d(np.asarray(capacidades_kwh, dtype=np.float64))
+    except (TypeError, ValueError):
+        raise ValueError(f"Capacidades de batería inválidas: {capacidades_kwh!r}")
+    if capacidades.ndim != 1 or not 1 <= capacidades.size <= BATERIA_MAX_CAPACIDADES:
+        raise ValueError(f"Se esperaban entre 1 y {BATERIA_MAX_CAPACIDADES} capacidades de batería")
+    if not np.all(np.isfinite(capacidades) & (capacidades > 0)):
+        raise ValueError("Las capacidades de batería deben ser números finitos y positivos")
+    return capacidades
+
+
+def simular_autoconsumo(tipo_instalacion, capacidad_kw, clima, capacidades_bateria_kwh,
+                        tipo_vivienda='casa_mediana', equipos=(), consumo_mensual=None):
+    """
+    Evalúa una instalación con una o varias baterías frente al consumo del hogar
+
+    Args:
+        tipo_instalacion (str): 'solar' o 'eolica'
+        capacidad_kw (float): Capacidad de la instalación en kW
+        clima (dict): Datos climáticos del sitio
+        capacidades_bateria_kwh (float o list): Capacidades de batería a comparar
+        tipo_vivienda (str): Tipo de vivienda para el perfil de consumo
+        equipos (list): Equipos eléctricos del hogar
+        consumo_mensual (float, optional): Consumo medio real en kWh/mes
+
+    Returns:
+        dict: Indicadores sin batería ('sin_bateria') y por capacidad ('baterias')
+
+    Raises:
+        ValueError: Si las capacidades de batería no son válidas
+    """
+    capacidades = np.concatenate([[0.0], validar_capacidades(capacidades_bateria_kwh)])
+    generacion = perfil_generacion(tipo_instalacion, capacidad_kw, clima)
+    consumo = perfil_consumo(tipo_vivienda, equipos, consumo_mensual, clima.get('latitud'))
+    resultado = simular_bateria(generacion, consumo, capacidades)
+
+    return {
+        'consumo_anual_kwh': round(float(consumo.sum()), 1),
+        'generacion_anual_kwh': round(float(generacion.sum()), 1),
+        'sin_bateria': resumen_bateria(resultado, 0),
+        'baterias': [resumen_bateria(resultado, i) for i in range(1, len(capacidades))]
+    }
@@ -0,0 +1,505 @@
+"""
+Módulo de caché en dos niveles para los servicios de EcoSmart Advisor.
+Combina un LRU en memoria del proceso con un segundo nivel compartido
+entre procesos (workers de gunicorn), que además sobrevive a los
+reinicios de los workers. El segundo nivel se elige con
+ECOSMART_CACHE_BACKEND:
+
+- 'sqlite' (por defecto): un archivo SQLite por caché en CACHE_DIR
+- 'redis': un servidor Redis en REDIS_URL (requiere el paquete redis;
+  si no está instalado se usa SQLite)
+- 'memoria': sin segundo nivel, solo el LRU de cada proceso
+"""
+import os
+import json
+import math
+import time
+import sqlite3
+import tempfile
+import threading
+import logging
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Directorio donde se guardan las bases de caché compartidas
+CACHE_DIR = os.environ.get("ECOSMART_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ecosmart_cache"))
+
+# Segundo nivel de las cachés escalonadas: 'sqlite', 'redis' o 'memoria'
+CACHE_BACKEND = os.environ.get("ECOSMART_CACHE_BACKEND", "sqlite").strip().lower()
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+# Espera máxima de cada operación con Redis y pausa después de un error (segundos)
+REDIS_TIMEOUT = float(os.environ.get("REDIS_TIMEOUT", "0.5"))
+REDIS_REINTENTO_SEGUNDOS = float(os.environ.get("REDIS_REINTENTO_SEGUNDOS", "10"))
+
+
+class CacheLRU:
+    """
+    Caché LRU en memoria con expiración por TTL y límite de entradas.
+    Es segura para usar desde varios hilos.
+    """
+
+    def __init__(self, max_entradas=1024, ttl=3600):
+        """
+        Args:
+            max_entradas (int): Cantidad máxima de entradas antes de expulsar la menos usada
+            ttl (float): Tiempo de vida por defecto de cada entrada, en segundos
+        """
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+
+    def obtener(self, clave, defecto=None):
+        """
+        Devuelve el valor asociado a la clave o `defecto` si no existe o expiró.
+        """
+        ahora = time.time()
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return defecto
+            expira, valor = entrada
+            if expira < ahora:
+                del self._datos[clave]
+                self.fallos += 1
+                return defecto
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def guardar(self, clave, valor, ttl=None):
+        """
+        Guarda un valor, expulsando la entrada menos usada si se supera el límite.
+        """
+        expira = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._datos[clave] = (expira, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self.expulsiones += 1
+
+    def eliminar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Contadores de aciertos, fallos, expulsiones y tamaño actual
+        """
+        total = self.aciertos + self.fallos
+        return {
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'expulsiones': self.expulsiones,
+            'entradas': len(self._datos),
+            'tasa_aciertos': round(self.aciertos / total, 3) if total else 0.0
+        }
+
+
+class CacheSQLite:
+    """
+    Caché persistente en un archivo SQLite. Los valores se guardan como JSON,
+    por lo que el archivo puede ser compartido por varios procesos.
+    """
+
+    def __init__(self, nombre, max_entradas=10000, ttl=86400, ruta=None):
+        """
+        Args:
+            nombre (str): Nombre de la caché (se usa como nombre de tabla y de archivo)
+            max_entradas (int): Cantidad máxima de filas antes de expulsar las más antiguas
+            ttl (float): Tiempo de vida por defecto de cada entrada, en segundos
+            ruta (str, optional): Ruta del archivo SQLite. Por defecto, CACHE_DIR/<nombre>.sqlite
+        """
+        self.nombre = nombre
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.ruta = ruta or os.path.join(CACHE_DIR, f"{nombre}.sqlite")
+        self._local = threading.local()
+        self._lock = threading.Lock()  # Protege los contadores
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self._escrituras = 0
+
+    def _conexion(self):
+        # Una conexión por hilo y por proceso: las conexiones no sobreviven a un fork
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is not None and self._local.pid == os.getpid():
+            return conexion
+
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        conexion = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "clave TEXT PRIMARY KEY, valor TEXT NOT NULL, "
+            "creado REAL NOT NULL, expira REAL NOT NULL)"
+        )
+        conexion.execute("CREATE INDEX IF NOT EXISTS idx_cache_creado ON cache (creado)")
+        self._local.conexion = conexion
+        self._local.pid = os.getpid()
+        return conexion
+
+    def _contar(self, acierto):
+        with self._lock:
+            if acierto:
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+
+    def obtener(self, clave, defecto=None):
+        return self.obtener_con_expiracion(clave, defecto)[0]
+
+    def obtener_con_expiracion(self, clave, defecto=None):
+        """
+        Devuelve el valor y el momento en que expira (epoch en segundos),
+        o (defecto, None) si la clave no existe o expiró.
+        """
+        try:
+            fila = self._conexion().execute(
+                "SELECT valor, expira FROM cache WHERE clave = ?", (clave,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Error al leer la caché '{self.nombre}': {str(e)}")
+            self._contar(False)
+            return defecto, None
+
+        if fila is None or fila[1] < time.time():
+            self._contar(False)
+            return defecto, None
+        self._contar(True)
+        return json.loads(fila[0]), fila[1]
+
+    def guardar(self, clave, valor, ttl=None):
+        ahora = time.time()
+        expira = ahora + (self.ttl if ttl is None else ttl)
+        try:
+            conexion = self._conexion()
+            conexion.execute(
+                "INSERT OR REPLACE INTO cache (clave, valor, creado, expira) VALUES (?, ?, ?, ?)",
+                (clave, json.dumps(valor, ensure_ascii=False), ahora, expira)
+            )
+            # Revisar el tamaño cada tanto para no pagar un COUNT(*) en cada escritura
+            with self._lock:
+                self._escrituras += 1
+                podar = self._escrituras % 64 == 0
+            if podar:
+                self._podar(conexion)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.error(f"Error al escribir en la caché '{self.nombre}': {str(e)}")
+
+    def _podar(self, conexion):
+        conexion.execute("DELETE FROM cache WHERE expira < ?", (time.time(),))
+        total = conexion.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        exceso = total - self.max_entradas
+        if exceso > 0:
+            conexion.execute(
+                "DELETE FROM cache WHERE clave IN "
+                "(SELECT clave FROM cache ORDER BY creado ASC LIMIT ?)", (exceso,)
+            )
+            with self._lock:
+                self.expulsiones += exceso
+
+    def eliminar(self, clave):
+        try:
+            self._conexion().execute("DELETE FROM cache WHERE clave = ?", (clave,))
+        except sqlite3.Error as e:
+            logger.error(f"Error al eliminar de la caché '{self.nombre}': {str(e)}")
+
+    def limpiar(self):
+        try:
+            self._conexion().execute("DELETE FROM cache")
+        except sqlite3.Error as e:
+            logger.error(f"Error al limpiar la caché '{self.nombre}': {str(e)}")
+
+    def __len__(self):
+        try:
+            return self._conexion().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def estadisticas(self):
+        total = self.aciertos + self.fallos
+        return {
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'expulsiones': self.expulsiones,
+            'entradas': len(self),
+            'tasa_aciertos': round(self.aciertos / total, 3) if total else 0.0
+        }
+
+
+class CacheRedis:
+    """
+    Caché compartida en un servidor Redis. Los valores se guardan como JSON
+    con expiración nativa (SET ... EX) bajo el prefijo ecosmart:<nombre>:,
+    así que todos los workers ven las mismas entradas. El límite de
+    entradas lo aplica el servidor con su política maxmemory.
+
+    Si Redis no responde, las lecturas cuentan como fallos y las escrituras
+    se descartan durante REDIS_REINTENTO_SEGUNDOS, para no esperar el
+    timeout en cada solicitud.
+    """
+
+    def __init__(self, nombre, max_entradas=10000, ttl=86400, url=None, cliente=None):
+        """
+        Args:
+            nombre (str): Nombre de la caché (se usa como prefijo de las claves)
+            max_entradas (int): Se informa en las estadísticas; Redis aplica su propio límite
+            ttl (float): Tiempo de vida por defecto de cada entrada, en segundos
+            url (str, optional): URL del servidor (por defecto REDIS_URL)
+            cliente (optional): Cliente compatible con redis.Redis (get, pttl, set, delete, scan_iter)
+        """
+        self.nombre = nombre
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.url = url or REDIS_URL
+        self.prefijo = f"ecosmart:{nombre}:"
+        self._cliente = cliente
+        self._suspendida_hasta = 0.0
+        self._lock = threading.Lock()  # Protege los contadores
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self.errores = 0
+
+    def _conexion(self):
+        # redis.Redis es seguro entre hilos y su pool detecta los fork
+        if self._cliente is None:
+            if redis is None:
+                raise RuntimeError("El paquete redis no está instalado")
+            self._cliente = redis.Redis.from_url(self.url, socket_timeout=REDIS_TIMEOUT,
+                                                 socket_connect_timeout=REDIS_TIMEOUT)
+        return self._cliente
+
+    def _disponible(self):
+        return time.monotonic() >= self._suspendida_hasta
+
+    def _error(self, operacion, error):
+        with self._lock:
+            self.errores += 1
+        self._suspendida_hasta = time.monotonic() + REDIS_REINTENTO_SEGUNDOS
+        logger.error(f"Error al {operacion} la caché Redis '{self.nombre}': {str(error)}")
+
+    def _contar(self, acierto):
+        with self._lock:
+            if acierto:
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+
+    def obtener(self, clave, defecto=None):
+        if not self._disponible():
+            self._contar(False)
+            return defecto
+        try:
+            valor = self._conexion().get(self.prefijo + clave)
+        except Exception as e:
+            self._error('leer', e)
+            self._contar(False)
+            return defecto
+
+        if valor is None:
+            self._contar(False)
+            return defecto
+        self._contar(True)
+        return json.loads(valor)
+
+    def obtener_con_expiracion(self, clave, defecto=None):
+        """
+        Devuelve el valor y el momento en que expira (epoch en segundos),
+        o (defecto, None) si la clave no existe. La expiración es None si la
+        entrada no tiene TTL o no se pudo consultar.
+        """
+        valor = self.obtener(clave, _AUSENTE)
+        if valor is _AUSENTE:
+            return defecto, None
+        try:
+            milisegundos = self._conexion().pttl(self.prefijo + clave)
+        except Exception as e:
+            self._error('leer', e)
+            return valor, None
+        # PTTL devuelve -1 si la clave no expira y -2 si ya no existe
+        return valor, (time.time() + milisegundos / 1000 if milisegundos >= 0 else None)
+
+    def guardar(self, clave, valor, ttl=None):
+        segundos = self.ttl if ttl is None else ttl
+        if not self._disponible():
+            return
+        try:
+            if segundos <= 0:
+                self._conexion().delete(self.prefijo + clave)
+                return
+            self._conexion().set(self.prefijo + clave, json.dumps(valor, ensure_ascii=False),
+                                 ex=max(1, math.ceil(segundos)))
+        except (TypeError, ValueError) as e:
+            logger.error(f"Error al escribir en la caché '{self.nombre}': {str(e)}")
+        except Exception as e:
+            self._error('escribir en', e)
+
+    def eliminar(self, clave):
+        try:
+            self._conexion().delete(self.prefijo + clave)
+        except Exception as e:
+            self._error('eliminar de', e)
+
+    def _claves(self):
+        return self._conexion().scan_iter(match=self.prefijo + '*', count=500)
+
+    def limpiar(self):
+        try:
+            lote = []
+            for clave in self._claves():
+                lote.append(clave)
+                if len(lote) >= 500:
+                    self._conexion().delete(*lote)
+                    lote = []
+            if lote:
+                self._conexion().delete(*lote)
+        except Exception as e:
+            self._error('limpiar', e)
+
+    def __len__(self):
+        if not self._disponible():
+            return 0
+        try:
+            return sum(1 for _ in self._claves())
+        except Exception:
+            return 0
+
+    def estadisticas(self):
+        total = self.aciertos + self.fallos
+        return {
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'expulsiones': self.expulsiones,
+            'errores': self.errores,
+            'entradas': len(self),
+            'tasa_aciertos': round(self.aciertos / total, 3) if total else 0.0
+        }
+
+
+def crear_cache_compartida(nombre, max_entradas=10000, ttl=86400, ruta=None, backend=None):
+    """
+    Crea el segundo nivel (compartido entre procesos) de una caché
+
+    Args:
+        nombre (str): Nombre de la caché
+        max_entradas (int): Límite de entradas
+        ttl (float): Tiempo de vida por defecto en segundos
+        ruta (str, optional): Ruta de un archivo SQLite; si se indica, se usa SQLite
+        backend (str, optional): 'sqlite', 'redis' o 'memoria' (por defecto CACHE_BACKEND)
+
+    Returns:
+        CacheSQLite, CacheRedis o None (sin segundo nivel)
+    """
+    backend = (backend or CACHE_BACKEND) if ruta is None else 'sqlite'
+    if backend == 'memoria':
+        return None
+    if backend == 'redis':
+        if redis is not None:
+            return CacheRedis(nombre, max_entradas=max_entradas, ttl=ttl)
+        logger.warning(f"El paquete redis no está instalado: la caché '{nombre}' usa SQLite")
+    elif backend != 'sqlite':
+        logger.warning(f"Backend de caché desconocido '{backend}': la caché '{nombre}' usa SQLite")
+    return CacheSQLite(nombre, max_entradas=max_entradas, ttl=ttl, ruta=ruta)
+
+
+class CacheEscalonada:
+    """
+    Caché de dos niveles: primero busca en el LRU del proceso y, si no
+    encuentra la clave, en el nivel compartido (SQLite, Redis o ninguno,
+    según ECOSMART_CACHE_BACKEND). Los aciertos del nivel compartido se
+    promueven a memoria con el tiempo de vida que les queda.
+    """
+
+    def __init__(self, nombre, max_entradas=1024, ttl=3600, max_entradas_disco=None, ruta=None,
+                 backend=None, compartida=None):
+        """
+        Args:
+            nombre (str): Nombre de la caché
+            max_entradas (int): Límite de entradas en memoria
+            ttl (float): Tiempo de vida por defecto en segundos
+            max_entradas_disco (int, optional): Límite del nivel compartido (por defecto 10x memoria)
+            ruta (str, optional): Ruta del archivo SQLite (implica el backend SQLite)
+            backend (str, optional): 'sqlite', 'redis' o 'memoria' (por defecto CACHE_BACKEND)
+            compartida (optional): Nivel compartido ya creado (CacheSQLite, CacheRedis, ...)
+        """
+        self.nombre = nombre
+        self.memoria = CacheLRU(max_entradas=max_entradas, ttl=ttl)
+        if compartida is None:
+            compartida = crear_cache_compartida(
+                nombre,
+                max_entradas=max_entradas_disco or max_entradas * 10,
+                ttl=ttl,
+                ruta=ruta,
+                backend=backend
+            )
+        self.disco = compartida
+
+    def obtener(self, clave, defecto=None):
+        valor = self.memoria.obtener(clave, _AUSENTE)
+        if valor is not _AUSENTE:
+            return valor
+        if self.disco is None:
+            return defecto
+        valor, expira = self.disco.obtener_con_expiracion(clave, _AUSENTE)
+        if valor is not _AUSENTE:
+            self.memoria.guardar(clave, valor, None if expira is None else expira - time.time())
+            return valor
+        return defecto
+
+    def guardar(self, clave, valor, ttl=None):
+        self.memoria.guardar(clave, valor, ttl)
+        if self.disco is not None:
+            self.disco.guardar(clave, valor, ttl)
+
+    def eliminar(self, clave):
+        self.memoria.eliminar(clave)
+        if self.disco is not None:
+            self.disco.eliminar(clave)
+
+    def limpiar(self):
+        self.memoria.limpiar()
+        if self.disco is not None:
+            self.disco.limpiar()
+
+    def estadisticas(self):
+        return {
+            'nombre': self.nombre,
+            'backend': type(self.disco).__name__ if self.disco is not None else 'memoria',
+            'memoria': self.memoria.estadisticas(),
+            'disco': self.disco.estadisticas() if self.disco is not None else None
+        }
+
+
+# Marcador interno para distinguir "no está en caché" de un valor guardado
+_AUSENTE = object()
@@ -2,11 +2,23 @@
 Módulo para generar contenido aleatorio relevante para el carrusel de la página principal,
 utilizando Deepseek AI para obtener información actualizada sobre energías renovables
 e integrando una API de imágenes para mostrar contenido visual pertinente.
+
+El contenido se reconstruye en un hilo de segundo plano cada
+CARRUSEL_REFRESCO_SEGUNDOS y se publica como una instantánea inmutable;
+la página principal solo lee la última instantánea publicada, así que no
+espera a Deepseek ni a Unsplash.
 """
 import os
 import random
 import json
-import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from ecosmart_advisor.app.services import http_cliente
+from ecosmart_advisor.app.services import llm_cache
+from ecosmart_advisor.app.services import tareas
+from ecosmart_advisor.app.services import imagenes
+from ecosmart_advisor.app.services.cache import CacheEscalonada
 import hashlib
 import time
 import logging
@@ -23,6 +35,10 @@ load_dotenv()
 DEEPSEEK_API_KEY = os.environ.get("DEEPSEEK_API_KEY")
 DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
 
+# Las respuestas de Deepseek para cada categoría y enfoque se reutilizan
+# durante este tiempo (segundos); la variedad la aporta el enfoque aleatorio
+CARRUSEL_LLM_TTL = int(os.environ.get("CARRUSEL_LLM_TTL", str(6 * 3600)))
+
 # Configurar API de imágenes (Unsplash)
 UNSPLASH_ACCESS_KEY = os.environ.get("UNSPLASH_API_KEY")  # Usar la clave de API de las variables de entorno
 UNSPLASH_API_URL = "https://api.unsplash.com/search/photos"
@@ -30,12 +46,26 @@ UNSPLASH_API_URL = "https://api.unsplash.com/search/photos"
 # Nota: Ya no usamos URLs predefinidas de Unsplash porque dependen de la API.
 # En su lugar, usamos imágenes locales como fallback que están siempre disponibles.
 
-# Caché para evitar generar el mismo contenido en cada solicitud
-# Usaremos un tiempo de expiración para refrescar el contenido periódicamente
-CONTENT_CACHE = {}  # Vaciar caché para forzar regeneración
+# Reconstrucción del carrusel en segundo plano: intervalo entre reconstrucciones
+# y espera antes de reintentar si una reconstrucción falla (segundos)
+CARRUSEL_REFRESCO_SEGUNDOS = float(os.environ.get("CARRUSEL_REFRESCO_SEGUNDOS", "1800"))
+CARRUSEL_REINTENTO_SEGUNDOS = float(os.environ.get("CARRUSEL_REINTENTO_SEGUNDOS", "60"))
+CARRUSEL_REFRESCO = os.environ.get("CARRUSEL_REFRESCO", "1").lower() not in ("0", "false", "no")
+# Cada reconstrucción consulta todas las categorías en paralelo (texto e imagen por
+# separado) y espera como máximo CARRUSEL_PLAZO_SEGUNDOS en total
+CARRUSEL_PLAZO_SEGUNDOS = float(os.environ.get("CARRUSEL_PLAZO_SEGUNDOS", "12"))
+CARRUSEL_HILOS = int(os.environ.get("CARRUSEL_HILOS", "12"))
 
-logger.info("---- Generando datos para el carrusel con imágenes filtradas de energías renovables ----")
-CACHE_EXPIRY = 10  # Reducir temporalmente a 10 segundos para pruebas
+# Imágenes locales, siempre disponibles, para cada categoría
+IMAGENES_LOCALES = {
+    "energia_solar": "/static/images/carousel/energia_solar.jpg",
+    "energia_eolica": "/static/images/carousel/energia_eolica.jpg",
+    "termotanque_solar": "/static/images/carousel/termotanque_solar.jpg",
+    "eficiencia_energetica": "/static/images/carousel/eficiencia_energetica.jpg",
+    "futuro_renovables": "/static/images/carousel/futuro_renovable.jpg",
+    "energia_termica": "/static/images/carousel/energia_termica.jpg"
+}
+IMAGEN_GENERICA = "/static/images/carousel/energia_eolica.jpg"
 
 # Temas predefinidos para las imágenes
 IMAGE_TOPICS = {
@@ -110,14 +140,7 @@ def buscar_imagen_unsplash(tema, categoria=None):
         str: URL de la imagen
     """
     # Mapeo de fallback con imágenes locales por si falla la API
-    imagenes_fallback = {
-        "energia_solar": "/static/images/carousel/energia_solar.jpg",
-        "energia_eolica": "/static/images/carousel/energia_eolica.jpg",
-        "termotanque_solar": "/static/images/carousel/termotanque_solar.jpg",
-        "eficiencia_energetica": "/static/images/carousel/eficiencia_energetica.jpg",
-        "futuro_renovables": "/static/images/carousel/futuro_renovable.jpg",
-        "energia_termica": "/static/images/carousel/energia_termica.jpg"
-    }
+    imagenes_fallback = IMAGENES_LOCALES
     
     # Filtros para asegurar que solo se muestren imágenes de energías renovables
     filtros_renovables = [
@@ -133,14 +156,14 @@ def buscar_imagen_unsplash(tema, categoria=None):
         if categoria and categoria in imagenes_fallback:
             logger.info(f"Sin API key - Usando imagen local para {categoria}")
             return imagenes_fallback[categoria]
-        return "/static/images/carousel/energia_eolica.jpg"
+        return IMAGEN_GENERICA
     
     if not tema:
         logger.warning("No se proporcionó tema de búsqueda")
         if categoria and categoria in imagenes_fallback:
             logger.info(f"Sin tema - Usando imagen local para {categoria}")
             return imagenes_fallback[categoria]
-        return "/static/images/carousel/energia_eolica.jpg"
+        return IMAGEN_GENERICA
     
     # Verificar el formato de la API key (mostrar solo los primeros 5 caracteres por seguridad)
     if UNSPLASH_ACCESS_KEY:
@@ -163,7 +186,7 @@ def buscar_imagen_unsplash(tema, categoria=None):
         }
         
         # Realizar la petición a la API
-        response = requests.get(UNSPLASH_API_URL, params=params, timeout=5)
+        response = http_cliente.get(UNSPLASH_API_URL, params=params, timeout=5)
         
         # Verificar si la solicitud fue exitosa
         if response.status_code == 200:
@@ -187,39 +210,49 @@ def buscar_imagen_unsplash(tema, categoria=None):
         return imagenes_fallback[categoria]
     
     logger.info("Usando imagen genérica de fallback")
-    return "/static/images/carousel/energia_eolica.jpg"
+    return IMAGEN_GENERICA
 
-def generar_datos_carrusel():
+def generar_datos_carrusel(plazo=None):
     """
     Genera datos para el carrusel con imágenes dinámicas de Unsplash filtradas 
     para asegurar que sean relacionadas con energías renovables.
     
+    El texto y la imagen de todas las categorías se piden a la vez en un pool
+    de hilos acotado; al vencer el plazo, cada categoría que no terminó usa
+    sus datos predeterminados o su imagen local. Las consultas demoradas
+    siguen en segundo plano y su respuesta queda en la caché de la IA.
+    
+    Args:
+        plazo (float, optional): Segundos de espera en total (por defecto CARRUSEL_PLAZO_SEGUNDOS)
+    
     Returns:
         dict: Datos para el carrusel con URLs de imágenes
     """
-    print("---- Generando datos para el carrusel con imágenes filtradas de energías renovables ----")
+    logger.info("---- Generando datos para el carrusel con imágenes filtradas de energías renovables ----")
+    limite = tareas.limite_desde(CARRUSEL_PLAZO_SEGUNDOS if plazo is None else plazo)
+    pool = ThreadPoolExecutor(max_workers=CARRUSEL_HILOS, thread_name_prefix="ecosmart-carrusel")
     
     try:
+        # Lanzar todas las consultas antes de esperar ninguna
+        textos = {categoria: pool.submit(generar_datos_categoria, categoria) for categoria in CAROUSEL_CATEGORIES}
+        fotos = {categoria: pool.submit(obtener_imagen_categoria, categoria) for categoria in CAROUSEL_CATEGORIES}
+        
         # Crear datos dinámicos para cada categoría
         carousel_data = {}
         
         # Procesar cada categoría
         for categoria in CAROUSEL_CATEGORIES:
-            # Intentar generar datos dinámicos de texto para esta categoría
-            datos_categoria = generar_datos_categoria(categoria)
+            datos_categoria = tareas.esperar(textos[categoria], limite, lambda: None,
+                                             f"texto del carrusel ({categoria})")
             
-            # Si no se pudieron generar datos, usar los predeterminados
+            # Si no se pudieron generar datos a tiempo, usar los predeterminados
             if not datos_categoria:
                 datos_categoria = DEFAULT_CAROUSEL_DATA[categoria].copy()
             
-            # Obtener el tema específico para la búsqueda de imágenes
-            tema_imagen = IMAGE_TOPICS.get(categoria)
-            
-            # Buscar una imagen con el filtro de energías renovables aplicado
-            imagen_url = buscar_imagen_unsplash(tema_imagen, categoria)
-            
-            # Añadir la URL de la imagen
-            datos_categoria["imagen_url"] = imagen_url
+            # Imagen con el filtro de energías renovables, o la local si no llegó a tiempo
+            datos_categoria.update(tareas.esperar(fotos[categoria], limite,
+                                                  lambda: {"imagen_url": IMAGENES_LOCALES[categoria], "imagen": None},
+                                                  f"imagen del carrusel ({categoria})"))
             
             # Asegurar que tenga color
             if "color" not in datos_categoria:
@@ -232,12 +265,39 @@ def generar_datos_carrusel():
         return carousel_data
     
     except Exception as e:
-        print(f"Error al generar datos del carrusel: {str(e)}")
+        logger.error(f"Error al generar datos del carrusel: {str(e)}")
         # En caso de error, devolver datos mínimos con imágenes locales
-        datos_minimos = DEFAULT_CAROUSEL_DATA.copy()
-        for categoria in CAROUSEL_CATEGORIES:
-            datos_minimos[categoria]['imagen_url'] = f"/static/images/carousel/{categoria}.jpg" if categoria != "futuro_renovables" else "/static/images/carousel/futuro_renovable.jpg"
-        return datos_minimos
+        return datos_locales()
+    
+    finally:
+        # No esperar a las consultas demoradas: terminan solas en segundo plano
+        pool.shutdown(wait=False)
+
+def obtener_imagen_categoria(categoria):
+    """
+    Imagen de una categoría con sus variantes optimizadas
+
+    Args:
+        categoria (str): Categoría del carrusel
+
+    Returns:
+        dict: 'imagen_url' (URL original) e 'imagen' (variantes AVIF/WebP/JPEG
+              servidas desde /img/, o None si no se pudieron generar)
+    """
+    imagen_url = buscar_imagen_unsplash(IMAGE_TOPICS.get(categoria), categoria)
+    return {"imagen_url": imagen_url, "imagen": imagenes.preparar_imagen(imagen_url)}
+
+def datos_locales():
+    """
+    Datos predeterminados del carrusel con imágenes locales (sin consultar APIs)
+
+    Returns:
+        dict: Copia de DEFAULT_CAROUSEL_DATA con la URL de la imagen local de cada categoría
+    """
+    return {
+        categoria: dict(DEFAULT_CAROUSEL_DATA[categoria], imagen_url=IMAGENES_LOCALES[categoria])
+        for categoria in CAROUSEL_CATEGORIES
+    }
 
 def generar_datos_categoria(categoria):
     """
@@ -313,31 +373,36 @@ def generar_datos_categoria(categoria):
                 "response_format": {"type": "json_object"}
             }
             
-            # Realizar la petición a la API
-            response = requests.post(DEEPSEEK_API_URL, json=payload, headers=headers, timeout=10)
-            
-            # Verificar la respuesta
-            if response.status_code == 200:
-                data = response.json()
-                content = data['choices'][0]['message']['content']
+            def consultar_deepseek():
+                # Realizar la petición a la API
+                response = http_cliente.post(DEEPSEEK_API_URL, json=payload, headers=headers, timeout=10)
+                if response.status_code != 200:
+                    return None
                 
                 # Parsear el JSON de la respuesta
                 try:
-                    resultado = json.loads(content)
-                    
-                    # Verificar que todas las claves necesarias están presentes
-                    required_keys = ["titulo", "texto_principal", "dato_destacado"]
-                    if all(key in resultado for key in required_keys):
-                        # Añadir el color del tema predeterminado o uno aleatorio
-                        colores = ['primary', 'secondary', 'success', 'danger', 'warning', 'info']
-                        resultado["color"] = random.choice(colores)
-                        
-                        # Añadir campo para la URL de la imagen (se completará después)
-                        resultado["imagen_url"] = ""  # String vacío en lugar de None
-                        
-                        return resultado
+                    data = response.json()
+                    resultado = json.loads(data['choices'][0]['message']['content'])
                 except Exception as e:
                     print(f"Error al procesar respuesta de Deepseek: {str(e)}")
+                    return None
+                
+                # Verificar que todas las claves necesarias están presentes
+                required_keys = ["titulo", "texto_principal", "dato_destacado"]
+                if all(key in resultado for key in required_keys):
+                    return {key: resultado[key] for key in required_keys}
+                return None
+            
+            resultado = llm_cache.consultar('carrusel', payload, consultar_deepseek, ttl=CARRUSEL_LLM_TTL)
+            if resultado is not None:
+                # Añadir el color del tema predeterminado o uno aleatorio
+                colores = ['primary', 'secondary', 'success', 'danger', 'warning', 'info']
+                resultado["color"] = random.choice(colores)
+                
+                # Añadir campo para la URL de la imagen (se completará después)
+                resultado["imagen_url"] = ""  # String vacío en lugar de None
+                
+                return resultado
         
         # Si no se pudo generar con Deepseek, usar datos alternativos aleatorios
         # Banco de datos predefinidos por categoría
@@ -444,7 +509,7 @@ def generar_datos_categoria(categoria):
         
     except Exception as e:
         print(f"Error al generar datos para la categoría {categoria}: {str(e)}")
-        return DEFAULT_CAROUSEL_DATA[categoria]
+        return DEFAULT_CAROUSEL_DATA[categoria].copy()
 
 # Función auxiliar para obtener todos los datos del carrusel para pruebas
 def obtener_todos_datos_carrusel():
@@ -464,4 +529,134 @@ def obtener_todos_datos_carrusel():
             print(f"Error generando datos para {categoria}: {str(e)}")
             resultado[categoria] = DEFAULT_CAROUSEL_DATA[categoria]
     
-    return resultado
\ No newline at end of file
+    return resultado
+
+
+def _congelar(datos):
+    """
+    Instantánea inmutable de los datos del carrusel
+
+    Args:
+        datos (dict): Categoría -> datos de la diapositiva
+
+    Returns:
+        MappingProxyType: Vista de solo lectura (también cada diapositiva)
+    """
+    return MappingProxyType({categoria: MappingProxyType(dict(valores)) for categoria, valores in datos.items()})
+
+
+# Última instantánea publicada; se reemplaza de una vez (asignación atómica),
+# así que los lectores nunca ven datos a medio construir
+_instantanea = _congelar(datos_locales())
+
+# Copia de la última instantánea en la caché compartida: un worker nuevo o
+# reiniciado la publica de entrada y no reconstruye antes de tiempo
+_cache_carrusel = CacheEscalonada("carrusel", max_entradas=4, ttl=7 * 86400)
+_metricas = {'reconstrucciones': 0, 'errores': 0, 'ultima_duracion': None, 'actualizada': None}
+_refresco_pid = None
+_detener = None
+_lock_refresco = threading.Lock()
+
+
+def refrescar_carrusel():
+    """
+    Reconstruye los datos del carrusel y publica la nueva instantánea
+
+    Returns:
+        MappingProxyType: Instantánea publicada
+    """
+    global _instantanea
+    inicio = time.monotonic()
+    datos = generar_datos_carrusel()
+    _instantanea = _congelar(datos)
+    _metricas['reconstrucciones'] += 1
+    _metricas['ultima_duracion'] = time.monotonic() - inicio
+    _metricas['actualizada'] = time.time()
+    _cache_carrusel.guardar('instantanea', {'datos': datos, 'actualizada': _metricas['actualizada']})
+    logger.info(f"Carrusel reconstruido en {_metricas['ultima_duracion']:.2f} s")
+    return _instantanea
+
+
+def cargar_instantanea_compartida():
+    """
+    Publica la última instantánea guardada por cualquier worker, si existe
+
+    Returns:
+        float: Segundos que faltan para la próxima reconstrucción (0 si no había instantánea)
+    """
+    global _instantanea
+    try:
+        guardada = _cache_carrusel.obtener('instantanea')
+        if not guardada or set(guardada['datos']) != set(CAROUSEL_CATEGORIES):
+            return 0.0
+        _instantanea = _congelar({categoria: guardada['datos'][categoria] for categoria in CAROUSEL_CATEGORIES})
+        _metricas['actualizada'] = guardada['actualizada']
+    except Exception as e:
+        logger.error(f"Error al leer la instantánea compartida del carrusel: {str(e)}")
+        return 0.0
+    return max(0.0, guardada['actualizada'] + CARRUSEL_REFRESCO_SEGUNDOS - time.time())
+
+
+def _ciclo_refresco(detener, espera_inicial=0.0):
+    """Reconstruye el carrusel cada CARRUSEL_REFRESCO_SEGUNDOS hasta que se detenga"""
+    # Si otro worker ya publicó una instantánea reciente, esperar a que venza
+    detener.wait(espera_inicial)
+    while not detener.is_set():
+        try:
+            refrescar_carrusel()
+            espera = CARRUSEL_REFRESCO_SEGUNDOS
+        except Exception as e:
+            _metricas['errores'] += 1
+            logger.error(f"Error al reconstruir el carrusel: {str(e)}")
+            espera = CARRUSEL_REINTENTO_SEGUNDOS
+        detener.wait(espera)
+
+
+def iniciar_refresco():
+    """
+    Inicia el hilo de reconstrucción del carrusel, una vez por proceso
+    (después de un fork el hilo del proceso maestro no existe en el worker)
+    """
+    global _refresco_pid, _detener
+    if not CARRUSEL_REFRESCO or _refresco_pid == os.getpid():
+        return
+    with _lock_refresco:
+        if _refresco_pid == os.getpid():
+            return
+        _refresco_pid = os.getpid()
+        _detener = threading.Event()
+        espera_inicial = cargar_instantanea_compartida()
+        threading.Thread(target=_ciclo_refresco, args=(_detener, espera_inicial),
+                         name="ecosmart-carrusel", daemon=True).start()
+
+
+def detener_refresco():
+    """Detiene el hilo de reconstrucción del proceso actual, si está en marcha"""
+    global _refresco_pid
+    with _lock_refresco:
+        if _detener is not None:
+            _detener.set()
+        _refresco_pid = None
+
+
+def obtener_carrusel():
+    """
+    Datos del carrusel para la página principal: la última instantánea
+    publicada, sin esperar a ninguna API
+
+    Returns:
+        MappingProxyType: Categoría -> datos de la diapositiva (solo lectura)
+    """
+    iniciar_refresco()
+    return _instantanea
+
+
+def estadisticas_carrusel():
+    """
+    Returns:
+        dict: Reconstrucciones, errores, duración de la última reconstrucción
+              y momento (time.time()) de la última publicación
+    """
+    metricas = dict(_metricas)
+    metricas['intervalo_segundos'] = CARRUSEL_REFRESCO_SEGUNDOS
+    return metricas
@@ -0,0 +1,199 @@
+"""
+Motor de ciclo de vida y flujo de caja de las instalaciones.
+
+Proyecta año por año (25 por defecto) la generación con degradación, la
+tarifa con escalada anual, la operación y mantenimiento y el reemplazo del
+inversor, y a partir del flujo de caja calcula el valor actual neto (VAN),
+la tasa interna de retorno (TIR), el costo nivelado de la energía (LCOE) y
+el período de recupero descontado.
+
+Todos los cálculos están vectorizados: `evaluar_ciclo_vida` recibe arrays de
+costos y generaciones y evalúa miles de sistemas candidatos en una sola
+llamada (la TIR se obtiene por bisección simultánea sobre todos ellos).
+"""
+import os
+import numpy as np
+from dotenv import load_dotenv
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Parámetros financieros generales
+VIDA_UTIL = 25  # años
+TASA_DESCUENTO = float(os.environ.get("CICLO_VIDA_TASA_DESCUENTO", "0.08"))
+ESCALADA_TARIFA = float(os.environ.get("CICLO_VIDA_ESCALADA_TARIFA", "0.03"))
+INFLACION_OM = 0.02  # Aumento anual del costo de operación y mantenimiento
+
+# Parámetros técnicos por tipo de instalación
+PARAMETROS_POR_TIPO = {
+    'solar': {
+        'degradacion': 0.005,  # Pérdida anual de rendimiento de los paneles
+        'om_anual': 0.01,  # Operación y mantenimiento (fracción del costo inicial)
+        'anio_reemplazo_inversor': 12,
+        'costo_reemplazo_inversor': 0.15  # Fracción del costo inicial
+    },
+    'eolica': {
+        'degradacion': 0.01,
+        'om_anual': 0.025,
+        'anio_reemplazo_inversor': 12,
+        'costo_reemplazo_inversor': 0.12
+    },
+    'termotanque_solar': {
+        'degradacion': 0.01,
+        'om_anual': 0.01,
+        'anio_reemplazo_inversor': None,  # Sin electrónica de potencia
+        'costo_reemplazo_inversor': 0.0
+    },
+}
+
+# Límites de búsqueda de la TIR
+TIR_MINIMA = -0.99
+TIR_MAXIMA = 1.0
+ITERACIONES_TIR = 60
+
+
+def _valor_actual(flujos, tasa):
+    """
+    Valor actual de flujos (..., T+1) descontados a una tasa (...,) o escalar
+    """
+    anios = np.arange(flujos.shape[-1])
+    factores = (1 + np.asarray(tasa, dtype=np.float64)[..., None]) ** -anios
+    return np.sum(flujos * factores, axis=-1)
+
+
+def calcular_tir(flujos):
+    """
+    Tasa interna de retorno de cada fila de flujos por bisección vectorizada
+
+    Args:
+        flujos (numpy.ndarray): Flujos de caja (..., T+1), con la inversión en el año 0
+
+    Returns:
+        numpy.ndarray: TIR por sistema; NaN si no cambia de signo en el rango buscado
+    """
+    flujos = np.asarray(flujos, dtype=np.float64)
+    forma = flujos.shape[:-1]
+    bajo = np.full(forma, TIR_MINIMA)
+    alto = np.full(forma, TIR_MAXIMA)
+    van_bajo = _valor_actual(flujos, bajo)
+    valida = np.sign(van_bajo) != np.sign(_valor_actual(flujos, alto))
+
+    for _ in range(ITERACIONES_TIR):
+        medio = (bajo + alto) / 2
+        van_medio = _valor_actual(flujos, medio)
+        mismo_signo = np.sign(van_medio) == np.sign(van_bajo)
+        bajo = np.where(mismo_signo, medio, bajo)
+        van_bajo = np.where(mismo_signo, van_medio, van_bajo)
+        alto = np.where(mismo_signo, alto, medio)
+
+    return np.where(valida, (bajo + alto) / 2, np.nan)
+
+
+def evaluar_ciclo_vida(costo_inicial, generacion_anual, tipo_instalacion='solar', precio_kwh=0.15,
+                       anios=VIDA_UTIL, tasa_descuento=TASA_DESCUENTO, escalada_tarifa=ESCALADA_TARIFA,
+                       **parametros):
+    """
+    Proyecta el flujo de caja de uno o varios sistemas a lo largo de su vida útil
+
+    Args:
+        costo_inicial (float o array): Inversión inicial en USD
+        generacion_anual (float o array): Generación del primer año en kWh
+        tipo_instalacion (str): Tipo de instalación, define los parámetros técnicos por defecto
+        precio_kwh (float): Tarifa del primer año en USD/kWh
+        anios (int): Años de vida útil a proyectar
+        tasa_descuento (float): Tasa de descuento anual
+        escalada_tarifa (float): Aumento anual de la tarifa
+        **parametros: Reemplazos de PARAMETROS_POR_TIPO (degradacion, om_anual,
+                      anio_reemplazo_inversor, costo_reemplazo_inversor)
+
+    Returns:
+        dict: Arrays con la forma de la entrada ('van', 'tir', 'lcoe',
+              'recupero_descontado') y con un eje final de años para las
+              columnas del flujo de caja ('generacion', 'ingresos', ...)
+    """
+    configuracion = dict(PARAMETROS_POR_TIPO.get(tipo_instalacion, PARAMETROS_POR_TIPO['solar']))
+    configuracion.update({clave: valor for clave, valor in parametros.items() if valor is not None})
+
+    costo, generacion = np.broadcast_arrays(np.asarray(costo_inicial, dtype=np.float64),
+                                            np.asarray(generacion_anual, dtype=np.float64))
+    anio = np.arange(1, anios + 1)
+
+    energia = generacion[..., None] * (1 - configuracion['degradacion']) ** (anio - 1)
+    tarifa = precio_kwh * (1 + escalada_tarifa) ** (anio - 1)
+    ingresos = energia * tarifa
+    om = costo[..., None] * configuracion['om_anual'] * (1 + INFLACION_OM) ** (anio - 1)
+    reemplazos = np.zeros_like(om)
+    anio_reemplazo = configuracion['anio_reemplazo_inversor']
+    if anio_reemplazo and anio_reemplazo < anios:
+        reemplazos[..., anio_reemplazo - 1] = costo * configuracion['costo_reemplazo_inversor']
+
+    flujo = ingresos - om - reemplazos
+    flujos = np.concatenate([-costo[..., None], flujo], axis=-1)  # Año 0: inversión
+    descuento = (1 + tasa_descuento) ** -np.arange(anios + 1)
+    descontado_acumulado = np.cumsum(flujos * descuento, axis=-1)
+
+    costos_actuales = costo + np.sum((om + reemplazos) * descuento[1:], axis=-1)
+    energia_actual = np.sum(energia * descuento[1:], axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lcoe = np.where(energia_actual > 0, costos_actuales / energia_actual, np.nan)
+
+    # Primer año en que el flujo descontado acumulado deja de ser negativo
+    recuperado = descontado_acumulado >= 0
+    recupero = np.where(recuperado.any(axis=-1), np.argmax(recuperado, axis=-1), np.nan)
+
+    return {
+        'van': descontado_acumulado[..., -1],
+        'tir': calcular_tir(flujos),
+        'lcoe': lcoe,
+        'recupero_descontado': recupero,
+        'generacion': energia,
+        'tarifa': tarifa,
+        'ingresos': ingresos,
+        'om': om,
+        'reemplazos': reemplazos,
+        'flujo': flujo,
+        'flujo_acumulado': np.cumsum(flujos, axis=-1)[..., 1:],
+        'flujo_descontado_acumulado': descontado_acumulado[..., 1:],
+        'parametros': dict(configuracion, anios=anios, tasa_descuento=tasa_descuento,
+                           escalada_tarifa=escalada_tarifa, precio_kwh=precio_kwh)
+    }
+
+
+def _numero(valor, decimales=2):
+    valor = float(valor)
+    return None if np.isnan(valor) else round(valor, decimales)
+
+
+def resumen_ciclo_vida(evaluacion, indice=(), incluir_tabla=True):
+    """
+    Convierte un sistema de `evaluar_ciclo_vida` en un dict serializable
+
+    Args:
+        evaluacion (dict): Resultado de evaluar_ciclo_vida
+        indice (int o tuple): Posición del sistema en la evaluación
+        incluir_tabla (bool): Si es True incluye el flujo de caja año por año
+
+    Returns:
+        dict: VAN, TIR (%), LCOE, recupero descontado, parámetros y tabla anual
+    """
+    tir = _numero(evaluacion['tir'][indice], 4)
+    recupero = _numero(evaluacion['recupero_descontado'][indice], 0)
+    resumen = {
+        'van_usd': _numero(evaluacion['van'][indice]),
+        'tir_porcentaje': None if tir is None else round(tir * 100, 2),
+        'lcoe_usd_kwh': _numero(evaluacion['lcoe'][indice], 4),
+        'recupero_descontado_anos': None if recupero is None else int(recupero),
+        'parametros': evaluacion['parametros']
+    }
+    if incluir_tabla:
+        columnas = ['generacion', 'tarifa', 'ingresos', 'om', 'reemplazos', 'flujo',
+                    'flujo_acumulado', 'flujo_descontado_acumulado']
+        valores = {columna: evaluacion[columna][indice] if evaluacion[columna].ndim > 1 else evaluacion[columna]
+                   for columna in columnas}
+        resumen['flujo_de_caja'] = [
+            dict({'anio': anio + 1},
+                 **{columna: round(float(valores[columna][anio]), 4 if columna == 'tarifa' else 2)
+                    for columna in columnas})
+            for anio in range(len(valores['flujo']))
+        ]
+    return resumen
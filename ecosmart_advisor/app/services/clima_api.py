@@ -2,10 +2,13 @@
 Módulo para interactuar con APIs climáticas y obtener datos relevantes
 para las recomendaciones de energía renovable.
 """
-import requests
 import os
 from dotenv import load_dotenv
 import logging
+from ecosmart_advisor.app.services.cache import CacheEscalonada
+from ecosmart_advisor.app.services import http_cliente
+from ecosmart_advisor.app.services import climatologia
+from ecosmart_advisor.app.services import localidades
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -14,6 +17,24 @@ logger.setLevel(logging.INFO)
 # Cargar variables de entorno
 load_dotenv()
 
+# Configuración de la caché de datos climáticos
+# Las coordenadas se redondean a una grilla (en grados) para que ubicaciones
+# cercanas compartan la misma entrada
+CLIMA_CACHE_GRILLA = float(os.environ.get("CLIMA_CACHE_GRILLA", "0.05"))
+CLIMA_CACHE_TTL = int(os.environ.get("CLIMA_CACHE_TTL", str(6 * 3600)))  # segundos
+CLIMA_CACHE_MAX = int(os.environ.get("CLIMA_CACHE_MAX", "2048"))  # entradas en memoria
+
+# Fuente principal de datos climáticos:
+# - 'climatologia': grilla local de normales (sin red); Open-Meteo solo fuera de Argentina
+# - 'open_meteo': siempre consultar la API (con caché)
+CLIMA_FUENTE = os.environ.get("CLIMA_FUENTE", "climatologia")
+
+_cache_clima = CacheEscalonada(
+    "clima",
+    max_entradas=CLIMA_CACHE_MAX,
+    ttl=CLIMA_CACHE_TTL
+)
+
 def obtener_datos_clima(ubicacion):
     """
     Obtiene datos climáticos relevantes para la ubicación especificada
@@ -79,7 +100,8 @@ def obtener_datos_clima(ubicacion):
 
 def obtener_datos_por_ciudad(ciudad, provincia=None, pais="Argentina"):
     """
-    Obtiene coordenadas de una ciudad usando Nominatim
+    Obtiene coordenadas de una ciudad usando el nomenclador local de
+    localidades (con Nominatim como respaldo para nombres desconocidos)
     y luego obtiene los datos climáticos.
     
     Args:
@@ -91,32 +113,15 @@ def obtener_datos_por_ciudad(ciudad, provincia=None, pais="Argentina"):
         dict: Datos climáticos para la ubicación
     """
     try:
-        # Construir query optimizada para Argentina
-        query = f"{ciudad}"
-        if provincia:
-            query += f", {provincia}"
-        if pais:
-            query += f", {pais}"
-            
-        # Usando Nominatim con parámetros optimizados para Argentina
-        headers = {
-            'User-Agent': 'EcoSmartAdvisor/1.0',
-            'Accept-Language': 'es'
-        }
-        geocoding_url = (
-            "https://nominatim.openstreetmap.org/search"
-            f"?format=json&q={query}&limit=1&countrycodes=ar"
-            "&addressdetails=1&accept-language=es"
-        )
-        resp = requests.get(geocoding_url, headers=headers, timeout=5)
-        data = resp.json()
+        localidad = localidades.resolver_localidad(ciudad, provincia)
         
-        # Nominatim devuelve una lista de resultados, no un objeto con 'results'
-        if data and len(data) > 0:
-            lat = float(data[0]['lat'])
-            lon = float(data[0]['lon'])
-            lugar = data[0].get('display_name', 'Ubicación')
-            return obtener_datos_por_coordenadas(lat, lon, nombre_lugar=lugar)
+        if localidad:
+            lugar = localidad.get('display_name') or ", ".join(
+                p for p in (localidad['nombre'], localidad['provincia'], pais) if p
+            )
+            return obtener_datos_por_coordenadas(
+                localidad['latitud'], localidad['longitud'], nombre_lugar=lugar
+            )
         else:
             # Si no se encuentra, devolver datos genéricos
             return {
@@ -141,10 +146,91 @@ def obtener_datos_por_ciudad(ciudad, provincia=None, pais="Argentina"):
             'fuente': 'datos_estimados'
         }
 
+def ajustar_a_grilla(lat, lon, grilla=None):
+    """
+    Redondea las coordenadas al centro de la celda de la grilla de caché
+    
+    Args:
+        lat (float): Latitud
+        lon (float): Longitud
+        grilla (float, optional): Tamaño de la celda en grados (por defecto CLIMA_CACHE_GRILLA)
+        
+    Returns:
+        tuple: (latitud, longitud) redondeadas
+    """
+    grilla = grilla or CLIMA_CACHE_GRILLA
+    return (round(round(float(lat) / grilla) * grilla, 4),
+            round(round(float(lon) / grilla) * grilla, 4))
+
 def obtener_datos_por_coordenadas(lat, lon, nombre_lugar=None):
+    """
+    Obtiene datos climáticos para las coordenadas especificadas.
+    Si la fuente configurada es la climatología local y la ubicación está
+    dentro de la grilla, responde sin red. Si no, consulta primero la caché
+    (memoria y disco) y solo si no hay datos vigentes para la celda de la
+    grilla llama a Open-Meteo.
+    
+    Args:
+        lat (float): Latitud
+        lon (float): Longitud
+        nombre_lugar (str, optional): Nombre del lugar si se conoce
+        
+    Returns:
+        dict: Datos climáticos para la ubicación
+    """
+    try:
+        if CLIMA_FUENTE == 'climatologia':
+            try:
+                datos = climatologia.obtener_climatologia(lat, lon, nombre_lugar)
+                if datos is not None:
+                    return datos
+            except Exception as e:
+                logger.error(f"Error al consultar la climatología local: {str(e)}")
+        
+        lat_grilla, lon_grilla = ajustar_a_grilla(lat, lon)
+        clave = f"{lat_grilla:.4f},{lon_grilla:.4f}"
+        
+        datos = _cache_clima.obtener(clave)
+        if datos is None:
+            datos = consultar_open_meteo(lat_grilla, lon_grilla)
+            # Solo se guardan datos reales; las estimaciones por latitud se recalculan
+            if datos.get('fuente') == 'open_meteo':
+                _cache_clima.guardar(clave, datos)
+        else:
+            logger.info(f"Datos climáticos obtenidos de caché para celda {clave}")
+        
+        # Los datos de la celda se personalizan con la ubicación pedida
+        resultado = dict(datos)
+        resultado['ubicacion'] = nombre_lugar or f"{lat}, {lon}"
+        resultado['latitud'] = float(lat)
+        resultado['longitud'] = float(lon)
+        return resultado
+    except Exception as e:
+        logger.error(f"Error general obtener_datos_por_coordenadas: {str(e)}")
+        # Valores predeterminados en caso de fallo total
+        return {
+            'radiacion_solar': 4.2,
+            'velocidad_viento': 3.5,
+            'temperatura_promedio': 15,
+            'ubicacion': nombre_lugar or f"{lat}, {lon}",
+            'latitud': float(lat) if lat else None,
+            'longitud': float(lon) if lon else None,
+            'fuente': 'valores_por_defecto_emergencia'
+        }
+
+def estadisticas_cache_clima():
+    """
+    Devuelve los contadores de aciertos y fallos de la caché climática
+    
+    Returns:
+        dict: Estadísticas de los niveles de memoria y disco
+    """
+    return _cache_clima.estadisticas()
+
+def consultar_open_meteo(lat, lon, nombre_lugar=None):
     """
     Obtiene datos climáticos para las coordenadas especificadas
-    usando la API de Open-Meteo
+    usando la API de Open-Meteo, sin pasar por la caché
     
     Args:
         lat (float): Latitud
@@ -166,7 +252,7 @@ def obtener_datos_por_coordenadas(lat, lon, nombre_lugar=None):
         logger.info(f"Obteniendo datos climáticos de: {forecast_url}")
         
         try:
-            forecast_resp = requests.get(forecast_url, timeout=10)
+            forecast_resp = http_cliente.get(forecast_url, timeout=10)
             if forecast_resp.status_code != 200:
                 logger.error(f"Error al obtener datos de clima: {forecast_resp.status_code}")
                 raise Exception(f"API de clima devolvió código: {forecast_resp.status_code}")
@@ -0,0 +1,393 @@
+"""
+Módulo de climatología offline para Argentina.
+Construye una grilla de ~0.1° con medias mensuales de radiación solar,
+viento a 10 m, parámetros de Weibull y temperatura, y la consulta con
+interpolación bilineal sin ninguna llamada de red.
+
+La grilla se genera a partir de las normales de estaciones de referencia
+(data/estaciones_climatologia.json) y se guarda como un archivo .npy en
+CACHE_DIR que se abre en modo memory-map, de modo que todos los workers
+comparten las mismas páginas en memoria.
+
+La grilla es un rectángulo que también cubre el océano y parte de los
+países vecinos; los puntos alejados de toda estación de referencia se
+consideran fuera de cobertura y se consultan a Open-Meteo.
+"""
+import os
+import sys
+import json
+import math
+import hashlib
+import time
+import threading
+import logging
+from datetime import date
+import numpy as np
+from ecosmart_advisor.app.services import http_cliente
+from ecosmart_advisor.app.services.cache import CACHE_DIR
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Archivos de datos
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+RUTA_ESTACIONES = os.path.join(DATA_DIR, "estaciones_climatologia.json")
+RUTA_GRILLA = os.environ.get("CLIMATOLOGIA_RUTA", os.path.join(CACHE_DIR, "climatologia_ar.npy"))
+
+# Distancia máxima (km) a la estación más cercana para usar la grilla
+DISTANCIA_MAX_KM = float(os.environ.get("CLIMATOLOGIA_DISTANCIA_MAX_KM", "300"))
+
+# Segundos que se espera antes de reintentar una construcción fallida
+REINTENTO_CONSTRUCCION = 600
+
+# Extensión y resolución de la grilla (grados)
+LAT_MIN, LAT_MAX = -55.2, -21.7
+LON_MIN, LON_MAX = -73.7, -53.5
+PASO = 0.1
+NLAT = int(round((LAT_MAX - LAT_MIN) / PASO)) + 1
+NLON = int(round((LON_MAX - LON_MIN) / PASO)) + 1
+
+# Variables guardadas por celda, en este orden, con 12 valores mensuales cada una
+VARIABLES = ('radiacion_solar', 'velocidad_viento', 'weibull_k', 'weibull_c', 'temperatura')
+
+# Días por mes para promediar los valores anuales
+DIAS_MES = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.float64)
+
+# Mes (centro del mes = 1..12) en el que se alcanza el máximo estacional
+# La radiación es máxima cerca del solsticio de diciembre y la temperatura
+# llega con un mes de retraso
+MES_PICO_RADIACION = 12.2
+MES_PICO_TEMPERATURA = 13.0
+
+# Exponente de la interpolación por distancia inversa entre estaciones
+POTENCIA_IDW = 3
+
+# API de reanálisis de Open-Meteo, usada solo para refrescar las estaciones
+OPEN_METEO_ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+
+_grilla = None
+_estaciones = None
+_fallo_construccion = None
+_lock = threading.Lock()
+
+
+def _curva_estacional(media, amplitud, mes_pico):
+    """
+    Genera 12 valores mensuales a partir de una media y una amplitud
+    usando una curva cosenoidal con máximo en `mes_pico`.
+    """
+    meses = np.arange(1, 13, dtype=np.float64)
+    return media + amplitud * np.cos(2 * np.pi * (meses - mes_pico) / 12)
+
+
+def _valores_mensuales(estacion):
+    """
+    Devuelve un array (5, 12) con las variables mensuales de una estación.
+    Si la estación tiene valores mensuales explícitos se usan esos.
+    """
+    mensual = estacion.get('mensual') or {}
+
+    if 'radiacion_solar' in mensual:
+        radiacion = np.array(mensual['radiacion_solar'], dtype=np.float64)
+    else:
+        radiacion = _curva_estacional(estacion['radiacion_media'], estacion['radiacion_amplitud'],
+                                      MES_PICO_RADIACION)
+
+    if 'temperatura' in mensual:
+        temperatura = np.array(mensual['temperatura'], dtype=np.float64)
+    else:
+        temperatura = _curva_estacional(estacion['temperatura_media'], estacion['temperatura_amplitud'],
+                                        MES_PICO_TEMPERATURA)
+
+    if 'velocidad_viento' in mensual:
+        viento = np.array(mensual['velocidad_viento'], dtype=np.float64)
+    else:
+        viento = _curva_estacional(estacion['viento_media'], estacion['viento_amplitud'],
+                                   estacion.get('viento_mes_pico', 10))
+
+    k = np.array(mensual.get('weibull_k', [estacion.get('weibull_k', 2.0)] * 12), dtype=np.float64)
+
+    # Parámetro de escala de Weibull a partir de la media: c = v / Γ(1 + 1/k)
+    c = viento / np.array([math.gamma(1 + 1 / ki) for ki in k])
+
+    return np.stack([np.maximum(radiacion, 0.1), np.maximum(viento, 0.1), k, c, temperatura])
+
+
+def _hash_estaciones(ruta):
+    with open(ruta, 'rb') as archivo:
+        return hashlib.sha256(archivo.read()).hexdigest()[:16]
+
+
+def construir_grilla(ruta_estaciones=RUTA_ESTACIONES, destino=RUTA_GRILLA):
+    """
+    Construye la grilla de climatología interpolando las estaciones de
+    referencia por distancia inversa y la guarda en `destino`.
+
+    Args:
+        ruta_estaciones (str): Archivo JSON con las estaciones
+        destino (str): Ruta del archivo .npy a generar
+
+    Returns:
+        str: Ruta del archivo generado
+    """
+    with open(ruta_estaciones, encoding='utf-8') as archivo:
+        estaciones = json.load(archivo)['estaciones']
+
+    lat_est = np.array([e['latitud'] for e in estaciones])
+    lon_est = np.array([e['longitud'] for e in estaciones])
+    valores = np.stack([_valores_mensuales(e) for e in estaciones]).reshape(len(estaciones), -1)
+
+    lats = LAT_MIN + PASO * np.arange(NLAT)
+    lons = LON_MIN + PASO * np.arange(NLON)
+    lat_celda, lon_celda = np.meshgrid(lats, lons, indexing='ij')
+    lat_celda = lat_celda.reshape(-1, 1)
+    lon_celda = lon_celda.reshape(-1, 1)
+
+    # Distancia aproximada en km (proyección equirectangular)
+    dy = (lat_celda - lat_est) * 111.2
+    dx = (lon_celda - lon_est) * 111.2 * np.cos(np.radians(lat_celda))
+    distancia = np.sqrt(dx ** 2 + dy ** 2) + 1.0
+    pesos = distancia ** -POTENCIA_IDW
+    pesos /= pesos.sum(axis=1, keepdims=True)
+
+    grilla = (pesos @ valores).astype(np.float32).reshape(NLAT, NLON, len(VARIABLES), 12)
+
+    directorio = os.path.dirname(destino)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    temporal = f"{destino}.{os.getpid()}.tmp"
+    with open(temporal, 'wb') as archivo:
+        np.save(archivo, grilla)
+    os.replace(temporal, destino)
+
+    temporal = f"{_ruta_meta(destino)}.{os.getpid()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump({
+            'estaciones': _hash_estaciones(ruta_estaciones),
+            'forma': list(grilla.shape),
+            'lat_min': LAT_MIN,
+            'lon_min': LON_MIN,
+            'paso': PASO
+        }, archivo)
+    os.replace(temporal, _ruta_meta(destino))
+
+    logger.info(f"Grilla de climatología generada en {destino} ({grilla.nbytes / 1e6:.1f} MB)")
+    return destino
+
+
+def _ruta_meta(ruta_grilla):
+    return os.path.splitext(ruta_grilla)[0] + ".json"
+
+
+def _grilla_vigente(ruta_grilla, ruta_estaciones):
+    try:
+        with open(_ruta_meta(ruta_grilla), encoding='utf-8') as archivo:
+            meta = json.load(archivo)
+        return (os.path.exists(ruta_grilla)
+                and meta.get('estaciones') == _hash_estaciones(ruta_estaciones)
+                and meta.get('forma') == [NLAT, NLON, len(VARIABLES), 12])
+    except (OSError, ValueError):
+        return False
+
+
+def cargar_grilla():
+    """
+    Abre la grilla en modo memory-map, generándola si no existe o si
+    las estaciones cambiaron desde la última construcción.
+
+    Returns:
+        numpy.ndarray: Array (NLAT, NLON, 5, 12) de solo lectura
+
+    Raises:
+        RuntimeError: Si la construcción falló hace menos de REINTENTO_CONSTRUCCION segundos
+    """
+    global _grilla, _fallo_construccion
+    if _grilla is not None:
+        return _grilla
+
+    with _lock:
+        if _grilla is None:
+            # No reintentar en cada consulta una construcción que acaba de fallar
+            if _fallo_construccion is not None and time.monotonic() - _fallo_construccion < REINTENTO_CONSTRUCCION:
+                raise RuntimeError("La grilla de climatología no está disponible")
+            try:
+                if not _grilla_vigente(RUTA_GRILLA, RUTA_ESTACIONES):
+                    construir_grilla()
+                _grilla = np.load(RUTA_GRILLA, mmap_mode='r')
+            except Exception:
+                _fallo_construccion = time.monotonic()
+                raise
+            _fallo_construccion = None
+    return _grilla
+
+
+def _coordenadas_estaciones():
+    """Latitudes y longitudes de las estaciones de referencia (se leen una sola vez)"""
+    global _estaciones
+    if _estaciones is None:
+        with open(RUTA_ESTACIONES, encoding='utf-8') as archivo:
+            estaciones = json.load(archivo)['estaciones']
+        _estaciones = (np.array([e['latitud'] for e in estaciones]),
+                       np.array([e['longitud'] for e in estaciones]))
+    return _estaciones
+
+
+def distancia_estacion_km(lat, lon):
+    """
+    Distancia aproximada (km) a la estación de referencia más cercana
+    """
+    lat_est, lon_est = _coordenadas_estaciones()
+    dy = (lat - lat_est) * 111.2
+    dx = (lon - lon_est) * 111.2 * math.cos(math.radians(lat))
+    return float(np.sqrt(dx ** 2 + dy ** 2).min())
+
+
+def contiene(lat, lon):
+    """
+    Indica si las coordenadas están dentro de la grilla de climatología y
+    a menos de DISTANCIA_MAX_KM de alguna estación de referencia
+    """
+    return (LAT_MIN <= lat <= LAT_MAX and LON_MIN <= lon <= LON_MAX
+            and distancia_estacion_km(lat, lon) <= DISTANCIA_MAX_KM)
+
+
+def interpolar(lat, lon):
+    """
+    Interpola bilinealmente las variables mensuales en uno o varios puntos.
+
+    Args:
+        lat (float o array): Latitud(es)
+        lon (float o array): Longitud(es)
+
+    Returns:
+        numpy.ndarray: Array (n, 5, 12) con las variables de VARIABLES por mes
+    """
+    grilla = cargar_grilla()
+    lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+    lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+
+    fi = np.clip((lat - LAT_MIN) / PASO, 0, NLAT - 1)
+    fj = np.clip((lon - LON_MIN) / PASO, 0, NLON - 1)
+    i0 = np.minimum(np.floor(fi).astype(np.intp), NLAT - 2)
+    j0 = np.minimum(np.floor(fj).astype(np.intp), NLON - 2)
+    ti = (fi - i0)[:, None, None]
+    tj = (fj - j0)[:, None, None]
+
+    return (grilla[i0, j0] * (1 - ti) * (1 - tj)
+            + grilla[i0 + 1, j0] * ti * (1 - tj)
+            + grilla[i0, j0 + 1] * (1 - ti) * tj
+            + grilla[i0 + 1, j0 + 1] * ti * tj)
+
+
+def obtener_climatologia(lat, lon, nombre_lugar=None):
+    """
+    Obtiene los datos climáticos de una ubicación desde la grilla local,
+    con el mismo formato que devuelve clima_api.
+
+    Args:
+        lat (float): Latitud
+        lon (float): Longitud
+        nombre_lugar (str, optional): Nombre del lugar si se conoce
+
+    Returns:
+        dict: Datos climáticos con medias anuales y mensuales, o None si
+              la ubicación está fuera de cobertura
+    """
+    lat = float(lat)
+    lon = float(lon)
+    if not contiene(lat, lon):
+        return None
+
+    mensual = interpolar(lat, lon)[0].astype(np.float64)
+    anual = (mensual * DIAS_MES).sum(axis=1) / DIAS_MES.sum()
+
+    return {
+        'radiacion_solar': round(float(anual[0]), 2),  # kWh/m²/día
+        'velocidad_viento': round(float(anual[1]), 1),  # m/s
+        'temperatura_promedio': round(float(anual[4]), 1),  # °C
+        'ubicacion': nombre_lugar or f"{lat}, {lon}",
+        'latitud': lat,
+        'longitud': lon,
+        'fuente': 'climatologia',
+        'climatologia_mensual': {
+            nombre: [round(float(v), 2) for v in mensual[i]]
+            for i, nombre in enumerate(VARIABLES)
+        }
+    }
+
+
+def actualizar_estaciones_open_meteo(anios=10, ruta_estaciones=RUTA_ESTACIONES):
+    """
+    Refresca las normales de las estaciones con el reanálisis diario de
+    Open-Meteo y reconstruye la grilla. Es el único camino que usa la red
+    y está pensado para ejecutarse manualmente o de forma programada.
+
+    Args:
+        anios (int): Cantidad de años completos a promediar
+        ruta_estaciones (str): Archivo JSON con las estaciones
+
+    Returns:
+        int: Cantidad de estaciones actualizadas
+    """
+    with open(ruta_estaciones, encoding='utf-8') as archivo:
+        datos = json.load(archivo)
+
+    fin = date(date.today().year - 1, 12, 31)
+    inicio = date(fin.year - anios + 1, 1, 1)
+    actualizadas = 0
+
+    for estacion in datos['estaciones']:
+        try:
+            params = {
+                'latitude': estacion['latitud'],
+                'longitude': estacion['longitud'],
+                'start_date': inicio.isoformat(),
+                'end_date': fin.isoformat(),
+                'daily': 'shortwave_radiation_sum,temperature_2m_mean,wind_speed_10m_mean',
+                'wind_speed_unit': 'ms',
+                'timezone': 'auto'
+            }
+            respuesta = http_cliente.get(OPEN_METEO_ARCHIVE_URL, params=params, timeout=60)
+            if respuesta.status_code != 200:
+                logger.error(f"Open-Meteo devolvió {respuesta.status_code} para {estacion['nombre']}")
+                continue
+            diario = respuesta.json()['daily']
+
+            meses = np.array([int(f[5:7]) for f in diario['time']])
+            radiacion = np.array(diario['shortwave_radiation_sum'], dtype=np.float64) / 3.6  # MJ → kWh
+            temperatura = np.array(diario['temperature_2m_mean'], dtype=np.float64)
+            viento = np.array(diario['wind_speed_10m_mean'], dtype=np.float64)
+
+            mensual = {'radiacion_solar': [], 'temperatura': [], 'velocidad_viento': [], 'weibull_k': []}
+            for mes in range(1, 13):
+                filtro = meses == mes
+                v = viento[filtro]
+                mensual['radiacion_solar'].append(round(float(np.nanmean(radiacion[filtro])), 2))
+                mensual['temperatura'].append(round(float(np.nanmean(temperatura[filtro])), 1))
+                mensual['velocidad_viento'].append(round(float(np.nanmean(v)), 2))
+                # Estimación de k por momentos (Justus): k = (σ/μ)^-1.086
+                k = (np.nanstd(v) / np.nanmean(v)) ** -1.086
+                mensual['weibull_k'].append(round(float(np.clip(k, 1.2, 4.0)), 2))
+
+            estacion['mensual'] = mensual
+            actualizadas += 1
+            logger.info(f"Estación actualizada: {estacion['nombre']}")
+        except Exception as e:
+            logger.error(f"Error al actualizar la estación {estacion.get('nombre')}: {str(e)}")
+
+    if actualizadas:
+        with open(ruta_estaciones, 'w', encoding='utf-8') as archivo:
+            json.dump(datos, archivo, ensure_ascii=False, indent=2)
+        construir_grilla(ruta_estaciones)
+
+    return actualizadas
+
+
+if __name__ == "__main__":
+    # python -m ecosmart_advisor.app.services.climatologia [--actualizar]
+    logging.basicConfig(level=logging.INFO)
+    if "--actualizar" in sys.argv:
+        print(f"Estaciones actualizadas: {actualizar_estaciones_open_meteo()}")
+    else:
+        print(f"Grilla generada en: {construir_grilla()}")
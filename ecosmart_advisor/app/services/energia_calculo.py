@@ -3,15 +3,37 @@ Módulo para realizar cálculos relacionados con energía renovable,
 recomendaciones y estimaciones.
 """
 import os
+import copy
+from dotenv import load_dotenv
 from .ai_recommender import evaluar_factores_energia_renovable
+from .cache import CacheEscalonada
+from .clima_api import ajustar_a_grilla
+from . import motor_eolico
+from . import tareas
 
-def calcular_recomendacion(datos_usuario, clima):
+# Cargar variables de entorno
+load_dotenv()
+
+# Caché de frentes de Pareto por celda de la grilla climática, consumo,
+# superficie, presupuesto y tecnologías
+FRENTE_CACHE_TTL = int(os.environ.get("FRENTE_CACHE_TTL", str(24 * 3600)))  # segundos
+FRENTE_CACHE_MAX = int(os.environ.get("FRENTE_CACHE_MAX", "512"))  # entradas en memoria
+
+_cache_frentes = CacheEscalonada(
+    "frente_pareto",
+    max_entradas=FRENTE_CACHE_MAX,
+    ttl=FRENTE_CACHE_TTL
+)
+
+def calcular_recomendacion(datos_usuario, clima, limite=None):
     """
     Calcula la recomendación de energía renovable según datos del usuario y clima
     
     Args:
         datos_usuario (dict): Datos proporcionados por el usuario
         clima (dict): Datos climáticos de la ubicación
+        limite (float, optional): Instante (time.monotonic) hasta el que se espera
+                                  a la IA; por defecto, el plazo de tareas desde ahora
         
     Returns:
         dict: Recomendación detallada de sistema(s) de energía renovable
@@ -28,13 +50,22 @@ def calcular_recomendacion(datos_usuario, clima):
     # Guardar el consumo mensual en datos_usuario para el análisis de IA
     datos_usuario['consumo_mensual'] = consumo_mensual
     
-    # Intentar obtener recomendaciones de IA primero
+    # Consultar al modelo de IA en segundo plano para obtener recomendaciones más precisas
+    limite = limite or tareas.limite_desde()
+    futuro_ia = tareas.lanzar(evaluar_factores_energia_renovable, dict(datos_usuario), clima)
+    
+    # Mientras tanto, calcular la parte determinística (opciones por reglas,
+    # combinaciones dimensionadas y frente de Pareto). La usan las dos ramas:
+    # después de la espera solo queda armar la respuesta
+    tradicional = calcular_recomendacion_tradicional(datos_usuario, clima)
+    
+    # Intentar usar las recomendaciones de IA primero
     try:
-        # Consultar al modelo de IA para obtener recomendaciones más precisas
-        recomendaciones_ia = evaluar_factores_energia_renovable(datos_usuario, clima)
+        recomendaciones_ia = tareas.esperar(futuro_ia, limite, lambda: None, 'la evaluación de la IA')
         
-        # Si se obtuvo una respuesta válida de la IA, procesarla
-        if recomendaciones_ia and isinstance(recomendaciones_ia, dict):
+        # Si se obtuvo una respuesta válida de la IA, procesarla (la respuesta
+        # de respaldo tiene valores fijos y no aporta nada al método tradicional)
+        if recomendaciones_ia and isinstance(recomendaciones_ia, dict) and not recomendaciones_ia.get('respaldo'):
             # Construir opciones viables basadas en la respuesta de IA
             opciones_viables = []
             
@@ -124,7 +155,7 @@ def calcular_recomendacion(datos_usuario, clima):
             
             # Si no hay opciones viables, volver al método tradicional
             if not opciones_viables:
-                return calcular_recomendacion_tradicional(datos_usuario, clima)
+                return tradicional
             
             # Ordenar según el objetivo del usuario
             if objetivo == 'ahorro':
@@ -134,62 +165,22 @@ def calcular_recomendacion(datos_usuario, clima):
             else:  # Por defecto, ordenar por cobertura
                 opciones_viables.sort(key=lambda x: x['cobertura'], reverse=True)
             
-            # Evaluar posibles combinaciones según la IA
-            combinaciones = []
-            combinacion = recomendaciones_ia.get('combinacion_recomendada', {})
-            
-            if combinacion and combinacion.get('opciones') and len(combinacion.get('opciones', [])) > 1:
-                tipos_combinados = combinacion['opciones']
-                tipos_nombres = {
-                    'solar': 'Sistema Solar Fotovoltaico',
-                    'eolica': 'Aerogenerador',
-                    'termotanque_solar': 'Termotanque Solar'
-                }
-                
-                nombres_combinados = [tipos_nombres.get(tipo, tipo) for tipo in tipos_combinados]
-                detalle_combinacion = f"{' y '.join(nombres_combinados)} - {combinacion.get('justificacion', '')}"
-                
-                combinaciones.append({
-                    'tipos': tipos_combinados,
-                    'cobertura': combinacion.get('cobertura_combinada', 0),
-                    'detalle': detalle_combinacion
-                })
-            
-            # Si no hay combinaciones explícitas de la IA pero tenemos múltiples opciones viables,
-            # generar combinaciones como en el método tradicional
-            if not combinaciones and len(opciones_viables) >= 2:
-                # Buscar opciones viables por tipo
-                solar_viable = next((op for op in opciones_viables if op['tipo'] == 'solar'), None)
-                eolica_viable = next((op for op in opciones_viables if op['tipo'] == 'eolica'), None)
-                termotanque_viable = next((op for op in opciones_viables if op['tipo'] == 'termotanque_solar'), None)
-                
-                # Combinar solar + termotanque
-                if solar_viable and termotanque_viable:
-                    cobertura_combinada = min(100, solar_viable['cobertura'] + termotanque_viable['cobertura'])
-                    combinaciones.append({
-                        'tipos': ['solar', 'termotanque_solar'],
-                        'cobertura': cobertura_combinada,
-                        'detalle': 'Paneles solares para electricidad y termotanque solar para agua caliente'
-                    })
-                
-                # Combinar eólica + termotanque
-                if eolica_viable and termotanque_viable:
-                    cobertura_combinada = min(100, eolica_viable['cobertura'] + termotanque_viable['cobertura'])
-                    combinaciones.append({
-                        'tipos': ['eolica', 'termotanque_solar'],
-                        'cobertura': cobertura_combinada,
-                        'detalle': 'Aerogenerador para electricidad y termotanque solar para agua caliente'
-                    })
+            # Las combinaciones son las que dimensionó el optimizador; la IA solo
+            # agrega su justificación a la que coincide con su sugerencia
+            combinaciones, sugerida = anotar_combinaciones(
+                tradicional['combinaciones'], recomendaciones_ia.get('combinacion_recomendada')
+            )
             
             # Determinar recomendación principal basada en la mejor_opcion de la IA
             mejor_opcion = recomendaciones_ia.get('mejor_opcion', '')
             
             if mejor_opcion == 'combinacion' and combinaciones:
-                # Si la IA recomienda una combinación, usar la primera combinación
+                # Si la IA recomienda una combinación, usar la que sugirió o la mejor del optimizador
+                combinacion = sugerida or combinaciones[0]
                 principal = {
                     'tipo': 'combinacion',
-                    'cobertura': combinaciones[0]['cobertura'],
-                    'combinacion': combinaciones[0]
+                    'cobertura': combinacion['cobertura'],
+                    'combinacion': combinacion
                 }
             else:
                 # Buscar la mejor opción según la IA, o usar la primera por cobertura
@@ -203,6 +194,7 @@ def calcular_recomendacion(datos_usuario, clima):
                 'mensaje': f"Se identificaron {len(opciones_viables)} opciones viables de energía renovable para tu ubicación.",
                 'opciones': opciones_viables,
                 'combinaciones': combinaciones,
+                'frente_pareto': tradicional['frente_pareto'],
                 'principal': principal,
                 'justificacion': recomendaciones_ia.get('justificacion', '')
             }
@@ -215,7 +207,7 @@ def calcular_recomendacion(datos_usuario, clima):
         # En caso de error, usamos el método tradicional como fallback
     
     # Si llegamos a este punto, usar el método tradicional
-    return calcular_recomendacion_tradicional(datos_usuario, clima)
+    return tradicional
 
 
 def calcular_recomendacion_tradicional(datos_usuario, clima):
@@ -319,23 +311,7 @@ def calcular_recomendacion_tradicional(datos_usuario, clima):
     # Evaluar posibles combinaciones si hay múltiples opciones viables
     combinaciones = []
     if len(opciones_viables) >= 2:
-        # Combinar solar + termotanque
-        if es_viable_solar and es_viable_termotanque:
-            cobertura_combinada = min(100, cobertura_solar + cobertura_termotanque)
-            combinaciones.append({
-                'tipos': ['solar', 'termotanque_solar'],
-                'cobertura': cobertura_combinada,
-                'detalle': 'Paneles solares para electricidad y termotanque solar para agua caliente'
-            })
-        
-        # Combinar eólica + termotanque
-        if es_viable_eolica and es_viable_termotanque:
-            cobertura_combinada = min(100, cobertura_eolica + cobertura_termotanque)
-            combinaciones.append({
-                'tipos': ['eolica', 'termotanque_solar'],
-                'cobertura': cobertura_combinada,
-                'detalle': 'Aerogenerador para electricidad y termotanque solar para agua caliente'
-            })
+        combinaciones = calcular_combinaciones(opciones_viables, datos_usuario, clima, consumo_mensual)
     
     # Preparar la respuesta consolidada
     if not opciones_viables:
@@ -343,6 +319,7 @@ def calcular_recomendacion_tradicional(datos_usuario, clima):
             'mensaje': "Basado en la información proporcionada, no se recomienda ninguna solución de energía renovable. Considera aumentar la superficie disponible o implementar medidas de eficiencia energética para reducir el consumo.",
             'opciones': [],
             'combinaciones': [],
+            'frente_pareto': [],
             'principal': None
         }
     else:
@@ -350,11 +327,149 @@ def calcular_recomendacion_tradicional(datos_usuario, clima):
             'mensaje': f"Se identificaron {len(opciones_viables)} opciones viables de energía renovable para tu ubicación.",
             'opciones': opciones_viables,
             'combinaciones': combinaciones,
+            'frente_pareto': calcular_frente_pareto(opciones_viables, datos_usuario, clima, consumo_mensual),
             'principal': opciones_viables[0]  # La mejor opción según criterio de ordenamiento
         }
     
     return recomendacion
 
+def _parametros_optimizador(opciones_viables, datos_usuario):
+    """
+    Restricciones del usuario para el optimizador híbrido
+    """
+    try:
+        presupuesto = float(datos_usuario.get('presupuesto') or 0) or None
+    except (TypeError, ValueError):
+        presupuesto = None
+    
+    return {
+        'superficie_disponible': float(datos_usuario.get('superficie_disponible', 50)),
+        'presupuesto': presupuesto,
+        'tecnologias': {opcion['tipo'] for opcion in opciones_viables} | {'bateria'},
+        'tipo_vivienda': datos_usuario.get('tipo_vivienda') or 'casa_mediana',
+        'equipos': datos_usuario.get('equipos') or ()
+    }
+
+
+def calcular_combinaciones(opciones_viables, datos_usuario, clima, consumo_mensual, max_combinaciones=2):
+    """
+    Dimensiona combinaciones de las opciones viables (más una batería) con el
+    optimizador híbrido, respetando la superficie, el presupuesto y el objetivo
+    
+    Args:
+        opciones_viables (list): Opciones viables calculadas
+        datos_usuario (dict): Datos proporcionados por el usuario
+        clima (dict): Datos climáticos de la ubicación
+        consumo_mensual (float): Consumo mensual en kWh
+        max_combinaciones (int): Cantidad máxima de combinaciones a devolver
+        
+    Returns:
+        list: Combinaciones de al menos dos tecnologías, de mejor a peor
+    """
+    # Importación diferida: el optimizador depende de baterias, que importa este módulo
+    from .optimizador import optimizar_sistema_hibrido
+    
+    try:
+        resultado = optimizar_sistema_hibrido(
+            clima,
+            consumo_mensual,
+            objetivo=datos_usuario.get('objetivo', 'cobertura'),
+            max_resultados=max_combinaciones * 4,
+            **_parametros_optimizador(opciones_viables, datos_usuario)
+        )
+    except Exception as e:
+        import logging
+        logger = logging.getLogger('energia_calculo')
+        logger.error(f"Error al optimizar combinaciones: {str(e)}")
+        return []
+    
+    # Solo interesan los sistemas híbridos
+    hibridas = [c for c in resultado['combinaciones'] if len(c['tipos']) >= 2]
+    return hibridas[:max_combinaciones]
+
+
+def anotar_combinaciones(combinaciones, combinacion_ia):
+    """
+    Agrega la justificación de la IA a las combinaciones del optimizador que
+    usan las tecnologías que sugirió (sin contar la batería). La IA no agrega
+    combinaciones ni cambia sus tamaños o métricas
+    
+    Args:
+        combinaciones (list): Combinaciones dimensionadas por el optimizador
+        combinacion_ia (dict): 'combinacion_recomendada' de la respuesta de la IA
+        
+    Returns:
+        tuple: (copia de las combinaciones anotadas, primera que coincide con la sugerencia o None)
+    """
+    tipos_ia = set((combinacion_ia or {}).get('opciones') or [])
+    anotadas, sugerida = [], None
+    for combinacion in combinaciones:
+        combinacion = dict(combinacion)
+        if len(tipos_ia) > 1 and set(combinacion['tipos']) - {'bateria'} == tipos_ia:
+            combinacion['justificacion_ia'] = combinacion_ia.get('justificacion', '')
+            sugerida = sugerida or combinacion
+        anotadas.append(combinacion)
+    return anotadas, sugerida
+
+
+def calcular_frente_pareto(opciones_viables, datos_usuario, clima, consumo_mensual):
+    """
+    Alternativas no dominadas en costo, cobertura, retorno y CO2 evitado entre
+    todos los tamaños y combinaciones de las opciones viables
+    
+    Args:
+        opciones_viables (list): Opciones viables calculadas
+        datos_usuario (dict): Datos proporcionados por el usuario
+        clima (dict): Datos climáticos de la ubicación
+        consumo_mensual (float): Consumo mensual en kWh
+        
+    Returns:
+        list: Alternativas del frente ordenadas por costo creciente
+    """
+    from .optimizador import calcular_frente_pareto as frente_optimizador
+    
+    if not opciones_viables:
+        return []
+    parametros = _parametros_optimizador(opciones_viables, datos_usuario)
+    clave = clave_frente(clima, consumo_mensual, parametros)
+    if clave is not None:
+        frente = _cache_frentes.obtener(clave)
+        if frente is not None:
+            return copy.deepcopy(frente)
+    try:
+        frente = frente_optimizador(clima, consumo_mensual, **parametros)['frente']
+    except Exception as e:
+        import logging
+        logger = logging.getLogger('energia_calculo')
+        logger.error(f"Error al calcular el frente de Pareto: {str(e)}")
+        return []
+    if clave is not None:
+        _cache_frentes.guardar(clave, frente)
+    return copy.deepcopy(frente)
+
+
+def clave_frente(clima, consumo_mensual, parametros):
+    """
+    Clave de caché del frente de Pareto: celda de la grilla climática, consumo,
+    superficie, presupuesto, tecnologías, tipo de vivienda y equipos
+    
+    Returns:
+        str: Clave, o None si el clima no tiene coordenadas
+    """
+    if clima.get('latitud') is None or clima.get('longitud') is None:
+        return None
+    lat, lon = ajustar_a_grilla(clima['latitud'], clima['longitud'])
+    return "|".join([
+        f"{lat:.4f},{lon:.4f}",
+        f"{float(consumo_mensual):.1f}",
+        f"{parametros['superficie_disponible']:g}",
+        f"{parametros['presupuesto'] or 0:g}",
+        ",".join(sorted(parametros['tecnologias'])),
+        str(parametros['tipo_vivienda']),
+        ",".join(sorted(map(str, parametros['equipos'])))
+    ])
+
+
 def calcular_potencial_solar(radiacion_solar, superficie, temperatura, parametros_ia=None):
     """
     Calcula el potencial de generación solar fotovoltaica
@@ -504,24 +619,12 @@ def calcular_potencial_eolico(velocidad_viento, superficie, parametros_ia=None):
         # Descripción genérica
         descripcion = f"Aerogenerador doméstico con torre de {altura_torre} metros de altura."
     
-    # Calcular generación usando la fórmula de la ley cúbica del viento
-    # Para simplificar, usamos una fórmula empírica para aerogeneradores pequeños
-    
-    # Generación aproximada para un aerogenerador
-    if velocidad_ajustada < 2.5:
-        generacion_nominal = 0  # Por debajo de la velocidad de arranque
-    else:
-        # ESTA ES UNA CORRECCIÓN IMPORTANTE: La versión anterior sobreestimaba la generación eólica
-        # Usamos un factor más realista (0.1 en lugar de 0.2) y una curva de potencia más conservadora
-        generacion_nominal = potencia_maxima * (0.1 * (velocidad_ajustada ** 3) / (11 ** 3))
-        generacion_nominal = min(generacion_nominal, potencia_maxima)  # No exceder la potencia máxima
-    
-    # Factor de capacidad (porcentaje del tiempo que genera a potencia nominal)
-    # Ajustamos el factor de capacidad a valores más realistas para pequeños aerogeneradores
-    factor_capacidad = 0.15 * factor_viabilidad  # 15% en lugar de 25%
+    # Calcular generación integrando la curva de potencia del aerogenerador contra
+    # una distribución de Weibull (Rayleigh, k = 2) a la altura de la torre
+    factor_capacidad = float(motor_eolico.factor_capacidad(float(velocidad_viento), altura_buje=float(altura_torre)))
     
     # Generación diaria y mensual
-    generacion_diaria = generacion_nominal * 24 * factor_capacidad
+    generacion_diaria = potencia_maxima * 24 * factor_capacidad
     generacion_mensual = generacion_diaria * 30
     
     return {
@@ -613,6 +716,35 @@ def calcular_potencial_termotanque(radiacion_solar, temperatura, parametros_ia=N
     
     return resultado
 
+# Consumo base mensual (kWh) según tipo de vivienda
+CONSUMOS_BASE_VIVIENDA = {
+    'casa_pequena': 250,
+    'casa_mediana': 350,
+    'casa_grande': 450,
+    'apartamento': 200,
+    'oficina': 300,
+    'comercio': 500,
+    'otro': 300
+}
+
+# Consumo adicional mensual (kWh) por equipo
+CONSUMOS_ADICIONALES_EQUIPO = {
+    'aire_acondicionado': 150,
+    'calefaccion_electrica': 200,
+    'bomba_calor': 100,
+    'refrigerador': 50,
+    'lavadora': 30,
+    'secadora': 80,
+    'lavavajillas': 30,
+    'horno_electrico': 40,
+    'computadoras': 25,
+    'iluminacion_led': 15,
+    'iluminacion_tradicional': 40,
+    'piscina': 120,
+    'jacuzzi': 80,
+    'otro': 30
+}
+
 def calcular_estimacion_sin_kwh(tipo_vivienda, equipos):
     """
     Estima el consumo mensual en kWh cuando el usuario no proporciona este dato
@@ -624,40 +756,11 @@ def calcular_estimacion_sin_kwh(tipo_vivienda, equipos):
     Returns:
         float: Consumo estimado en kWh/mes
     """
-    # Consumo base según tipo de vivienda
-    consumos_base = {
-        'casa_pequena': 250,
-        'casa_mediana': 350,
-        'casa_grande': 450,
-        'apartamento': 200,
-        'oficina': 300,
-        'comercio': 500,
-        'otro': 300
-    }
-    
     # Si no se especifica el tipo, usar una casa mediana por defecto
-    consumo_base = consumos_base.get(tipo_vivienda, 350)
-    
-    # Adicionales por cada equipo
-    adicionales_equipo = {
-        'aire_acondicionado': 150,
-        'calefaccion_electrica': 200,
-        'bomba_calor': 100,
-        'refrigerador': 50,
-        'lavadora': 30,
-        'secadora': 80,
-        'lavavajillas': 30,
-        'horno_electrico': 40,
-        'computadoras': 25,
-        'iluminacion_led': 15,
-        'iluminacion_tradicional': 40,
-        'piscina': 120,
-        'jacuzzi': 80,
-        'otro': 30
-    }
+    consumo_base = CONSUMOS_BASE_VIVIENDA.get(tipo_vivienda, 350)
     
     # Sumar consumo de equipos
-    consumo_equipos = sum(adicionales_equipo.get(equipo, 0) for equipo in equipos)
+    consumo_equipos = sum(CONSUMOS_ADICIONALES_EQUIPO.get(equipo, 0) for equipo in equipos)
     
     # Retornar estimación total
     return consumo_base + consumo_equipos
\ No newline at end of file
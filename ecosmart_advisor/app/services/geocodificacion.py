@@ -0,0 +1,213 @@
+"""
+Módulo de geocodificación con OpenCage para el autocompletado del mapa.
+Normaliza las consultas, guarda en caché los resultados simplificados
+(también las búsquedas sin resultados, con un TTL más corto) y agrupa
+las consultas idénticas simultáneas para que solo una llegue a OpenCage.
+"""
+import os
+import time
+import threading
+import logging
+from collections import deque
+from dotenv import load_dotenv
+from ecosmart_advisor.app.services.cache import CacheEscalonada
+from ecosmart_advisor.app.services import http_cliente
+from ecosmart_advisor.app.services.localidades import normalizar
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Cargar variables de entorno
+load_dotenv()
+
+OPENCAGE_URL = 'https://api.opencagedata.com/geocode/v1/json'
+
+# Configuración de la caché de geocodificación
+GEOCODE_CACHE_TTL = int(os.environ.get("GEOCODE_CACHE_TTL", str(7 * 86400)))  # segundos
+GEOCODE_CACHE_TTL_NEGATIVO = int(os.environ.get("GEOCODE_CACHE_TTL_NEGATIVO", "600"))  # sin resultados
+GEOCODE_CACHE_MAX = int(os.environ.get("GEOCODE_CACHE_MAX", "4096"))
+GEOCODE_TIMEOUT = (3.05, 5)  # (conexión, lectura) en segundos
+
+_cache_geocode = CacheEscalonada(
+    "geocode",
+    max_entradas=GEOCODE_CACHE_MAX,
+    ttl=GEOCODE_CACHE_TTL
+)
+
+# Consultas en curso: clave -> _Vuelo
+_en_vuelo = {}
+_lock = threading.Lock()
+
+# Métricas del proceso
+_metricas = {'consultas': 0, 'aciertos_cache': 0, 'consultas_opencage': 0, 'agrupadas': 0, 'errores': 0}
+_latencias = deque(maxlen=1000)
+
+
+class ErrorGeocodificacion(Exception):
+    """Error devuelto por OpenCage o por la conexión con el servicio"""
+
+
+class _Vuelo:
+    """Consulta a OpenCage en curso que pueden esperar otros hilos"""
+
+    def __init__(self):
+        self.listo = threading.Event()
+        self.resultados = None
+        self.error = None
+
+
+def preparar_consulta(q):
+    """
+    Ajusta la consulta para priorizar resultados de Argentina
+    """
+    if 'argentina' not in q.lower() and len(q.split(',')) > 1:
+        q = f"{q}, Argentina"
+    return q
+
+
+def clave_consulta(q, limit):
+    """
+    Clave de caché: consulta sin acentos, mayúsculas ni puntuación, más el límite
+    """
+    return f"{normalizar(preparar_consulta(q))}|{limit}"
+
+
+def simplificar_resultados(data):
+    """
+    Reduce la respuesta de OpenCage a los campos que usa el mapa
+
+    Args:
+        data (dict): Respuesta JSON de OpenCage
+
+    Returns:
+        list: Resultados simplificados
+    """
+    results = []
+    for result in data.get('results', []):
+        simplified = {
+            'formatted': result['formatted'],
+            'lat': result['geometry']['lat'],
+            'lng': result['geometry']['lng'],
+            'confidence': result.get('confidence', 0)
+        }
+        # Agregar componentes de dirección si están disponibles
+        if 'components' in result:
+            comp = result['components']
+            simplified['components'] = {
+                'street': comp.get('road', ''),
+                'number': comp.get('house_number', ''),
+                'city': comp.get('city', comp.get('town', comp.get('village', ''))),
+                'state': comp.get('state', ''),
+                'country': comp.get('country', '')
+            }
+        results.append(simplified)
+    return results
+
+
+def consultar_opencage(q, limit, api_key):
+    """
+    Realiza la consulta a OpenCage y devuelve los resultados simplificados
+
+    Raises:
+        ErrorGeocodificacion: Si OpenCage devuelve un error
+    """
+    params = {
+        'q': preparar_consulta(q),
+        'key': api_key,
+        'limit': limit,
+        'countrycode': 'ar',  # Priorizar Argentina
+        'language': 'es',     # Respuestas en español
+        'no_annotations': 1   # Respuestas más ligeras
+    }
+    logger.info(f"Consulta a OpenCage: {params['q']}")
+    response = http_cliente.get(OPENCAGE_URL, params=params, timeout=GEOCODE_TIMEOUT)
+    data = response.json()
+
+    if 'error' in data:
+        raise ErrorGeocodificacion(data.get('error', {}).get('message', 'Error desconocido'))
+    estado = data.get('status', {})
+    if estado.get('code', 200) != 200:
+        raise ErrorGeocodificacion(estado.get('message', 'Error desconocido'))
+
+    return simplificar_resultados(data)
+
+
+def geocodificar(q, limit, api_key):
+    """
+    Geocodifica una consulta usando la caché y agrupando las consultas
+    idénticas que llegan al mismo tiempo.
+
+    Args:
+        q (str): Texto de búsqueda
+        limit (int o str): Cantidad máxima de resultados
+        api_key (str): API key de OpenCage
+
+    Returns:
+        list: Resultados simplificados
+
+    Raises:
+        ErrorGeocodificacion: Si OpenCage devuelve un error
+    """
+    inicio = time.perf_counter()
+    clave = clave_consulta(q, limit)
+    _metricas['consultas'] += 1
+
+    try:
+        resultados = _cache_geocode.obtener(clave)
+        if resultados is not None:
+            _metricas['aciertos_cache'] += 1
+            return resultados
+
+        with _lock:
+            vuelo = _en_vuelo.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = _en_vuelo[clave] = _Vuelo()
+
+        if not lider:
+            # Otra petición ya está consultando lo mismo: esperar su resultado
+            _metricas['agrupadas'] += 1
+            if not vuelo.listo.wait(GEOCODE_TIMEOUT[0] + GEOCODE_TIMEOUT[1]):
+                raise ErrorGeocodificacion("Tiempo de espera agotado")
+            if vuelo.error is not None:
+                raise vuelo.error
+            return vuelo.resultados
+
+        try:
+            _metricas['consultas_opencage'] += 1
+            vuelo.resultados = consultar_opencage(q, limit, api_key)
+            # Las búsquedas sin resultados se guardan menos tiempo
+            ttl = GEOCODE_CACHE_TTL if vuelo.resultados else GEOCODE_CACHE_TTL_NEGATIVO
+            _cache_geocode.guardar(clave, vuelo.resultados, ttl)
+            return vuelo.resultados
+        except Exception as e:
+            _metricas['errores'] += 1
+            vuelo.error = e if isinstance(e, ErrorGeocodificacion) else ErrorGeocodificacion(str(e))
+            raise vuelo.error
+        finally:
+            with _lock:
+                _en_vuelo.pop(clave, None)
+            vuelo.listo.set()
+    finally:
+        _latencias.append(time.perf_counter() - inicio)
+
+
+def estadisticas_geocodificacion():
+    """
+    Returns:
+        dict: Contadores de consultas, caché y latencias (ms) del proceso
+    """
+    latencias = sorted(_latencias)
+
+    def percentil(p):
+        if not latencias:
+            return 0.0
+        return round(latencias[min(len(latencias) - 1, int(p * len(latencias)))] * 1000, 2)
+
+    return {
+        **_metricas,
+        'latencia_p50_ms': percentil(0.50),
+        'latencia_p95_ms': percentil(0.95),
+        'cache': _cache_geocode.estadisticas()
+    }
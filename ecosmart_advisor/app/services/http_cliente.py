@@ -0,0 +1,313 @@
+"""
+Cliente HTTP compartido para todas las integraciones externas
+(Open-Meteo, Nominatim, OpenCage, Deepseek y Unsplash).
+
+Mantiene una sesión con pool de conexiones persistentes por host, aplica
+timeouts de conexión y lectura uniformes, reintenta con backoff y jitter
+los errores transitorios, limita la concurrencia por host y registra
+histogramas de latencia.
+"""
+import os
+import time
+import random
+import threading
+import logging
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from dotenv import load_dotenv
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Timeouts por defecto (conexión, lectura) en segundos
+HTTP_TIMEOUT_CONEXION = float(os.environ.get("HTTP_TIMEOUT_CONEXION", "3.05"))
+HTTP_TIMEOUT_LECTURA = float(os.environ.get("HTTP_TIMEOUT_LECTURA", "10"))
+# Reintentos ante errores transitorios y base del backoff exponencial (segundos)
+HTTP_REINTENTOS = int(os.environ.get("HTTP_REINTENTOS", "2"))
+HTTP_BACKOFF = float(os.environ.get("HTTP_BACKOFF", "0.3"))
+# Peticiones simultáneas por host (y tamaño del pool de conexiones)
+HTTP_MAX_CONCURRENCIA = int(os.environ.get("HTTP_MAX_CONCURRENCIA", "8"))
+
+# Límites específicos de algunos servicios
+LIMITES_POR_HOST = {
+    'nominatim.openstreetmap.org': 1,  # Política de uso: 1 petición por segundo
+    'api.unsplash.com': 4,
+}
+
+# Respuestas que vale la pena reintentar
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+METODOS_IDEMPOTENTES = {'GET', 'HEAD', 'OPTIONS'}
+
+# Límites superiores (ms) de los baldes del histograma de latencias
+BALDES_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, float('inf'))
+
+
+class ErrorSaturacion(requests.exceptions.RequestException):
+    """No se obtuvo un lugar en el límite de concurrencia del host a tiempo"""
+
+
+def _sin_conexion(error):
+    """
+    Indica si la petición falló antes de establecer la conexión, es decir,
+    si el servidor no pudo recibir el cuerpo y es seguro repetirla.
+
+    Args:
+        error (requests.exceptions.RequestException): Error de la petición
+
+    Returns:
+        bool: True si no llegó a conectarse (timeout o fallo al conectar)
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.exceptions.ConnectionError):
+        return False
+    # requests envuelve el MaxRetryError de urllib3; su causa es el error de conexión
+    causa = error.args[0] if error.args else None
+    return isinstance(getattr(causa, 'reason', causa), NewConnectionError)
+
+
+def _liberar_al_cerrar(respuesta, semaforo):
+    """
+    Retiene el lugar del semáforo hasta que se cierre la respuesta. Con
+    stream=True el cuerpo se lee después de solicitar(), así que el lugar
+    debe ocuparse mientras dure la lectura.
+
+    Args:
+        respuesta (requests.Response): Respuesta en modo streaming
+        semaforo (threading.BoundedSemaphore): Semáforo del host
+    """
+    cerrar = respuesta.close
+    pendiente = [semaforo.release]
+
+    def close():
+        try:
+            cerrar()
+        finally:
+            # pop() es atómico: el lugar se libera una sola vez aunque se cierre dos veces
+            try:
+                liberar = pendiente.pop()
+            except IndexError:
+                liberar = None
+            if liberar:
+                liberar()
+
+    respuesta.close = close
+
+
+class _Host:
+    """Estado por host: sesión con pool de conexiones, semáforo y métricas"""
+
+    def __init__(self, nombre, limite):
+        self.nombre = nombre
+        self.limite = limite
+        self.semaforo = threading.BoundedSemaphore(limite)
+        self.sesion = requests.Session()
+        self.sesion.headers.update({'User-Agent': 'EcoSmartAdvisor/1.0'})
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=limite, max_retries=0)
+        self.sesion.mount('https://', adaptador)
+        self.sesion.mount('http://', adaptador)
+        self.baldes = [0] * len(BALDES_MS)
+        self.peticiones = 0
+        self.errores = 0
+        self.reintentos = 0
+        self.tiempo_total = 0.0
+
+    def registrar(self, segundos):
+        milisegundos = segundos * 1000
+        for i, limite in enumerate(BALDES_MS):
+            if milisegundos <= limite:
+                self.baldes[i] += 1
+                break
+        self.peticiones += 1
+        self.tiempo_total += segundos
+
+    def percentil(self, p):
+        """
+        Percentil aproximado (límite superior del balde) en milisegundos
+        """
+        if not self.peticiones:
+            return 0.0
+        objetivo = p * self.peticiones
+        acumulado = 0
+        for limite, cantidad in zip(BALDES_MS, self.baldes):
+            acumulado += cantidad
+            if acumulado >= objetivo:
+                return limite
+        return BALDES_MS[-1]
+
+    def estadisticas(self):
+        return {
+            'peticiones': self.peticiones,
+            'errores': self.errores,
+            'reintentos': self.reintentos,
+            'latencia_media_ms': round(self.tiempo_total * 1000 / self.peticiones, 1) if self.peticiones else 0.0,
+            'latencia_p50_ms': self.percentil(0.50),
+            'latencia_p95_ms': self.percentil(0.95),
+            'histograma_ms': {
+                ('inf' if limite == float('inf') else f"<={limite}"): cantidad
+                for limite, cantidad in zip(BALDES_MS, self.baldes)
+            }
+        }
+
+
+class ClienteHTTP:
+    """
+    Cliente HTTP con un pool de conexiones por host. Las sesiones se crean
+    de nuevo en cada proceso, ya que los sockets no se comparten tras un fork.
+    """
+
+    def __init__(self, timeout=None, reintentos=HTTP_REINTENTOS, backoff=HTTP_BACKOFF,
+                 max_concurrencia=HTTP_MAX_CONCURRENCIA, limites=None):
+        """
+        Args:
+            timeout (tuple, optional): (conexión, lectura) por defecto en segundos
+            reintentos (int): Reintentos ante errores transitorios
+            backoff (float): Base del backoff exponencial en segundos
+            max_concurrencia (int): Peticiones simultáneas por host por defecto
+            limites (dict, optional): Límite de concurrencia por host
+        """
+        self.timeout = timeout or (HTTP_TIMEOUT_CONEXION, HTTP_TIMEOUT_LECTURA)
+        self.reintentos = reintentos
+        self.backoff = backoff
+        self.max_concurrencia = max_concurrencia
+        self.limites = dict(LIMITES_POR_HOST if limites is None else limites)
+        self._hosts = {}
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def _host(self, url):
+        nombre = urlsplit(url).hostname or ''
+        if self._pid != os.getpid():
+            # Proceso hijo: descartar sesiones heredadas del padre
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._hosts = {}
+                    self._pid = os.getpid()
+        host = self._hosts.get(nombre)
+        if host is None:
+            with self._lock:
+                host = self._hosts.get(nombre)
+                if host is None:
+                    limite = self.limites.get(nombre, self.max_concurrencia)
+                    host = self._hosts[nombre] = _Host(nombre, limite)
+        return host
+
+    def _espera(self, intento, respuesta=None):
+        """
+        Tiempo de espera antes de un reintento: backoff exponencial con jitter,
+        respetando Retry-After si el servidor lo indica
+        """
+        espera = self.backoff * (2 ** intento) * random.uniform(0.5, 1.5)
+        if respuesta is not None:
+            try:
+                espera = max(espera, min(float(respuesta.headers.get('Retry-After', 0)), 5.0))
+            except ValueError:
+                pass
+        return espera
+
+    def solicitar(self, metodo, url, timeout=None, reintentos=None, **kwargs):
+        """
+        Realiza una petición HTTP con pool de conexiones, límite de concurrencia
+        y reintentos.
+
+        Args:
+            metodo (str): Método HTTP
+            url (str): URL de destino
+            timeout (float o tuple, optional): Timeout total o (conexión, lectura)
+            reintentos (int, optional): Reintentos para esta petición
+            **kwargs: Argumentos adicionales de requests (params, json, headers, ...)
+
+        Returns:
+            requests.Response: Respuesta del servidor. Con stream=True ocupa el
+            lugar en el límite de concurrencia del host hasta que se cierra,
+            así que debe cerrarse (o usarse con `with`)
+
+        Raises:
+            requests.exceptions.RequestException: Si la petición falla tras los reintentos
+        """
+        metodo = metodo.upper()
+        host = self._host(url)
+        reintentos = self.reintentos if reintentos is None else reintentos
+        if timeout is None:
+            timeout = self.timeout
+        elif not isinstance(timeout, tuple):
+            timeout = (min(HTTP_TIMEOUT_CONEXION, timeout), timeout)
+        idempotente = metodo in METODOS_IDEMPOTENTES
+
+        intento = 0
+        while True:
+            if not host.semaforo.acquire(timeout=timeout[0] + timeout[1]):
+                host.errores += 1
+                raise ErrorSaturacion(f"Demasiadas peticiones simultáneas a {host.nombre}")
+            inicio = time.perf_counter()
+            retenido = False
+            try:
+                respuesta = host.sesion.request(metodo, url, timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                host.registrar(time.perf_counter() - inicio)
+                # Un POST solo se reintenta si la conexión no llegó a establecerse:
+                # si se cortó después de enviar el cuerpo, el servidor pudo procesarlo
+                reintentable = idempotente or _sin_conexion(e)
+                if intento >= reintentos or not reintentable:
+                    host.errores += 1
+                    raise
+                logger.warning(f"Error de conexión con {host.nombre} ({type(e).__name__}), reintentando")
+                respuesta = None
+            else:
+                host.registrar(time.perf_counter() - inicio)
+                if not (respuesta.status_code in ESTADOS_REINTENTABLES
+                        and (idempotente or respuesta.status_code == 429)
+                        and intento < reintentos):
+                    if respuesta.status_code >= 400:
+                        host.errores += 1
+                    if kwargs.get('stream'):
+                        _liberar_al_cerrar(respuesta, host.semaforo)
+                        retenido = True
+                    return respuesta
+                logger.warning(f"{host.nombre} respondió {respuesta.status_code}, reintentando")
+                respuesta.close()
+            finally:
+                if not retenido:
+                    host.semaforo.release()
+
+            host.reintentos += 1
+            time.sleep(self._espera(intento, respuesta))
+            intento += 1
+
+    def get(self, url, **kwargs):
+        return self.solicitar('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.solicitar('POST', url, **kwargs)
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Métricas por host del proceso actual
+        """
+        return {nombre: host.estadisticas() for nombre, host in list(self._hosts.items())}
+
+
+# Cliente compartido por todos los servicios
+cliente = ClienteHTTP()
+
+
+def get(url, **kwargs):
+    """Petición GET con el cliente compartido"""
+    return cliente.get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    """Petición POST con el cliente compartido"""
+    return cliente.post(url, **kwargs)
+
+
+def estadisticas_http():
+    """Métricas por host del cliente compartido"""
+    return cliente.estadisticas()
@@ -0,0 +1,223 @@
+"""
+Variantes optimizadas de las imágenes del carrusel.
+
+Cada imagen (de Unsplash o de static/images) se lee una sola vez, se
+reescala a unos pocos anchos y se codifica en AVIF, WebP y JPEG. Los
+archivos se guardan en disco con el hash del contenido original en el
+nombre, así que nunca cambian y la ruta /img/ los sirve con caché
+inmutable de un año. La página arma un <picture> con srcset para que el
+navegador descargue solo el formato y el ancho que necesita.
+
+Pillow es opcional: si no está instalado, el carrusel sigue usando las
+URL originales.
+"""
+import io
+import os
+import re
+import hashlib
+import logging
+from dotenv import load_dotenv
+from ecosmart_advisor.app.services import http_cliente
+from ecosmart_advisor.app.services.cache import CacheEscalonada, CACHE_DIR
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Cargar variables de entorno
+load_dotenv()
+
+IMAGENES_DIR = os.environ.get("ECOSMART_IMAGENES_DIR", os.path.join(CACHE_DIR, "imagenes"))
+IMAGENES_ANCHOS = sorted(int(a) for a in os.environ.get("IMAGENES_ANCHOS", "480,960,1440").split(","))
+IMAGENES_CALIDAD = int(os.environ.get("IMAGENES_CALIDAD", "70"))
+IMAGENES_MAX_BYTES = int(os.environ.get("IMAGENES_MAX_BYTES", str(10 * 1024 * 1024)))
+IMAGENES_TIMEOUT = (3.05, 10)  # (conexión, lectura) en segundos
+
+# Prefijo de las URL servidas por la ruta /img/
+RUTA_IMAGENES = "/img/"
+# Las variantes nunca cambian de contenido: se pueden guardar en caché un año
+IMAGENES_MAX_AGE = 365 * 86400
+
+# Formatos modernos, del más liviano al más pesado; JPEG queda siempre como respaldo
+FORMATOS_MODERNOS = [f.strip() for f in os.environ.get("IMAGENES_FORMATOS", "avif,webp").split(",") if f.strip()]
+TIPOS = {'avif': 'image/avif', 'webp': 'image/webp', 'jpg': 'image/jpeg'}
+_FORMATOS_PIL = {'avif': 'AVIF', 'webp': 'WEBP', 'jpg': 'JPEG'}
+_NOMBRE_VARIANTE = re.compile(r'^[0-9a-f]{16}-\d+\.(avif|webp|jpg)$')
+
+_DIRECTORIO_STATIC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+
+# Origen -> descripción de las variantes (las imágenes no se vuelven a leer)
+_variantes = CacheEscalonada("imagenes", max_entradas=256, ttl=30 * 86400, max_entradas_disco=5000)
+
+
+def disponible():
+    """Indica si Pillow está instalado y se pueden generar variantes"""
+    return Image is not None
+
+
+def formatos():
+    """
+    Returns:
+        list: Extensiones que se generan, con JPEG al final como respaldo
+    """
+    if Image is None:
+        return []
+    return [f for f in FORMATOS_MODERNOS if f in TIPOS and f != 'jpg' and features.check(f)] + ['jpg']
+
+
+def ruta_variante(nombre):
+    """
+    Ruta en disco de una variante generada
+
+    Args:
+        nombre (str): Nombre del archivo (hash-ancho.extensión)
+
+    Returns:
+        str: Ruta del archivo, o None si el nombre no es válido o no existe
+    """
+    if not _NOMBRE_VARIANTE.match(nombre):
+        return None
+    ruta = os.path.join(IMAGENES_DIR, nombre)
+    return ruta if os.path.isfile(ruta) else None
+
+
+def _ruta_local(origen):
+    """Archivo bajo static/ para una URL /static/..., o None si sale de la carpeta"""
+    relativa = origen[len('/static/'):]
+    ruta = os.path.normpath(os.path.join(_DIRECTORIO_STATIC, relativa))
+    if not ruta.startswith(_DIRECTORIO_STATIC + os.sep):
+        return None
+    return ruta
+
+
+def _clave(origen):
+    """Clave de caché: la URL, o la ruta con fecha y tamaño para los archivos locales"""
+    if origen.startswith('/static/'):
+        ruta = _ruta_local(origen)
+        if ruta is None or not os.path.isfile(ruta):
+            return None
+        estado = os.stat(ruta)
+        return f"{origen}|{estado.st_mtime_ns}|{estado.st_size}"
+    return origen
+
+
+def _leer_origen(origen):
+    """
+    Contenido de la imagen original
+
+    Raises:
+        ValueError: Si el origen no es válido, no responde o es demasiado grande
+    """
+    if origen.startswith('/static/'):
+        ruta = _ruta_local(origen)
+        if ruta is None:
+            raise ValueError(f"Ruta fuera de static: {origen}")
+        with open(ruta, 'rb') as archivo:
+            contenido = archivo.read(IMAGENES_MAX_BYTES + 1)
+    elif origen.startswith(('http://', 'https://')):
+        respuesta = http_cliente.get(origen, timeout=IMAGENES_TIMEOUT)
+        if respuesta.status_code != 200:
+            raise ValueError(f"Respuesta {respuesta.status_code} al descargar {origen}")
+        contenido = respuesta.content
+    else:
+        raise ValueError(f"Origen de imagen no soportado: {origen}")
+    if len(contenido) > IMAGENES_MAX_BYTES:
+        raise ValueError(f"Imagen demasiado grande: {origen}")
+    return contenido
+
+
+def _guardar(nombre, imagen, extension):
+    """Codifica y escribe una variante (escritura atómica); no la rehace si ya existe"""
+    ruta = os.path.join(IMAGENES_DIR, nombre)
+    if os.path.isfile(ruta):
+        return
+    opciones = {
+        'avif': {'quality': IMAGENES_CALIDAD, 'speed': 8},
+        'webp': {'quality': IMAGENES_CALIDAD, 'method': 4},
+        'jpg': {'quality': IMAGENES_CALIDAD + 10, 'optimize': True, 'progressive': True},
+    }[extension]
+    buffer = io.BytesIO()
+    imagen.save(buffer, _FORMATOS_PIL[extension], **opciones)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'wb') as archivo:
+        archivo.write(buffer.getvalue())
+    os.replace(temporal, ruta)
+
+
+def generar_variantes(contenido):
+    """
+    Genera las variantes de una imagen en todos los anchos y formatos
+
+    Args:
+        contenido (bytes): Imagen original
+
+    Returns:
+        dict: Ancho y alto originales, 'src' y 'srcset' en JPEG y 'fuentes'
+              [{'tipo', 'srcset'}] con los formatos modernos
+
+    Raises:
+        OSError: Si Pillow no puede decodificar la imagen
+    """
+    huella = hashlib.sha256(contenido).hexdigest()[:16]
+    with Image.open(io.BytesIO(contenido)) as original:
+        imagen = ImageOps.exif_transpose(original).convert('RGB')
+    ancho_original, alto_original = imagen.size
+
+    # Anchos menores que el original, más el original si es menor que el máximo
+    anchos = sorted({a for a in IMAGENES_ANCHOS if a < ancho_original} | {min(ancho_original, IMAGENES_ANCHOS[-1])})
+
+    os.makedirs(IMAGENES_DIR, exist_ok=True)
+    srcsets = {}
+    for ancho in anchos:
+        alto = max(1, round(alto_original * ancho / ancho_original))
+        reescalada = imagen if ancho == ancho_original else imagen.resize((ancho, alto), Image.LANCZOS)
+        for extension in formatos():
+            nombre = f"{huella}-{ancho}.{extension}"
+            _guardar(nombre, reescalada, extension)
+            srcsets.setdefault(extension, []).append(f"{RUTA_IMAGENES}{nombre} {ancho}w")
+
+    # El <img> de respaldo usa el JPEG de ancho intermedio
+    predeterminado = anchos[len(anchos) // 2]
+    return {
+        'ancho': ancho_original,
+        'alto': alto_original,
+        'src': f"{RUTA_IMAGENES}{huella}-{predeterminado}.jpg",
+        'srcset': ", ".join(srcsets['jpg']),
+        'fuentes': [{'tipo': TIPOS[e], 'srcset': ", ".join(srcsets[e])} for e in formatos() if e != 'jpg'],
+    }
+
+
+def preparar_imagen(origen):
+    """
+    Variantes optimizadas de una imagen, generándolas la primera vez
+
+    Args:
+        origen (str): URL remota o ruta /static/... de la imagen original
+
+    Returns:
+        dict: Descripción de las variantes (ver generar_variantes), o None si
+              Pillow no está instalado o la imagen no se pudo procesar
+    """
+    if Image is None or not origen:
+        return None
+    try:
+        clave = _clave(origen)
+        if clave is None:
+            return None
+        variantes = _variantes.obtener(clave)
+        if variantes is not None:
+            # Las variantes pueden haberse borrado del disco (p. ej. un directorio temporal)
+            if all(ruta_variante(url.split()[0][len(RUTA_IMAGENES):]) for url in variantes['srcset'].split(", ")):
+                return variantes
+        variantes = generar_variantes(_leer_origen(origen))
+        _variantes.guardar(clave, variantes)
+        logger.info(f"Variantes generadas para {origen}: {variantes['srcset']}")
+        return variantes
+    except Exception as e:
+        logger.warning(f"No se pudieron generar variantes para {origen}: {str(e)}")
+        return None
@@ -0,0 +1,259 @@
+"""
+Modo de incertidumbre (Monte Carlo) para las simulaciones de instalaciones.
+
+En lugar de un único valor calculado con constantes fijas (precio de la
+energía, costo por kW, factor de emisiones) y el clima medio, sortea esos
+parámetros de distribuciones configurables y devuelve los percentiles
+P10/P50/P90 de generación, ahorro y retorno de la inversión.
+
+Todas las muestras se evalúan juntas con NumPy: la simulación física del
+sitio se hace una sola vez y cada muestra solo escala o interpola sus
+resultados, de modo que 10.000 sorteos tardan unos pocos milisegundos.
+Con la misma semilla se obtienen exactamente los mismos sorteos.
+"""
+import os
+import logging
+import numpy as np
+from dotenv import load_dotenv
+from ecosmart_advisor.app.services import simulador
+from ecosmart_advisor.app.services import motor_solar
+from ecosmart_advisor.app.services import motor_eolico
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Cargar variables de entorno
+load_dotenv()
+
+MONTE_CARLO_MUESTRAS = int(os.environ.get("MONTE_CARLO_MUESTRAS", "10000"))
+MONTE_CARLO_MAX_MUESTRAS = int(os.environ.get("MONTE_CARLO_MAX_MUESTRAS", "200000"))
+
+# Distribuciones por defecto: (tipo, parámetros)
+#   normal: (media, desvío), uniforme: (mínimo, máximo),
+#   triangular: (mínimo, moda, máximo), fijo: (valor,)
+# Los factores climáticos multiplican el valor medio del sitio y representan
+# la variabilidad entre años y la incertidumbre de la fuente de datos.
+DISTRIBUCIONES_POR_DEFECTO = {
+    'precio_kwh': ('triangular', (0.10, simulador.PRECIO_KWH, 0.22)),  # USD/kWh
+    'costo_solar_por_kw': ('triangular', (900, simulador.COSTO_SOLAR_POR_KW, 1600)),  # USD/kW
+    'costo_eolico_por_kw': ('triangular', (1500, simulador.COSTO_EOLICO_POR_KW, 2800)),  # USD/kW
+    'costo_termotanque_por_litro': ('triangular', (1.5, simulador.COSTO_TERMOTANQUE_POR_LITRO, 3.0)),  # USD/litro
+    'factor_co2': ('uniforme', (0.3, 0.5)),  # kg CO2 por kWh
+    'factor_radiacion': ('normal', (1.0, 0.06)),
+    'factor_viento': ('normal', (1.0, 0.10)),
+}
+
+# Cantidad de parámetros de cada tipo de distribución
+PARAMETROS_POR_TIPO = {'normal': 2, 'uniforme': 2, 'triangular': 3, 'fijo': 1}
+
+PERCENTILES = (10, 50, 90)
+
+# Multiplicadores de la velocidad del viento en los que se tabula la generación
+_FACTORES_VIENTO = np.linspace(0.3, 1.7, 141)
+
+
+def muestrear(generador, distribucion, muestras):
+    """
+    Sortea valores de una distribución
+
+    Args:
+        generador (numpy.random.Generator): Generador de números aleatorios
+        distribucion (tuple): (tipo, parámetros)
+        muestras (int): Cantidad de valores
+
+    Returns:
+        numpy.ndarray: Valores sorteados
+
+    Raises:
+        ValueError: Si el tipo o los parámetros no son válidos
+    """
+    tipo, parametros = distribucion
+    parametros = [float(p) for p in parametros]
+    if tipo == 'normal':
+        media, desvio = parametros
+        return generador.normal(media, max(desvio, 0.0), muestras)
+    if tipo == 'uniforme':
+        minimo, maximo = parametros
+        return generador.uniform(min(minimo, maximo), max(minimo, maximo), muestras)
+    if tipo == 'triangular':
+        minimo, maximo = min(parametros), max(parametros)
+        moda = parametros[1]
+        if minimo == maximo:
+            return np.full(muestras, minimo)
+        return generador.triangular(minimo, moda, maximo, muestras)
+    if tipo == 'fijo':
+        return np.full(muestras, parametros[0])
+    raise ValueError(f"Distribución no soportada: {tipo}")
+
+
+def validar_distribucion(nombre, distribucion):
+    """
+    Valida el reemplazo de la distribución de un parámetro incierto
+
+    Args:
+        nombre (str): Parámetro de DISTRIBUCIONES_POR_DEFECTO
+        distribucion (tuple o dict): (tipo, parámetros) o {'tipo': ..., 'parametros': [...]}
+
+    Returns:
+        tuple: (tipo, parámetros como floats)
+
+    Raises:
+        ValueError: Si el parámetro, el tipo o los parámetros no son válidos
+    """
+    if nombre not in DISTRIBUCIONES_POR_DEFECTO:
+        raise ValueError(f"Parámetro incierto desconocido: {nombre}")
+    if isinstance(distribucion, dict):
+        tipo, parametros = distribucion.get('tipo'), distribucion.get('parametros')
+    else:
+        try:
+            tipo, parametros = distribucion
+        except (TypeError, ValueError):
+            raise ValueError(f"La distribución de {nombre} debe ser (tipo, parámetros)")
+    if tipo not in PARAMETROS_POR_TIPO:
+        raise ValueError(f"Distribución no soportada: {tipo}")
+    try:
+        parametros = tuple(float(p) for p in parametros)
+    except (TypeError, ValueError):
+        raise ValueError(f"Los parámetros de {nombre} deben ser una lista de números")
+    if len(parametros) != PARAMETROS_POR_TIPO[tipo] or not all(np.isfinite(parametros)):
+        raise ValueError(f"La distribución {tipo} de {nombre} requiere "
+                         f"{PARAMETROS_POR_TIPO[tipo]} parámetros numéricos finitos")
+    return tipo, parametros
+
+
+def validar_opciones(opciones):
+    """
+    Valida las opciones del modo de incertidumbre recibidas en una petición
+
+    Args:
+        opciones (dict o bool): 'muestras', 'semilla' y 'distribuciones' (True usa los valores por defecto)
+
+    Returns:
+        dict: Argumentos muestras, semilla y distribuciones para simular_monte_carlo
+
+    Raises:
+        ValueError: Si alguna opción no es válida
+    """
+    opciones = opciones if isinstance(opciones, dict) else {}
+    try:
+        muestras = int(opciones.get('muestras', MONTE_CARLO_MUESTRAS))
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError("La cantidad de muestras debe ser un número entero")
+    if not 1 <= muestras <= MONTE_CARLO_MAX_MUESTRAS:
+        raise ValueError(f"La cantidad de muestras debe estar entre 1 y {MONTE_CARLO_MAX_MUESTRAS}")
+
+    semilla = opciones.get('semilla')
+    if semilla is not None and (isinstance(semilla, bool) or not isinstance(semilla, (int, np.integer)) or semilla < 0):
+        raise ValueError("La semilla debe ser un número entero no negativo")
+
+    distribuciones = opciones.get('distribuciones') or {}
+    if not isinstance(distribuciones, dict):
+        raise ValueError("Las distribuciones deben indicarse por nombre de parámetro")
+    return {
+        'muestras': muestras,
+        'semilla': semilla,
+        'distribuciones': {nombre: validar_distribucion(nombre, distribucion)
+                           for nombre, distribucion in distribuciones.items()}
+    }
+
+
+def _resumen(valores):
+    """
+    Percentiles y media de una muestra; los valores infinitos (sin retorno)
+    cuentan para los percentiles pero se informan como None
+    """
+    p10, p50, p90 = np.percentile(valores, PERCENTILES)
+    finitos = valores[np.isfinite(valores)]
+
+    def valor(v):
+        return round(float(v), 2) if np.isfinite(v) else None
+
+    return {
+        'p10': valor(p10),
+        'p50': valor(p50),
+        'p90': valor(p90),
+        'media': valor(finitos.mean()) if finitos.size == valores.size else None
+    }
+
+
+def _generacion_solar(capacidad, clima, factor_radiacion):
+    latitud, radiacion_mensual, temperatura_mensual = simulador.obtener_clima_mensual(clima)
+    anual = float(motor_solar.simular_fv(capacidad, latitud, radiacion_mensual, temperatura_mensual)['anual'])
+    # La generación es prácticamente proporcional a la radiación recibida
+    return anual * np.maximum(factor_radiacion, 0.0)
+
+
+def _generacion_eolica(capacidad, clima, factor_viento):
+    velocidad_mensual, k_mensual = simulador.obtener_viento_mensual(clima)
+    # La curva de potencia no es lineal: se tabula la generación anual para
+    # una grilla de multiplicadores de la velocidad y se interpola por muestra
+    tabla = motor_eolico.simular_eolico(
+        _FACTORES_VIENTO[:, None] * velocidad_mensual, capacidad, k=k_mensual, mensual=True
+    )['generacion'][..., 0].sum(axis=1)
+    return np.interp(factor_viento, _FACTORES_VIENTO, tabla)
+
+
+def simular_monte_carlo(tipo_instalacion, capacidad, clima, consumo_mensual,
+                        muestras=MONTE_CARLO_MUESTRAS, semilla=None, distribuciones=None):
+    """
+    Simula la instalación con parámetros inciertos
+
+    Args:
+        tipo_instalacion (str): 'solar', 'eolica' o 'termotanque_solar'
+        capacidad (float): kW (o litros para el termotanque)
+        clima (dict): Datos climáticos del sitio
+        consumo_mensual (float): Consumo mensual en kWh
+        muestras (int): Cantidad de sorteos
+        semilla (int, optional): Semilla para reproducir los sorteos
+        distribuciones (dict, optional): Reemplazos de DISTRIBUCIONES_POR_DEFECTO
+
+    Returns:
+        dict: Percentiles de generación, cobertura, ahorro, retorno y CO2 evitado
+
+    Raises:
+        ValueError: Si la cantidad de muestras o alguna distribución no es válida
+    """
+    opciones = validar_opciones({'muestras': muestras, 'semilla': semilla, 'distribuciones': distribuciones})
+    muestras = opciones['muestras']
+    configuracion = dict(DISTRIBUCIONES_POR_DEFECTO, **opciones['distribuciones'])
+
+    # Sortear siempre en el mismo orden para que la semilla sea reproducible
+    generador = np.random.default_rng(semilla)
+    sorteo = {nombre: muestrear(generador, configuracion[nombre], muestras)
+              for nombre in sorted(configuracion)}
+
+    if tipo_instalacion == 'solar':
+        anual = _generacion_solar(capacidad, clima, sorteo['factor_radiacion'])
+        costo = capacidad * sorteo['costo_solar_por_kw']
+    elif tipo_instalacion == 'eolica':
+        anual = _generacion_eolica(capacidad, clima, sorteo['factor_viento'])
+        costo = capacidad * sorteo['costo_eolico_por_kw']
+    elif tipo_instalacion == 'termotanque_solar':
+        radiacion = clima.get('radiacion_solar', 4.5) * np.maximum(sorteo['factor_radiacion'], 0.0)
+        calculo = simulador.calcular_termotanque(capacidad, radiacion, clima.get('temperatura_promedio', 18))
+        anual = calculo['energia_aportada_diaria'] * 365
+        mensual = calculo['energia_aportada_diaria'] * 30  # Igual que simular_termotanque
+        costo = simulador.COSTO_TERMOTANQUE_BASE + capacidad * sorteo['costo_termotanque_por_litro']
+    else:
+        raise ValueError(f"Tipo de instalación no válido: {tipo_instalacion}")
+
+    if tipo_instalacion != 'termotanque_solar':
+        mensual = anual / 12
+    ahorro_anual = anual * sorteo['precio_kwh']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        retorno = np.where((costo > 0) & (ahorro_anual > 0), costo / ahorro_anual, np.inf)
+    cobertura = np.minimum(100, mensual / consumo_mensual * 100) if consumo_mensual > 0 else np.zeros(muestras)
+
+    return {
+        'muestras': muestras,
+        'semilla': semilla,
+        'distribuciones': {nombre: [tipo, list(parametros)] for nombre, (tipo, parametros) in configuracion.items()},
+        'generacion_anual': _resumen(anual),
+        'generacion_mensual': _resumen(mensual),
+        'cobertura': _resumen(cobertura),
+        'costo_estimado': _resumen(costo),
+        'ahorro_anual_usd': _resumen(ahorro_anual),
+        'retorno_inversion_anos': _resumen(retorno),
+        'co2_evitado': _resumen(anual * sorteo['factor_co2'])
+    }
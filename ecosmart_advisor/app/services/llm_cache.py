@@ -0,0 +1,289 @@
+"""
+Caché de respuestas de Deepseek con claves canónicas.
+
+Las consultas a Deepseek tardan varios segundos y se cobran por token, y la
+mayoría de los diagnósticos, simulaciones y preguntas del chatbot llegan con
+datos casi idénticos. Antes de armar el prompt, los datos numéricos se
+cuantizan (radiación a 0,1 kWh/m², consumo en tramos de 25 kWh, etc.), y la
+clave se calcula sobre el payload completo con los textos normalizados, de
+modo que consultas equivalentes comparten la misma respuesta.
+
+Las respuestas se guardan en la caché de dos niveles (LRU del proceso y
+SQLite compartido entre workers) con TTL y límite de entradas.
+"""
+import os
+import re
+import copy
+import json
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from dotenv import load_dotenv
+from ecosmart_advisor.app.services.cache import CacheEscalonada
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Configuración de la caché de respuestas de la IA
+LLM_CACHE_HABILITADA = os.environ.get("LLM_CACHE_HABILITADA", "1").lower() not in ("0", "false", "no")
+LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", str(7 * 86400)))  # segundos
+LLM_CACHE_MAX = int(os.environ.get("LLM_CACHE_MAX", "512"))  # entradas en memoria
+LLM_CACHE_MAX_DISCO = int(os.environ.get("LLM_CACHE_MAX_DISCO", "20000"))  # filas en disco
+
+# Paso de cuantización de cada dato numérico que interviene en los prompts
+CUANTIZACION = {
+    'radiacion_solar': 0.1,  # kWh/m²/día
+    'velocidad_viento': 0.1,  # m/s
+    'temperatura_promedio': 0.5,  # °C
+    'latitud': 0.1,  # grados
+    'longitud': 0.1,
+    'consumo_mensual': 25,  # kWh
+    'superficie_disponible': 5,  # m²
+    'capacidad': 0.5,  # kW (o litros para el termotanque)
+    'generacion_mensual': 10,  # kWh
+    'generacion_anual': 100,  # kWh
+    'cobertura': 5,  # %
+    'ahorro_anual_usd': 10,  # USD
+}
+
+_cache = CacheEscalonada(
+    "llm",
+    max_entradas=LLM_CACHE_MAX,
+    ttl=LLM_CACHE_TTL,
+    max_entradas_disco=LLM_CACHE_MAX_DISCO
+)
+
+# Métricas por espacio de caché (tipo de consulta)
+_metricas = {}
+_lock_metricas = threading.Lock()
+
+
+def cuantizar(valor, paso):
+    """
+    Redondea un valor al múltiplo más cercano del paso
+
+    Args:
+        valor (float): Valor a cuantizar
+        paso (float): Tamaño del tramo
+
+    Returns:
+        float o int: Valor cuantizado (int si el paso es entero)
+    """
+    cuantizado = round(float(valor) / paso) * paso
+    if float(paso).is_integer():
+        return int(cuantizado)
+    decimales = max(0, -int(f"{paso:e}".split('e')[1]))
+    return round(cuantizado, decimales)
+
+
+def canonicalizar(datos, cuantizacion=None):
+    """
+    Copia de los datos con los valores numéricos cuantizados según su nombre
+
+    Se aplica a los datos antes de construir el prompt, para que la respuesta
+    guardada corresponda exactamente a la consulta canónica.
+
+    Args:
+        datos (dict): Datos del usuario, del clima o de la simulación
+        cuantizacion (dict, optional): Pasos por nombre (por defecto CUANTIZACION)
+
+    Returns:
+        dict: Datos cuantizados (los valores no numéricos no cambian)
+    """
+    cuantizacion = CUANTIZACION if cuantizacion is None else cuantizacion
+    if not isinstance(datos, dict):
+        return datos
+
+    resultado = {}
+    for nombre, valor in datos.items():
+        if isinstance(valor, dict):
+            resultado[nombre] = canonicalizar(valor, cuantizacion)
+        elif nombre in cuantizacion and isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            resultado[nombre] = cuantizar(valor, cuantizacion[nombre])
+        elif nombre in cuantizacion and isinstance(valor, str):
+            # Valores numéricos que llegan como texto desde los formularios
+            try:
+                resultado[nombre] = cuantizar(float(valor.replace(',', '.')), cuantizacion[nombre])
+            except ValueError:
+                resultado[nombre] = valor
+        else:
+            resultado[nombre] = valor
+    return resultado
+
+
+def normalizar_texto(texto):
+    """
+    Forma canónica de un texto para la clave: sin mayúsculas, con los espacios
+    colapsados y sin signos de puntuación en los extremos
+    """
+    texto = unicodedata.normalize('NFKC', str(texto)).casefold()
+    texto = re.sub(r'\s+', ' ', texto)
+    return texto.strip(' ¿?¡!.,;:')
+
+
+def _canonico(valor):
+    if isinstance(valor, str):
+        return normalizar_texto(valor)
+    if isinstance(valor, dict):
+        return {str(clave): _canonico(v) for clave, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_canonico(v) for v in valor]
+    if isinstance(valor, float):
+        return round(valor, 6)
+    return valor
+
+
+def clave_consulta(espacio, consulta):
+    """
+    Clave de caché de una consulta
+
+    Args:
+        espacio (str): Tipo de consulta (por ejemplo 'diagnostico' o 'chatbot')
+        consulta: Payload o partes que determinan la respuesta
+
+    Returns:
+        str: Clave con el espacio como prefijo y un hash SHA-256 del contenido canónico
+    """
+    contenido = json.dumps(_canonico(consulta), sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return f"{espacio}:{hashlib.sha256(contenido.encode('utf-8')).hexdigest()}"
+
+
+def _registrar(espacio, evento, segundos=0.0):
+    with _lock_metricas:
+        metricas = _metricas.setdefault(espacio, {
+            'aciertos': 0, 'fallos': 0, 'omitidas': 0, 'segundos_ahorrados': 0.0, 'segundos_consulta': 0.0
+        })
+        metricas[evento] += 1
+        if evento == 'aciertos':
+            metricas['segundos_ahorrados'] += segundos
+        elif evento == 'fallos':
+            metricas['segundos_consulta'] += segundos
+
+
+def obtener(espacio, consulta):
+    """
+    Devuelve la respuesta guardada para una consulta, sin generarla
+
+    Pensada para las consultas que se transmiten por partes (streaming), que
+    no pueden envolverse en `consultar`; en caso de fallo, quien llama debe
+    informar el resultado con `registrar_respuesta`.
+
+    Args:
+        espacio (str): Tipo de consulta
+        consulta: Payload o partes que determinan la respuesta
+
+    Returns:
+        Copia de la respuesta guardada, o None si no está en la caché
+    """
+    if not LLM_CACHE_HABILITADA:
+        _registrar(espacio, 'omitidas')
+        return None
+
+    entrada = _cache.obtener(clave_consulta(espacio, consulta))
+    if entrada is None:
+        return None
+    _registrar(espacio, 'aciertos', entrada.get('segundos', 0.0))
+    logger.info(f"Respuesta de IA obtenida de la caché ({espacio})")
+    # Copia: quien llama puede modificar la respuesta sin alterar la caché
+    return copy.deepcopy(entrada['valor'])
+
+
+def contiene(espacio, consulta):
+    """
+    Indica si hay una respuesta guardada para la consulta, sin contarla en las métricas
+    (para la precarga de respuestas frecuentes)
+    """
+    return LLM_CACHE_HABILITADA and _cache.obtener(clave_consulta(espacio, consulta)) is not None
+
+
+def registrar_respuesta(espacio, consulta, valor, segundos=0.0, ttl=None):
+    """
+    Registra una consulta a la IA que no estaba en la caché y guarda su respuesta
+
+    Args:
+        espacio (str): Tipo de consulta
+        consulta: Payload o partes que determinan la respuesta
+        valor: Respuesta obtenida (None si la consulta falló; no se guarda)
+        segundos (float): Duración de la consulta a la IA
+        ttl (float, optional): Tiempo de vida en segundos (por defecto LLM_CACHE_TTL)
+    """
+    if not LLM_CACHE_HABILITADA:
+        return
+    _registrar(espacio, 'fallos', segundos)
+    if valor is not None:
+        _cache.guardar(clave_consulta(espacio, consulta),
+                       {'valor': copy.deepcopy(valor), 'segundos': round(segundos, 3)}, ttl)
+
+
+def consultar(espacio, consulta, generar, ttl=None, usar_cache=True):
+    """
+    Devuelve la respuesta guardada para la consulta o la genera y la guarda
+
+    Args:
+        espacio (str): Tipo de consulta
+        consulta: Payload o partes que determinan la respuesta (se canonicalizan para la clave)
+        generar (callable): Función sin argumentos que consulta a la IA; si devuelve
+                            None (error o respuesta inválida) el resultado no se guarda
+        ttl (float, optional): Tiempo de vida en segundos (por defecto LLM_CACHE_TTL)
+        usar_cache (bool): False para omitir la caché en esta consulta
+
+    Returns:
+        Respuesta guardada o generada (None si la generación falló)
+    """
+    if not (LLM_CACHE_HABILITADA and usar_cache):
+        _registrar(espacio, 'omitidas')
+        return generar()
+
+    valor = obtener(espacio, consulta)
+    if valor is not None:
+        return valor
+
+    inicio = time.perf_counter()
+    valor = generar()
+    registrar_respuesta(espacio, consulta, valor, time.perf_counter() - inicio, ttl)
+    return valor
+
+
+def invalidar(espacio, consulta):
+    """
+    Elimina la respuesta guardada para una consulta
+    """
+    _cache.eliminar(clave_consulta(espacio, consulta))
+
+
+def limpiar_cache_llm():
+    """
+    Elimina todas las respuestas guardadas y reinicia las métricas
+    """
+    _cache.limpiar()
+    with _lock_metricas:
+        _metricas.clear()
+
+
+def estadisticas_llm_cache():
+    """
+    Devuelve las métricas de la caché de respuestas de la IA
+
+    Returns:
+        dict: Estado, aciertos/fallos/omitidas y segundos ahorrados por espacio,
+              y estadísticas de los niveles de memoria y disco
+    """
+    with _lock_metricas:
+        por_espacio = {espacio: dict(metricas) for espacio, metricas in _metricas.items()}
+    for metricas in por_espacio.values():
+        total = metricas['aciertos'] + metricas['fallos']
+        metricas['tasa_aciertos'] = round(metricas['aciertos'] / total, 3) if total else 0.0
+        metricas['segundos_ahorrados'] = round(metricas['segundos_ahorrados'], 2)
+        metricas['segundos_consulta'] = round(metricas['segundos_consulta'], 2)
+    return {
+        'habilitada': LLM_CACHE_HABILITADA,
+        'ttl': LLM_CACHE_TTL,
+        'espacios': por_espacio,
+        'niveles': _cache.estadisticas()
+    }
@@ -0,0 +1,429 @@
+"""
+Nomenclador local de localidades argentinas.
+Resuelve nombres de ciudades a coordenadas sin salir del proceso usando
+un índice de prefijos ordenado y un índice de trigramas, ambos sobre
+texto sin acentos. Nominatim solo se consulta para nombres desconocidos:
+sus respuestas se agregan al nomenclador con el nombre canónico y la
+consulta original como alias, y los nombres que tampoco conoce se
+recuerdan durante LOCALIDADES_TTL_NEGATIVO segundos.
+"""
+import os
+import csv
+import time
+import bisect
+import threading
+import unicodedata
+import logging
+import numpy as np
+from ecosmart_advisor.app.services.cache import CacheEscalonada, CACHE_DIR
+from ecosmart_advisor.app.services import http_cliente
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Archivos de datos
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+RUTA_LOCALIDADES = os.path.join(DATA_DIR, "localidades_ar.csv")
+# Las localidades aprendidas de Nominatim se guardan en un archivo escribible,
+# compartido por todos los workers
+RUTA_APRENDIDAS = os.environ.get(
+    "LOCALIDADES_APRENDIDAS",
+    os.path.join(CACHE_DIR, "localidades_aprendidas.csv")
+)
+CAMPOS = ['nombre', 'provincia', 'latitud', 'longitud', 'poblacion', 'alias']
+
+# Similitud mínima (coeficiente de Dice sobre trigramas) para aceptar una coincidencia aproximada
+SIMILITUD_MINIMA = 0.7
+
+# Nominatim admite como máximo una petición por segundo
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+NOMINATIM_INTERVALO = 1.0
+# Segundos que se recuerda que Nominatim no conoce un nombre
+LOCALIDADES_TTL_NEGATIVO = int(os.environ.get("LOCALIDADES_TTL_NEGATIVO", "86400"))
+
+_nomenclador = None
+_lock = threading.Lock()
+_lock_nominatim = threading.Lock()
+_ultima_consulta_nominatim = 0.0
+_mtime_aprendidas = None
+
+# Nombres que Nominatim no encontró, compartidos entre workers
+_desconocidas = CacheEscalonada("localidades_desconocidas", max_entradas=1024, ttl=LOCALIDADES_TTL_NEGATIVO)
+
+
+def normalizar(texto):
+    """
+    Normaliza un texto para comparación: minúsculas, sin acentos ni
+    signos de puntuación y con los espacios colapsados.
+    """
+    texto = unicodedata.normalize('NFKD', str(texto).lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    texto = ''.join(c if c.isalnum() else ' ' for c in texto)
+    return ' '.join(texto.split())
+
+
+def trigramas(clave):
+    """
+    Devuelve el conjunto de trigramas de una clave normalizada
+    """
+    relleno = f"  {clave} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+class Nomenclador:
+    """
+    Conjunto de localidades guardado en arrays paralelos, con un índice
+    ordenado de claves (nombres y alias) para búsquedas por prefijo y un
+    índice invertido de trigramas para búsquedas aproximadas.
+    """
+
+    def __init__(self, registros):
+        """
+        Args:
+            registros (list): Lista de dicts con nombre, provincia, latitud, longitud,
+                poblacion y, opcionalmente, alias
+        """
+        self.nombres = [r['nombre'] for r in registros]
+        self.provincias = [r['provincia'] for r in registros]
+        self.latitudes = np.array([float(r['latitud']) for r in registros], dtype=np.float64)
+        self.longitudes = np.array([float(r['longitud']) for r in registros], dtype=np.float64)
+        self.poblaciones = np.array([int(r.get('poblacion') or 0) for r in registros], dtype=np.int64)
+        self.claves = [normalizar(n) for n in self.nombres]
+        self.claves_provincia = [normalizar(p) for p in self.provincias]
+
+        # Índice de prefijos: claves y alias ordenados con la posición del registro
+        entradas = list(zip(self.claves, range(len(self.claves))))
+        for i, r in enumerate(registros):
+            alias = normalizar(r.get('alias') or '')
+            if alias and alias != self.claves[i]:
+                entradas.append((alias, i))
+        entradas.sort(key=lambda entrada: entrada[0])
+        self._indice = [clave for clave, _ in entradas]
+        self._posiciones = np.array([i for _, i in entradas], dtype=np.int64)
+
+        # Índice invertido de trigramas
+        invertido = {}
+        self._n_trigramas = np.zeros(len(self.claves), dtype=np.int64)
+        for i, clave in enumerate(self.claves):
+            propios = trigramas(clave)
+            self._n_trigramas[i] = len(propios)
+            for trigrama in propios:
+                invertido.setdefault(trigrama, []).append(i)
+        self._trigramas = {t: np.array(v, dtype=np.int64) for t, v in invertido.items()}
+
+    def __len__(self):
+        return len(self.nombres)
+
+    def registro(self, i, fuente='nomenclador'):
+        return {
+            'nombre': self.nombres[i],
+            'provincia': self.provincias[i],
+            'latitud': float(self.latitudes[i]),
+            'longitud': float(self.longitudes[i]),
+            'poblacion': int(self.poblaciones[i]),
+            'fuente': fuente
+        }
+
+    def _rango(self, clave, prefijo=False):
+        inicio = bisect.bisect_left(self._indice, clave)
+        fin = bisect.bisect_right(self._indice, clave + '\uffff' if prefijo else clave)
+        return self._posiciones[inicio:fin]
+
+    def _ordenar(self, candidatos, provincia=None):
+        """
+        Ordena los candidatos priorizando la provincia pedida y luego la población
+        """
+        candidatos = np.asarray(candidatos, dtype=np.int64)
+        if provincia and len(candidatos):
+            en_provincia = np.array([self.claves_provincia[i].startswith(provincia) for i in candidatos])
+            if en_provincia.any():
+                candidatos = candidatos[en_provincia]
+        return candidatos[np.argsort(-self.poblaciones[candidatos], kind='stable')]
+
+    def similares(self, clave, umbral=SIMILITUD_MINIMA):
+        """
+        Busca claves parecidas por trigramas compartidos.
+
+        Returns:
+            tuple: (índices, similitudes) ordenados por similitud descendente
+        """
+        propios = trigramas(clave)
+        listas = [self._trigramas[t] for t in propios if t in self._trigramas]
+        if not listas:
+            return np.array([], dtype=np.int64), np.array([])
+        comunes = np.bincount(np.concatenate(listas), minlength=len(self))
+        similitud = 2 * comunes / (len(propios) + self._n_trigramas)
+        indices = np.flatnonzero(similitud >= umbral)
+        orden = np.lexsort((-self.poblaciones[indices], -similitud[indices]))
+        return indices[orden], similitud[indices][orden]
+
+    def buscar(self, nombre, provincia=None):
+        """
+        Resuelve un nombre de localidad: primero por coincidencia exacta y
+        luego por similitud de trigramas (tolera errores de tipeo).
+
+        Args:
+            nombre (str): Nombre de la localidad
+            provincia (str, optional): Provincia para desambiguar
+
+        Returns:
+            dict: Registro de la localidad o None si no se encuentra
+        """
+        clave = normalizar(nombre)
+        if not clave:
+            return None
+        provincia = normalizar(provincia) if provincia else None
+
+        exactos = self._rango(clave)
+        if len(exactos):
+            return self.registro(int(self._ordenar(exactos, provincia)[0]))
+
+        indices, similitud = self.similares(clave)
+        if len(indices):
+            # Entre los de mayor similitud, preferir la provincia indicada
+            mejores = indices[similitud >= similitud[0] - 0.05]
+            return self.registro(int(self._ordenar(mejores, provincia)[0]))
+        return None
+
+    def sugerir(self, prefijo, limite=10, provincia=None):
+        """
+        Devuelve localidades cuyo nombre empieza con el prefijo, ordenadas por
+        población. Si no hay coincidencias por prefijo usa la similitud.
+
+        Args:
+            prefijo (str): Texto ingresado por el usuario
+            limite (int): Cantidad máxima de resultados
+            provincia (str, optional): Provincia para priorizar
+
+        Returns:
+            list: Registros de localidades
+        """
+        clave = normalizar(prefijo)
+        if not clave:
+            return []
+        provincia = normalizar(provincia) if provincia else None
+
+        candidatos = self._rango(clave, prefijo=True)
+        if len(candidatos):
+            # Un registro puede coincidir por su nombre y por su alias
+            candidatos = self._ordenar(np.unique(candidatos), provincia)
+        else:
+            candidatos, _ = self.similares(clave, umbral=0.5)
+        return [self.registro(int(i)) for i in candidatos[:limite]]
+
+
+def _leer_csv(ruta):
+    if not os.path.exists(ruta):
+        return []
+    with open(ruta, encoding='utf-8', newline='') as archivo:
+        return [fila for fila in csv.DictReader(archivo) if fila.get('nombre')]
+
+
+def _construir():
+    global _mtime_aprendidas
+    registros = _leer_csv(RUTA_LOCALIDADES)
+    try:
+        registros += _leer_csv(RUTA_APRENDIDAS)
+        _mtime_aprendidas = os.path.getmtime(RUTA_APRENDIDAS) if os.path.exists(RUTA_APRENDIDAS) else None
+    except (OSError, csv.Error, ValueError) as e:
+        logger.error(f"Error al leer las localidades aprendidas: {str(e)}")
+    return Nomenclador(registros)
+
+
+def obtener_nomenclador():
+    """
+    Devuelve el nomenclador del proceso, cargándolo la primera vez
+    """
+    global _nomenclador
+    if _nomenclador is None:
+        with _lock:
+            if _nomenclador is None:
+                _nomenclador = _construir()
+                logger.info(f"Nomenclador cargado con {len(_nomenclador)} localidades")
+    return _nomenclador
+
+
+def _recargar_si_cambio():
+    """
+    Recarga el nomenclador si otro worker agregó localidades aprendidas.
+
+    Returns:
+        bool: True si se recargó
+    """
+    global _nomenclador
+    try:
+        mtime = os.path.getmtime(RUTA_APRENDIDAS)
+    except OSError:
+        return False
+    if mtime == _mtime_aprendidas:
+        return False
+    with _lock:
+        _nomenclador = _construir()
+    return True
+
+
+def _migrar_aprendidas():
+    """
+    Reescribe el archivo de aprendidas con las columnas actuales si fue
+    creado con un encabezado anterior (sin la columna alias).
+    """
+    with open(RUTA_APRENDIDAS, encoding='utf-8', newline='') as archivo:
+        lector = csv.DictReader(archivo)
+        if lector.fieldnames == CAMPOS:
+            return
+        filas = list(lector)
+    temporal = f"{RUTA_APRENDIDAS}.{os.getpid()}.tmp"
+    with open(temporal, 'w', encoding='utf-8', newline='') as archivo:
+        escritor = csv.DictWriter(archivo, fieldnames=CAMPOS, extrasaction='ignore')
+        escritor.writeheader()
+        escritor.writerows(filas)
+    os.replace(temporal, RUTA_APRENDIDAS)
+
+
+def aprender(nombre, provincia, lat, lon, poblacion=0, alias=None):
+    """
+    Agrega una localidad al archivo de aprendidas y al nomenclador del proceso.
+
+    Args:
+        nombre (str): Nombre canónico de la localidad
+        provincia (str): Provincia
+        lat (float): Latitud
+        lon (float): Longitud
+        poblacion (int, optional): Población si se conoce
+        alias (str, optional): Texto consultado, si difiere del nombre canónico
+    """
+    global _nomenclador
+    if alias and normalizar(alias) == normalizar(nombre):
+        alias = None
+    with _lock:
+        try:
+            directorio = os.path.dirname(RUTA_APRENDIDAS)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            nuevo = not os.path.exists(RUTA_APRENDIDAS)
+            if not nuevo:
+                _migrar_aprendidas()
+            with open(RUTA_APRENDIDAS, 'a', encoding='utf-8', newline='') as archivo:
+                escritor = csv.DictWriter(archivo, fieldnames=CAMPOS)
+                if nuevo:
+                    escritor.writeheader()
+                escritor.writerow({
+                    'nombre': nombre,
+                    'provincia': provincia or '',
+                    'latitud': round(float(lat), 4),
+                    'longitud': round(float(lon), 4),
+                    'poblacion': int(poblacion or 0),
+                    'alias': alias or ''
+                })
+        except (OSError, csv.Error) as e:
+            logger.error(f"No se pudo guardar la localidad aprendida '{nombre}': {str(e)}")
+        _nomenclador = _construir()
+    logger.info(f"Localidad aprendida de Nominatim: {nombre} ({provincia})"
+                + (f", alias '{alias}'" if alias else ""))
+
+
+def geocodificar_nominatim(ciudad, provincia=None, pais="Argentina"):
+    """
+    Consulta Nominatim respetando el límite de una petición por segundo.
+
+    Returns:
+        dict: Registro con el nombre canónico de Nominatim, provincia, latitud,
+              longitud y display_name, o None
+    """
+    global _ultima_consulta_nominatim
+    query = ", ".join(p for p in (ciudad, provincia, pais) if p)
+    headers = {
+        'User-Agent': 'EcoSmartAdvisor/1.0',
+        'Accept-Language': 'es'
+    }
+    params = {
+        'format': 'json',
+        'q': query,
+        'limit': 1,
+        'countrycodes': 'ar',
+        'addressdetails': 1,
+        'accept-language': 'es'
+    }
+    with _lock_nominatim:
+        espera = NOMINATIM_INTERVALO - (time.monotonic() - _ultima_consulta_nominatim)
+        if espera > 0:
+            time.sleep(espera)
+        try:
+            resp = http_cliente.get(NOMINATIM_URL, params=params, headers=headers, timeout=5)
+        finally:
+            _ultima_consulta_nominatim = time.monotonic()
+    data = resp.json()
+
+    # Nominatim devuelve una lista de resultados
+    if not data:
+        return None
+    direccion = data[0].get('address', {})
+    canonico = (data[0].get('name') or direccion.get('city') or direccion.get('town')
+                or direccion.get('village') or direccion.get('municipality') or ciudad.strip())
+    return {
+        'nombre': canonico,
+        'provincia': direccion.get('state') or provincia or '',
+        'latitud': float(data[0]['lat']),
+        'longitud': float(data[0]['lon']),
+        'poblacion': 0,
+        'display_name': data[0].get('display_name'),
+        'fuente': 'nominatim'
+    }
+
+
+def separar_consulta(texto, provincia=None):
+    """
+    Separa un texto libre como "Rosario, Santa Fe, Argentina" en ciudad y provincia.
+
+    Returns:
+        tuple: (ciudad, provincia)
+    """
+    partes = [p.strip() for p in str(texto).split(',') if p.strip()]
+    partes = [p for p in partes if normalizar(p) != 'argentina']
+    if not partes:
+        return '', provincia
+    if provincia is None and len(partes) > 1:
+        provincia = partes[1]
+    return partes[0], provincia
+
+
+def resolver_localidad(texto, provincia=None, usar_nominatim=True):
+    """
+    Resuelve un nombre de localidad a coordenadas. Usa el nomenclador local
+    y, para nombres desconocidos, Nominatim, cuyo resultado se aprende.
+
+    Args:
+        texto (str): Nombre de la localidad (puede incluir provincia separada por coma)
+        provincia (str, optional): Provincia para desambiguar
+        usar_nominatim (bool): Si es False solo se consulta el nomenclador local
+
+    Returns:
+        dict: Registro de la localidad o None si no se encuentra
+    """
+    ciudad, provincia = separar_consulta(texto, provincia)
+    if not ciudad:
+        return None
+
+    resultado = obtener_nomenclador().buscar(ciudad, provincia)
+    if resultado is None and _recargar_si_cambio():
+        resultado = obtener_nomenclador().buscar(ciudad, provincia)
+    if resultado is not None or not usar_nominatim:
+        return resultado
+
+    # No pagar otra consulta a Nominatim (1 por segundo) por un nombre que ya no encontró
+    clave_desconocida = f"{normalizar(ciudad)}|{normalizar(provincia or '')}"
+    if _desconocidas.obtener(clave_desconocida) is not None:
+        return None
+
+    try:
+        resultado = geocodificar_nominatim(ciudad, provincia)
+    except Exception as e:
+        logger.error(f"Error al consultar Nominatim para '{ciudad}': {str(e)}")
+        return None
+    if resultado is None:
+        _desconocidas.guardar(clave_desconocida, True)
+        return None
+    aprender(resultado['nombre'], resultado['provincia'], resultado['latitud'], resultado['longitud'],
+             alias=ciudad)
+    return resultado
@@ -0,0 +1,141 @@
+"""
+Motor de simulación eólica basado en la distribución de Weibull.
+
+Integra la curva de potencia de cada modelo de aerogenerador contra la
+distribución de velocidades del viento a la altura del buje. Las curvas se
+calculan una sola vez por modelo y quedan en caché, y la integración está
+vectorizada: una llamada evalúa muchos sitios (o meses) y muchos tamaños
+de aerogenerador a la vez.
+"""
+import math
+from functools import lru_cache
+import numpy as np
+
+# Modelos de aerogenerador: velocidades características en m/s
+MODELOS = {
+    'domestico': {'arranque': 2.5, 'nominal': 11.0, 'corte': 25.0},
+    'baja_velocidad': {'arranque': 2.0, 'nominal': 9.5, 'corte': 20.0},
+}
+MODELO_POR_DEFECTO = 'domestico'
+
+# Discretización de la curva de potencia (m/s)
+PASO_VELOCIDAD = 0.1
+VELOCIDAD_MAXIMA = 40.0
+
+# Perfil vertical del viento (ley potencial) y alturas típicas
+EXPONENTE_CIZALLADURA = 0.14
+ALTURA_REFERENCIA = 10.0  # m, altura de medición del viento
+ALTURA_BUJE = 15.0  # m, torre estándar para aerogeneradores domésticos
+
+# Factor de forma de Weibull cuando no hay datos (distribución de Rayleigh)
+WEIBULL_K_POR_DEFECTO = 2.0
+
+# Disponibilidad, pérdidas eléctricas y turbulencia
+PERDIDAS_EOLICAS = 0.85
+
+HORAS_ANIO = 8760
+HORAS_MES = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]) * 24
+
+_gamma = np.vectorize(math.gamma, otypes=[np.float64])
+
+
+@lru_cache(maxsize=None)
+def curva_potencia(modelo=MODELO_POR_DEFECTO):
+    """
+    Curva de potencia normalizada (potencia / potencia nominal) del modelo,
+    evaluada en el centro de cada intervalo de velocidad.
+
+    Args:
+        modelo (str): Nombre del modelo en MODELOS
+
+    Returns:
+        tuple: (bordes de los intervalos en m/s, potencia normalizada por intervalo),
+               arrays de solo lectura
+    """
+    datos = MODELOS[modelo]
+    arranque, nominal, corte = datos['arranque'], datos['nominal'], datos['corte']
+    bordes = np.arange(0.0, VELOCIDAD_MAXIMA + PASO_VELOCIDAD, PASO_VELOCIDAD)
+    centros = (bordes[:-1] + bordes[1:]) / 2
+
+    # Tramo cúbico entre arranque y nominal, potencia nominal hasta el corte
+    potencia = np.where(
+        (centros >= arranque) & (centros < nominal),
+        (centros ** 3 - arranque ** 3) / (nominal ** 3 - arranque ** 3),
+        np.where((centros >= nominal) & (centros <= corte), 1.0, 0.0)
+    )
+    bordes.setflags(write=False)
+    potencia.setflags(write=False)
+    return bordes, potencia
+
+
+def ajustar_altura(velocidad, altura_buje=ALTURA_BUJE, altura_referencia=ALTURA_REFERENCIA,
+                   exponente=EXPONENTE_CIZALLADURA):
+    """
+    Extrapola la velocidad del viento a la altura del buje con la ley potencial
+    """
+    return np.asarray(velocidad, dtype=np.float64) * (altura_buje / altura_referencia) ** exponente
+
+
+def escala_weibull(velocidad_media, k=WEIBULL_K_POR_DEFECTO):
+    """
+    Parámetro de escala c de Weibull a partir de la velocidad media: c = v / Γ(1 + 1/k)
+    """
+    k = np.asarray(k, dtype=np.float64)
+    return np.asarray(velocidad_media, dtype=np.float64) / _gamma(1 + 1 / k)
+
+
+def factor_capacidad(velocidad_media, k=WEIBULL_K_POR_DEFECTO, altura_buje=ALTURA_BUJE,
+                     modelo=MODELO_POR_DEFECTO, perdidas=PERDIDAS_EOLICAS):
+    """
+    Factor de capacidad esperado integrando la curva de potencia contra la
+    distribución de Weibull. Admite arrays de cualquier forma (sitios, meses).
+
+    Args:
+        velocidad_media (float o array): Velocidad media a la altura de referencia (m/s)
+        k (float o array): Factor de forma de Weibull
+        altura_buje (float): Altura del buje en metros
+        modelo (str): Modelo de aerogenerador
+        perdidas (float): Factor de disponibilidad y pérdidas
+
+    Returns:
+        numpy.ndarray: Factor de capacidad (0-1) con la forma de la entrada
+    """
+    bordes, potencia = curva_potencia(modelo)
+    velocidad_buje = ajustar_altura(velocidad_media, altura_buje)
+    k = np.broadcast_to(np.asarray(k, dtype=np.float64), velocidad_buje.shape)
+    c = np.maximum(escala_weibull(velocidad_buje, k), 1e-6)
+
+    # Probabilidad de cada intervalo de velocidad: F(v2) - F(v1), con F(v) = 1 - exp(-(v/c)^k)
+    supervivencia = np.exp(-(bordes / c[..., None]) ** k[..., None])
+    probabilidad = supervivencia[..., :-1] - supervivencia[..., 1:]
+    return probabilidad @ potencia * perdidas
+
+
+def simular_eolico(velocidad_media, capacidades_kw, k=WEIBULL_K_POR_DEFECTO, altura_buje=ALTURA_BUJE,
+                   modelo=MODELO_POR_DEFECTO, mensual=False):
+    """
+    Simula la generación de uno o varios aerogeneradores en uno o varios sitios.
+
+    Args:
+        velocidad_media (float o array): Velocidad media por sitio (m/s)
+        capacidades_kw (float o array): Potencias nominales a evaluar (kW)
+        k (float o array): Factor de forma de Weibull (misma forma que la velocidad)
+        altura_buje (float): Altura del buje en metros
+        modelo (str): Modelo de aerogenerador
+        mensual (bool): Si es True el último eje de la velocidad son los 12 meses
+
+    Returns:
+        dict: 'factor_capacidad' con la forma de la velocidad y 'generacion' (kWh en el
+              período) con un eje final adicional para las capacidades
+    """
+    velocidad = np.asarray(velocidad_media, dtype=np.float64)
+    capacidades = np.atleast_1d(np.asarray(capacidades_kw, dtype=np.float64))
+    fc = factor_capacidad(velocidad, k, altura_buje, modelo)
+
+    horas = HORAS_MES if mensual else HORAS_ANIO
+
+    return {
+        'factor_capacidad': fc,
+        'generacion': (fc * horas)[..., None] * capacidades,
+        'velocidad_buje': ajustar_altura(velocidad, altura_buje)
+    }
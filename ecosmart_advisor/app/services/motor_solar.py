@@ -0,0 +1,227 @@
+"""
+Motor de simulación fotovoltaica horaria (8760 horas) vectorizado con NumPy.
+
+A partir de una climatología mensual (radiación global diaria y temperatura
+media) reconstruye un año típico hora a hora:
+
+1. Geometría solar para la latitud del sitio (declinación, ángulo horario,
+   ángulo cenital y azimut).
+2. Reparto de la radiación diaria en horas (Collares-Pereira y Rabl para la
+   global, Liu y Jordan para la difusa) y fracción difusa diaria de Erbs.
+3. Transposición al plano de los paneles (modelo isotrópico de Liu y Jordan)
+   según inclinación y orientación.
+4. Temperatura de celda por el método NOCT y pérdida por temperatura.
+5. Pérdidas del sistema, eficiencia del inversor y recorte (clipping) por la
+   potencia nominal del inversor.
+
+Como el inversor se dimensiona en proporción a la potencia de los paneles,
+el perfil por kW instalado es el mismo para todas las capacidades y una
+sola llamada puede dimensionar muchos sistemas candidatos.
+"""
+import math
+from functools import lru_cache
+import numpy as np
+
+# Calendario de un año típico
+DIAS_MES = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+MES_DEL_DIA = np.repeat(np.arange(12), DIAS_MES)  # (365,)
+HORAS_ANIO = 8760
+
+# Constante solar (W/m²)
+CONSTANTE_SOLAR = 1367.0
+
+# Parámetros del módulo y del sistema
+NOCT = 45.0  # °C, temperatura nominal de operación de la celda
+COEF_TEMPERATURA = -0.004  # 1/°C, pérdida de potencia por grado sobre 25 °C
+PERDIDAS_SISTEMA = 0.90  # Cableado, suciedad, desajuste entre módulos
+EFICIENCIA_INVERSOR = 0.96
+RELACION_DC_AC = 1.1  # Potencia de paneles / potencia nominal del inversor
+ALBEDO = 0.2
+
+# Amplitud térmica diaria típica (°C) y hora de la máxima
+AMPLITUD_TERMICA_DIARIA = 5.0
+HORA_TEMPERATURA_MAXIMA = 15.0
+
+# Altura solar mínima para el cociente de radiación directa (evita divergencias al amanecer)
+COS_CENIT_MINIMO = math.cos(math.radians(85))
+
+
+def inclinacion_por_defecto(latitud):
+    """
+    Inclinación fija recomendada: igual a la latitud, entre 10° y 60°
+    """
+    return float(min(60.0, max(10.0, round(abs(latitud)))))
+
+
+def estimar_radiacion_mensual(radiacion_media, latitud):
+    """
+    Estima 12 valores mensuales de radiación a partir de la media anual
+    cuando no hay climatología mensual. La amplitud estacional crece con la
+    latitud y el máximo cae en el solsticio de verano del hemisferio.
+
+    Args:
+        radiacion_media (float): Radiación media anual (kWh/m²/día)
+        latitud (float): Latitud del sitio
+
+    Returns:
+        numpy.ndarray: Radiación mensual (kWh/m²/día)
+    """
+    meses = np.arange(1, 13)
+    mes_pico = 12.2 if latitud < 0 else 6.2
+    amplitud = radiacion_media * min(0.6, abs(latitud) / 75)
+    return np.maximum(radiacion_media + amplitud * np.cos(2 * np.pi * (meses - mes_pico) / 12), 0.1)
+
+
+def estimar_temperatura_mensual(temperatura_media, latitud):
+    """
+    Estima 12 temperaturas medias mensuales a partir de la media anual
+    """
+    meses = np.arange(1, 13)
+    mes_pico = 1.0 if latitud < 0 else 7.0
+    amplitud = min(10.0, abs(latitud) / 5)
+    return temperatura_media + amplitud * np.cos(2 * np.pi * (meses - mes_pico) / 12)
+
+
+@lru_cache(maxsize=256)
+def _perfil_por_kw(latitud, radiacion, temperatura, inclinacion, azimut, albedo, relacion_dc_ac):
+    """
+    Calcula el perfil horario de un sistema de 1 kW. Los argumentos son
+    escalares y tuplas para poder memorizar el resultado.
+
+    Returns:
+        tuple: (ac, plano, dc_sin_temperatura, dc) arrays de solo lectura (365, 24),
+               con potencia en kW por kW instalado e irradiancia en kW/m²
+    """
+    phi = np.radians(latitud)
+    beta = np.radians(inclinacion)
+    # Azimut de la superficie medido desde el sur (convención de Duffie y Beckman):
+    # en el hemisferio sur los paneles miran al norte
+    gamma = np.radians(azimut + (180.0 if latitud < 0 else 0.0))
+
+    dia = np.arange(1, 366, dtype=np.float64)[:, None]  # (365, 1)
+    hora = np.arange(24, dtype=np.float64)[None, :] + 0.5  # Hora solar al centro del intervalo
+    mes = MES_DEL_DIA[:, None]
+    H = np.asarray(radiacion, dtype=np.float64)[mes]  # kWh/m²/día
+    T_media = np.asarray(temperatura, dtype=np.float64)[mes]
+
+    # Geometría solar
+    delta = np.radians(23.45) * np.sin(2 * np.pi * (284 + dia) / 365)
+    omega = np.radians(15.0 * (hora - 12.0))
+    cos_ws = np.clip(-np.tan(phi) * np.tan(delta), -1.0, 1.0)
+    ws = np.arccos(cos_ws)
+    cos_cenit = np.sin(phi) * np.sin(delta) + np.cos(phi) * np.cos(delta) * np.cos(omega)
+    sin_cenit = np.sqrt(np.clip(1 - cos_cenit ** 2, 0.0, 1.0))
+
+    # Radiación extraterrestre diaria en plano horizontal (kWh/m²/día)
+    H0 = (24 / np.pi) * CONSTANTE_SOLAR / 1000 * (1 + 0.033 * np.cos(2 * np.pi * dia / 365)) * (
+        np.cos(phi) * np.cos(delta) * np.sin(ws) + ws * np.sin(phi) * np.sin(delta)
+    )
+    kt = np.clip(H / np.maximum(H0, 1e-6), 0.0, 0.85)
+
+    # Fracción difusa diaria (Erbs et al.)
+    ws_grados = np.degrees(ws)
+    fraccion_difusa = np.where(
+        ws_grados <= 81.4,
+        1.391 - 3.560 * kt + 4.189 * kt ** 2 - 2.137 * kt ** 3,
+        1.311 - 3.022 * kt + 3.427 * kt ** 2 - 1.821 * kt ** 3
+    )
+    fraccion_difusa = np.where(kt >= 0.75, np.where(ws_grados <= 81.4, 0.175, 0.143), fraccion_difusa)
+    Hd = H * np.clip(fraccion_difusa, 0.0, 1.0)
+
+    # Reparto horario: Collares-Pereira y Rabl (global) y Liu y Jordan (difusa)
+    denominador = np.sin(ws) - ws * cos_ws
+    a = 0.409 + 0.5016 * np.sin(ws - np.radians(60))
+    b = 0.6609 - 0.4767 * np.sin(ws - np.radians(60))
+    forma = np.maximum(np.cos(omega) - cos_ws, 0.0)
+    rd = (np.pi / 24) * forma / np.maximum(denominador, 1e-6)
+    rt = rd * (a + b * np.cos(omega))
+    # Normalizar para que la suma horaria reproduzca exactamente la radiación diaria
+    rt /= np.maximum(rt.sum(axis=1, keepdims=True), 1e-9)
+    rd /= np.maximum(rd.sum(axis=1, keepdims=True), 1e-9)
+    global_h = rt * H  # kWh/m² en la hora = kW/m² medio
+    difusa_h = np.minimum(rd * Hd, global_h)
+    directa_h = global_h - difusa_h
+
+    # Azimut solar desde el sur, positivo hacia el oeste
+    cos_azimut = (cos_cenit * np.sin(phi) - np.sin(delta)) / np.maximum(sin_cenit * np.cos(phi), 1e-9)
+    azimut_solar = np.sign(omega) * np.arccos(np.clip(cos_azimut, -1.0, 1.0))
+
+    # Transposición al plano inclinado (isotrópica)
+    cos_incidencia = cos_cenit * np.cos(beta) + sin_cenit * np.sin(beta) * np.cos(azimut_solar - gamma)
+    rb = np.where(cos_cenit > 0, np.maximum(cos_incidencia, 0.0) / np.maximum(cos_cenit, COS_CENIT_MINIMO), 0.0)
+    plano = (directa_h * rb
+             + difusa_h * (1 + np.cos(beta)) / 2
+             + global_h * albedo * (1 - np.cos(beta)) / 2)
+
+    # Temperatura ambiente horaria y temperatura de celda (NOCT)
+    T_amb = T_media + AMPLITUD_TERMICA_DIARIA * np.cos(2 * np.pi * (hora - HORA_TEMPERATURA_MAXIMA) / 24)
+    T_celda = T_amb + (NOCT - 20.0) / 0.8 * plano  # plano en kW/m²
+    factor_temperatura = 1 + COEF_TEMPERATURA * (T_celda - 25.0)
+
+    dc_sin_temperatura = plano * PERDIDAS_SISTEMA
+    dc = dc_sin_temperatura * factor_temperatura
+    ac = np.minimum(dc * EFICIENCIA_INVERSOR, 1.0 / relacion_dc_ac)
+
+    resultado = (ac, plano, dc_sin_temperatura, dc)
+    for array in resultado:
+        array.setflags(write=False)
+    return resultado
+
+
+def simular_fv(capacidad_kw, latitud, radiacion_mensual, temperatura_mensual,
+               inclinacion=None, azimut=0.0, albedo=ALBEDO, relacion_dc_ac=RELACION_DC_AC,
+               incluir_horario=False):
+    """
+    Simula un año hora a hora de uno o varios sistemas fotovoltaicos.
+
+    Args:
+        capacidad_kw (float o array): Potencia de paneles en kWp (escalar o array de candidatos)
+        latitud (float): Latitud del sitio
+        radiacion_mensual (array): Radiación global horizontal media por mes (kWh/m²/día)
+        temperatura_mensual (array): Temperatura media por mes (°C)
+        inclinacion (float, optional): Inclinación de los paneles en grados (por defecto, la latitud)
+        azimut (float): Desvío respecto de la orientación al ecuador en grados (positivo al oeste)
+        albedo (float): Reflectividad del suelo
+        relacion_dc_ac (float): Potencia de paneles / potencia nominal del inversor
+        incluir_horario (bool): Si es True incluye el perfil de 8760 horas
+
+    Returns:
+        dict: Arrays con la forma de `capacidad_kw` para 'anual' y 'factor_capacidad',
+              y con un eje final de 12 meses para 'mensual'
+    """
+    capacidad = np.asarray(capacidad_kw, dtype=np.float64)
+    if inclinacion is None:
+        inclinacion = inclinacion_por_defecto(latitud)
+
+    ac, plano, dc_sin_temperatura, dc = _perfil_por_kw(
+        round(float(latitud), 2),
+        tuple(round(float(v), 3) for v in radiacion_mensual),
+        tuple(round(float(v), 2) for v in temperatura_mensual),
+        round(float(inclinacion), 1),
+        round(float(azimut), 1),
+        float(albedo),
+        float(relacion_dc_ac)
+    )
+
+    # Agregados por kW instalado
+    diario = ac.sum(axis=1)  # kWh/kW por día
+    mensual_kw = np.bincount(MES_DEL_DIA, weights=diario, minlength=12)
+    anual_kw = diario.sum()
+    plano_mensual = np.bincount(MES_DEL_DIA, weights=plano.sum(axis=1), minlength=12) / DIAS_MES
+    dc_inversor = dc * EFICIENCIA_INVERSOR
+
+    resultado = {
+        'mensual': capacidad[..., None] * mensual_kw,  # kWh por mes
+        'anual': capacidad * anual_kw,  # kWh por año
+        'rendimiento_especifico': anual_kw,  # kWh/kWp por año
+        'factor_capacidad': anual_kw / HORAS_ANIO * 100,  # %
+        'irradiacion_plano_mensual': plano_mensual,  # kWh/m²/día sobre los paneles
+        'relacion_rendimiento': anual_kw / max(plano.sum(), 1e-9) * 100,  # Performance ratio (%)
+        'perdida_temperatura': (1 - dc.sum() / max(dc_sin_temperatura.sum(), 1e-9)) * 100,  # %
+        'perdida_recorte': (1 - anual_kw / max(dc_inversor.sum(), 1e-9)) * 100,  # %
+        'potencia_maxima': capacidad * ac.max(),  # kW
+        'inclinacion': inclinacion
+    }
+    if incluir_horario:
+        resultado['horario'] = capacidad[..., None] * ac.reshape(-1)  # kW por hora
+    return resultado
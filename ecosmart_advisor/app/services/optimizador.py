@@ -0,0 +1,530 @@
+"""
+Optimizador de sistemas híbridos (solar, eólica, termotanque solar y batería).
+
+Busca la combinación de tamaños que maximiza la cobertura, el VAN o el CO2
+evitado según el objetivo del usuario, respetando la superficie disponible y
+el presupuesto. La búsqueda trabaja sobre una tabla de rendimiento
+precalculada:
+
+1. Perfiles horarios por kW de la generación solar y eólica, perfil de
+   consumo del hogar y aporte anual de cada tamaño de termotanque.
+2. Todas las combinaciones sin batería que entran en la superficie y el
+   presupuesto se evalúan de una vez, en bloques vectorizados de 8760 horas.
+3. Las combinaciones con batería se ordenan por una cota superior del
+   objetivo (una batería no puede trasladar más energía que la exportada ni
+   más de un ciclo por día) y se despachan por bloques hasta que la cota del
+   siguiente bloque ya no supera a las mejores encontradas (ramificación y
+   poda), sin recorrer combinaciones en Python.
+"""
+import time
+import logging
+import numpy as np
+from ecosmart_advisor.app.services import simulador
+from ecosmart_advisor.app.services import baterias
+from ecosmart_advisor.app.services.ciclo_vida import evaluar_ciclo_vida
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Tamaños candidatos por tecnología
+PASO_SOLAR_KW = 0.5
+SOLAR_MAXIMO_KW = 20.0
+TAMANOS_EOLICA_KW = (1.0, 2.0, 3.0, 5.0, 10.0)
+TAMANOS_TERMOTANQUE_LITROS = (100.0, 150.0, 200.0, 300.0)
+TAMANOS_BATERIA_KWH = (5.0, 10.0, 15.0)
+
+# Ningún sistema se dimensiona para generar más que esta fracción del consumo anual
+SOBREDIMENSIONAMIENTO_MAXIMO = 1.5
+
+# Costos y supuestos complementarios a los del simulador
+COSTO_BATERIA_POR_KWH = 600  # USD/kWh instalado
+M2_POR_LITRO_TERMOTANQUE = 0.013  # Unos 2 m² de colector por cada 150 litros
+FRACCION_AGUA_CALIENTE = 0.25  # Parte del consumo que puede reemplazar el termotanque
+FRACCION_PRECIO_EXPORTACION = 0.5  # Valor de la energía inyectada respecto de la tarifa
+
+# Objetivo del usuario -> métrica a maximizar
+OBJETIVOS = {
+    'cobertura': 'cobertura',
+    'equilibrado': 'cobertura',
+    'ahorro': 'van_usd',
+    'ambiental': 'co2_evitado',
+}
+
+TECNOLOGIAS = ('solar', 'eolica', 'termotanque_solar', 'bateria')
+NOMBRES = {
+    'solar': 'paneles solares',
+    'eolica': 'aerogenerador',
+    'termotanque_solar': 'termotanque solar',
+    'bateria': 'batería',
+}
+
+BLOQUE = 64  # Combinaciones por bloque vectorizado
+# En el frente de Pareto cada bloque despachado agranda el frente con el que se
+# poda el siguiente: bloques más chicos despachan menos combinaciones
+BLOQUE_PARETO = 16
+
+# Criterios del frente de Pareto: (métrica, se maximiza, decimales con que se comparan)
+CRITERIOS_PARETO = (
+    ('costo', False, 0),
+    ('cobertura', True, 1),
+    ('retorno', False, 1),
+    ('co2_evitado', True, 0),
+)
+
+
+def _tamanos(candidatos, generacion_por_unidad, consumo_anual):
+    """
+    Tamaños hasta el primero que supera el sobredimensionamiento máximo
+    """
+    candidatos = np.asarray(candidatos, dtype=np.float64)
+    limite = SOBREDIMENSIONAMIENTO_MAXIMO * consumo_anual
+    excedidos = np.flatnonzero(candidatos * generacion_por_unidad > limite)
+    if excedidos.size:
+        candidatos = candidatos[:excedidos[0] + 1]
+    return np.concatenate([[0.0], candidatos])
+
+
+def tabla_rendimiento(clima, consumo_mensual, tipo_vivienda='casa_mediana', equipos=(),
+                      tecnologias=TECNOLOGIAS, superficie_disponible=None):
+    """
+    Precalcula los perfiles y los tamaños candidatos de cada tecnología
+
+    Returns:
+        dict: 'consumo' (8760), 'solar' y 'eolica' (8760 por kW), 'tamanos'
+              por tecnología y 'termotanque' (kWh anuales por tamaño)
+    """
+    consumo = baterias.perfil_consumo(tipo_vivienda, equipos, consumo_mensual, clima.get('latitud'))
+    consumo_anual = consumo.sum()
+    perfil_solar = baterias.perfil_generacion('solar', 1.0, clima)
+    perfil_eolico = baterias.perfil_generacion('eolica', 1.0, clima)
+
+    solar_maximo = SOLAR_MAXIMO_KW
+    if superficie_disponible is not None:
+        solar_maximo = min(solar_maximo, superficie_disponible * simulador.POTENCIA_SOLAR_POR_M2)
+    tamanos = {tecnologia: np.zeros(1) for tecnologia in TECNOLOGIAS}
+    if 'solar' in tecnologias:
+        candidatos = np.arange(PASO_SOLAR_KW, solar_maximo + 1e-9, PASO_SOLAR_KW)
+        tamanos['solar'] = _tamanos(candidatos, perfil_solar.sum(), consumo_anual)
+    if 'eolica' in tecnologias:
+        tamanos['eolica'] = _tamanos(TAMANOS_EOLICA_KW, perfil_eolico.sum(), consumo_anual)
+    if 'termotanque_solar' in tecnologias:
+        tamanos['termotanque_solar'] = np.concatenate([[0.0], TAMANOS_TERMOTANQUE_LITROS])
+    if 'bateria' in tecnologias:
+        tamanos['bateria'] = np.concatenate([[0.0], TAMANOS_BATERIA_KWH])
+
+    # Aporte del termotanque, limitado a la parte del consumo destinada a agua caliente
+    aporte = simulador.calcular_termotanque(tamanos['termotanque_solar'], clima.get('radiacion_solar', 4.5),
+                                            clima.get('temperatura_promedio', 18))['energia_aportada_diaria'] * 365
+    termotanque = np.minimum(aporte, FRACCION_AGUA_CALIENTE * consumo_anual)
+
+    return {
+        'consumo': consumo,
+        'solar': perfil_solar,
+        'eolica': perfil_eolico,
+        'tamanos': tamanos,
+        'termotanque': termotanque
+    }
+
+
+def _costo(solar, eolica, litros, bateria):
+    return (solar * simulador.COSTO_SOLAR_POR_KW
+            + eolica * simulador.COSTO_EOLICO_POR_KW
+            + np.where(litros > 0, simulador.COSTO_TERMOTANQUE_BASE + litros * simulador.COSTO_TERMOTANQUE_POR_LITRO, 0)
+            + bateria * COSTO_BATERIA_POR_KWH)
+
+
+def _metricas(consumo_anual, importacion, exportacion, costo):
+    """
+    Cobertura, valor anual, retorno simple, VAN y CO2 evitado a partir del
+    intercambio con la red
+    """
+    cubierto = consumo_anual - importacion
+    ahorro_anual = (cubierto + exportacion * FRACCION_PRECIO_EXPORTACION) * simulador.PRECIO_KWH
+    van = evaluar_ciclo_vida(costo, ahorro_anual / simulador.PRECIO_KWH, 'solar',
+                             precio_kwh=simulador.PRECIO_KWH)['van']
+    with np.errstate(divide='ignore'):
+        retorno = np.where(ahorro_anual > 0, costo / np.maximum(ahorro_anual, 1e-12), np.inf)
+    return {
+        'cobertura': cubierto / consumo_anual * 100,
+        'ahorro_anual_usd': ahorro_anual,
+        'retorno': retorno,
+        'van_usd': van,
+        'co2_evitado': (cubierto + exportacion) * simulador.FACTOR_CO2_KWH
+    }
+
+
+def _intercambio_sin_bateria(tabla, solar, eolica, factor_consumo):
+    """
+    Importación y exportación anual de cada combinación, por bloques
+    """
+    importacion = np.empty(len(solar))
+    exportacion = np.empty(len(solar))
+    for inicio in range(0, len(solar), BLOQUE * 4):
+        tramo = slice(inicio, inicio + BLOQUE * 4)
+        neto = (solar[tramo, None] * tabla['solar'] + eolica[tramo, None] * tabla['eolica']
+                - factor_consumo[tramo, None] * tabla['consumo'])
+        exportacion[tramo] = np.maximum(neto, 0).sum(axis=1)
+        importacion[tramo] = np.maximum(-neto, 0).sum(axis=1)
+    return importacion, exportacion
+
+
+def _evaluar_sin_bateria(tabla, superficie_disponible=None, presupuesto=None):
+    """
+    Evalúa todas las combinaciones sin batería que entran en la superficie y el presupuesto
+
+    Returns:
+        tuple: (dict de arrays por combinación, factor de consumo eléctrico de cada una)
+    """
+    tamanos = tabla['tamanos']
+    consumo_anual = tabla['consumo'].sum()
+    i_solar, i_eolica, i_termo = (indice.ravel() for indice in np.meshgrid(
+        np.arange(len(tamanos['solar'])), np.arange(len(tamanos['eolica'])),
+        np.arange(len(tamanos['termotanque_solar'])), indexing='ij'))
+    solar = tamanos['solar'][i_solar]
+    eolica = tamanos['eolica'][i_eolica]
+    litros = tamanos['termotanque_solar'][i_termo]
+    superficie = solar / simulador.POTENCIA_SOLAR_POR_M2 + litros * M2_POR_LITRO_TERMOTANQUE
+    costo = _costo(solar, eolica, litros, 0.0)
+
+    factible = costo > 0
+    if superficie_disponible is not None:
+        factible &= superficie <= superficie_disponible + 1e-9
+    if presupuesto:
+        factible &= costo <= presupuesto
+    solar, eolica, litros, i_termo, superficie, costo = (
+        x[factible] for x in (solar, eolica, litros, i_termo, superficie, costo))
+
+    # El termotanque reemplaza parte del consumo eléctrico
+    factor_consumo = 1 - tabla['termotanque'][i_termo] / consumo_anual
+    importacion, exportacion = _intercambio_sin_bateria(tabla, solar, eolica, factor_consumo)
+    evaluadas = {
+        'solar': solar,
+        'eolica': eolica,
+        'termotanque_solar': litros,
+        'bateria': np.zeros_like(solar),
+        'superficie': superficie,
+        'costo': costo,
+        'importacion': importacion,
+        'exportacion': exportacion,
+        **_metricas(consumo_anual, importacion, exportacion, costo)
+    }
+    return evaluadas, factor_consumo
+
+
+def _candidatas_con_bateria(tabla, sin_bateria, presupuesto=None):
+    """
+    Combinaciones con batería y una cota optimista de cada métrica
+
+    Una batería no puede trasladar más energía que la exportada ni más de un
+    ciclo útil por día. Además, cada kWh que entrega dejó de exportarse
+    1 / EFICIENCIA_IDA_VUELTA kWh, de modo que las métricas son lineales en
+    la energía trasladada y su mejor valor posible está en uno de los dos
+    extremos: sin trasladar nada o trasladando el máximo.
+
+    Returns:
+        dict: 'indices' (fila sin batería), 'bateria', 'costo' y 'cotas' por métrica,
+              o None si la batería no está entre las tecnologías
+    """
+    consumo_anual = tabla['consumo'].sum()
+    importacion, exportacion = sin_bateria['importacion'], sin_bateria['exportacion']
+    eficiencia_descarga = np.sqrt(baterias.EFICIENCIA_IDA_VUELTA)
+    candidatas = []
+    for capacidad in tabla['tamanos']['bateria'][1:]:
+        costo_b = sin_bateria['costo'] + capacidad * COSTO_BATERIA_POR_KWH
+        posibles = np.flatnonzero((exportacion > 0) & ((costo_b <= presupuesto) if presupuesto else True))
+        util = capacidad * (1 - baterias.SOC_MINIMO)
+        trasladable = np.minimum(exportacion[posibles] * baterias.EFICIENCIA_IDA_VUELTA,
+                                 365 * util * eficiencia_descarga)
+        importacion_minima = np.maximum(importacion[posibles] - trasladable, 0)
+        sin_traslado = _metricas(consumo_anual, importacion[posibles], exportacion[posibles], costo_b[posibles])
+        con_traslado = _metricas(consumo_anual, importacion_minima,
+                                 exportacion[posibles] - trasladable / baterias.EFICIENCIA_IDA_VUELTA,
+                                 costo_b[posibles])
+        cotas = {clave: (np.minimum if clave == 'retorno' else np.maximum)(sin_traslado[clave], con_traslado[clave])
+                 for clave in sin_traslado}
+        candidatas.append((posibles, np.full(len(posibles), capacidad), costo_b[posibles], cotas))
+
+    if not candidatas:
+        return None
+    return {
+        'indices': np.concatenate([c[0] for c in candidatas]),
+        'bateria': np.concatenate([c[1] for c in candidatas]),
+        'costo': np.concatenate([c[2] for c in candidatas]),
+        'cotas': {clave: np.concatenate([c[3][clave] for c in candidatas]) for clave in candidatas[0][3]}
+    }
+
+
+def _evaluar_con_bateria(tabla, sin_bateria, factor_consumo, indices, capacidad, costo):
+    """
+    Despacha la batería de las combinaciones indicadas y calcula sus métricas
+    """
+    consumo_anual = tabla['consumo'].sum()
+    generacion = (sin_bateria['solar'][indices, None] * tabla['solar']
+                  + sin_bateria['eolica'][indices, None] * tabla['eolica'])
+    demanda = factor_consumo[indices, None] * tabla['consumo']
+    despacho = baterias.simular_bateria(generacion, demanda, capacidad)
+    return {
+        'solar': sin_bateria['solar'][indices],
+        'eolica': sin_bateria['eolica'][indices],
+        'termotanque_solar': sin_bateria['termotanque_solar'][indices],
+        'bateria': capacidad,
+        'superficie': sin_bateria['superficie'][indices],
+        'costo': costo,
+        'importacion': despacho['importacion_red'],
+        'exportacion': despacho['exportacion_red'],
+        **_metricas(consumo_anual, despacho['importacion_red'], despacho['exportacion_red'], costo)
+    }
+
+
+def _combinacion(evaluadas, i):
+    """
+    Fila i de las combinaciones evaluadas como dict serializable
+    """
+    tamanos = {tipo: float(evaluadas[tipo][i]) for tipo in TECNOLOGIAS}
+    return {
+        'tipos': [tipo for tipo in TECNOLOGIAS if tamanos[tipo] > 0],
+        'tamanos': {
+            'solar_kw': tamanos['solar'],
+            'eolica_kw': tamanos['eolica'],
+            'termotanque_litros': tamanos['termotanque_solar'],
+            'bateria_kwh': tamanos['bateria']
+        },
+        'cobertura': round(float(evaluadas['cobertura'][i]), 1),
+        'costo_total': round(float(evaluadas['costo'][i]), 0),
+        'ahorro_anual_usd': round(float(evaluadas['ahorro_anual_usd'][i]), 2),
+        'retorno_inversion_anos': (round(float(evaluadas['retorno'][i]), 1)
+                                   if np.isfinite(evaluadas['retorno'][i]) else None),
+        'van_usd': round(float(evaluadas['van_usd'][i]), 2),
+        'co2_evitado': round(float(evaluadas['co2_evitado'][i]), 1),
+        'superficie_m2': round(float(evaluadas['superficie'][i]), 1),
+        'importacion_red_kwh': round(float(evaluadas['importacion'][i]), 1),
+        'exportacion_red_kwh': round(float(evaluadas['exportacion'][i]), 1),
+        'detalle': describir_combinacion(tamanos)
+    }
+
+
+def _ranking(valores, costo):
+    """
+    Orden de mejor a peor: mayor objetivo (redondeado) y, a igualdad, menor costo
+    """
+    return np.lexsort((costo, -np.round(valores, 1)))
+
+
+def optimizar_sistema_hibrido(clima, consumo_mensual, superficie_disponible=None, presupuesto=None,
+                              objetivo='cobertura', tecnologias=TECNOLOGIAS, tipo_vivienda='casa_mediana',
+                              equipos=(), max_resultados=3):
+    """
+    Busca las mejores combinaciones de tamaños de solar, eólica, termotanque y batería
+
+    Args:
+        clima (dict): Datos climáticos del sitio
+        consumo_mensual (float): Consumo medio mensual en kWh
+        superficie_disponible (float, optional): m² disponibles para paneles y colectores
+        presupuesto (float, optional): Inversión máxima en USD
+        objetivo (str): 'cobertura', 'equilibrado', 'ahorro' o 'ambiental'
+        tecnologias (iterable): Tecnologías permitidas
+        tipo_vivienda (str): Tipo de vivienda para el perfil de consumo
+        equipos (list): Equipos eléctricos del hogar
+        max_resultados (int): Cantidad de combinaciones a devolver
+
+    Returns:
+        dict: 'combinaciones' ordenadas de mejor a peor, métrica optimizada y
+              estadísticas de la búsqueda
+    """
+    inicio = time.perf_counter()
+    metrica = OBJETIVOS.get(objetivo, 'cobertura')
+    tabla = tabla_rendimiento(clima, consumo_mensual, tipo_vivienda, equipos, tecnologias, superficie_disponible)
+    evaluadas, factor_consumo = _evaluar_sin_bateria(tabla, superficie_disponible, presupuesto)
+    consumo_anual = tabla['consumo'].sum()
+    cantidad_evaluadas, podadas = len(factor_consumo), 0
+
+    # Combinaciones con batería: cota superior del objetivo para cada una
+    candidatas = _candidatas_con_bateria(tabla, evaluadas, presupuesto)
+    if candidatas:
+        posibles, capacidades, costos_b = candidatas['indices'], candidatas['bateria'], candidatas['costo']
+        cotas = candidatas['cotas'][metrica]
+        orden = _ranking(cotas, costos_b)
+        posibles, capacidades, costos_b, cotas = posibles[orden], capacidades[orden], costos_b[orden], cotas[orden]
+        sin_bateria = evaluadas
+
+        for inicio_bloque in range(0, len(posibles), BLOQUE):
+            # Umbral: la peor de las mejores combinaciones encontradas hasta ahora
+            mejores = _ranking(evaluadas[metrica], evaluadas['costo'])[:max_resultados]
+            umbral = np.round(evaluadas[metrica][mejores[-1]], 1) if len(mejores) >= max_resultados else -np.inf
+            bloque = slice(inicio_bloque, inicio_bloque + BLOQUE)
+            prometedoras = np.round(cotas[bloque], 1) > umbral
+            if not prometedoras.any():
+                # Las cotas están ordenadas: ninguna combinación restante puede mejorar
+                podadas += len(posibles) - inicio_bloque
+                break
+            podadas += int((~prometedoras).sum())
+            nuevas = _evaluar_con_bateria(tabla, sin_bateria, factor_consumo, posibles[bloque][prometedoras],
+                                          capacidades[bloque][prometedoras], costos_b[bloque][prometedoras])
+            cantidad_evaluadas += int(prometedoras.sum())
+            evaluadas = {clave: np.concatenate([evaluadas[clave], nuevas[clave]]) for clave in evaluadas}
+
+    combinaciones = [_combinacion(evaluadas, i)
+                     for i in _ranking(evaluadas[metrica], evaluadas['costo'])[:max_resultados]]
+
+    tiempo_ms = (time.perf_counter() - inicio) * 1000
+    logger.info(f"Optimización híbrida ({metrica}): {cantidad_evaluadas} combinaciones evaluadas, "
+                f"{podadas} podadas en {tiempo_ms:.0f} ms")
+    return {
+        'objetivo': metrica,
+        'combinaciones': combinaciones,
+        'consumo_anual_kwh': round(float(consumo_anual), 1),
+        'evaluadas': cantidad_evaluadas,
+        'podadas': podadas,
+        'tiempo_ms': round(tiempo_ms, 1)
+    }
+
+
+def _dominados(puntos, frente):
+    """
+    Máscara de los puntos dominados por alguno del frente (todo a minimizar)
+    """
+    if not len(frente) or not len(puntos):
+        return np.zeros(len(puntos), dtype=bool)
+    menor_igual = (frente[None, :, :] <= puntos[:, None, :]).all(axis=-1)
+    menor = (frente[None, :, :] < puntos[:, None, :]).any(axis=-1)
+    return (menor_igual & menor).any(axis=1)
+
+
+def frente_pareto(valores, maximizar=None):
+    """
+    Índices de las filas no dominadas (skyline) de una tabla de criterios
+
+    Las filas se ordenan lexicográficamente, de modo que una fila solo puede
+    ser dominada por filas anteriores. Con dos criterios basta un mínimo
+    acumulado (O(n log n)); con más, cada bloque de filas se compara de forma
+    vectorizada solo contra el frente acumulado (sort-filter-skyline).
+
+    Args:
+        valores (array): Criterios (n, d)
+        maximizar (list de bool, optional): Qué criterios se maximizan (por defecto todos se minimizan)
+
+    Returns:
+        numpy.ndarray: Índices de las filas del frente, en orden creciente; de
+                       varias filas idénticas se conserva la primera
+    """
+    puntos = np.asarray(valores, dtype=np.float64)
+    if puntos.ndim != 2 or not len(puntos):
+        return np.zeros(0, dtype=np.int64)
+    if maximizar is not None:
+        puntos = np.where(np.asarray(maximizar, dtype=bool), -puntos, puntos)
+
+    _, unicos = np.unique(puntos, axis=0, return_index=True)
+    orden = unicos[np.lexsort(puntos[unicos].T[::-1])]
+    ordenados = puntos[orden]
+
+    if ordenados.shape[1] == 1:
+        return np.sort(orden[:1])
+    if ordenados.shape[1] == 2:
+        # Ordenados por el primer criterio: no dominada si mejora el mínimo del segundo
+        previo = np.minimum.accumulate(np.concatenate([[np.inf], ordenados[:-1, 1]]))
+        return np.sort(orden[ordenados[:, 1] < previo])
+
+    frente = np.empty((0, ordenados.shape[1]))
+    indices = []
+    for inicio in range(0, len(ordenados), BLOQUE):
+        bloque = ordenados[inicio:inicio + BLOQUE]
+        posiciones = orden[inicio:inicio + BLOQUE]
+        libres = ~_dominados(bloque, frente)
+        bloque, posiciones = bloque[libres], posiciones[libres]
+        libres = ~_dominados(bloque, bloque)
+        frente = np.concatenate([frente, bloque[libres]])
+        indices.append(posiciones[libres])
+    return np.sort(np.concatenate(indices))
+
+
+def _criterios(evaluadas):
+    """
+    Tabla (n, d) de criterios a minimizar, redondeados como se informan
+    """
+    columnas = [np.round(evaluadas[metrica], decimales) * (-1 if maximizar else 1)
+                for metrica, maximizar, decimales in CRITERIOS_PARETO]
+    return np.stack(columnas, axis=1)
+
+
+def calcular_frente_pareto(clima, consumo_mensual, superficie_disponible=None, presupuesto=None,
+                           tecnologias=TECNOLOGIAS, tipo_vivienda='casa_mediana', equipos=()):
+    """
+    Frente de Pareto de todos los tamaños y combinaciones candidatos según
+    costo, cobertura, retorno de la inversión y CO2 evitado
+
+    Las combinaciones con batería se recorren en orden de su cota optimista y
+    solo se despachan si esa cota no está dominada por el frente encontrado
+    hasta el momento.
+
+    Args:
+        clima (dict): Datos climáticos del sitio
+        consumo_mensual (float): Consumo medio mensual en kWh
+        superficie_disponible (float, optional): m² disponibles para paneles y colectores
+        presupuesto (float, optional): Inversión máxima en USD
+        tecnologias (iterable): Tecnologías permitidas
+        tipo_vivienda (str): Tipo de vivienda para el perfil de consumo
+        equipos (list): Equipos eléctricos del hogar
+
+    Returns:
+        dict: 'frente' ordenado por costo creciente y estadísticas de la búsqueda
+    """
+    inicio = time.perf_counter()
+    tabla = tabla_rendimiento(clima, consumo_mensual, tipo_vivienda, equipos, tecnologias, superficie_disponible)
+    evaluadas, factor_consumo = _evaluar_sin_bateria(tabla, superficie_disponible, presupuesto)
+    cantidad_evaluadas, podadas = len(factor_consumo), 0
+
+    candidatas = _candidatas_con_bateria(tabla, evaluadas, presupuesto)
+    if candidatas is not None and len(candidatas['indices']):
+        criterios = _criterios(evaluadas)
+        frente = criterios[frente_pareto(criterios)]
+        optimistas = _criterios(dict(candidatas['cotas'], costo=candidatas['costo']))
+        orden = np.lexsort(optimistas.T[::-1])
+        sin_bateria = evaluadas
+
+        for inicio_bloque in range(0, len(orden), BLOQUE_PARETO):
+            # Se despachan solo las candidatas cuya cota no está dominada por el frente actual
+            bloque = orden[inicio_bloque:inicio_bloque + BLOQUE_PARETO]
+            prometedoras = bloque[~_dominados(optimistas[bloque], frente)]
+            podadas += len(bloque) - len(prometedoras)
+            if not len(prometedoras):
+                continue
+            nuevas = _evaluar_con_bateria(tabla, sin_bateria, factor_consumo, candidatas['indices'][prometedoras],
+                                          candidatas['bateria'][prometedoras], candidatas['costo'][prometedoras])
+            cantidad_evaluadas += len(prometedoras)
+            evaluadas = {clave: np.concatenate([evaluadas[clave], nuevas[clave]]) for clave in evaluadas}
+            criterios = np.concatenate([frente, _criterios(nuevas)])
+            frente = criterios[frente_pareto(criterios)]
+
+    indices = frente_pareto(_criterios(evaluadas))
+    indices = indices[np.lexsort((-evaluadas['cobertura'][indices], evaluadas['costo'][indices]))]
+
+    tiempo_ms = (time.perf_counter() - inicio) * 1000
+    logger.info(f"Frente de Pareto: {len(indices)} de {cantidad_evaluadas} combinaciones evaluadas "
+                f"({podadas} podadas) en {tiempo_ms:.0f} ms")
+    return {
+        'criterios': [metrica for metrica, _, _ in CRITERIOS_PARETO],
+        'frente': [_combinacion(evaluadas, i) for i in indices],
+        'evaluadas': cantidad_evaluadas,
+        'podadas': podadas,
+        'tiempo_ms': round(tiempo_ms, 1)
+    }
+
+
+def describir_combinacion(tamanos):
+    """
+    Descripción legible de una combinación de tamaños
+    """
+    partes = []
+    if tamanos.get('solar'):
+        partes.append(f"{tamanos['solar']:g} kW de {NOMBRES['solar']}")
+    if tamanos.get('eolica'):
+        partes.append(f"{NOMBRES['eolica']} de {tamanos['eolica']:g} kW")
+    if tamanos.get('termotanque_solar'):
+        partes.append(f"{NOMBRES['termotanque_solar']} de {tamanos['termotanque_solar']:g} litros")
+    if tamanos.get('bateria'):
+        partes.append(f"{NOMBRES['bateria']} de {tamanos['bateria']:g} kWh")
+    if not partes:
+        return ''
+    texto = partes[0] if len(partes) == 1 else ', '.join(partes[:-1]) + ' y ' + partes[-1]
+    return texto[0].upper() + texto[1:]
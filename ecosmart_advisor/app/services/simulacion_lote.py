@@ -0,0 +1,338 @@
+"""
+Simulación por lotes de muchos escenarios de instalación.
+
+Pensado para instaladores que evalúan cientos de variantes por cliente:
+los datos climáticos se consultan una sola vez por ubicación distinta (en
+paralelo), los escenarios del mismo tipo y ubicación se resuelven con una
+única llamada vectorizada a los motores solar, eólico y de termotanque, y
+cada resultado conserva la forma de `simular_instalacion`. Las
+recomendaciones se generan con reglas locales en lugar de consultar
+Deepseek por cada escenario.
+"""
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+from ecosmart_advisor.app.services import simulador
+from ecosmart_advisor.app.services import motor_solar
+from ecosmart_advisor.app.services import motor_eolico
+from ecosmart_advisor.app.services.ciclo_vida import evaluar_ciclo_vida, resumen_ciclo_vida
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Cantidad máxima de escenarios por lote y consultas climáticas simultáneas
+SIMULACION_LOTE_MAX = int(os.environ.get("SIMULACION_LOTE_MAX", "1000"))
+SIMULACION_LOTE_HILOS = int(os.environ.get("SIMULACION_LOTE_HILOS", "8"))
+# Puntos máximos por curva en el barrido de capacidad
+BARRIDO_MAX_PUNTOS = int(os.environ.get("BARRIDO_MAX_PUNTOS", "2000"))
+
+# Rangos de capacidad por defecto del barrido (mínimo, máximo, paso)
+RANGOS_BARRIDO = {
+    'solar': (0.5, 10.0, 0.5),  # kW
+    'eolica': (0.5, 10.0, 0.5),  # kW
+    'termotanque_solar': (50.0, 500.0, 50.0),  # litros
+}
+UNIDADES_BARRIDO = {'solar': 'kW', 'eolica': 'kW', 'termotanque_solar': 'litros'}
+
+
+def _obtener_clima(ubicacion, descripcion_ubicacion):
+    try:
+        return simulador.obtener_datos_clima(ubicacion)
+    except Exception as e:
+        logger.error(f"Error al obtener datos climáticos para {ubicacion}: {str(e)}")
+        return simulador.clima_por_defecto(descripcion_ubicacion)
+
+
+def obtener_climas(parametros, hilos=SIMULACION_LOTE_HILOS):
+    """
+    Consulta los datos climáticos una vez por ubicación distinta
+
+    Args:
+        parametros (list): Escenarios normalizados
+        hilos (int): Consultas simultáneas como máximo
+
+    Returns:
+        dict: Datos climáticos por ubicación
+    """
+    ubicaciones = {}
+    for p in parametros:
+        ubicaciones.setdefault(p['ubicacion'], p['descripcion_ubicacion'])
+
+    if len(ubicaciones) == 1 or hilos <= 1:
+        return {u: _obtener_clima(u, d) for u, d in ubicaciones.items()}
+
+    with ThreadPoolExecutor(max_workers=min(hilos, len(ubicaciones))) as ejecutor:
+        climas = ejecutor.map(lambda par: _obtener_clima(*par), ubicaciones.items())
+        return dict(zip(ubicaciones, climas))
+
+
+def capacidades_barrido(minimo, maximo, paso):
+    """
+    Capacidades equiespaciadas entre mínimo y máximo (inclusive)
+
+    Raises:
+        ValueError: Si el rango es inválido o supera BARRIDO_MAX_PUNTOS
+    """
+    minimo, maximo, paso = float(minimo), float(maximo), float(paso)
+    if not (np.isfinite([minimo, maximo, paso]).all() and minimo > 0 and maximo >= minimo and paso > 0):
+        raise ValueError(f"Rango de capacidad inválido: {minimo}-{maximo} con paso {paso}")
+    puntos = int(np.floor((maximo - minimo) / paso + 1e-9)) + 1
+    if puntos > BARRIDO_MAX_PUNTOS:
+        raise ValueError(f"El barrido supera el máximo de {BARRIDO_MAX_PUNTOS} puntos")
+    return minimo + paso * np.arange(puntos)
+
+
+def _simular_grupo_solar(capacidades, clima):
+    latitud, radiacion_mensual, temperatura_mensual = simulador.obtener_clima_mensual(clima)
+    simulacion = motor_solar.simular_fv(capacidades, latitud, radiacion_mensual, temperatura_mensual)
+    return [simulador.armar_resultado_solar(float(c), clima, simulacion, i)
+            for i, c in enumerate(capacidades)]
+
+
+def _simular_grupo_eolica(capacidades, clima):
+    try:
+        velocidad_mensual, k_mensual = simulador.obtener_viento_mensual(clima)
+        generacion = motor_eolico.simular_eolico(velocidad_mensual, capacidades, k=k_mensual,
+                                                 mensual=True)['generacion']  # (12, n)
+    except Exception as e:
+        logger.error(f"Error al calcular generación eólica: {str(e)}")
+        # Valores conservadores por defecto: 15% de factor de capacidad
+        generacion = np.outer(np.ones(12), capacidades * 0.15 * 8760 / 12)
+    return [simulador.armar_resultado_eolica(float(c), clima, generacion[:, i])
+            for i, c in enumerate(capacidades)]
+
+
+def _simular_termotanques(indices, parametros, climas):
+    capacidades = np.array([parametros[i]['capacidad'] for i in indices])
+    radiacion = np.array([climas[parametros[i]['ubicacion']].get('radiacion_solar', 4.5) for i in indices])
+    temperatura = np.array([climas[parametros[i]['ubicacion']].get('temperatura_promedio', 18) for i in indices])
+    calculo = simulador.calcular_termotanque(capacidades, radiacion, temperatura)
+    return [simulador.armar_resultado_termotanque(float(capacidades[j]), climas[parametros[i]['ubicacion']],
+                                                  calculo, j)
+            for j, i in enumerate(indices)]
+
+
+def indicadores_economicos(generacion_mensual, generacion_anual, consumo_mensual, costo):
+    """
+    Cobertura, ahorro y retorno de inversión con las mismas fórmulas que
+    simular_instalacion, para arrays de cualquier forma
+
+    Returns:
+        dict: Arrays 'cobertura', 'ahorro_mensual_usd', 'ahorro_anual_usd',
+              'retorno_inversion_anos' (NaN cuando no hay retorno) y 'con_retorno'
+    """
+    mensual = np.asarray(generacion_mensual, dtype=np.float64)
+    anual = np.asarray(generacion_anual, dtype=np.float64)
+    consumo = np.asarray(consumo_mensual, dtype=np.float64)
+    costo = np.asarray(costo, dtype=np.float64)
+
+    cobertura = np.where((consumo > 0) & (mensual > 0),
+                         np.minimum(100, mensual / np.where(consumo > 0, consumo, 1) * 100), 0)
+    ahorro_mensual = mensual * simulador.PRECIO_KWH
+    ahorro_anual = anual * simulador.PRECIO_KWH
+    con_retorno = (costo > 0) & (ahorro_anual > 0)
+    retorno = np.where(con_retorno, costo / np.where(con_retorno, ahorro_anual, 1), np.nan)
+    return {
+        'cobertura': cobertura,
+        'ahorro_mensual_usd': ahorro_mensual,
+        'ahorro_anual_usd': ahorro_anual,
+        'retorno_inversion_anos': retorno,
+        'con_retorno': con_retorno
+    }
+
+
+def _completar_resultados(resultados, parametros, climas):
+    """
+    Agrega métricas ambientales, cobertura, ahorro, retorno y recomendaciones
+    con las mismas fórmulas que simular_instalacion, calculadas para todo el lote
+    """
+    anual = np.array([r['generacion_anual'] for r in resultados], dtype=np.float64)
+    mensual = np.array([r['generacion_mensual'] for r in resultados], dtype=np.float64)
+    consumo = np.array([p['consumo_mensual'] for p in parametros], dtype=np.float64)
+    costo = np.array([r['costo_estimado'] for r in resultados], dtype=np.float64)
+
+    co2 = np.maximum(anual, 0) * simulador.FACTOR_CO2_KWH
+    arboles = co2 * simulador.ARBOLES_POR_KG_CO2
+    km = co2 / simulador.KG_CO2_POR_KM
+    economia = indicadores_economicos(mensual, anual, consumo, costo)
+    cobertura = economia['cobertura']
+    ahorro_mensual = economia['ahorro_mensual_usd']
+    ahorro_anual = economia['ahorro_anual_usd']
+    con_retorno = economia['con_retorno']
+    retorno = economia['retorno_inversion_anos']
+
+    # Ciclo de vida: una evaluación vectorizada por tipo de instalación
+    ciclo_vida = [None] * len(resultados)
+    tipos = np.array([p['tipo_instalacion'] for p in parametros])
+    for tipo in np.unique(tipos):
+        indices = np.flatnonzero(tipos == tipo)
+        evaluacion = evaluar_ciclo_vida(costo[indices], anual[indices], tipo, precio_kwh=simulador.PRECIO_KWH)
+        for j, i in enumerate(indices):
+            ciclo_vida[i] = resumen_ciclo_vida(evaluacion, j)
+
+    for i, (r, p) in enumerate(zip(resultados, parametros)):
+        r['metricas_ambientales'] = {
+            'co2_evitado': round(float(co2[i]), 1),
+            'arboles_equivalentes': round(float(arboles[i]), 1),
+            'km_auto_equivalentes': round(float(km[i]), 1)
+        }
+        r['cobertura'] = float(cobertura[i])
+        r['ahorro_mensual_usd'] = float(ahorro_mensual[i])
+        r['ahorro_anual_usd'] = float(ahorro_anual[i])
+        r['retorno_inversion_anos'] = float(retorno[i]) if con_retorno[i] else None
+        r['ciclo_vida'] = ciclo_vida[i]
+        r['recomendaciones'] = simulador.generar_recomendacion_basica(
+            p['tipo_instalacion'], p['capacidad'], climas[p['ubicacion']], r
+        )
+        r['descripcion_ubicacion'] = p['descripcion_ubicacion']
+
+
+def simular_lote(escenarios, hilos=SIMULACION_LOTE_HILOS):
+    """
+    Simula una lista de escenarios de instalación
+
+    Args:
+        escenarios (list): Diccionarios con los mismos campos que acepta
+                           simular_instalacion (tipo_instalacion, capacidad,
+                           ubicacion, consumo_mensual, descripcion_ubicacion)
+        hilos (int): Consultas climáticas simultáneas como máximo
+
+    Returns:
+        list: Resultados en el mismo orden que los escenarios, con la forma de
+              simular_instalacion
+    """
+    if len(escenarios) > SIMULACION_LOTE_MAX:
+        raise ValueError(f"El lote supera el máximo de {SIMULACION_LOTE_MAX} escenarios")
+
+    parametros = [simulador.normalizar_datos_simulacion(e) for e in escenarios]
+    climas = obtener_climas(parametros, hilos)
+    logger.info(f"Simulando lote de {len(parametros)} escenarios en {len(climas)} ubicaciones")
+
+    # Agrupar por tipo y ubicación para resolver cada grupo con una sola llamada
+    grupos = {}
+    for i, p in enumerate(parametros):
+        grupos.setdefault((p['tipo_instalacion'], p['ubicacion']), []).append(i)
+
+    resultados = [None] * len(parametros)
+    termotanques = []
+    for (tipo, ubicacion), indices in grupos.items():
+        if tipo == 'termotanque_solar':
+            termotanques.extend(indices)
+            continue
+        capacidades = np.array([parametros[i]['capacidad'] for i in indices])
+        if tipo == 'solar':
+            grupo = _simular_grupo_solar(capacidades, climas[ubicacion])
+        else:
+            grupo = _simular_grupo_eolica(capacidades, climas[ubicacion])
+        for i, resultado in zip(indices, grupo):
+            resultados[i] = resultado
+
+    # El termotanque no depende del perfil horario: todo el lote en una sola llamada
+    if termotanques:
+        for i, resultado in zip(termotanques, _simular_termotanques(termotanques, parametros, climas)):
+            resultados[i] = resultado
+
+    _completar_resultados(resultados, parametros, climas)
+    return resultados
+
+
+def _generacion_barrido(tipo, capacidades, clima):
+    """
+    Generación mensual promedio, anual y costo para un array de capacidades
+    """
+    if tipo == 'solar':
+        latitud, radiacion_mensual, temperatura_mensual = simulador.obtener_clima_mensual(clima)
+        anual = motor_solar.simular_fv(capacidades, latitud, radiacion_mensual, temperatura_mensual)['anual']
+        return anual / 12, anual, capacidades * simulador.COSTO_SOLAR_POR_KW
+    if tipo == 'eolica':
+        velocidad_mensual, k_mensual = simulador.obtener_viento_mensual(clima)
+        anual = motor_eolico.simular_eolico(velocidad_mensual, capacidades, k=k_mensual,
+                                            mensual=True)['generacion'].sum(axis=0)
+        return anual / 12, anual, capacidades * simulador.COSTO_EOLICO_POR_KW
+    calculo = simulador.calcular_termotanque(capacidades, clima.get('radiacion_solar', 4.5),
+                                             clima.get('temperatura_promedio', 18))
+    diaria = calculo['energia_aportada_diaria']
+    # Igual que simular_termotanque: 30 días por mes y 365 por año
+    return diaria * 30, diaria * 365, calculo['costo_estimado']
+
+
+def _lista(valores, decimales=1):
+    return [None if np.isnan(v) else round(float(v), decimales) for v in valores]
+
+
+def barrido_capacidad(ubicacion, consumo_mensual, rangos=None, descripcion_ubicacion=None):
+    """
+    Calcula las curvas de generación, cobertura, ahorro y retorno en función
+    de la capacidad para cada tipo de instalación, con una sola consulta
+    climática y una llamada vectorizada por tipo
+
+    Args:
+        ubicacion (str): Ciudad o coordenadas "lat,lon"
+        consumo_mensual (float): Consumo mensual en kWh
+        rangos (dict, optional): (mínimo, máximo, paso) o {'min', 'max', 'paso'}
+                                 por tipo; por defecto RANGOS_BARRIDO
+        descripcion_ubicacion (str, optional): Nombre legible de la ubicación
+
+    Returns:
+        dict: Datos de entrada, resumen del clima y 'curvas' por tipo de instalación
+
+    Raises:
+        ValueError: Si algún tipo o rango es inválido
+    """
+    parametros = simulador.normalizar_datos_simulacion({
+        'ubicacion': ubicacion,
+        'consumo_mensual': consumo_mensual,
+        'descripcion_ubicacion': descripcion_ubicacion or ubicacion
+    })
+    rangos = RANGOS_BARRIDO if rangos is None else rangos
+    if not isinstance(rangos, dict):
+        raise ValueError("Los rangos deben indicarse por tipo de instalación")
+    clima = _obtener_clima(parametros['ubicacion'], parametros['descripcion_ubicacion'])
+
+    curvas = {}
+    for tipo, rango in rangos.items():
+        if tipo not in RANGOS_BARRIDO:
+            raise ValueError(f"Tipo de instalación no válido: {tipo}")
+        if isinstance(rango, dict):
+            rango = (rango.get('min'), rango.get('max'), rango.get('paso'))
+        try:
+            capacidades = capacidades_barrido(*rango)
+        except TypeError:
+            raise ValueError(f"Rango de capacidad inválido para {tipo}: {rango}")
+
+        mensual, anual, costo = _generacion_barrido(tipo, capacidades, clima)
+        economia = indicadores_economicos(mensual, anual, parametros['consumo_mensual'], costo)
+        evaluacion = evaluar_ciclo_vida(costo, anual, tipo, precio_kwh=simulador.PRECIO_KWH)
+        curvas[tipo] = {
+            'unidad': UNIDADES_BARRIDO[tipo],
+            'capacidades': _lista(capacidades, 3),
+            'generacion_mensual': _lista(mensual),
+            'generacion_anual': _lista(anual),
+            'costo_estimado': _lista(costo, 0),
+            'cobertura': _lista(economia['cobertura']),
+            'ahorro_mensual_usd': _lista(economia['ahorro_mensual_usd'], 2),
+            'ahorro_anual_usd': _lista(economia['ahorro_anual_usd'], 2),
+            'retorno_inversion_anos': _lista(economia['retorno_inversion_anos']),
+            'van_usd': _lista(evaluacion['van'], 2),
+            'tir_porcentaje': _lista(evaluacion['tir'] * 100, 2),
+            'lcoe_usd_kwh': _lista(evaluacion['lcoe'], 4)
+        }
+
+    return {
+        'ubicacion': parametros['ubicacion'],
+        'descripcion_ubicacion': parametros['descripcion_ubicacion'],
+        'consumo_mensual': parametros['consumo_mensual'],
+        'clima': {
+            'radiacion_solar': clima.get('radiacion_solar'),
+            'velocidad_viento': clima.get('velocidad_viento'),
+            'temperatura_promedio': clima.get('temperatura_promedio'),
+            'fuente': clima.get('fuente')
+        },
+        'curvas': curvas
+    }
@@ -4,27 +4,129 @@ con diferentes parámetros y calcular su rendimiento.
 Puede utilizar Deepseek AI para recomendaciones más avanzadas.
 """
 import os
+import re
 import json
-import requests
+from ecosmart_advisor.app.services import http_cliente
+from ecosmart_advisor.app.services import llm_cache
+from ecosmart_advisor.app.services import tareas
 import logging
+import numpy as np
 from dotenv import load_dotenv
 from ecosmart_advisor.app.services.clima_api import obtener_datos_clima
+from ecosmart_advisor.app.services import climatologia
+from ecosmart_advisor.app.services import motor_solar
+from ecosmart_advisor.app.services import motor_eolico
+from ecosmart_advisor.app.services.ciclo_vida import evaluar_ciclo_vida, resumen_ciclo_vida
 
 # Cargar variables de entorno
 load_dotenv()
 
+# Latitud usada cuando los datos climáticos no traen coordenadas (Buenos Aires)
+LATITUD_POR_DEFECTO = -34.61
+
 # Configurar la API de Deepseek
 DEEPSEEK_API_KEY = os.environ.get("DEEPSEEK_API_KEY")
 DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
 USAR_DEEPSEEK = DEEPSEEK_API_KEY is not None and len(DEEPSEEK_API_KEY.strip()) > 0
 
-def simular_instalacion(datos):
+def normalizar_datos_simulacion(datos):
+    """
+    Valida los parámetros de una simulación y completa los faltantes o
+    inválidos con valores por defecto
+    
+    Args:
+        datos (dict): Parámetros recibidos (tipo, capacidad, ubicación, etc.)
+        
+    Returns:
+        dict: tipo_instalacion, capacidad, consumo_mensual, ubicacion y descripcion_ubicacion
+    """
+    import logging
+    logger = logging.getLogger('simulador')
+    
+    # Si datos es None o no es un diccionario, usar un diccionario vacío
+    if not datos or not isinstance(datos, dict):
+        logger.warning(f"Datos inválidos: {datos}, usando valores por defecto")
+        datos = {}
+    
+    # Extraer datos de la simulación con validación
+    tipo_instalacion = datos.get('tipo_instalacion')
+    
+    # Validar tipo de instalación
+    tipos_validos = ['solar', 'eolica', 'termotanque_solar']
+    if not tipo_instalacion or tipo_instalacion not in tipos_validos:
+        logger.warning(f"Tipo de instalación no válido: {tipo_instalacion}, usando solar por defecto")
+        tipo_instalacion = 'solar'
+    
+    # Asegurar que capacidad y consumo sean valores numéricos válidos
+    try:
+        capacidad_valor = datos.get('capacidad', '')
+        capacidad = float(capacidad_valor) if capacidad_valor else 0
+        if capacidad <= 0:
+            logger.warning(f"Capacidad inválida: {capacidad}, usando valor por defecto")
+            # Valores por defecto según tipo de instalación
+            if tipo_instalacion == 'termotanque_solar':
+                capacidad = 200.0  # 200 litros por defecto
+            else:
+                capacidad = 1.0  # 1 kW por defecto
+    except (ValueError, TypeError) as e:
+        logger.error(f"Error al convertir capacidad '{datos.get('capacidad')}': {str(e)}")
+        if tipo_instalacion == 'termotanque_solar':
+            capacidad = 200.0
+        else:
+            capacidad = 1.0
+        
+    try:
+        consumo_valor = datos.get('consumo_mensual', '')
+        consumo_mensual = float(consumo_valor) if consumo_valor else 0
+        if consumo_mensual <= 0:
+            logger.warning(f"Consumo mensual inválido: {consumo_mensual}, usando valor por defecto")
+            consumo_mensual = 300.0  # 300 kWh por defecto
+    except (ValueError, TypeError) as e:
+        logger.error(f"Error al convertir consumo '{datos.get('consumo_mensual')}': {str(e)}")
+        consumo_mensual = 300.0
+        
+    # Ubicación con validación
+    ubicacion_default = '-34.61,-58.38'  # Buenos Aires como ubicación por defecto
+    ubicacion = datos.get('ubicacion')
+    
+    if not ubicacion or not isinstance(ubicacion, str) or ubicacion.strip() == '':
+        logger.warning(f"Ubicación inválida: {ubicacion}, usando Buenos Aires por defecto")
+        ubicacion = ubicacion_default
+        
+    descripcion_ubicacion = datos.get('descripcion_ubicacion', 'Buenos Aires, Argentina')
+    
+    return {
+        'tipo_instalacion': tipo_instalacion,
+        'capacidad': capacidad,
+        'consumo_mensual': consumo_mensual,
+        'ubicacion': ubicacion,
+        'descripcion_ubicacion': descripcion_ubicacion
+    }
+
+def clima_por_defecto(descripcion_ubicacion=None):
+    """
+    Datos climáticos de referencia cuando no se pueden obtener los del sitio
+    """
+    return {
+        'radiacion_solar': 4.5,  # kWh/m²/día
+        'velocidad_viento': 4.0,  # m/s
+        'temperatura_promedio': 18.0,  # °C
+        'ubicacion': descripcion_ubicacion or 'No especificada',
+        'latitud': None,
+        'longitud': None,
+        'fuente': 'datos_por_defecto'
+    }
+
+def simular_instalacion(datos, limite=None):
     """
     Simula la instalación de un sistema de energía renovable
     y calcula su rendimiento esperado
     
     Args:
         datos (dict): Parámetros de la simulación (tipo, capacidad, ubicación, etc.)
+        limite (float, optional): Instante (time.monotonic) hasta el que se esperan
+                                  las recomendaciones de la IA; por defecto, el
+                                  plazo de tareas desde el inicio de la simulación
         
     Returns:
         dict: Resultados de la simulación
@@ -33,60 +135,19 @@ def simular_instalacion(datos):
     logger = logging.getLogger('simulador')
     logger.setLevel(logging.DEBUG)
     
+    limite = limite or tareas.limite_desde()
+    # Las opciones (monte_carlo, bateria) se leen de los datos originales
+    if not isinstance(datos, dict):
+        datos = {}
     try:
         logger.info(f"Iniciando simulación con datos: {datos}")
         
-        # Si datos es None o no es un diccionario, usar un diccionario vacío
-        if not datos or not isinstance(datos, dict):
-            logger.warning(f"Datos inválidos: {datos}, usando valores por defecto")
-            datos = {}
-        
-        # Extraer datos de la simulación con validación
-        tipo_instalacion = datos.get('tipo_instalacion')
-        
-        # Validar tipo de instalación
-        tipos_validos = ['solar', 'eolica', 'termotanque_solar']
-        if not tipo_instalacion or tipo_instalacion not in tipos_validos:
-            logger.warning(f"Tipo de instalación no válido: {tipo_instalacion}, usando solar por defecto")
-            tipo_instalacion = 'solar'
-        
-        # Asegurar que capacidad y consumo sean valores numéricos válidos
-        try:
-            capacidad_valor = datos.get('capacidad', '')
-            capacidad = float(capacidad_valor) if capacidad_valor else 0
-            if capacidad <= 0:
-                logger.warning(f"Capacidad inválida: {capacidad}, usando valor por defecto")
-                # Valores por defecto según tipo de instalación
-                if tipo_instalacion == 'termotanque_solar':
-                    capacidad = 200.0  # 200 litros por defecto
-                else:
-                    capacidad = 1.0  # 1 kW por defecto
-        except (ValueError, TypeError) as e:
-            logger.error(f"Error al convertir capacidad '{datos.get('capacidad')}': {str(e)}")
-            if tipo_instalacion == 'termotanque_solar':
-                capacidad = 200.0
-            else:
-                capacidad = 1.0
-            
-        try:
-            consumo_valor = datos.get('consumo_mensual', '')
-            consumo_mensual = float(consumo_valor) if consumo_valor else 0
-            if consumo_mensual <= 0:
-                logger.warning(f"Consumo mensual inválido: {consumo_mensual}, usando valor por defecto")
-                consumo_mensual = 300.0  # 300 kWh por defecto
-        except (ValueError, TypeError) as e:
-            logger.error(f"Error al convertir consumo '{datos.get('consumo_mensual')}': {str(e)}")
-            consumo_mensual = 300.0
-            
-        # Ubicación con validación
-        ubicacion_default = '-34.61,-58.38'  # Buenos Aires como ubicación por defecto
-        ubicacion = datos.get('ubicacion')
-        
-        if not ubicacion or not isinstance(ubicacion, str) or ubicacion.strip() == '':
-            logger.warning(f"Ubicación inválida: {ubicacion}, usando Buenos Aires por defecto")
-            ubicacion = ubicacion_default
-            
-        descripcion_ubicacion = datos.get('descripcion_ubicacion', 'Buenos Aires, Argentina')
+        parametros = normalizar_datos_simulacion(datos)
+        tipo_instalacion = parametros['tipo_instalacion']
+        capacidad = parametros['capacidad']
+        consumo_mensual = parametros['consumo_mensual']
+        ubicacion = parametros['ubicacion']
+        descripcion_ubicacion = parametros['descripcion_ubicacion']
         
         # Registro detallado para debug
         logger.info(f"Simulando instalación de tipo: {tipo_instalacion}")
@@ -101,15 +162,7 @@ def simular_instalacion(datos):
         except Exception as e:
             logger.error(f"Error al obtener datos climáticos: {str(e)}")
             # Datos climáticos por defecto en caso de error
-            clima = {
-                'radiacion_solar': 4.5,  # kWh/m²/día
-                'velocidad_viento': 4.0,  # m/s
-                'temperatura_promedio': 18.0,  # °C
-                'ubicacion': descripcion_ubicacion or 'No especificada',
-                'latitud': None,
-                'longitud': None,
-                'fuente': 'datos_por_defecto'
-            }
+            clima = clima_por_defecto(descripcion_ubicacion)
         
         # Simular según el tipo de instalación
         logger.info(f"Iniciando simulación de {tipo_instalacion}")
@@ -157,7 +210,7 @@ def simular_instalacion(datos):
             resultados['cobertura'] = 0
         
         # Agregar datos de ahorro económico
-        precio_kwh = 0.15  # USD/kWh
+        precio_kwh = PRECIO_KWH
         try:
             resultados['ahorro_mensual_usd'] = resultados.get('generacion_mensual', 0) * precio_kwh
             resultados['ahorro_anual_usd'] = resultados.get('generacion_anual', 0) * precio_kwh
@@ -178,27 +231,80 @@ def simular_instalacion(datos):
         except Exception as e:
             logger.error(f"Error al calcular retorno de inversión: {str(e)}")
             resultados['retorno_inversion_anos'] = None
-            
-        # Obtener recomendaciones avanzadas con Deepseek AI
-        try:
+        
+        # Lanzar la consulta de recomendaciones avanzadas a Deepseek AI en segundo
+        # plano; el resto de los cálculos continúa mientras tanto
+        def recomendacion_basica():
+            return generar_recomendacion_basica(tipo_instalacion, capacidad, clima, resultados)
+        
+        futuro_recomendacion = None
+        if USAR_DEEPSEEK:
             logger.info(f"Solicitando recomendaciones avanzadas para {tipo_instalacion}")
-            recomendaciones = obtener_recomendacion_avanzada(
-                tipo_instalacion, 
-                capacidad, 
-                clima, 
-                resultados
+            futuro_recomendacion = tareas.lanzar(obtener_recomendacion_avanzada, tipo_instalacion, capacidad,
+                                                 clima, dict(resultados))
+        
+        # Proyectar el ciclo de vida: flujo de caja anual, VAN, TIR y LCOE
+        try:
+            evaluacion = evaluar_ciclo_vida(
+                resultados.get('costo_estimado', 0),
+                resultados.get('generacion_anual', 0),
+                tipo_instalacion,
+                precio_kwh=precio_kwh
             )
+            resultados['ciclo_vida'] = resumen_ciclo_vida(evaluacion)
+        except Exception as e:
+            logger.error(f"Error al calcular el ciclo de vida: {str(e)}")
+            resultados['ciclo_vida'] = None
+        
+        # Modo de incertidumbre opcional: percentiles por Monte Carlo
+        monte_carlo = datos.get('monte_carlo')
+        if monte_carlo:
+            from ecosmart_advisor.app.services.incertidumbre import simular_monte_carlo, validar_opciones
+            try:
+                resultados['incertidumbre'] = simular_monte_carlo(
+                    tipo_instalacion,
+                    capacidad,
+                    clima,
+                    consumo_mensual,
+                    **validar_opciones(monte_carlo)
+                )
+            except Exception as e:
+                logger.error(f"Error en la simulación de Monte Carlo: {str(e)}")
+                resultados['incertidumbre'] = {'error': str(e)}
+        
+        # Almacenamiento opcional: despacho horario de baterías frente al consumo del hogar
+        bateria = datos.get('bateria')
+        if bateria and tipo_instalacion in ('solar', 'eolica'):
+            from ecosmart_advisor.app.services.baterias import simular_autoconsumo
+            opciones = bateria if isinstance(bateria, dict) else {}
+            try:
+                resultados['almacenamiento'] = simular_autoconsumo(
+                    tipo_instalacion,
+                    capacidad,
+                    clima,
+                    opciones.get('capacidad_kwh', [5, 10, 15]),
+                    tipo_vivienda=opciones.get('tipo_vivienda', 'casa_mediana'),
+                    equipos=opciones.get('equipos', []),
+                    consumo_mensual=consumo_mensual
+                )
+            except Exception as e:
+                logger.error(f"Error en la simulación de baterías: {str(e)}")
+                resultados['almacenamiento'] = {'error': str(e)}
+        
+        # Esperar las recomendaciones de la IA solo hasta el plazo de la solicitud;
+        # si no llegan, usar las recomendaciones básicas
+        try:
+            if futuro_recomendacion is None:
+                recomendaciones = obtener_recomendacion_avanzada(tipo_instalacion, capacidad, clima, resultados)
+            else:
+                recomendaciones = tareas.esperar(futuro_recomendacion, limite, recomendacion_basica,
+                                                 'las recomendaciones avanzadas')
             resultados['recomendaciones'] = recomendaciones
             logger.info(f"Recomendaciones obtenidas con éxito: {recomendaciones.get('recomendacion_principal', '')}")
         except Exception as e:
             logger.error(f"Error al obtener recomendaciones avanzadas: {str(e)}")
             # En caso de error, incluir recomendaciones básicas
-            resultados['recomendaciones'] = generar_recomendacion_basica(
-                tipo_instalacion, 
-                capacidad, 
-                clima, 
-                resultados
-            )
+            resultados['recomendaciones'] = recomendacion_basica()
         
         # Agregar descripción de ubicación a los resultados
         resultados['descripcion_ubicacion'] = descripcion_ubicacion
@@ -232,63 +338,127 @@ def simular_instalacion(datos):
             'descripcion_ubicacion': datos.get('descripcion_ubicacion', '') if datos else ''
         }
 
-def simular_solar(capacidad_kw, clima, consumo_mensual):
+def _climatologia_mensual(clima, latitud):
+    """
+    Devuelve la climatología mensual que trae el dict de clima o, si no la
+    trae, la de la grilla local para sus coordenadas (None si no hay datos)
+    """
+    mensual = clima.get('climatologia_mensual')
+    if mensual is None and clima.get('longitud') is not None:
+        try:
+            datos = climatologia.obtener_climatologia(latitud, clima['longitud'])
+            mensual = datos['climatologia_mensual'] if datos else None
+        except Exception:
+            mensual = None
+    return mensual
+
+def _media_anual(valores):
+    dias = motor_solar.DIAS_MES
+    return np.dot(valores, dias) / dias.sum()
+
+def obtener_clima_mensual(clima):
     """
-    Simula una instalación solar fotovoltaica
+    Obtiene la climatología mensual (radiación y temperatura) para los datos
+    climáticos dados. Usa la climatología que trae el propio dict, o la de la
+    grilla local con su forma estacional ajustada a la media recibida, o una
+    estimación por latitud si no hay otra fuente.
     
     Args:
-        capacidad_kw (float): Capacidad en kW del sistema
         clima (dict): Datos climáticos
-        consumo_mensual (float): Consumo mensual en kWh
         
     Returns:
-        dict: Resultados de la simulación
+        tuple: (latitud, radiación mensual, temperatura mensual) como arrays de 12 valores
     """
-    import logging
-    logger = logging.getLogger('simulador_solar')
-    logger.setLevel(logging.DEBUG)
-    
-    # Validar parámetros de entrada
-    logger.info(f"Simulando solar con capacidad={capacidad_kw}kW, consumo={consumo_mensual}kWh")
-    logger.info(f"Datos clima: {clima}")
+    radiacion_media = float(clima.get('radiacion_solar') or 4.5)
+    temperatura_media = float(clima.get('temperatura_promedio') or 18)
+    latitud = clima.get('latitud')
+    latitud = float(latitud) if latitud is not None else LATITUD_POR_DEFECTO
+    
+    mensual = _climatologia_mensual(clima, latitud)
+    if mensual:
+        radiacion = np.array(mensual['radiacion_solar'], dtype=np.float64)
+        temperatura = np.array(mensual['temperatura'], dtype=np.float64)
+        # Conservar la forma estacional pero respetar las medias de la fuente de datos
+        radiacion *= radiacion_media / _media_anual(radiacion)
+        temperatura += temperatura_media - _media_anual(temperatura)
+    else:
+        radiacion = motor_solar.estimar_radiacion_mensual(radiacion_media, latitud)
+        temperatura = motor_solar.estimar_temperatura_mensual(temperatura_media, latitud)
     
-    # Extraer radiación solar con valores por defecto seguros
-    radiacion_solar = clima.get('radiacion_solar', 4.5)  # kWh/m²/día
-    temperatura = clima.get('temperatura_promedio', 18)  # °C
+    return latitud, radiacion, temperatura
+
+def obtener_viento_mensual(clima):
+    """
+    Obtiene la velocidad media mensual del viento y el factor de forma de
+    Weibull para los datos climáticos dados, con el mismo criterio que
+    obtener_clima_mensual. Sin climatología se usa una distribución de
+    Rayleigh (k = 2) con la velocidad media todo el año.
     
-    logger.info(f"Radiación solar: {radiacion_solar}, Temperatura: {temperatura}")
+    Args:
+        clima (dict): Datos climáticos
+        
+    Returns:
+        tuple: (velocidad mensual, k mensual) como arrays de 12 valores
+    """
+    velocidad_media = float(clima.get('velocidad_viento') or 4.0)
+    latitud = clima.get('latitud')
+    latitud = float(latitud) if latitud is not None else LATITUD_POR_DEFECTO
+    
+    mensual = _climatologia_mensual(clima, latitud)
+    if mensual:
+        velocidad = np.array(mensual['velocidad_viento'], dtype=np.float64)
+        velocidad *= velocidad_media / _media_anual(velocidad)
+        k = np.array(mensual['weibull_k'], dtype=np.float64)
+    else:
+        velocidad = np.full(12, velocidad_media)
+        k = np.full(12, motor_eolico.WEIBULL_K_POR_DEFECTO)
     
-    # Factor de pérdida por temperatura
-    factor_temperatura = 1 - max(0, (temperatura - 25) * 0.004)
+    return velocidad, k
+
+# Precio de la energía y factores de conversión ambientales
+PRECIO_KWH = 0.15  # USD/kWh
+FACTOR_CO2_KWH = 0.4  # kg CO2 por kWh (varía según matriz energética)
+ARBOLES_POR_KG_CO2 = 0.06  # árboles equivalentes por kg CO2 (aproximación)
+KG_CO2_POR_KM = 0.2  # kg CO2 por km en auto promedio
+
+# Costos y rendimientos de referencia por tecnología
+POTENCIA_SOLAR_POR_M2 = 0.185  # kWp por m² (aproximado para paneles modernos)
+COSTO_SOLAR_POR_KW = 1200  # USD/kW (varía según país y tecnología)
+COSTO_EOLICO_POR_KW = 2000  # USD/kW (varía según país y tecnología)
+COSTO_TERMOTANQUE_BASE = 800  # USD (costo base del sistema)
+COSTO_TERMOTANQUE_POR_LITRO = 2  # USD/litro
+EFICIENCIA_TERMOTANQUE = 0.7  # 70% de eficiencia
+
+def armar_resultado_solar(capacidad_kw, clima, simulacion, indice=()):
+    """
+    Construye el dict de resultados solares a partir de una simulación del
+    motor horario, que puede corresponder a varias capacidades a la vez.
     
-    # Otras pérdidas del sistema (inversores, cables, etc.)
-    otras_perdidas = 0.85  # 15% de pérdidas
+    Args:
+        capacidad_kw (float): Capacidad en kW del sistema
+        clima (dict): Datos climáticos
+        simulacion (dict): Resultado de motor_solar.simular_fv
+        indice (int o tuple): Posición de esta capacidad en la simulación
+        
+    Returns:
+        dict: Resultados de la simulación
+    """
+    radiacion_solar = clima.get('radiacion_solar', 4.5)  # kWh/m²/día
+    temperatura = clima.get('temperatura_promedio', 18)  # °C
     
     # Calcular superficie necesaria
-    potencia_por_m2 = 0.185  # kWp por m² (aproximado para paneles modernos)
-    superficie_paneles = capacidad_kw / potencia_por_m2
+    superficie_paneles = capacidad_kw / POTENCIA_SOLAR_POR_M2
     
-    # Calcular generación
-    horas_sol_pico = radiacion_solar  # Las HSP equivalen a la radiación en kWh/m²/día
-    generacion_diaria = capacidad_kw * horas_sol_pico * factor_temperatura * otras_perdidas
-    generacion_mensual = generacion_diaria * 30  # Aproximado
-    generacion_anual = generacion_diaria * 365
+    generacion_anual = float(simulacion['anual'][indice])
+    generacion_mensual = generacion_anual / 12  # Promedio mensual
+    generacion_diaria = generacion_anual / 365
     
     # Estimar costo del sistema
-    costo_por_kw = 1200  # USD/kW (varía según país y tecnología)
-    costo_estimado = capacidad_kw * costo_por_kw
+    costo_estimado = capacidad_kw * COSTO_SOLAR_POR_KW
     
-    try:
-        factor_capacidad = (generacion_anual / (capacidad_kw * 8760) * 100) if capacidad_kw > 0 else 0
-    except Exception as e:
-        logger.error(f"Error al calcular factor de capacidad: {str(e)}")
-        factor_capacidad = 0
-    
-    try:
-        eficiencia_sistema = factor_temperatura * otras_perdidas * 100
-    except Exception as e:
-        logger.error(f"Error al calcular eficiencia: {str(e)}")
-        eficiencia_sistema = 85  # Valor por defecto
+    factor_capacidad = float(simulacion['factor_capacidad']) if capacidad_kw > 0 else 0
+    # Eficiencia del sistema: energía entregada / irradiación sobre los paneles (performance ratio)
+    eficiencia_sistema = float(simulacion['relacion_rendimiento'])
     
     # Crear detalle del clima seguro
     detalle_clima = {
@@ -297,8 +467,7 @@ def simular_solar(capacidad_kw, clima, consumo_mensual):
         'ubicacion': clima.get('ubicacion', 'No especificada')
     }
     
-    # Retornar resultados
-    resultados = {
+    return {
         'tipo': 'solar',
         'capacidad_kw': capacidad_kw,
         'superficie_m2': round(superficie_paneles, 1),
@@ -308,18 +477,23 @@ def simular_solar(capacidad_kw, clima, consumo_mensual):
         'costo_estimado': round(costo_estimado, 0),
         'factor_capacidad': round(factor_capacidad, 1),  # Porcentaje
         'eficiencia_sistema': round(eficiencia_sistema, 1),  # Porcentaje
-        'detalle_clima': detalle_clima
+        'detalle_clima': detalle_clima,
+        'detalle_mensual': {
+            'generacion': [round(float(v), 1) for v in simulacion['mensual'][indice]],  # kWh por mes
+            'irradiacion_plano': [round(float(v), 2) for v in simulacion['irradiacion_plano_mensual']],
+            'inclinacion': simulacion['inclinacion'],
+            'perdida_temperatura': round(float(simulacion['perdida_temperatura']), 1),  # Porcentaje
+            'perdida_recorte': round(float(simulacion['perdida_recorte']), 1)  # Porcentaje
+        }
     }
-    
-    logger.info(f"Resultados solares generados: {resultados}")
-    return resultados
 
-def simular_eolica(capacidad_kw, clima, consumo_mensual):
+def simular_solar(capacidad_kw, clima, consumo_mensual):
     """
-    Simula una instalación eólica
+    Simula una instalación solar fotovoltaica con el motor horario de
+    8760 horas (estacionalidad, temperatura de celda y recorte del inversor)
     
     Args:
-        capacidad_kw (float): Capacidad en kW del aerogenerador
+        capacidad_kw (float): Capacidad en kW del sistema
         clima (dict): Datos climáticos
         consumo_mensual (float): Consumo mensual en kWh
         
@@ -327,75 +501,67 @@ def simular_eolica(capacidad_kw, clima, consumo_mensual):
         dict: Resultados de la simulación
     """
     import logging
-    logger = logging.getLogger('simulador_eolica')
+    logger = logging.getLogger('simulador_solar')
     logger.setLevel(logging.DEBUG)
     
     # Validar parámetros de entrada
-    logger.info(f"Simulando eólica con capacidad={capacidad_kw}kW, consumo={consumo_mensual}kWh")
-    logger.info(f"Datos clima para eólica: {clima}")
+    logger.info(f"Simulando solar con capacidad={capacidad_kw}kW, consumo={consumo_mensual}kWh")
+    logger.info(f"Datos clima: {clima}")
     
-    # Extraer velocidad del viento con valor por defecto seguro
-    velocidad_viento = clima.get('velocidad_viento', 4.0)  # m/s
-    logger.info(f"Velocidad del viento: {velocidad_viento} m/s")
+    # Simulación horaria de un año típico
+    latitud, radiacion_mensual, temperatura_mensual = obtener_clima_mensual(clima)
+    simulacion = motor_solar.simular_fv(capacidad_kw, latitud, radiacion_mensual, temperatura_mensual)
+    
+    resultados = armar_resultado_solar(capacidad_kw, clima, simulacion)
     
-    # Evaluar viabilidad según velocidad
+    logger.info(f"Resultados solares generados: {resultados}")
+    return resultados
+
+def clasificar_viabilidad_eolica(velocidad_viento):
+    """
+    Factor de viabilidad (0-1) según la velocidad media del viento
+    """
     if velocidad_viento < 3.0:
-        factor_viabilidad = 0.3  # Muy baja viabilidad
+        return 0.3  # Muy baja viabilidad
     elif velocidad_viento < 4.0:
-        factor_viabilidad = 0.6  # Baja viabilidad
+        return 0.6  # Baja viabilidad
     elif velocidad_viento < 5.0:
-        factor_viabilidad = 0.8  # Viabilidad media
-    else:
-        factor_viabilidad = 1.0  # Alta viabilidad
-    
-    # Velocidades características
-    velocidad_arranque = 2.5  # m/s
-    velocidad_nominal = 11.0  # m/s
-    velocidad_corte = 25.0  # m/s
+        return 0.8  # Viabilidad media
+    return 1.0  # Alta viabilidad
+
+def armar_resultado_eolica(capacidad_kw, clima, generacion_por_mes):
+    """
+    Construye el dict de resultados eólicos a partir de la generación mensual
     
-    # Calcular factor de capacidad estimado
-    # Este cálculo es una aproximación, en la realidad depende de la distribución de Weibull del viento
-    try:
-        if velocidad_viento < velocidad_arranque:
-            factor_capacidad = 0
-        elif velocidad_viento > velocidad_nominal:
-            factor_capacidad = 0.35 * factor_viabilidad  # Factor máximo para pequeños aerogeneradores
-        else:
-            # Interpolación para velocidades entre arranque y nominal
-            factor_capacidad = (0.35 * factor_viabilidad) * ((velocidad_viento - velocidad_arranque) / 
-                                                        (velocidad_nominal - velocidad_arranque))
-    except Exception as e:
-        logger.error(f"Error al calcular factor de capacidad eólico: {str(e)}")
-        factor_capacidad = 0.15  # Valor conservador por defecto
+    Args:
+        capacidad_kw (float): Capacidad en kW del aerogenerador
+        clima (dict): Datos climáticos
+        generacion_por_mes (array): Generación de cada mes en kWh
+        
+    Returns:
+        dict: Resultados de la simulación
+    """
+    velocidad_viento = clima.get('velocidad_viento', 4.0)  # m/s
+    modelo = motor_eolico.MODELOS[motor_eolico.MODELO_POR_DEFECTO]
     
-    # Calcular generación
-    horas_anuales = 8760  # horas en un año
-    try:
-        generacion_anual = capacidad_kw * factor_capacidad * horas_anuales
-        generacion_mensual = generacion_anual / 12
-        generacion_diaria = generacion_mensual / 30
-    except Exception as e:
-        logger.error(f"Error al calcular generación eólica: {str(e)}")
-        # Valores conservadores por defecto
-        generacion_anual = capacidad_kw * 0.15 * horas_anuales  # 15% factor de capacidad como fallback
-        generacion_mensual = generacion_anual / 12
-        generacion_diaria = generacion_mensual / 30
+    generacion_anual = float(np.sum(generacion_por_mes))
+    generacion_mensual = generacion_anual / 12
+    generacion_diaria = generacion_anual / 365
+    factor_capacidad = generacion_anual / (capacidad_kw * 8760) if capacidad_kw > 0 else 0
     
     # Estimar costo del sistema
-    costo_por_kw = 2000  # USD/kW (varía según país y tecnología)
-    costo_estimado = capacidad_kw * costo_por_kw
+    costo_estimado = capacidad_kw * COSTO_EOLICO_POR_KW
     
     # Crear detalle de viento seguro
     detalle_viento = {
         'velocidad_viento': velocidad_viento,
-        'velocidad_arranque': velocidad_arranque,
-        'velocidad_nominal': velocidad_nominal,
-        'velocidad_corte': velocidad_corte,
+        'velocidad_arranque': modelo['arranque'],
+        'velocidad_nominal': modelo['nominal'],
+        'velocidad_corte': modelo['corte'],
         'ubicacion': clima.get('ubicacion', 'No especificada')
     }
     
-    # Retornar resultados
-    resultados = {
+    return {
         'tipo': 'eolica',
         'capacidad_kw': capacidad_kw,
         'generacion_diaria': round(generacion_diaria, 1),
@@ -403,13 +569,115 @@ def simular_eolica(capacidad_kw, clima, consumo_mensual):
         'generacion_anual': round(generacion_anual, 1),
         'costo_estimado': round(costo_estimado, 0),
         'factor_capacidad': round(factor_capacidad * 100, 1),  # Porcentaje
-        'factor_viabilidad': round(factor_viabilidad, 2),
-        'detalle_viento': detalle_viento
+        'factor_viabilidad': round(clasificar_viabilidad_eolica(velocidad_viento), 2),
+        'detalle_viento': detalle_viento,
+        'detalle_mensual': {
+            'generacion': [round(float(v), 1) for v in generacion_por_mes],  # kWh por mes
+            'altura_buje': motor_eolico.ALTURA_BUJE
+        }
     }
+
+def simular_eolica(capacidad_kw, clima, consumo_mensual):
+    """
+    Simula una instalación eólica integrando la curva de potencia del
+    aerogenerador contra la distribución de Weibull de cada mes
+    
+    Args:
+        capacidad_kw (float): Capacidad en kW del aerogenerador
+        clima (dict): Datos climáticos
+        consumo_mensual (float): Consumo mensual en kWh
+        
+    Returns:
+        dict: Resultados de la simulación
+    """
+    import logging
+    logger = logging.getLogger('simulador_eolica')
+    logger.setLevel(logging.DEBUG)
+    
+    # Validar parámetros de entrada
+    logger.info(f"Simulando eólica con capacidad={capacidad_kw}kW, consumo={consumo_mensual}kWh")
+    logger.info(f"Datos clima para eólica: {clima}")
+    
+    try:
+        velocidad_mensual, k_mensual = obtener_viento_mensual(clima)
+        simulacion = motor_eolico.simular_eolico(velocidad_mensual, capacidad_kw, k=k_mensual, mensual=True)
+        generacion_por_mes = simulacion['generacion'][:, 0]
+    except Exception as e:
+        logger.error(f"Error al calcular generación eólica: {str(e)}")
+        # Valores conservadores por defecto: 15% de factor de capacidad
+        generacion_por_mes = np.full(12, capacidad_kw * 0.15 * 8760 / 12)
+    
+    resultados = armar_resultado_eolica(capacidad_kw, clima, generacion_por_mes)
     
     logger.info(f"Resultados eólicos generados: {resultados}")
     return resultados
 
+def calcular_termotanque(capacidad_litros, radiacion_solar, temperatura):
+    """
+    Calcula el aporte de un termotanque solar. Acepta escalares o arrays
+    (por ejemplo, muchas capacidades o ubicaciones a la vez).
+    
+    Args:
+        capacidad_litros (float o array): Capacidad en litros
+        radiacion_solar (float o array): Radiación en kWh/m²/día
+        temperatura (float o array): Temperatura media en °C
+        
+    Returns:
+        dict: Arrays con personas abastecidas, energía necesaria y aportada por día,
+              costo y eficiencia total
+    """
+    capacidad = np.asarray(capacidad_litros, dtype=np.float64)
+    radiacion = np.asarray(radiacion_solar, dtype=np.float64)
+    temperatura = np.asarray(temperatura, dtype=np.float64)
+    
+    # Capacidad de captura normalizada para una radiación de referencia de 4 kWh/m²/día
+    factor_radiacion = np.minimum(1.0, radiacion / 4.0)
+    # Energía para elevar el agua a 45°C desde la temperatura ambiente
+    energia_necesaria_diaria = capacidad * 0.00116 * (45 - temperatura)
+    
+    return {
+        'personas_abastecidas': capacidad / 50,  # Asumiendo 50L/persona/día
+        'energia_necesaria_diaria': energia_necesaria_diaria,
+        'energia_aportada_diaria': energia_necesaria_diaria * EFICIENCIA_TERMOTANQUE * factor_radiacion,
+        'costo_estimado': COSTO_TERMOTANQUE_BASE + capacidad * COSTO_TERMOTANQUE_POR_LITRO,
+        'eficiencia_total': EFICIENCIA_TERMOTANQUE * factor_radiacion * 100
+    }
+
+def armar_resultado_termotanque(capacidad_litros, clima, calculo, indice=()):
+    """
+    Construye el dict de resultados del termotanque a partir de calcular_termotanque
+    
+    Args:
+        capacidad_litros (float): Capacidad en litros del termotanque
+        clima (dict): Datos climáticos
+        calculo (dict): Resultado de calcular_termotanque
+        indice (int o tuple): Posición de este termotanque en el cálculo
+        
+    Returns:
+        dict: Resultados de la simulación
+    """
+    energia_aportada_diaria = float(calculo['energia_aportada_diaria'][indice])
+    
+    # Crear detalle del clima seguro
+    detalle_clima = {
+        'radiacion_solar': clima.get('radiacion_solar', 4.5),
+        'temperatura': clima.get('temperatura_promedio', 18),
+        'ubicacion': clima.get('ubicacion', 'No especificada')
+    }
+    
+    return {
+        'tipo': 'termotanque_solar',
+        'capacidad_litros': round(capacidad_litros, 0),
+        'personas_abastecidas': round(float(calculo['personas_abastecidas'][indice]), 1),
+        'energia_necesaria_diaria': round(float(calculo['energia_necesaria_diaria'][indice]), 1),
+        'energia_aportada_diaria': round(energia_aportada_diaria, 1),
+        'generacion_mensual': round(energia_aportada_diaria * 30, 1),  # Para compatibilidad con otros tipos
+        'generacion_anual': round(energia_aportada_diaria * 365, 1),
+        'costo_estimado': round(float(calculo['costo_estimado'][indice]), 0),
+        'eficiencia': round(float(calculo['eficiencia_total'][indice]), 1),  # Porcentaje
+        'detalle_clima': detalle_clima
+    }
+
 def simular_termotanque(capacidad_litros, clima, consumo_mensual):
     """
     Simula una instalación de termotanque solar
@@ -437,64 +705,20 @@ def simular_termotanque(capacidad_litros, clima, consumo_mensual):
     logger.info(f"Radiación solar: {radiacion_solar}, Temperatura: {temperatura}")
     
     try:
-        # Personas que pueden abastecerse con este termotanque
-        personas_abastecidas = capacidad_litros / 50  # Asumiendo 50L/persona/día
-        
-        # Eficiencia del termotanque solar
-        eficiencia_termotanque = 0.7  # 70% de eficiencia
-        
-        # Capacidad de captura (dependiendo de la radiación solar)
-        factor_radiacion = min(1.0, radiacion_solar / 4.0)  # Normalizado para una radiación de referencia de 4 kWh/m²/día
-        
-        # Consumo típico de energía para calentamiento de agua
-        # Estimamos 1 kWh para elevar 1L de agua a 45°C desde la temperatura ambiente
-        energia_necesaria_diaria = capacidad_litros * 0.00116 * (45 - temperatura)
-        
-        # Energía aportada por el termotanque solar
-        energia_aportada_diaria = energia_necesaria_diaria * eficiencia_termotanque * factor_radiacion
-        
-        # Calcular ahorro energético
-        ahorro_mensual = energia_aportada_diaria * 30
-        ahorro_anual = energia_aportada_diaria * 365
-        
-        # Estimar costo del sistema
-        costo_base = 800  # USD (costo base del sistema)
-        costo_por_litro = 2  # USD/litro
-        costo_estimado = costo_base + capacidad_litros * costo_por_litro
-        
-        # Calcular eficiencia total
-        eficiencia_total = eficiencia_termotanque * factor_radiacion * 100
+        calculo = calcular_termotanque(capacidad_litros, radiacion_solar, temperatura)
     except Exception as e:
         logger.error(f"Error en cálculos del termotanque: {str(e)}")
         # Valores por defecto conservadores en caso de error
-        personas_abastecidas = capacidad_litros / 50
         energia_necesaria_diaria = capacidad_litros * 0.05  # Valor aproximado
-        energia_aportada_diaria = energia_necesaria_diaria * 0.5  # 50% de eficiencia como fallback
-        ahorro_mensual = energia_aportada_diaria * 30
-        ahorro_anual = energia_aportada_diaria * 365
-        costo_estimado = 800 + capacidad_litros * 2
-        eficiencia_total = 50  # 50% como valor por defecto
-    
-    # Crear detalle del clima seguro
-    detalle_clima = {
-        'radiacion_solar': radiacion_solar,
-        'temperatura': temperatura,
-        'ubicacion': clima.get('ubicacion', 'No especificada')
-    }
+        calculo = {
+            'personas_abastecidas': np.asarray(capacidad_litros / 50),
+            'energia_necesaria_diaria': np.asarray(energia_necesaria_diaria),
+            'energia_aportada_diaria': np.asarray(energia_necesaria_diaria * 0.5),  # 50% de eficiencia como fallback
+            'costo_estimado': np.asarray(COSTO_TERMOTANQUE_BASE + capacidad_litros * COSTO_TERMOTANQUE_POR_LITRO),
+            'eficiencia_total': np.asarray(50.0)  # 50% como valor por defecto
+        }
     
-    # Retornar resultados
-    resultados = {
-        'tipo': 'termotanque_solar',
-        'capacidad_litros': round(capacidad_litros, 0),
-        'personas_abastecidas': round(personas_abastecidas, 1),
-        'energia_necesaria_diaria': round(energia_necesaria_diaria, 1),
-        'energia_aportada_diaria': round(energia_aportada_diaria, 1),
-        'generacion_mensual': round(ahorro_mensual, 1),  # Para compatibilidad con otros tipos
-        'generacion_anual': round(ahorro_anual, 1),
-        'costo_estimado': round(costo_estimado, 0),
-        'eficiencia': round(eficiencia_total, 1),  # Porcentaje
-        'detalle_clima': detalle_clima
-    }
+    resultados = armar_resultado_termotanque(capacidad_litros, clima, calculo)
     
     logger.info(f"Resultados termotanque generados: {resultados}")
     return resultados
@@ -522,8 +746,8 @@ def calcular_metricas_ambientales(generacion_anual):
             generacion_anual = 0
         
         # Factores de conversión
-        factor_co2 = 0.4  # kg CO2 por kWh (varía según matriz energética)
-        factor_arboles = 0.06  # árboles equivalentes por kg CO2 (aproximación)
+        factor_co2 = FACTOR_CO2_KWH
+        factor_arboles = ARBOLES_POR_KG_CO2
         
         # Calcular ahorro de CO2
         co2_evitado = generacion_anual * factor_co2
@@ -532,8 +756,7 @@ def calcular_metricas_ambientales(generacion_anual):
         arboles_equivalentes = co2_evitado * factor_arboles
         
         # Calcular kilómetros no recorridos en auto (equivalente)
-        # Aproximadamente 0.2 kg CO2 por km en auto promedio
-        km_auto_equivalentes = co2_evitado / 0.2
+        km_auto_equivalentes = co2_evitado / KG_CO2_POR_KM
         
         metricas = {
             'co2_evitado': round(co2_evitado, 1),  # kg CO2/año
@@ -575,8 +798,12 @@ def obtener_recomendacion_avanzada(tipo_instalacion, capacidad, clima, resultado
         return generar_recomendacion_basica(tipo_instalacion, capacidad, clima, resultados_simulacion)
     
     try:
-        # Construir prompt para Deepseek
-        prompt = construir_prompt_recomendacion(tipo_instalacion, capacidad, clima, resultados_simulacion)
+        # Construir prompt para Deepseek con los datos cuantizados, para que
+        # simulaciones casi idénticas compartan la respuesta en caché
+        datos_canonicos = llm_cache.canonicalizar({'capacidad': capacidad, 'clima': clima,
+                                                    'resultados': resultados_simulacion})
+        prompt = construir_prompt_recomendacion(tipo_instalacion, datos_canonicos['capacidad'],
+                                                datos_canonicos['clima'], datos_canonicos['resultados'])
         
         # Configurar headers
         headers = {
@@ -601,59 +828,51 @@ def obtener_recomendacion_avanzada(tipo_instalacion, capacidad, clima, resultado
             "max_tokens": 800
         }
         
-        logger.info(f"Enviando consulta a Deepseek para recomendación de {tipo_instalacion}")
-        
-        # Enviar solicitud a la API
-        response = requests.post(
-            DEEPSEEK_API_URL,
-            headers=headers,
-            data=json.dumps(payload),
-            timeout=10
-        )
-        
-        # Verificar respuesta
-        if response.status_code == 200:
+        def consultar_deepseek():
+            logger.info(f"Enviando consulta a Deepseek para recomendación de {tipo_instalacion}")
+            
+            # Enviar solicitud a la API
+            response = http_cliente.post(
+                DEEPSEEK_API_URL,
+                headers=headers,
+                data=json.dumps(payload),
+                timeout=10
+            )
+            
+            # Verificar respuesta
+            if response.status_code != 200:
+                logger.error(f"Error en la respuesta de Deepseek: {response.status_code} - {response.text}")
+                return None
+            
             respuesta = response.json()
             contenido = respuesta.get('choices', [{}])[0].get('message', {}).get('content', '')
-            
-            if contenido:
-                logger.info("Recomendación de Deepseek recibida con éxito")
-                
-                # Parsear la respuesta en formato JSON si es posible
-                try:
-                    # Intentar extraer JSON si existe en la respuesta
-                    import re
-                    json_match = re.search(r'\{.*\}', contenido, re.DOTALL)
-                    
-                    if json_match:
-                        json_str = json_match.group(0)
-                        recomendacion = json.loads(json_str)
-                    else:
-                        # Si no hay JSON, crear estructura con el texto completo
-                        recomendacion = {
-                            "recomendacion_principal": contenido[:150] + "...",
-                            "detalles": contenido,
-                            "consejos": ["Optimiza la orientación del sistema", 
-                                        "Considera la limpieza y mantenimiento periódicos",
-                                        "Evalúa la posibilidad de ampliar el sistema en el futuro"]
-                        }
-                        
-                    return recomendacion
-                    
-                except Exception as e:
-                    logger.error(f"Error al procesar respuesta JSON: {str(e)}")
-                    # Devolver la respuesta en texto plano si falla el parsing
-                    return {
-                        "recomendacion_principal": contenido[:150] + "...",
-                        "detalles": contenido,
-                        "consejos": ["Optimiza la orientación del sistema", 
-                                    "Considera la limpieza y mantenimiento periódicos",
-                                    "Evalúa la posibilidad de ampliar el sistema en el futuro"]
-                    }
-            else:
+            if not contenido:
                 logger.warning("Respuesta de Deepseek vacía")
-        else:
-            logger.error(f"Error en la respuesta de Deepseek: {response.status_code} - {response.text}")
+                return None
+            
+            logger.info("Recomendación de Deepseek recibida con éxito")
+            
+            # Parsear la respuesta en formato JSON si es posible
+            try:
+                # Intentar extraer JSON si existe en la respuesta
+                json_match = re.search(r'\{.*\}', contenido, re.DOTALL)
+                if json_match:
+                    return json.loads(json_match.group(0))
+            except Exception as e:
+                logger.error(f"Error al procesar respuesta JSON: {str(e)}")
+            
+            # Si no hay JSON válido, crear estructura con el texto completo
+            return {
+                "recomendacion_principal": contenido[:150] + "...",
+                "detalles": contenido,
+                "consejos": ["Optimiza la orientación del sistema", 
+                            "Considera la limpieza y mantenimiento periódicos",
+                            "Evalúa la posibilidad de ampliar el sistema en el futuro"]
+            }
+        
+        recomendacion = llm_cache.consultar('simulacion', payload, consultar_deepseek)
+        if recomendacion is not None:
+            return recomendacion
             
     except Exception as e:
         logger.error(f"Error al obtener recomendación avanzada: {str(e)}")
@@ -705,14 +924,14 @@ Con base en estos datos, proporciona:
 
 Formato de la respuesta:
 ```json
-{
+{{
   "recomendacion_principal": "Una recomendación concisa de una o dos frases",
   "viabilidad": "Alta/Media/Baja", 
   "detalles": "Explicación detallada de la recomendación",
   "consejos": ["Consejo 1", "Consejo 2", "Consejo 3"],
   "mantenimiento": "Recomendaciones de mantenimiento",
   "vida_util": "Información sobre vida útil"
-}
+}}
 ```
 """
     return prompt
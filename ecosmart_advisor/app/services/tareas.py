@@ -0,0 +1,138 @@
+"""
+Ejecución en segundo plano de las consultas a la IA con plazo por solicitud.
+
+Las consultas a Deepseek se lanzan en un pool de hilos compartido apenas se
+conocen sus datos, mientras el hilo de la solicitud sigue con los cálculos
+deterministas. Al final se espera la respuesta solo hasta el plazo de la
+solicitud: si no llegó, se usa el respaldo basado en reglas y la consulta
+sigue corriendo, de modo que su respuesta queda en la caché de la IA para la
+próxima vez. Así la latencia de la página queda acotada por el plazo y no por
+Deepseek.
+"""
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturoVencido
+from dotenv import load_dotenv
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Tiempo máximo (segundos) que una solicitud espera a la IA, contado desde su inicio
+IA_PLAZO_SEGUNDOS = float(os.environ.get("IA_PLAZO_SEGUNDOS", "4"))
+IA_HILOS = int(os.environ.get("IA_HILOS", "8"))
+
+_pool = None
+_pid = None
+_lock = threading.Lock()
+
+_metricas = {'a_tiempo': 0, 'vencidas': 0, 'errores': 0}
+_lock_metricas = threading.Lock()
+
+
+def obtener_pool():
+    """
+    Pool de hilos del proceso; se crea de nuevo después de un fork, porque los
+    hilos del proceso maestro de gunicorn no pasan a los workers
+    """
+    global _pool, _pid
+    if _pool is None or _pid != os.getpid():
+        with _lock:
+            if _pool is None or _pid != os.getpid():
+                _pool = ThreadPoolExecutor(max_workers=IA_HILOS, thread_name_prefix="ecosmart-ia")
+                _pid = os.getpid()
+    return _pool
+
+
+def limite_desde(plazo=None, inicio=None):
+    """
+    Instante límite (reloj monotónico) de una solicitud
+
+    Args:
+        plazo (float, optional): Segundos disponibles (por defecto IA_PLAZO_SEGUNDOS)
+        inicio (float, optional): Inicio de la solicitud (por defecto, ahora)
+
+    Returns:
+        float: Valor de time.monotonic() en el que vence el plazo
+    """
+    plazo = IA_PLAZO_SEGUNDOS if plazo is None else plazo
+    return (time.monotonic() if inicio is None else inicio) + plazo
+
+
+def lanzar(funcion, *args, **kwargs):
+    """
+    Ejecuta una función en el pool compartido
+
+    Returns:
+        concurrent.futures.Future: Futuro con el resultado
+    """
+    return obtener_pool().submit(funcion, *args, **kwargs)
+
+
+def _registrar(evento):
+    with _lock_metricas:
+        _metricas[evento] += 1
+
+
+def esperar(futuro, limite, respaldo, descripcion='consulta a la IA'):
+    """
+    Espera el resultado de un futuro hasta el instante límite
+
+    Args:
+        futuro (Future): Tarea lanzada con `lanzar`
+        limite (float): Instante límite según time.monotonic()
+        respaldo (callable): Función sin argumentos que genera la respuesta
+                             de respaldo si vence el plazo o la tarea falla
+        descripcion (str): Descripción para los registros
+
+    Returns:
+        Resultado de la tarea o del respaldo
+    """
+    restante = max(0.0, limite - time.monotonic())
+    try:
+        resultado = futuro.result(timeout=restante)
+        _registrar('a_tiempo')
+        return resultado
+    except FuturoVencido:
+        # La tarea sigue en segundo plano y su respuesta se guardará en la caché
+        _registrar('vencidas')
+        logger.warning(f"Plazo vencido esperando {descripcion}, se usa la respuesta de respaldo")
+    except Exception as e:
+        _registrar('errores')
+        logger.error(f"Error en {descripcion}: {str(e)}")
+    return respaldo()
+
+
+def ejecutar_con_plazo(funcion, args=(), plazo=None, respaldo=None, descripcion='consulta a la IA'):
+    """
+    Lanza una función en el pool y espera su resultado como máximo `plazo` segundos
+
+    Args:
+        funcion (callable): Función a ejecutar
+        args (tuple): Argumentos de la función
+        plazo (float, optional): Segundos de espera (por defecto IA_PLAZO_SEGUNDOS)
+        respaldo (callable, optional): Respuesta si vence el plazo (por defecto None)
+        descripcion (str): Descripción para los registros
+
+    Returns:
+        Resultado de la función o del respaldo
+    """
+    limite = limite_desde(plazo)
+    return esperar(lanzar(funcion, *args), limite, respaldo or (lambda: None), descripcion)
+
+
+def estadisticas_tareas():
+    """
+    Returns:
+        dict: Plazo configurado y cantidad de consultas a tiempo, vencidas y con error
+    """
+    with _lock_metricas:
+        metricas = dict(_metricas)
+    metricas['plazo_segundos'] = IA_PLAZO_SEGUNDOS
+    metricas['hilos'] = IA_HILOS
+    return metricas
@@ -5,7 +5,14 @@ sistema de reglas como fallback.
 """
 import os
 import json
-import requests
+import time
+import hashlib
+import random
+import threading
+from ecosmart_advisor.app.services import http_cliente
+from ecosmart_advisor.app.services import llm_cache
+from ecosmart_advisor.app.services import tareas
+from ecosmart_advisor.app.services.localidades import normalizar
 import logging
 from dotenv import load_dotenv
 
@@ -14,7 +21,7 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 # Importar el chatbot original para usar como fallback
-from .chatbot import generar_respuesta_chatbot as respuesta_fallback
+from .chatbot import generar_respuesta_chatbot as respuesta_fallback, PREGUNTAS_EJEMPLO
 
 # Cargar variables de entorno
 load_dotenv()
@@ -22,6 +29,58 @@ load_dotenv()
 # Configurar la API de Deepseek
 DEEPSEEK_API_KEY = os.environ.get("DEEPSEEK_API_KEY")
 DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
+MODELO_DEEPSEEK = "deepseek-chat"
+
+# Mensaje del sistema de las respuestas del chatbot
+PROMPT_SISTEMA = (
+    "Eres un asistente virtual especializado en energías renovables para EcoSmart Advisor. "
+    "Tu objetivo es educar a los usuarios sobre energías renovables (solar, eólica, termotanque solar) "
+    "y guiarlos en el uso de la plataforma. "
+    "Responde en español de manera concisa, precisa y educativa. "
+    "Incluye datos técnicos relevantes pero presentados de forma accesible. "
+    "Tus respuestas no deben exceder los 200 palabras. "
+    "Si te preguntan sobre precios, da rangos aproximados actualizados. "
+    "Sugiere usar las herramientas de diagnóstico y simulación de la plataforma "
+    "cuando sea apropiado. Mantén un tono amigable y profesional. "
+    "Enfócate solo en responder la pregunta sin agregar información innecesaria."
+)
+
+# Las respuestas por pregunta se guardan con esta versión en la clave, así
+# que cambiar el prompt o el modelo no sirve respuestas generadas con los anteriores
+VERSION_PROMPT = hashlib.sha256(f"{MODELO_DEEPSEEK}\n{PROMPT_SISTEMA}".encode('utf-8')).hexdigest()[:12]
+
+# El prompt de sugerencias solo usa el comienzo de la respuesta, así que en el
+# modo streaming se piden apenas llegan estos caracteres
+CARACTERES_CONTEXTO_SUGERENCIAS = 200
+SUGERENCIAS_PLAZO_SEGUNDOS = float(os.environ.get("SUGERENCIAS_PLAZO_SEGUNDOS", "5"))
+
+# Respuestas por pregunta: las preguntas sin historial y las preguntas
+# frecuentes se guardan con la pregunta normalizada como clave, y al arrancar
+# cada worker se precargan las preguntas frecuentes
+CHATBOT_PRECARGA = os.environ.get("CHATBOT_PRECARGA", "1").lower() not in ("0", "false", "no")
+CHATBOT_PREGUNTAS_FRECUENTES = os.environ.get("CHATBOT_PREGUNTAS_FRECUENTES")  # archivo, una pregunta por línea
+
+# Sugerencias cuando no se pueden generar con la IA
+SUGERENCIAS_PREDETERMINADAS = [
+    "¿Cuánto cuesta instalar paneles solares?",
+    "¿Qué sistema de energía renovable me conviene?",
+    "¿Cómo funciona el termotanque solar?",
+    "¿Cuál es el retorno de inversión de la energía solar?",
+    "¿Qué mantenimiento requieren los sistemas eólicos?"
+]
+
+# Preguntas que la interfaz ofrece como sugerencias
+PREGUNTAS_INTERFAZ = [
+    "¿Qué sistema de energía renovable me conviene?",
+    "¿Cuánto cuesta instalar paneles solares?",
+    "¿Cuánto puedo ahorrar con energía renovable?",
+    "¿Qué es un termotanque solar?",
+    "¿Qué sistema de energía renovable es más económico?",
+    "¿Para qué sirve el simulador?"
+]
+
+_precarga_pid = None
+_lock_precarga = threading.Lock()
 
 logger.info("Inicializando chatbot educativo con IA")
 
@@ -48,57 +107,18 @@ def generar_respuesta_ia(pregunta, historial_conversacion=None):
         historial_conversacion = []
     
     try:
-        # Construir el prompt para Deepseek
-        prompt = construir_prompt(pregunta, historial_conversacion)
-        
-        # Preparar payload para la API de Deepseek
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {DEEPSEEK_API_KEY}"
-        }
-        
-        # Construir los mensajes incluyendo el historial
-        messages = [
-            {
-                "role": "system", 
-                "content": (
-                    "Eres un asistente virtual especializado en energías renovables para EcoSmart Advisor. "
-                    "Tu objetivo es educar a los usuarios sobre energías renovables (solar, eólica, termotanque solar) "
-                    "y guiarlos en el uso de la plataforma. "
-                    "Responde en español de manera concisa, precisa y educativa. "
-                    "Incluye datos técnicos relevantes pero presentados de forma accesible. "
-                    "Tus respuestas no deben exceder los 200 palabras. "
-                    "Si te preguntan sobre precios, da rangos aproximados actualizados. "
-                    "Sugiere usar las herramientas de diagnóstico y simulación de la plataforma "
-                    "cuando sea apropiado. Mantén un tono amigable y profesional. "
-                    "Enfócate solo en responder la pregunta sin agregar información innecesaria."
-                )
-            }
-        ]
-        
-        # Añadir el historial de conversación
-        for mensaje in historial_conversacion[-6:]:  # Incluir sólo los últimos 6 mensajes
-            messages.append({
-                "role": "user" if mensaje["rol"] == "usuario" else "assistant",
-                "content": mensaje["contenido"]
-            })
-        
-        # Añadir la pregunta actual
-        messages.append({"role": "user", "content": pregunta})
-        
-        payload = {
-            "model": "deepseek-chat",
-            "messages": messages,
-            "temperature": 0.7,
-            "top_p": 0.95,
-            "max_tokens": 500
-        }
+        espacio, consulta, payload = _consulta_cache(pregunta, historial_conversacion)
+        headers = _cabeceras()
         
-        # Realizar la petición a la API
-        response = requests.post(DEEPSEEK_API_URL, json=payload, headers=headers, timeout=10)
-        
-        # Verificar la respuesta
-        if response.status_code == 200:
+        def consultar_deepseek():
+            # Realizar la petición a la API
+            response = http_cliente.post(DEEPSEEK_API_URL, json=payload, headers=headers, timeout=10)
+            
+            # Verificar la respuesta
+            if response.status_code != 200:
+                logger.error(f"Error en la petición a Deepseek: {response.status_code} - {response.text}")
+                return None
+            
             data = response.json()
             content = data['choices'][0]['message']['content']
             
@@ -109,13 +129,16 @@ def generar_respuesta_ia(pregunta, historial_conversacion=None):
                 "respuesta": content,
                 "sugerencias": sugerencias
             }
-        else:
-            logger.error(f"Error en la petición a Deepseek: {response.status_code} - {response.text}")
-            # Usar el sistema de fallback
-            return {
-                "respuesta": respuesta_fallback(pregunta),
-                "sugerencias": generar_sugerencias_preguntas(pregunta)
-            }
+        
+        resultado = llm_cache.consultar(espacio, consulta, consultar_deepseek)
+        if resultado is not None:
+            return resultado
+        
+        # Usar el sistema de fallback
+        return {
+            "respuesta": respuesta_fallback(pregunta),
+            "sugerencias": generar_sugerencias_preguntas(pregunta)
+        }
         
     except Exception as e:
         logger.error(f"Error al procesar la respuesta con Deepseek: {str(e)}")
@@ -125,6 +148,271 @@ def generar_respuesta_ia(pregunta, historial_conversacion=None):
             "sugerencias": generar_sugerencias_preguntas(pregunta)
         }
 
+def generar_respuesta_ia_stream(pregunta, historial_conversacion=None):
+    """
+    Variante de generar_respuesta_ia que entrega la respuesta a medida que
+    Deepseek la genera.
+    
+    Las sugerencias se piden en paralelo apenas se conoce el comienzo de la
+    respuesta y se entregan al final. La respuesta completa se guarda en la
+    misma entrada de caché que usa generar_respuesta_ia (ver _consulta_cache).
+    
+    Args:
+        pregunta (str): Pregunta del usuario
+        historial_conversacion (list, optional): Historial de la conversación
+        
+    Yields:
+        tuple: (evento, datos): 'token' con {'texto'}, 'sugerencias' con
+               {'sugerencias'} y por último 'fin' con {'respuesta', 'origen'}
+    """
+    if pregunta is None:
+        texto = "Por favor, ingresa una pregunta sobre energías renovables para que pueda ayudarte."
+        yield 'token', {'texto': texto}
+        yield 'sugerencias', {'sugerencias': []}
+        yield 'fin', {'respuesta': texto, 'origen': 'reglas'}
+        return
+    
+    espacio, consulta, payload = _consulta_cache(pregunta, historial_conversacion or [])
+    
+    guardada = llm_cache.obtener(espacio, consulta)
+    if guardada is not None:
+        yield 'token', {'texto': guardada['respuesta']}
+        yield 'sugerencias', {'sugerencias': guardada['sugerencias']}
+        yield 'fin', {'respuesta': guardada['respuesta'], 'origen': 'cache'}
+        return
+    
+    partes = []
+    largo = 0
+    futuro_sugerencias = None
+    completa = False
+    inicio = time.perf_counter()
+    try:
+        if DEEPSEEK_API_KEY:
+            for fragmento in _fragmentos_deepseek(payload):
+                partes.append(fragmento)
+                largo += len(fragmento)
+                yield 'token', {'texto': fragmento}
+                if futuro_sugerencias is None and largo >= CARACTERES_CONTEXTO_SUGERENCIAS:
+                    futuro_sugerencias = tareas.lanzar(generar_sugerencias_preguntas, pregunta, ''.join(partes))
+            completa = True
+    except Exception as e:
+        logger.error(f"Error en el stream de Deepseek: {str(e)}")
+    
+    respuesta = ''.join(partes)
+    if not respuesta:
+        # Sin respuesta de la IA: usar el sistema de fallback
+        respuesta = respuesta_fallback(pregunta)
+        yield 'token', {'texto': respuesta}
+        yield 'sugerencias', {'sugerencias': generar_sugerencias_preguntas(pregunta)}
+        yield 'fin', {'respuesta': respuesta, 'origen': 'reglas'}
+        return
+    
+    if futuro_sugerencias is None:
+        futuro_sugerencias = tareas.lanzar(generar_sugerencias_preguntas, pregunta, respuesta)
+    sugerencias = tareas.esperar(
+        futuro_sugerencias,
+        tareas.limite_desde(SUGERENCIAS_PLAZO_SEGUNDOS),
+        lambda: generar_sugerencias_preguntas(pregunta),
+        'sugerencias del chatbot'
+    )
+    
+    # Una respuesta cortada a mitad de camino no se guarda
+    resultado = {"respuesta": respuesta, "sugerencias": sugerencias} if completa else None
+    llm_cache.registrar_respuesta(espacio, consulta, resultado, time.perf_counter() - inicio)
+    
+    yield 'sugerencias', {'sugerencias': sugerencias}
+    yield 'fin', {'respuesta': respuesta, 'origen': 'ia'}
+
+def clave_pregunta(pregunta):
+    """
+    Forma normalizada de una pregunta: minúsculas, sin acentos ni signos
+    """
+    return normalizar(pregunta)
+
+def clave_cache_pregunta(pregunta):
+    """
+    Clave de la respuesta compartida de una pregunta: la pregunta normalizada
+    precedida por la versión del prompt y del modelo
+    """
+    return f"{VERSION_PROMPT}:{clave_pregunta(pregunta)}"
+
+def pregunta_independiente(pregunta, historial_conversacion=None):
+    """
+    Indica si la respuesta a una pregunta no depende de la conversación previa:
+    sin historial, o una de las preguntas frecuentes fijas. Las sugerencias que
+    genera la IA son preguntas de seguimiento y se responden con el historial.
+    
+    Args:
+        pregunta (str): Pregunta del usuario
+        historial_conversacion (list, optional): Historial de la conversación
+        
+    Returns:
+        bool: True si la respuesta puede compartirse entre conversaciones
+    """
+    if not historial_conversacion:
+        return True
+    return clave_pregunta(pregunta) in _FRECUENTES_NORMALIZADAS
+
+def _consulta_cache(pregunta, historial_conversacion):
+    """
+    Espacio y clave de caché de una pregunta, y el payload para Deepseek
+    
+    Las preguntas independientes de la conversación se consultan sin historial
+    y se guardan por pregunta normalizada; el resto, por payload completo.
+    
+    Returns:
+        tuple: (espacio, consulta, payload)
+    """
+    if pregunta_independiente(pregunta, historial_conversacion):
+        return 'chatbot_pregunta', clave_cache_pregunta(pregunta), construir_payload(pregunta, [])
+    # La clave normaliza mayúsculas, espacios y signos de la pregunta y el historial
+    payload = construir_payload(pregunta, historial_conversacion)
+    return 'chatbot', payload, payload
+
+def preguntas_frecuentes():
+    """
+    Preguntas que se precargan en la caché: las sugeridas por la interfaz, las
+    sugerencias predeterminadas, las preguntas de ejemplo y las del archivo
+    CHATBOT_PREGUNTAS_FRECUENTES si está configurado
+    
+    Returns:
+        list: Preguntas sin repetir (según su forma normalizada)
+    """
+    preguntas = PREGUNTAS_INTERFAZ + SUGERENCIAS_PREDETERMINADAS + list(PREGUNTAS_EJEMPLO)
+    if CHATBOT_PREGUNTAS_FRECUENTES:
+        try:
+            with open(CHATBOT_PREGUNTAS_FRECUENTES, encoding='utf-8') as archivo:
+                preguntas += [linea.strip() for linea in archivo if linea.strip() and not linea.startswith('#')]
+        except OSError as e:
+            logger.warning(f"No se pudo leer el archivo de preguntas frecuentes: {str(e)}")
+    
+    unicas = {}
+    for pregunta in preguntas:
+        unicas.setdefault(clave_pregunta(pregunta), pregunta)
+    return list(unicas.values())
+
+def precargar_respuestas(preguntas=None):
+    """
+    Genera y guarda en la caché las respuestas de las preguntas frecuentes que
+    todavía no están. Se recorren en orden aleatorio para que los workers que
+    arrancan a la vez no consulten las mismas preguntas.
+    
+    Args:
+        preguntas (list, optional): Preguntas a precargar (por defecto, preguntas_frecuentes())
+        
+    Returns:
+        int: Cantidad de respuestas generadas
+    """
+    if not DEEPSEEK_API_KEY or not llm_cache.LLM_CACHE_HABILITADA:
+        return 0
+    
+    preguntas = list(preguntas_frecuentes() if preguntas is None else preguntas)
+    random.shuffle(preguntas)
+    generadas = 0
+    for pregunta in preguntas:
+        if llm_cache.contiene('chatbot_pregunta', clave_cache_pregunta(pregunta)):
+            continue
+        generar_respuesta_ia(pregunta)
+        generadas += llm_cache.contiene('chatbot_pregunta', clave_cache_pregunta(pregunta))
+    logger.info(f"Precarga del chatbot: {generadas} respuestas generadas de {len(preguntas)} preguntas frecuentes")
+    return generadas
+
+def iniciar_precarga():
+    """
+    Lanza la precarga de respuestas en segundo plano, una vez por proceso.
+    Se llama al atender la primera petición de cada worker (no al importar,
+    para no crear hilos en el proceso maestro de gunicorn antes del fork).
+    
+    Returns:
+        Future o None: Tarea lanzada, o None si ya se lanzó o está deshabilitada
+    """
+    global _precarga_pid
+    if not CHATBOT_PRECARGA or _precarga_pid == os.getpid():
+        return None
+    with _lock_precarga:
+        if _precarga_pid == os.getpid():
+            return None
+        _precarga_pid = os.getpid()
+    return tareas.lanzar(precargar_respuestas)
+
+def _fragmentos_deepseek(payload):
+    """
+    Consulta a Deepseek en modo streaming y devuelve los fragmentos de texto
+    a medida que llegan (eventos SSE "data: {...}" terminados en "data: [DONE]").
+    
+    Args:
+        payload (dict): Payload de la consulta (sin "stream")
+        
+    Yields:
+        str: Fragmento de la respuesta
+    """
+    response = http_cliente.post(DEEPSEEK_API_URL, json=dict(payload, stream=True),
+                                 headers=_cabeceras(), timeout=10, stream=True)
+    try:
+        if response.status_code != 200:
+            logger.error(f"Error en la petición a Deepseek: {response.status_code} - {response.text}")
+            return
+        
+        # Las líneas se decodifican de a una: un carácter multibyte nunca queda partido
+        for linea in response.iter_lines():
+            if not linea.startswith(b'data:'):
+                continue
+            datos = linea[5:].strip()
+            if datos == b'[DONE]':
+                return
+            delta = json.loads(datos.decode('utf-8'))['choices'][0].get('delta') or {}
+            if delta.get('content'):
+                yield delta['content']
+    finally:
+        response.close()
+
+def _cabeceras():
+    """Cabeceras de las peticiones a Deepseek"""
+    return {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {DEEPSEEK_API_KEY}"
+    }
+
+def construir_payload(pregunta, historial_conversacion):
+    """
+    Construye el payload de la consulta a Deepseek, con el historial reciente.
+    
+    Args:
+        pregunta (str): Pregunta del usuario
+        historial_conversacion (list): Historial de la conversación
+        
+    Returns:
+        dict: Payload para la API (también es la clave de la caché)
+    """
+    # Construir el prompt para Deepseek
+    prompt = construir_prompt(pregunta, historial_conversacion)
+    
+    # Construir los mensajes incluyendo el historial
+    messages = [
+        {
+            "role": "system", 
+            "content": PROMPT_SISTEMA
+        }
+    ]
+    
+    # Añadir el historial de conversación
+    for mensaje in historial_conversacion[-6:]:  # Incluir sólo los últimos 6 mensajes
+        messages.append({
+            "role": "user" if mensaje["rol"] == "usuario" else "assistant",
+            "content": mensaje["contenido"]
+        })
+    
+    # Añadir la pregunta actual
+    messages.append({"role": "user", "content": prompt})
+    
+    return {
+        "model": MODELO_DEEPSEEK,
+        "messages": messages,
+        "temperature": 0.7,
+        "top_p": 0.95,
+        "max_tokens": 500
+    }
+
 def construir_prompt(pregunta, historial):
     """
     Construye un prompt detallado para la consulta a Deepseek AI.
@@ -150,15 +438,6 @@ def generar_sugerencias_preguntas(pregunta, respuesta=None):
     Returns:
         list: Lista de preguntas sugeridas
     """
-    # Sugerencias básicas predeterminadas
-    sugerencias_default = [
-        "¿Cuánto cuesta instalar paneles solares?",
-        "¿Qué sistema de energía renovable me conviene?",
-        "¿Cómo funciona el termotanque solar?",
-        "¿Cuál es el retorno de inversión de la energía solar?",
-        "¿Qué mantenimiento requieren los sistemas eólicos?"
-    ]
-    
     try:
         # Si tenemos una respuesta de la IA, usarla para generar sugerencias más relevantes
         if respuesta and DEEPSEEK_API_KEY:
@@ -190,7 +469,7 @@ def generar_sugerencias_preguntas(pregunta, respuesta=None):
             }
             
             # Realizar la petición a la API
-            response = requests.post(DEEPSEEK_API_URL, json=payload, headers=headers, timeout=5)
+            response = http_cliente.post(DEEPSEEK_API_URL, json=payload, headers=headers, timeout=5)
             
             # Verificar la respuesta
             if response.status_code == 200:
@@ -214,8 +493,11 @@ def generar_sugerencias_preguntas(pregunta, respuesta=None):
                     logger.error(f"Error al procesar sugerencias: {str(e)}")
         
         # Si no pudimos generar sugerencias personalizadas, usar las predeterminadas
-        return sugerencias_default[:3]
+        return SUGERENCIAS_PREDETERMINADAS[:3]
         
     except Exception as e:
         logger.error(f"Error al generar sugerencias: {str(e)}")
-        return sugerencias_default[:3]
\ No newline at end of file
+        return SUGERENCIAS_PREDETERMINADAS[:3]
+
+# Preguntas frecuentes normalizadas (se calculan al final, cuando ya están definidas las funciones)
+_FRECUENTES_NORMALIZADAS = frozenset(clave_pregunta(pregunta) for pregunta in preguntas_frecuentes())
@@ -4,7 +4,15 @@ basado en un sistema de reglas para responder preguntas de usuarios.
 No requiere APIs externas de IA.
 """
 import os
+import logging
 from dotenv import load_dotenv
+from ecosmart_advisor.app.services.localidades import normalizar
+from .coincidencias import AutomataPalabras
+from .indice import IndiceBM25
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
 
 # Cargar variables de entorno
 load_dotenv()
@@ -110,6 +118,84 @@ CONOCIMIENTO_BASE = {
     )
 }
 
+# Preguntas de ejemplo específicas que mostramos en la interfaz
+PREGUNTAS_EJEMPLO = {
+    "¿qué sistema de energía renovable me conviene?": 
+        "Para determinar qué sistema de energía renovable te conviene, necesitamos considerar varios factores: tu ubicación geográfica, consumo energético, presupuesto disponible y espacio. En general, los paneles solares son versátiles y funcionan bien en la mayoría de las regiones con buena exposición solar. Los sistemas eólicos son mejores en áreas con vientos constantes. Los termotanques solares son una excelente opción si buscas reducir el consumo para calentar agua. Te recomiendo usar nuestra herramienta de diagnóstico que analizará tu situación particular y te dará una recomendación personalizada.",
+    
+    "¿cuánto cuesta instalar paneles solares?": 
+        "El costo de instalar paneles solares varía según la capacidad del sistema, calidad de los componentes y tu ubicación. En promedio, un sistema residencial de 3-5 kW puede costar entre $1,000 y $3,000 USD por kW instalado, incluyendo paneles, inversor, estructura, instalación y trámites. Los factores que más influyen son: capacidad total (kW), tipo y eficiencia de los paneles, tipo de instalación (techo o suelo), complejidad del montaje y costos laborales locales. El retorno de inversión suele ser de 4-7 años, dependiendo de las tarifas eléctricas de tu zona.",
+    
+    "¿cuánto puedo ahorrar con energía renovable?": 
+        "El ahorro con energía renovable depende de varios factores: tu consumo actual, costo de la electricidad en tu zona, tamaño y tipo del sistema instalado. En promedio, un sistema solar bien dimensionado puede reducir tu factura eléctrica entre un 50% y 90%. Un termotanque solar puede reducir el costo de calentar agua en 70-80%. Con sistemas de baterías, el ahorro puede ser aún mayor. A largo plazo, considerando que estos sistemas duran 25-30 años y las tarifas eléctricas tienden a aumentar, el ahorro acumulado puede superar varias veces la inversión inicial.",
+    
+    "¿qué es un termotanque solar?": 
+        "Un termotanque solar es un sistema que utiliza la energía del sol para calentar agua sin consumir electricidad o gas. Consta de colectores solares (donde el agua o un fluido caloportador se calienta) y un tanque aislado térmicamente para almacenar el agua caliente. Existen dos tipos principales: circulación natural (termosifón) donde el agua circula por diferencia de densidad, y circulación forzada que usa una pequeña bomba. Son muy eficientes, pudiendo reducir hasta un 80% del consumo energético para calentar agua y tienen una vida útil de 15-20 años con mínimo mantenimiento.",
+        
+    "¿qué sistema de energía renovable es más económico?": 
+        "El sistema de energía renovable más económico en términos de inversión inicial suele ser el termotanque solar, con costos desde $800-1,500 USD para una familia pequeña. Ofrece un excelente retorno de inversión (2-4 años) al reducir significativamente el consumo para calentar agua. Los paneles solares fotovoltaicos tienen una inversión inicial mayor ($3,000-9,000 USD para sistemas residenciales), pero generan electricidad para todos tus equipos con retornos de inversión de 4-7 años. Los sistemas eólicos domésticos suelen tener costos similares a los solares pero requieren condiciones de viento específicas. La opción más económica para tu caso específico dependerá de tu consumo, ubicación y necesidades particulares.",
+        
+    "¿para qué sirve el simulador?": 
+        "El simulador de EcoSmart Advisor te permite probar diferentes configuraciones de sistemas de energía renovable sin compromiso y ver resultados personalizados en tiempo real. Puedes ajustar parámetros como la capacidad de paneles solares, potencia de aerogeneradores o tamaño de termotanques, y obtener estimaciones de generación energética, ahorro económico e impacto ambiental. El simulador toma en cuenta tu ubicación geográfica, consumo energético y datos climáticos locales para brindarte resultados precisos. Es una herramienta ideal para explorar opciones antes de decidirte por una inversión específica."
+}
+
+# Respuestas a preguntas específicas (ver verificar_casos_especiales)
+CASOS_ESPECIALES = {
+    "mejor sistema recomendado": (
+        "La mejor opción depende de varios factores específicos de tu ubicación y necesidades. "
+        "En general, los sistemas solares fotovoltaicos son los más versátiles y fáciles de instalar "
+        "en entornos urbanos. Los sistemas eólicos son más efectivos en zonas rurales o costeras "
+        "con buena exposición al viento. Los termotanques solares ofrecen excelente relación "
+        "costo-beneficio para calentar agua. Te recomendamos usar nuestro diagnóstico "
+        "personalizado para obtener una recomendación específica para tu caso."
+    ),
+    "como funcionan los paneles solares": (
+        "Los paneles solares fotovoltaicos funcionan convirtiendo la luz solar en electricidad "
+        "mediante el efecto fotoeléctrico. Están compuestos por células solares de silicio que, "
+        "al recibir fotones de luz, generan un flujo de electrones (corriente continua). "
+        "Esta electricidad luego pasa por un inversor que la convierte en corriente alterna "
+        "utilizable en el hogar. La eficiencia típica de conversión está entre 15-22% "
+        "dependiendo de la tecnología del panel."
+    ),
+    "como funciona la energia eolica": (
+        "Los aerogeneradores convierten la energía cinética del viento en electricidad. "
+        "Las palas del aerogenerador, diseñadas aerodinámicamente, giran cuando el viento "
+        "las empuja, moviendo un eje conectado a un generador. Este generador transforma "
+        "la energía mecánica en electricidad. Los sistemas domésticos suelen comenzar a "
+        "generar con vientos de 3-4 m/s y alcanzan su máxima potencia con vientos de "
+        "11-15 m/s, dependiendo del modelo."
+    ),
+    "costo paneles solares fotovoltaicos": (
+        "El costo de los sistemas solares fotovoltaicos varía según la capacidad y calidad. "
+        "Una instalación doméstica típica (3-5 kW) puede costar entre $1,000-$1,500 por kW "
+        "instalado, incluyendo paneles, inversor y montaje. Para una casa promedio, esto "
+        "significa una inversión de $3,000-$7,500. Los sistemas premium con baterías y "
+        "monitorización avanzada pueden costar más. Sin embargo, con los incentivos y el "
+        "ahorro en la factura eléctrica, el retorno de inversión suele ser de 4-8 años."
+    ),
+    "costo sistemas eolicos": (
+        "Los sistemas eólicos domésticos tienen un costo aproximado de $2,000-$5,000 por "
+        "kW de capacidad instalada. Un sistema pequeño (1-3 kW) para una casa puede costar "
+        "entre $3,000-$15,000 dependiendo del fabricante, altura de la torre y equipamiento "
+        "adicional. Son generalmente más costosos que los sistemas solares para la misma "
+        "capacidad, pero pueden ser más eficientes en ubicaciones con buen recurso eólico."
+    ),
+    "costo termotanque solar": (
+        "Un sistema de termotanque solar para una familia típica (150-300 litros) "
+        "cuesta entre $800-$2,500 dependiendo de la capacidad, tipo de colector (plano o "
+        "tubos de vacío) y si incluye un sistema de respaldo. Son una de las inversiones "
+        "en energía renovable con mejor retorno, generalmente entre 2-5 años, especialmente "
+        "si sustituyen a sistemas eléctricos de calentamiento de agua."
+    )
+}
+
+# Puntuación de las coincidencias
+PESO_PALABRA_CLAVE = 0.8
+PESO_TERMINO_EXACTO = 0.6
+PESO_TERMINO_PARCIAL = 0.3
+UMBRAL_COINCIDENCIA = 0.3  # Puntuación mínima para considerar una coincidencia como relevante
+BM25_PUNTAJE_MINIMO = float(os.environ.get("CHATBOT_BM25_MINIMO", "2.5"))  # Relevancia mínima en el índice
+
 def generar_respuesta_chatbot(pregunta):
     """
     Genera una respuesta educativa a preguntas sobre energía renovable
@@ -128,97 +214,106 @@ def generar_respuesta_chatbot(pregunta):
     
     # Limpiar y preparar la pregunta
     pregunta_limpia = pregunta.lower().strip()
-    
-    # Manejar preguntas de ejemplo específicas que mostramos en la interfaz
-    preguntas_ejemplo = {
-        "¿qué sistema de energía renovable me conviene?": 
-            "Para determinar qué sistema de energía renovable te conviene, necesitamos considerar varios factores: tu ubicación geográfica, consumo energético, presupuesto disponible y espacio. En general, los paneles solares son versátiles y funcionan bien en la mayoría de las regiones con buena exposición solar. Los sistemas eólicos son mejores en áreas con vientos constantes. Los termotanques solares son una excelente opción si buscas reducir el consumo para calentar agua. Te recomiendo usar nuestra herramienta de diagnóstico que analizará tu situación particular y te dará una recomendación personalizada.",
-        
-        "¿cuánto cuesta instalar paneles solares?": 
-            "El costo de instalar paneles solares varía según la capacidad del sistema, calidad de los componentes y tu ubicación. En promedio, un sistema residencial de 3-5 kW puede costar entre $1,000 y $3,000 USD por kW instalado, incluyendo paneles, inversor, estructura, instalación y trámites. Los factores que más influyen son: capacidad total (kW), tipo y eficiencia de los paneles, tipo de instalación (techo o suelo), complejidad del montaje y costos laborales locales. El retorno de inversión suele ser de 4-7 años, dependiendo de las tarifas eléctricas de tu zona.",
-        
-        "¿cuánto puedo ahorrar con energía renovable?": 
-            "El ahorro con energía renovable depende de varios factores: tu consumo actual, costo de la electricidad en tu zona, tamaño y tipo del sistema instalado. En promedio, un sistema solar bien dimensionado puede reducir tu factura eléctrica entre un 50% y 90%. Un termotanque solar puede reducir el costo de calentar agua en 70-80%. Con sistemas de baterías, el ahorro puede ser aún mayor. A largo plazo, considerando que estos sistemas duran 25-30 años y las tarifas eléctricas tienden a aumentar, el ahorro acumulado puede superar varias veces la inversión inicial.",
-        
-        "¿qué es un termotanque solar?": 
-            "Un termotanque solar es un sistema que utiliza la energía del sol para calentar agua sin consumir electricidad o gas. Consta de colectores solares (donde el agua o un fluido caloportador se calienta) y un tanque aislado térmicamente para almacenar el agua caliente. Existen dos tipos principales: circulación natural (termosifón) donde el agua circula por diferencia de densidad, y circulación forzada que usa una pequeña bomba. Son muy eficientes, pudiendo reducir hasta un 80% del consumo energético para calentar agua y tienen una vida útil de 15-20 años con mínimo mantenimiento.",
-            
-        "¿qué sistema de energía renovable es más económico?": 
-            "El sistema de energía renovable más económico en términos de inversión inicial suele ser el termotanque solar, con costos desde $800-1,500 USD para una familia pequeña. Ofrece un excelente retorno de inversión (2-4 años) al reducir significativamente el consumo para calentar agua. Los paneles solares fotovoltaicos tienen una inversión inicial mayor ($3,000-9,000 USD para sistemas residenciales), pero generan electricidad para todos tus equipos con retornos de inversión de 4-7 años. Los sistemas eólicos domésticos suelen tener costos similares a los solares pero requieren condiciones de viento específicas. La opción más económica para tu caso específico dependerá de tu consumo, ubicación y necesidades particulares.",
-            
-        "¿para qué sirve el simulador?": 
-            "El simulador de EcoSmart Advisor te permite probar diferentes configuraciones de sistemas de energía renovable sin compromiso y ver resultados personalizados en tiempo real. Puedes ajustar parámetros como la capacidad de paneles solares, potencia de aerogeneradores o tamaño de termotanques, y obtener estimaciones de generación energética, ahorro económico e impacto ambiental. El simulador toma en cuenta tu ubicación geográfica, consumo energético y datos climáticos locales para brindarte resultados precisos. Es una herramienta ideal para explorar opciones antes de decidirte por una inversión específica."
-    }
+    # Forma sin acentos ni signos sobre la que se buscan las palabras clave
+    pregunta_normalizada = normalizar(pregunta_limpia)
     
     # Verificar si la pregunta es una de las preguntas de ejemplo o muy similar
-    for ejemplo, respuesta in preguntas_ejemplo.items():
-        if pregunta_limpia == ejemplo.lower() or pregunta_limpia in ejemplo.lower() or ejemplo.lower() in pregunta_limpia:
-            print(f"Coincidencia con pregunta de ejemplo: {ejemplo}")
-            return respuesta
-    
-    # Creamos un sistema de puntuación para seleccionar la mejor respuesta
-    mejores_coincidencias = {}
-    
-    # Verificar primero en la base de conocimiento para palabras clave exactas
-    for palabra_clave, respuesta in CONOCIMIENTO_BASE.items():
-        if palabra_clave.lower() == pregunta_limpia:  # Coincidencia exacta
-            print(f"Coincidencia exacta con palabra clave: {palabra_clave}")
-            return respuesta
-        elif palabra_clave.lower() in pregunta_limpia:  # Palabras clave en la pregunta
-            palabras_clave = palabra_clave.lower().split()
-            palabras_pregunta = pregunta_limpia.split()
-            # Calcular un puntaje basado en la proporción de palabras que coinciden
-            proporcion = len(palabras_clave) / len(palabras_pregunta) if palabras_pregunta else 0
-            mejores_coincidencias[palabra_clave] = proporcion * 0.8  # 80% de confianza si contiene la palabra clave
-            print(f"Coincidencia parcial con: {palabra_clave}, puntuación: {proporcion * 0.8}")
-    
-    # Buscar coincidencias en palabras relacionadas
-    palabras_pregunta = pregunta_limpia.split()
-    palabras_relacionadas_puntuacion = {}
-    
-    for palabra in palabras_pregunta:
-        for termino_relacionado, tema in get_palabras_relacionadas().items():
-            if palabra == termino_relacionado:  # Coincidencia exacta con un término relacionado
-                if tema in mejores_coincidencias:
-                    mejores_coincidencias[tema] += 0.6  # Aumentar la puntuación si ya existe
-                else:
-                    mejores_coincidencias[tema] = 0.6  # 60% de confianza
-                print(f"Coincidencia exacta con término relacionado: {termino_relacionado} -> {tema}")
-            elif termino_relacionado in palabra:  # El término relacionado es parte de la palabra
-                if tema in mejores_coincidencias:
-                    mejores_coincidencias[tema] += 0.3  # Aumentar la puntuación
-                else:
-                    mejores_coincidencias[tema] = 0.3  # 30% de confianza
-                print(f"Coincidencia parcial con término relacionado: {termino_relacionado} -> {tema}")
+    if pregunta_normalizada:
+        for ejemplo, respuesta in _EJEMPLOS_NORMALIZADOS:
+            if pregunta_normalizada in ejemplo or ejemplo in pregunta_normalizada:
+                logger.debug(f"Coincidencia con pregunta de ejemplo: {ejemplo}")
+                return respuesta
+    
+    # Coincidencia exacta con una palabra clave de la base de conocimiento
+    if pregunta_normalizada in _CLAVES_NORMALIZADAS:
+        logger.debug(f"Coincidencia exacta con palabra clave: {_CLAVES_NORMALIZADAS[pregunta_normalizada]}")
+        return CONOCIMIENTO_BASE[_CLAVES_NORMALIZADAS[pregunta_normalizada]]
     
     # Determinar la mejor coincidencia
     mejor_tema = None
-    mejor_puntuacion = 0.3  # Bajamos el umbral mínimo para considerar una coincidencia como relevante
+    mejor_puntuacion = UMBRAL_COINCIDENCIA
     
-    print(f"Mejores coincidencias: {mejores_coincidencias}")
+    mejores_coincidencias = puntuar_temas(pregunta_normalizada)
+    logger.debug(f"Mejores coincidencias: {mejores_coincidencias}")
     
     for tema, puntuacion in mejores_coincidencias.items():
         if puntuacion > mejor_puntuacion:
             mejor_puntuacion = puntuacion
             mejor_tema = tema
     
-    print(f"Mejor tema encontrado: {mejor_tema}, puntuación: {mejor_puntuacion if mejor_tema else 0}")
-    
     # Si encontramos una buena coincidencia, devolver la respuesta correspondiente
     if mejor_tema:
-        print(f"Retornando respuesta para: {mejor_tema}")
+        logger.debug(f"Mejor tema encontrado: {mejor_tema}, puntuación: {mejor_puntuacion}")
         return CONOCIMIENTO_BASE[mejor_tema]
     
     # Verificar casos especiales
     respuesta_especial = verificar_casos_especiales(pregunta_limpia)
     if respuesta_especial:
-        print("Encontrada respuesta especial")
+        logger.debug("Encontrada respuesta especial")
         return respuesta_especial
     
+    # Buscar en el índice de todas las respuestas (incluye sinónimos y variantes de las palabras)
+    resultados = buscar_respuestas(pregunta_limpia, limite=1)
+    if resultados and resultados[0]['puntaje'] >= BM25_PUNTAJE_MINIMO:
+        logger.debug(f"Respuesta del índice: {resultados[0]['titulo']}, puntuación: {resultados[0]['puntaje']}")
+        return resultados[0]['respuesta']
+    
     # Si no hay coincidencias suficientemente buenas, generar una respuesta genérica
-    print("No se encontraron coincidencias suficientes, utilizando respuesta genérica")
+    logger.debug("No se encontraron coincidencias suficientes, utilizando respuesta genérica")
     return respuesta_generica(pregunta_limpia)
 
+def buscar_respuestas(pregunta, limite=3):
+    """
+    Busca las respuestas más relevantes en el índice BM25 de la base de
+    conocimiento, las preguntas de ejemplo y los casos especiales.
+    
+    Args:
+        pregunta (str): Pregunta del usuario
+        limite (int): Cantidad máxima de resultados
+        
+    Returns:
+        list: Diccionarios con titulo, respuesta y puntaje, de mayor a menor
+    """
+    return [
+        {'titulo': _DOCUMENTOS[indice][0], 'respuesta': _DOCUMENTOS[indice][1], 'puntaje': round(puntaje, 3)}
+        for indice, puntaje in _INDICE.buscar(pregunta, limite)
+    ]
+
+def puntuar_temas(pregunta_normalizada):
+    """
+    Puntúa los temas de la base de conocimiento en una sola pasada sobre la pregunta.
+    
+    - Palabra clave de la base contenida en la pregunta: 0.8 por la proporción
+      de palabras de la pregunta que ocupa.
+    - Término relacionado que coincide con una palabra completa: +0.6.
+    - Término relacionado contenido dentro de una palabra: +0.3.
+    
+    Args:
+        pregunta_normalizada (str): Pregunta sin acentos ni signos (ver normalizar)
+        
+    Returns:
+        dict: Tema -> puntuación, primero los temas por palabra clave y luego
+              por término relacionado en el orden en que aparecen
+    """
+    largo = len(pregunta_normalizada)
+    cantidad_palabras = len(pregunta_normalizada.split())
+    por_clave = {}
+    por_termino = {}
+    
+    for inicio, fin, (palabra_clave, palabras_clave, tema) in _AUTOMATA.buscar(pregunta_normalizada):
+        if palabra_clave is not None:
+            por_clave[palabra_clave] = palabras_clave / cantidad_palabras * PESO_PALABRA_CLAVE
+        if tema is not None:
+            completa = ((inicio == 0 or pregunta_normalizada[inicio - 1] == ' ')
+                        and (fin == largo or pregunta_normalizada[fin] == ' '))
+            peso = PESO_TERMINO_EXACTO if completa else PESO_TERMINO_PARCIAL
+            por_termino[tema] = por_termino.get(tema, 0) + peso
+    
+    puntuaciones = {tema: por_clave[tema] for tema in CONOCIMIENTO_BASE if tema in por_clave}
+    for tema, puntuacion in por_termino.items():
+        puntuaciones[tema] = puntuaciones.get(tema, 0) + puntuacion
+    return puntuaciones
+
 def get_palabras_relacionadas():
     """
     Devuelve un diccionario de palabras relacionadas con los temas de la base de conocimiento
@@ -435,6 +530,56 @@ def get_palabras_relacionadas():
         "planeta": "impacto ambiental"
     }
 
+def _compilar_conocimiento():
+    """
+    Compila la base de conocimiento y los términos relacionados, sin acentos,
+    en un único autómata. Los términos de temas sin respuesta propia (como
+    "costos") se omiten: esas preguntas las resuelven los casos especiales.
+    
+    Returns:
+        tuple: (autómata, palabras clave normalizadas, preguntas de ejemplo normalizadas)
+    """
+    patrones = {}
+    claves = {}
+    for palabra_clave in CONOCIMIENTO_BASE:
+        clave = normalizar(palabra_clave)
+        claves[clave] = palabra_clave
+        patrones[clave] = (palabra_clave, len(clave.split()), None)
+    for termino, tema in get_palabras_relacionadas().items():
+        if tema not in CONOCIMIENTO_BASE:
+            continue
+        patron = normalizar(termino)
+        palabra_clave, palabras_clave, _ = patrones.get(patron, (None, 0, None))
+        patrones[patron] = (palabra_clave, palabras_clave, tema)
+    
+    ejemplos = [(normalizar(ejemplo), respuesta) for ejemplo, respuesta in PREGUNTAS_EJEMPLO.items()]
+    return AutomataPalabras(patrones), claves, ejemplos
+
+_AUTOMATA, _CLAVES_NORMALIZADAS, _EJEMPLOS_NORMALIZADOS = _compilar_conocimiento()
+
+def _construir_indice():
+    """
+    Construye el índice BM25 sobre todas las respuestas del chatbot. Cada tema
+    de la base de conocimiento lleva sus términos relacionados en el título.
+    
+    Returns:
+        tuple: (índice, lista de (título, respuesta) en el orden del índice)
+    """
+    relacionados = {}
+    for termino, tema in get_palabras_relacionadas().items():
+        relacionados.setdefault(tema, []).append(termino)
+    
+    documentos = [(palabra_clave, respuesta) for palabra_clave, respuesta in CONOCIMIENTO_BASE.items()]
+    documentos += [(ejemplo, respuesta) for ejemplo, respuesta in PREGUNTAS_EJEMPLO.items()]
+    documentos += [(caso, respuesta) for caso, respuesta in CASOS_ESPECIALES.items()]
+    
+    indice = IndiceBM25([
+        (' '.join([titulo] + relacionados.get(titulo, [])), respuesta) for titulo, respuesta in documentos
+    ])
+    return indice, documentos
+
+_INDICE, _DOCUMENTOS = _construir_indice()
+
 def verificar_casos_especiales(pregunta):
     """
     Verifica casos especiales o preguntas compuestas que requieren respuestas más específicas
@@ -459,52 +604,24 @@ def verificar_casos_especiales(pregunta):
     
     # Preguntas sobre comparación y recomendaciones
     if any(palabra in pregunta for palabra in ["mejor", "recomendable", "recomiendas", "conviene"]) and "sistema" in pregunta:
-        return ("La mejor opción depende de varios factores específicos de tu ubicación y necesidades. "
-                "En general, los sistemas solares fotovoltaicos son los más versátiles y fáciles de instalar "
-                "en entornos urbanos. Los sistemas eólicos son más efectivos en zonas rurales o costeras "
-                "con buena exposición al viento. Los termotanques solares ofrecen excelente relación "
-                "costo-beneficio para calentar agua. Te recomendamos usar nuestro diagnóstico "
-                "personalizado para obtener una recomendación específica para tu caso.")
+        return CASOS_ESPECIALES["mejor sistema recomendado"]
     
     # Funcionamiento de paneles solares
     if "como funciona" in pregunta and any(palabra in pregunta for palabra in ["panel", "solar", "fotovoltaico"]):
-        return ("Los paneles solares fotovoltaicos funcionan convirtiendo la luz solar en electricidad "
-                "mediante el efecto fotoeléctrico. Están compuestos por células solares de silicio que, "
-                "al recibir fotones de luz, generan un flujo de electrones (corriente continua). "
-                "Esta electricidad luego pasa por un inversor que la convierte en corriente alterna "
-                "utilizable en el hogar. La eficiencia típica de conversión está entre 15-22% "
-                "dependiendo de la tecnología del panel.")
+        return CASOS_ESPECIALES["como funcionan los paneles solares"]
                 
     # Funcionamiento de energía eólica
     if "como funciona" in pregunta and any(palabra in pregunta for palabra in ["eolica", "eolico", "viento", "aerogenerador", "turbina"]):
-        return ("Los aerogeneradores convierten la energía cinética del viento en electricidad. "
-                "Las palas del aerogenerador, diseñadas aerodinámicamente, giran cuando el viento "
-                "las empuja, moviendo un eje conectado a un generador. Este generador transforma "
-                "la energía mecánica en electricidad. Los sistemas domésticos suelen comenzar a "
-                "generar con vientos de 3-4 m/s y alcanzan su máxima potencia con vientos de "
-                "11-15 m/s, dependiendo del modelo.")
+        return CASOS_ESPECIALES["como funciona la energia eolica"]
     
     # Preguntas sobre costos específicos
     if any(palabra in pregunta for palabra in ["costo", "precio", "vale", "valor"]):
         if "panel" in pregunta or "solar" in pregunta or "fotovoltaico" in pregunta:
-            return ("El costo de los sistemas solares fotovoltaicos varía según la capacidad y calidad. "
-                    "Una instalación doméstica típica (3-5 kW) puede costar entre $1,000-$1,500 por kW "
-                    "instalado, incluyendo paneles, inversor y montaje. Para una casa promedio, esto "
-                    "significa una inversión de $3,000-$7,500. Los sistemas premium con baterías y "
-                    "monitorización avanzada pueden costar más. Sin embargo, con los incentivos y el "
-                    "ahorro en la factura eléctrica, el retorno de inversión suele ser de 4-8 años.")
+            return CASOS_ESPECIALES["costo paneles solares fotovoltaicos"]
         elif "eolico" in pregunta or "eolica" in pregunta or "viento" in pregunta:
-            return ("Los sistemas eólicos domésticos tienen un costo aproximado de $2,000-$5,000 por "
-                    "kW de capacidad instalada. Un sistema pequeño (1-3 kW) para una casa puede costar "
-                    "entre $3,000-$15,000 dependiendo del fabricante, altura de la torre y equipamiento "
-                    "adicional. Son generalmente más costosos que los sistemas solares para la misma "
-                    "capacidad, pero pueden ser más eficientes en ubicaciones con buen recurso eólico.")
+            return CASOS_ESPECIALES["costo sistemas eolicos"]
         elif "termotanque" in pregunta or "agua caliente" in pregunta:
-            return ("Un sistema de termotanque solar para una familia típica (150-300 litros) "
-                    "cuesta entre $800-$2,500 dependiendo de la capacidad, tipo de colector (plano o "
-                    "tubos de vacío) y si incluye un sistema de respaldo. Son una de las inversiones "
-                    "en energía renovable con mejor retorno, generalmente entre 2-5 años, especialmente "
-                    "si sustituyen a sistemas eléctricos de calentamiento de agua.")
+            return CASOS_ESPECIALES["costo termotanque solar"]
     
     # No se encontró un caso especial
     return None
@@ -593,28 +710,13 @@ def buscar_respuesta_relacionada(pregunta):
     
     # Añadir lógica para preguntas compuestas
     if ("mejor" in pregunta or "recomendable" in pregunta or "recomiendas" in pregunta) and "sistema" in pregunta:
-        return ("La mejor opción depende de varios factores específicos de tu ubicación y necesidades. "
-                "En general, los sistemas solares fotovoltaicos son los más versátiles y fáciles de instalar "
-                "en entornos urbanos. Los sistemas eólicos son más efectivos en zonas rurales o costeras "
-                "con buena exposición al viento. Los termotanques solares ofrecen excelente relación "
-                "costo-beneficio para calentar agua. Te recomendamos usar nuestro diagnóstico "
-                "personalizado para obtener una recomendación específica para tu caso.")
+        return CASOS_ESPECIALES["mejor sistema recomendado"]
     
     if "como funciona" in pregunta and "panel" in pregunta:
-        return ("Los paneles solares fotovoltaicos funcionan convirtiendo la luz solar en electricidad "
-                "mediante el efecto fotoeléctrico. Están compuestos por células solares de silicio que, "
-                "al recibir fotones de luz, generan un flujo de electrones (corriente continua). "
-                "Esta electricidad luego pasa por un inversor que la convierte en corriente alterna "
-                "utilizable en el hogar. La eficiencia típica de conversión está entre 15-22% "
-                "dependiendo de la tecnología del panel.")
+        return CASOS_ESPECIALES["como funcionan los paneles solares"]
                 
     if "como funciona" in pregunta and ("eolica" in pregunta or "viento" in pregunta):
-        return ("Los aerogeneradores convierten la energía cinética del viento en electricidad. "
-                "Las palas del aerogenerador, diseñadas aerodinámicamente, giran cuando el viento "
-                "las empuja, moviendo un eje conectado a un generador. Este generador transforma "
-                "la energía mecánica en electricidad. Los sistemas domésticos suelen comenzar a "
-                "generar con vientos de 3-4 m/s y alcanzan su máxima potencia con vientos de "
-                "11-15 m/s, dependiendo del modelo.")
+        return CASOS_ESPECIALES["como funciona la energia eolica"]
     
     # No se encontró ninguna coincidencia relacionada
     return None
@@ -693,12 +795,12 @@ def respuesta_generica(pregunta):
         import random
         muestra_preguntas = random.sample(preguntas_sugeridas, min(3, len(preguntas_sugeridas)))
         
-        sugerencias = "<br>".join([f"• {p}" for p in muestra_preguntas])
+        sugerencias = "\n".join([f"• {p}" for p in muestra_preguntas])
         
         return (
             "Gracias por tu interés en energías renovables. Para darte información "
             "más precisa, te invito a ser más específico en tu pregunta o a probar "
-            "con alguna de estas consultas:<br><br>" + sugerencias + "<br><br>"
+            "con alguna de estas consultas:\n\n" + sugerencias + "\n\n"
             "También puedes utilizar nuestro diagnóstico inteligente o el simulador "
             "para obtener recomendaciones personalizadas según tu ubicación y consumo energético."
         )
\ No newline at end of file
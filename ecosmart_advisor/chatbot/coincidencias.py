@@ -0,0 +1,76 @@
+"""
+Búsqueda simultánea de muchas palabras clave en un texto.
+
+Implementa un autómata de Aho-Corasick: los patrones se compilan una sola
+vez en un trie con enlaces de falla, y cada búsqueda recorre el texto una
+única vez, encontrando todas las apariciones (también las superpuestas)
+sin importar cuántos patrones haya.
+"""
+from collections import deque
+
+
+class AutomataPalabras:
+    """
+    Autómata de Aho-Corasick sobre un diccionario de patrones.
+    Los textos y patrones deben llegar ya normalizados (ver localidades.normalizar).
+    """
+
+    def __init__(self, patrones):
+        """
+        Args:
+            patrones (dict): Patrón (str no vacío) -> valor asociado
+        """
+        self.transiciones = [{}]
+        self.fallas = [0]
+        self.salidas = [[]]
+
+        for patron, valor in patrones.items():
+            if not patron:
+                continue
+            nodo = 0
+            for caracter in patron:
+                siguiente = self.transiciones[nodo].get(caracter)
+                if siguiente is None:
+                    siguiente = len(self.transiciones)
+                    self.transiciones.append({})
+                    self.fallas.append(0)
+                    self.salidas.append([])
+                    self.transiciones[nodo][caracter] = siguiente
+                nodo = siguiente
+            self.salidas[nodo].append((len(patron), valor))
+
+        # Enlaces de falla por niveles: cada nodo apunta al sufijo propio más
+        # largo que también es prefijo de algún patrón, y hereda sus salidas
+        cola = deque(self.transiciones[0].values())
+        while cola:
+            nodo = cola.popleft()
+            for caracter, hijo in self.transiciones[nodo].items():
+                cola.append(hijo)
+                falla = self.fallas[nodo]
+                while falla and caracter not in self.transiciones[falla]:
+                    falla = self.fallas[falla]
+                destino = self.transiciones[falla].get(caracter, 0)
+                self.fallas[hijo] = destino if destino != hijo else 0
+                self.salidas[hijo] = self.salidas[hijo] + self.salidas[self.fallas[hijo]]
+
+    def buscar(self, texto):
+        """
+        Recorre el texto una vez y devuelve todas las apariciones de los patrones
+
+        Args:
+            texto (str): Texto normalizado
+
+        Yields:
+            tuple: (inicio, fin, valor) de cada aparición, en orden de fin
+        """
+        transiciones, fallas, salidas = self.transiciones, self.fallas, self.salidas
+        nodo = 0
+        for posicion, caracter in enumerate(texto):
+            while nodo and caracter not in transiciones[nodo]:
+                nodo = fallas[nodo]
+            nodo = transiciones[nodo].get(caracter, 0)
+            for largo, valor in salidas[nodo]:
+                yield posicion + 1 - largo, posicion + 1, valor
+
+    def __len__(self):
+        return len(self.transiciones)
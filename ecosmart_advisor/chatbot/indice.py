@@ -0,0 +1,164 @@
+"""
+Índice invertido con puntuación BM25 para las respuestas del chatbot.
+
+Los textos se normalizan (minúsculas, sin acentos ni signos), se descartan
+las palabras vacías y cada palabra se reduce a su raíz con un stemmer
+liviano para español, de modo que "fotovoltaicos", "fotovoltaica" y
+"fotovoltaico" comparten término. El peso BM25 de cada aparición depende
+solo del término y del documento, así que se calcula al construir el
+índice y una búsqueda se reduce a sumar los pesos de los términos de la
+consulta: con miles de documentos sigue tardando menos de un milisegundo.
+"""
+import math
+from functools import lru_cache
+from collections import Counter, defaultdict
+import numpy as np
+from ecosmart_advisor.app.services.localidades import normalizar
+
+# Parámetros de BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Las palabras del título cuentan como si aparecieran esta cantidad de veces
+PESO_TITULO = 3
+
+PALABRAS_VACIAS = frozenset("""
+a al algo algun alguna algunos como con cual cuales cuando de del desde donde e el ella ellos en entre
+es esa ese eso esta estan este esto estos hace hay hoy la las le les lo los me mas mi mis mucho muy ni no
+nos o para pero poco por porque puede pueden puedo que quiero se ser si sin sirve sobre son su sus tal
+tan te tengo tiene tu tus u un una uno unos unas y ya yo
+""".split())
+
+# Sufijos derivativos (ya sin la vocal final ni el plural), del más largo al más corto
+SUFIJOS_DERIVATIVOS = ('amient', 'imient', 'acion', 'icion', 'ador', 'anci', 'idad', 'ment',
+                       'abl', 'ibl', 'ism', 'ist')
+# Terminaciones verbales: infinitivo, gerundio y participio
+SUFIJOS_VERBALES = ('iend', 'and', 'ad', 'id', 'ar', 'er', 'ir')
+# Largo mínimo de la raíz que queda al quitar un sufijo
+RAIZ_MINIMA = 4
+
+
+@lru_cache(maxsize=20000)
+def raiz(palabra):
+    """
+    Raíz de una palabra normalizada (stemmer liviano para español)
+
+    1. Quita el plural y la vocal final de género ("paneles" -> "panel",
+       "baterias" -> "bateri", "luces" -> "luz").
+    2. Quita un sufijo derivativo ("instalacion" -> "instal") o, si no hay,
+       una terminación verbal ("ahorrar" -> "ahorr").
+
+    Args:
+        palabra (str): Palabra en minúsculas y sin acentos
+
+    Returns:
+        str: Raíz de la palabra
+    """
+    if len(palabra) < 5:
+        return palabra
+
+    if palabra.endswith('eses'):
+        palabra = palabra[:-2]
+    elif palabra.endswith('ces'):
+        palabra = palabra[:-3] + 'z'
+    elif palabra[-1] == 's' and palabra[-2] in 'aeo':
+        palabra = palabra[:-2]
+    elif palabra[-1] in 'aeo':
+        palabra = palabra[:-1]
+
+    for sufijos in (SUFIJOS_DERIVATIVOS, SUFIJOS_VERBALES):
+        for sufijo in sufijos:
+            if palabra.endswith(sufijo) and len(palabra) - len(sufijo) >= RAIZ_MINIMA:
+                return palabra[:-len(sufijo)]
+    return palabra
+
+
+def tokenizar(texto):
+    """
+    Términos de un texto: palabras normalizadas, sin palabras vacías, reducidas a su raíz
+
+    Args:
+        texto (str): Texto libre
+
+    Returns:
+        list: Términos en el orden en que aparecen
+    """
+    return [raiz(palabra) for palabra in normalizar(texto).split() if palabra not in PALABRAS_VACIAS]
+
+
+class IndiceBM25:
+    """
+    Índice invertido: para cada término, los documentos que lo contienen y
+    el peso BM25 de cada uno, en arrays paralelos.
+    """
+
+    def __init__(self, documentos, k1=BM25_K1, b=BM25_B, peso_titulo=PESO_TITULO):
+        """
+        Args:
+            documentos (list): Pares (título, texto)
+            k1 (float): Saturación de la frecuencia del término
+            b (float): Normalización por largo del documento
+            peso_titulo (int): Repeticiones que vale cada palabra del título
+        """
+        self.cantidad = len(documentos)
+        listas = defaultdict(lambda: ([], []))
+        largos = np.zeros(self.cantidad)
+
+        for indice, (titulo, texto) in enumerate(documentos):
+            frecuencias = Counter(tokenizar(texto))
+            for termino in tokenizar(titulo):
+                frecuencias[termino] += peso_titulo
+            largos[indice] = sum(frecuencias.values())
+            for termino, frecuencia in frecuencias.items():
+                documentos_termino, frecuencias_termino = listas[termino]
+                documentos_termino.append(indice)
+                frecuencias_termino.append(frecuencia)
+
+        largo_promedio = largos.mean() if self.cantidad and largos.mean() > 0 else 1.0
+        self.postings = {}
+        for termino, (documentos_termino, frecuencias_termino) in listas.items():
+            ids = np.array(documentos_termino, dtype=np.int32)
+            frecuencia = np.array(frecuencias_termino, dtype=float)
+            idf = math.log(1 + (self.cantidad - len(ids) + 0.5) / (len(ids) + 0.5))
+            normalizacion = k1 * (1 - b + b * largos[ids] / largo_promedio)
+            self.postings[termino] = (ids, idf * frecuencia * (k1 + 1) / (frecuencia + normalizacion))
+
+    def puntuar(self, consulta):
+        """
+        Puntuación BM25 de todos los documentos para una consulta
+
+        Args:
+            consulta (str): Texto de la consulta
+
+        Returns:
+            numpy.ndarray: Puntuación por documento (0 si no comparte términos)
+        """
+        puntajes = np.zeros(self.cantidad)
+        for termino in set(tokenizar(consulta)):
+            entrada = self.postings.get(termino)
+            if entrada is not None:
+                # Cada documento aparece una sola vez por término
+                puntajes[entrada[0]] += entrada[1]
+        return puntajes
+
+    def buscar(self, consulta, limite=3):
+        """
+        Documentos más relevantes para una consulta
+
+        Args:
+            consulta (str): Texto de la consulta
+            limite (int): Cantidad máxima de resultados
+
+        Returns:
+            list: Pares (índice del documento, puntuación), de mayor a menor,
+                  solo con puntuación positiva
+        """
+        puntajes = self.puntuar(consulta)
+        if limite < self.cantidad:
+            candidatos = np.argpartition(-puntajes, limite)[:limite]
+        else:
+            candidatos = np.arange(self.cantidad)
+        candidatos = candidatos[np.argsort(-puntajes[candidatos], kind='stable')]
+        return [(int(i), float(puntajes[i])) for i in candidatos if puntajes[i] > 0]
+
+    def __len__(self):
+        return self.cantidad
@@ -29,4 +29,24 @@ graceful_timeout = 10
 preload_app = True
 
 # Cantidad máxima de peticiones simultaneas
-worker_connections = 1000
\ No newline at end of file
+worker_connections = 1000
+# Hilos por worker: mientras una respuesta del chatbot se transmite por
+# streaming, el mismo worker sigue atendiendo otras peticiones
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Precarga: con preload_app, el maestro compila las plantillas y carga los
+# índices, la climatología, el nomenclador y el carrusel antes de crear los
+# workers, que los comparten por copy-on-write
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from ecosmart_advisor.app.precarga import precalentar
+    informe = precalentar(server.app.wsgi())
+    server.log.info(f"Precarga en el maestro: {informe['segundos']:.2f} s, memoria {informe['memoria']}")
+
+def post_worker_init(worker):
+    from ecosmart_advisor.app.precarga import informe_memoria
+    memoria = informe_memoria()
+    if memoria:
+        worker.log.info(f"Worker {worker.pid}: {memoria['compartida']} MB compartidos con el maestro, "
+                        f"{memoria['privada']} MB propios")
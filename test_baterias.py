@@ -0,0 +1,118 @@
+"""
+Script para probar el despacho de baterías acoplado a la generación horaria
+"""
+import time
+import numpy as np
+
+from ecosmart_advisor.app import create_app
+from ecosmart_advisor.app import routes
+from ecosmart_advisor.app.services import baterias
+from ecosmart_advisor.app.services import simulador
+from ecosmart_advisor.app.services.energia_calculo import calcular_estimacion_sin_kwh
+
+CLIMA = {'radiacion_solar': 4.6, 'velocidad_viento': 5.5, 'temperatura_promedio': 17.8,
+         'latitud': -34.61, 'longitud': -58.38, 'ubicacion': 'Buenos Aires'}
+
+def _despacho_secuencial(generacion, consumo, capacidad):
+    """Versión de referencia hora por hora"""
+    eficiencia = np.sqrt(baterias.EFICIENCIA_IDA_VUELTA)
+    potencia = baterias.TASA_C * capacidad
+    minimo = capacidad * baterias.SOC_MINIMO
+    energia, importacion, exportacion = minimo, 0.0, 0.0
+    for g, c in zip(generacion.tolist(), consumo.tolist()):
+        if g >= c:
+            carga = min(g - c, potencia, (capacidad - energia) / eficiencia)
+            energia += carga * eficiencia
+            exportacion += g - c - carga
+        else:
+            descarga = min(c - g, potencia, (energia - minimo) * eficiencia)
+            energia -= descarga / eficiencia
+            importacion += c - g - descarga
+    return importacion, exportacion
+
+def test_perfil_consumo():
+    """El perfil horario respeta la estimación mensual y la estacionalidad de los equipos"""
+    equipos = ['aire_acondicionado', 'refrigerador', 'calefaccion_electrica']
+    perfil = baterias.perfil_consumo('casa_mediana', equipos, latitud=-34.6)
+    assert perfil.shape == (8760,)
+    assert abs(perfil.sum() - 12 * calcular_estimacion_sin_kwh('casa_mediana', equipos)) < 1e-6
+    # Con aire acondicionado en el hemisferio sur, enero consume más que abril
+    assert perfil[:744].sum() > perfil[2160:2880].sum() * 31 / 30
+    # Escalado a un consumo real
+    assert abs(baterias.perfil_consumo('oficina', [], consumo_mensual=500).sum() - 6000) < 1e-6
+
+def test_recurrencia_y_despacho():
+    """El barrido de prefijos coincide con el despacho secuencial y es rápido"""
+    generacion = baterias.perfil_generacion('solar', 4.0, CLIMA)
+    consumo = baterias.perfil_consumo('casa_mediana', ['aire_acondicionado'], latitud=-34.6)
+
+    generador = np.random.default_rng(1)
+    delta = generador.normal(0, 3, 8760)
+    esperado, valor = [], 2.0
+    for d in delta.tolist():
+        valor = min(max(valor + d, 1.0), 10.0)
+        esperado.append(valor)
+    np.testing.assert_allclose(baterias.recurrencia_acotada(delta, 1.0, 10.0, 2.0), esperado, atol=1e-9)
+
+    capacidades = np.array([0.0, 5.0, 10.0, 20.0])
+    inicio = time.perf_counter()
+    resultado = baterias.simular_bateria(generacion, consumo, capacidades)
+    tiempo = (time.perf_counter() - inicio) * 1000
+    print(f"Despacho de 4 baterías x 8760 horas: {tiempo:.1f} ms")
+    assert tiempo < 100
+
+    for i, capacidad in enumerate(capacidades):
+        importacion, exportacion = _despacho_secuencial(generacion, consumo, capacidad)
+        assert abs(resultado['importacion_red'][i] - importacion) < 1e-6
+        assert abs(resultado['exportacion_red'][i] - exportacion) < 1e-6
+
+    # Más batería, más autosuficiencia y menos intercambio con la red
+    assert np.all(np.diff(resultado['autosuficiencia']) > 0)
+    assert np.all(np.diff(resultado['exportacion_red']) < 0)
+    assert resultado['dias_autonomia'][0] == 0
+    print(f"Autosuficiencia: {np.round(resultado['autosuficiencia'], 1)} %")
+
+def test_simular_instalacion_con_bateria():
+    """El almacenamiento es opcional en simular_instalacion"""
+    original_clima, original_deepseek = simulador.obtener_datos_clima, simulador.USAR_DEEPSEEK
+    simulador.obtener_datos_clima = lambda ubicacion: dict(CLIMA)
+    simulador.USAR_DEEPSEEK = False
+    try:
+        datos = {'tipo_instalacion': 'eolica', 'capacidad': 3, 'ubicacion': '-34.61,-58.38',
+                 'consumo_mensual': 350, 'bateria': {'capacidad_kwh': [10], 'equipos': ['refrigerador']}}
+        resultados = simulador.simular_instalacion(datos)
+    finally:
+        simulador.obtener_datos_clima, simulador.USAR_DEEPSEEK = original_clima, original_deepseek
+
+    almacenamiento = resultados['almacenamiento']
+    assert almacenamiento['consumo_anual_kwh'] == 4200
+    assert len(almacenamiento['baterias']) == 1
+    assert almacenamiento['baterias'][0]['autosuficiencia'] >= almacenamiento['sin_bateria']['autosuficiencia']
+
+def test_capacidades_invalidas():
+    """La API rechaza con 400 capacidades no finitas, no positivas o demasiadas, sin despachar"""
+    app = create_app()
+    app.config['TESTING'] = True
+    cliente = app.test_client()
+    original = routes.simular_instalacion
+    simulaciones = []
+    routes.simular_instalacion = lambda *args: simulaciones.append(args) or {}
+    try:
+        for capacidades in ([float('nan')], [1e400], [-5], [0], 'diez', [[5, 10]], [],
+                            list(range(1, baterias.BATERIA_MAX_CAPACIDADES + 2))):
+            respuesta = cliente.post('/simulador/api', json={
+                'tipo_instalacion': 'solar', 'capacidad': 3, 'ubicacion': '-34.61,-58.38',
+                'consumo_mensual': 350, 'bateria': {'capacidad_kwh': capacidades}
+            })
+            assert respuesta.status_code == 400, capacidades
+            assert 'error' in respuesta.get_json()
+    finally:
+        routes.simular_instalacion = original
+    assert simulaciones == []
+    np.testing.assert_array_equal(baterias.validar_capacidades(7.5), [7.5])
+
+if __name__ == "__main__":
+    test_perfil_consumo()
+    test_recurrencia_y_despacho()
+    test_simular_instalacion_con_bateria()
+    test_capacidades_invalidas()
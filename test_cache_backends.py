@@ -0,0 +1,195 @@
+"""
+Script para probar los backends del nivel compartido de la caché
+(SQLite entre procesos, Redis simulado y solo memoria)
+"""
+import os
+import time
+import fnmatch
+import tempfile
+import threading
+import multiprocessing
+
+from ecosmart_advisor.app.services import cache
+from ecosmart_advisor.app.services import carousel_content
+from ecosmart_advisor.app.services.cache import CacheEscalonada, CacheRedis, CacheSQLite, crear_cache_compartida
+
+class RedisSimulado:
+    """Servidor Redis en memoria con las operaciones que usa CacheRedis"""
+
+    def __init__(self):
+        self.datos = {}
+        self.caido = False
+        self.operaciones = 0
+
+    def _verificar(self):
+        self.operaciones += 1
+        if self.caido:
+            raise ConnectionError("Redis no disponible")
+
+    def get(self, clave):
+        self._verificar()
+        entrada = self.datos.get(clave)
+        if entrada is None or entrada[1] < time.time():
+            return None
+        return entrada[0].encode('utf-8')
+
+    def pttl(self, clave):
+        self._verificar()
+        entrada = self.datos.get(clave)
+        if entrada is None or entrada[1] < time.time():
+            return -2
+        return -1 if entrada[1] == float('inf') else int((entrada[1] - time.time()) * 1000)
+
+    def set(self, clave, valor, ex=None):
+        self._verificar()
+        self.datos[clave] = (valor, time.time() + ex if ex else float('inf'))
+
+    def delete(self, *claves):
+        self._verificar()
+        for clave in claves:
+            self.datos.pop(clave, None)
+
+    def scan_iter(self, match='*', count=None):
+        self._verificar()
+        return [clave for clave in list(self.datos) if fnmatch.fnmatchcase(clave, match)]
+
+def _escribir_en_otro_proceso(ruta, clave, valor):
+    CacheEscalonada("compartida", ruta=ruta).guardar(clave, valor)
+
+def test_sqlite_entre_procesos():
+    """Lo que guarda un worker lo ve otro, y sigue ahí después de reiniciar"""
+    ruta = os.path.join(tempfile.mkdtemp(prefix="ecosmart_test_"), "compartida.sqlite")
+    worker = CacheEscalonada("compartida", ruta=ruta)
+    assert worker.obtener('clima') is None
+
+    proceso = multiprocessing.get_context('fork').Process(
+        target=_escribir_en_otro_proceso, args=(ruta, 'clima', {'radiacion_solar': 5.1})
+    )
+    proceso.start()
+    proceso.join(10)
+    assert proceso.exitcode == 0
+
+    # El LRU del worker no la tenía: la encuentra en el nivel compartido y la promueve
+    assert worker.obtener('clima') == {'radiacion_solar': 5.1}
+    assert worker.estadisticas()['memoria']['entradas'] == 1
+
+    reiniciado = CacheEscalonada("compartida", ruta=ruta)
+    assert reiniciado.obtener('clima') == {'radiacion_solar': 5.1}
+    assert reiniciado.estadisticas()['backend'] == 'CacheSQLite'
+
+def test_promocion_con_ttl_restante():
+    """Un acierto del nivel compartido se promueve a memoria solo por el tiempo que le queda"""
+    ruta = os.path.join(tempfile.mkdtemp(prefix="ecosmart_test_"), "ttl.sqlite")
+    servidor = RedisSimulado()
+    for crear in (lambda: CacheEscalonada("ttl", ttl=3600, ruta=ruta),
+                  lambda: CacheEscalonada("ttl", ttl=3600, compartida=CacheRedis("ttl", cliente=servidor))):
+        escritor, lector = crear(), crear()
+        escritor.guardar('corta', 'valor', ttl=2)
+        escritor.guardar('larga', 'valor')
+        assert lector.obtener('corta') == 'valor' and lector.obtener('larga') == 'valor'
+        restante = lector.memoria._datos['corta'][0] - time.time()
+        assert 0 < restante <= 2, restante
+        assert lector.memoria._datos['larga'][0] - time.time() > 3000
+
+def test_contadores_entre_hilos():
+    """Los contadores del nivel compartido no pierden consultas concurrentes"""
+    compartida = CacheRedis("contadores", cliente=RedisSimulado())
+    compartida.guardar('a', 1)
+
+    def consultar():
+        for _ in range(500):
+            compartida.obtener('a')
+            compartida.obtener('b')
+
+    hilos = [threading.Thread(target=consultar) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert compartida.aciertos == 4000 and compartida.fallos == 4000
+
+def test_redis_compartido():
+    """Dos workers con Redis comparten entradas, con expiración y prefijo por caché"""
+    servidor = RedisSimulado()
+    worker_a = CacheEscalonada("llm", compartida=CacheRedis("llm", cliente=servidor))
+    worker_b = CacheEscalonada("llm", compartida=CacheRedis("llm", cliente=servidor))
+    otra = CacheEscalonada("geocode", compartida=CacheRedis("geocode", cliente=servidor))
+
+    worker_a.guardar('pregunta', {'respuesta': 'Sí, conviene.'})
+    otra.guardar('pregunta', ['Córdoba'])
+    assert worker_b.obtener('pregunta') == {'respuesta': 'Sí, conviene.'}
+    assert sorted(servidor.datos) == ['ecosmart:geocode:pregunta', 'ecosmart:llm:pregunta']
+
+    # TTL nativo: las entradas vencidas no se devuelven y las ya vencidas no se guardan
+    worker_a.guardar('efimera', 1, ttl=0.01)
+    worker_a.guardar('vencida', 1, ttl=-1)
+    time.sleep(1.1)
+    assert worker_b.obtener('efimera') is None and 'ecosmart:llm:vencida' not in servidor.datos
+
+    # Limpiar una caché no borra las demás
+    worker_b.limpiar()
+    assert worker_a.disco.obtener('pregunta') is None and otra.obtener('pregunta') == ['Córdoba']
+
+    # Si Redis se cae, se responde como fallo sin reintentar en cada consulta
+    servidor.caido = True
+    compartida = CacheRedis("llm", cliente=servidor)
+    assert compartida.obtener('pregunta', 'sin datos') == 'sin datos'
+    operaciones = servidor.operaciones
+    for _ in range(20):
+        compartida.obtener('pregunta')
+        compartida.guardar('pregunta', 'x')
+    print(f"Redis caído: {compartida.estadisticas()['errores']} error y "
+          f"{servidor.operaciones - operaciones} operaciones en 40 consultas")
+    assert servidor.operaciones == operaciones
+
+def test_seleccion_de_backend():
+    """El backend se elige por configuración, con SQLite como respaldo"""
+    directorio = tempfile.mkdtemp(prefix="ecosmart_test_")
+    original = cache.CACHE_DIR
+    cache.CACHE_DIR = directorio
+    try:
+        solo_memoria = CacheEscalonada("memoria_test", backend='memoria')
+        solo_memoria.guardar('a', 1)
+        assert solo_memoria.obtener('a') == 1 and solo_memoria.disco is None
+        assert solo_memoria.estadisticas()['backend'] == 'memoria'
+
+        assert isinstance(crear_cache_compartida("sqlite_test"), CacheSQLite)
+        assert isinstance(crear_cache_compartida("otro_test", backend='dbm'), CacheSQLite)
+        if cache.redis is None:
+            assert isinstance(crear_cache_compartida("redis_test", backend='redis'), CacheSQLite)
+        else:
+            assert isinstance(crear_cache_compartida("redis_test", backend='redis'), CacheRedis)
+        # Una ruta explícita siempre usa SQLite
+        ruta = os.path.join(directorio, "explicita.sqlite")
+        assert crear_cache_compartida("explicita", ruta=ruta, backend='redis').ruta == ruta
+    finally:
+        cache.CACHE_DIR = original
+
+def test_carrusel_compartido():
+    """Un worker nuevo publica la instantánea del carrusel que dejó otro worker"""
+    servidor = RedisSimulado()
+    originales = (carousel_content._cache_carrusel, carousel_content._instantanea, dict(carousel_content._metricas))
+    carousel_content._cache_carrusel = CacheEscalonada("carrusel", compartida=CacheRedis("carrusel", cliente=servidor))
+    try:
+        assert carousel_content.cargar_instantanea_compartida() == 0.0
+        datos = carousel_content.datos_locales()
+        datos['energia_solar']['titulo'] = 'Generado por otro worker'
+        carousel_content._cache_carrusel.guardar('instantanea', {'datos': datos, 'actualizada': time.time() - 60})
+
+        # Worker reiniciado: LRU vacío, la instantánea sale del nivel compartido
+        carousel_content._cache_carrusel = CacheEscalonada("carrusel", compartida=CacheRedis("carrusel", cliente=servidor))
+        carousel_content._instantanea = carousel_content._congelar(carousel_content.datos_locales())
+        espera = carousel_content.cargar_instantanea_compartida()
+        assert carousel_content._instantanea['energia_solar']['titulo'] == 'Generado por otro worker'
+        assert 0 < espera <= carousel_content.CARRUSEL_REFRESCO_SEGUNDOS - 60
+    finally:
+        carousel_content._cache_carrusel, carousel_content._instantanea = originales[:2]
+        carousel_content._metricas.update(originales[2])
+
+if __name__ == "__main__":
+    test_sqlite_entre_procesos()
+    test_promocion_con_ttl_restante()
+    test_contadores_entre_hilos()
+    test_redis_compartido()
+    test_seleccion_de_backend()
+    test_carrusel_compartido()
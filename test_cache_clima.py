@@ -0,0 +1,72 @@
+"""
+Script para probar la caché de datos climáticos por coordenadas
+"""
+import os
+import time
+import tempfile
+
+# Usar un directorio de caché temporal para no mezclar con datos reales
+os.environ.setdefault("ECOSMART_CACHE_DIR", tempfile.mkdtemp(prefix="ecosmart_test_"))
+
+from ecosmart_advisor.app.services import clima_api
+from ecosmart_advisor.app.services.cache import CacheLRU
+
+def test_cache_clima():
+    """Verifica que coordenadas cercanas reutilicen la misma consulta"""
+    consultas = []
+    
+    def consulta_simulada(lat, lon, nombre_lugar=None):
+        consultas.append((lat, lon))
+        return {
+            'radiacion_solar': 5.1,
+            'velocidad_viento': 4.2,
+            'temperatura_promedio': 17.5,
+            'ubicacion': f"{lat}, {lon}",
+            'latitud': lat,
+            'longitud': lon,
+            'fuente': 'open_meteo'
+        }
+    
+    original = clima_api.consultar_open_meteo
+    fuente_original = clima_api.CLIMA_FUENTE
+    clima_api.consultar_open_meteo = consulta_simulada
+    clima_api.CLIMA_FUENTE = 'open_meteo'
+    try:
+        clima_api._cache_clima.limpiar()
+        inicio = time.perf_counter()
+        primero = clima_api.obtener_datos_clima("-31.4201,-64.1888")
+        segundo = clima_api.obtener_datos_clima("-31.4210,-64.1880")
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+    finally:
+        clima_api.consultar_open_meteo = original
+        clima_api.CLIMA_FUENTE = fuente_original
+    
+    print(f"Consultas a Open-Meteo: {len(consultas)}")
+    print(f"Tiempo total: {duracion_ms:.2f} ms")
+    print(f"Estadísticas: {clima_api.estadisticas_cache_clima()}")
+    
+    assert len(consultas) == 1
+    assert segundo['radiacion_solar'] == primero['radiacion_solar']
+    # La ubicación devuelta es la pedida, no la de la celda
+    assert segundo['latitud'] == -31.4210
+
+def test_cache_lru_expulsion():
+    """Verifica la expulsión por tamaño y por TTL del LRU en memoria"""
+    cache = CacheLRU(max_entradas=2, ttl=60)
+    cache.guardar('a', 1)
+    cache.guardar('b', 2)
+    cache.obtener('a')
+    cache.guardar('c', 3)  # Expulsa 'b', que es la menos usada
+    
+    print(f"Estadísticas LRU: {cache.estadisticas()}")
+    
+    assert cache.obtener('b') is None
+    assert cache.obtener('a') == 1
+    
+    cache_ttl = CacheLRU(max_entradas=2, ttl=60)
+    cache_ttl.guardar('d', 4, ttl=-1)  # Ya expirada
+    assert cache_ttl.obtener('d') is None
+
+if __name__ == "__main__":
+    test_cache_clima()
+    test_cache_lru_expulsion()
@@ -0,0 +1,159 @@
+"""
+Script para probar la reconstrucción del carrusel en segundo plano
+(la página principal no espera a las APIs aunque estén lentas) y la
+consulta en paralelo de todas las categorías con plazo global
+"""
+import os
+import json
+import time
+import tempfile
+
+from ecosmart_advisor.app import create_app
+from ecosmart_advisor.app.services import carousel_content
+from ecosmart_advisor.app.services import http_cliente
+from ecosmart_advisor.app.services import llm_cache
+from ecosmart_advisor.app.services.cache import CacheEscalonada
+
+DEMORA = 0.5  # Segundos que tarda cada API simulada
+DEMORA_LENTA = 3.0  # Segundos que tarda la API en los temas lentos (luego falla)
+
+class RespuestaSimulada:
+    text = ''
+
+    def __init__(self, contenido, status_code=200):
+        self._contenido = contenido
+        self.status_code = status_code
+
+    def json(self):
+        return self._contenido
+
+def _con_apis_lentas(prueba, temas_lentos=()):
+    """
+    Ejecuta la prueba con Deepseek y Unsplash simulados (lentos) y una caché temporal.
+    Las consultas a Deepseek sobre `temas_lentos` tardan DEMORA_LENTA y fallan,
+    para que no se guarden en la caché después de la prueba.
+    """
+    llamadas = []
+
+    def post_simulado(url, **kwargs):
+        llamadas.append('deepseek')
+        prompt = kwargs['json']['messages'][1]['content']
+        if any(tema in prompt for tema in temas_lentos):
+            time.sleep(DEMORA_LENTA)
+            return RespuestaSimulada({}, status_code=503)
+        time.sleep(DEMORA)
+        contenido = {'titulo': 'Título generado', 'texto_principal': 'Texto', 'dato_destacado': 'Dato'}
+        return RespuestaSimulada({'choices': [{'message': {'content': json.dumps(contenido)}}]})
+
+    def get_simulado(url, **kwargs):
+        if url != carousel_content.UNSPLASH_API_URL:
+            # Descarga de la imagen para generar sus variantes (no disponible en la prueba)
+            return RespuestaSimulada({}, status_code=404)
+        llamadas.append('unsplash')
+        time.sleep(DEMORA)
+        return RespuestaSimulada({'results': [{'urls': {'regular': 'https://images.example/foto.jpg'}}]})
+
+    directorio = tempfile.mkdtemp(prefix="ecosmart_test_")
+    originales = (http_cliente.post, http_cliente.get, llm_cache._cache, carousel_content.DEEPSEEK_API_KEY,
+                  carousel_content.UNSPLASH_ACCESS_KEY, carousel_content._instantanea,
+                  carousel_content.CARRUSEL_REFRESCO, carousel_content.CARRUSEL_REFRESCO_SEGUNDOS,
+                  carousel_content._cache_carrusel)
+    http_cliente.post, http_cliente.get = post_simulado, get_simulado
+    llm_cache._cache = CacheEscalonada("llm_test", ruta=os.path.join(directorio, "llm.sqlite"))
+    carousel_content._cache_carrusel = CacheEscalonada("carrusel_test", ruta=os.path.join(directorio, "carrusel.sqlite"))
+    carousel_content.DEEPSEEK_API_KEY = 'clave-de-prueba'
+    carousel_content.UNSPLASH_ACCESS_KEY = 'clave-de-prueba'
+    carousel_content.CARRUSEL_REFRESCO = True
+    carousel_content.CARRUSEL_REFRESCO_SEGUNDOS = 3600
+    carousel_content.detener_refresco()
+    carousel_content._instantanea = carousel_content._congelar(carousel_content.datos_locales())
+    try:
+        prueba(llamadas)
+    finally:
+        carousel_content.detener_refresco()
+        (http_cliente.post, http_cliente.get, llm_cache._cache, carousel_content.DEEPSEEK_API_KEY,
+         carousel_content.UNSPLASH_ACCESS_KEY, carousel_content._instantanea,
+         carousel_content.CARRUSEL_REFRESCO, carousel_content.CARRUSEL_REFRESCO_SEGUNDOS,
+         carousel_content._cache_carrusel) = originales
+
+def test_instantanea_inmutable():
+    """La instantánea publicada no se puede modificar y no comparte datos con los predeterminados"""
+    datos = carousel_content._congelar(carousel_content.datos_locales())
+    assert list(datos) == carousel_content.CAROUSEL_CATEGORIES
+    for diccionario, clave in ((datos, 'otra'), (datos['energia_solar'], 'titulo')):
+        try:
+            diccionario[clave] = 'x'
+            assert False, "la instantánea debería ser de solo lectura"
+        except TypeError:
+            pass
+    assert datos['futuro_renovables']['imagen_url'].endswith('futuro_renovable.jpg')
+    assert 'imagen_url' not in carousel_content.DEFAULT_CAROUSEL_DATA['energia_solar']
+
+def test_pagina_no_espera_apis():
+    """La página principal responde enseguida y muestra el contenido nuevo cuando se publica"""
+    def prueba(llamadas):
+        app = create_app()
+        app.config['TESTING'] = True
+        cliente = app.test_client()
+        anteriores = carousel_content.estadisticas_carrusel()['reconstrucciones']
+
+        inicio = time.perf_counter()
+        respuesta = cliente.get('/')
+        primera = time.perf_counter() - inicio
+        assert respuesta.status_code == 200
+        assert 'Ahorro con Energía Solar' in respuesta.get_data(as_text=True)
+
+        # Mientras se reconstruye en segundo plano, las páginas siguen leyendo la instantánea anterior
+        tiempos = []
+        for _ in range(5):
+            inicio = time.perf_counter()
+            assert cliente.get('/').status_code == 200
+            tiempos.append(time.perf_counter() - inicio)
+        print(f"Página principal: {primera * 1000:.0f} ms la primera vez, "
+              f"{max(tiempos) * 1000:.0f} ms como máximo durante la reconstrucción")
+        assert primera < DEMORA and max(tiempos) < DEMORA
+
+        limite = time.monotonic() + 30
+        while carousel_content.estadisticas_carrusel()['reconstrucciones'] == anteriores and time.monotonic() < limite:
+            time.sleep(0.05)
+        estadisticas = carousel_content.estadisticas_carrusel()
+        print(f"Carrusel reconstruido en {estadisticas['ultima_duracion']:.2f} s con {len(llamadas)} llamadas a las APIs")
+        assert estadisticas['reconstrucciones'] > anteriores and llamadas
+
+        html = cliente.get('/').get_data(as_text=True)
+        assert 'Título generado' in html and 'https://images.example/foto.jpg' in html
+    _con_apis_lentas(prueba)
+
+def test_reconstruccion_en_paralelo():
+    """Las categorías se consultan a la vez: el total se acerca al de una sola consulta"""
+    def prueba(llamadas):
+        inicio = time.perf_counter()
+        datos = carousel_content.generar_datos_carrusel()
+        total = time.perf_counter() - inicio
+        secuencial = 2 * DEMORA * len(carousel_content.CAROUSEL_CATEGORIES)
+        print(f"Carrusel completo en {total:.2f} s ({len(llamadas)} consultas; en serie serían {secuencial:.1f} s)")
+        assert total < 3 * DEMORA and len(llamadas) == 2 * len(carousel_content.CAROUSEL_CATEGORIES)
+        assert list(datos) == carousel_content.CAROUSEL_CATEGORIES
+        assert all(d['titulo'] == 'Título generado' and d['imagen_url'].startswith('https://') for d in datos.values())
+    _con_apis_lentas(prueba)
+
+def test_plazo_por_categoria():
+    """Al vencer el plazo, solo las categorías demoradas usan sus datos predeterminados"""
+    def prueba(llamadas):
+        inicio = time.perf_counter()
+        datos = carousel_content.generar_datos_carrusel(plazo=1.5)
+        total = time.perf_counter() - inicio
+        print(f"Carrusel con una categoría demorada en {total:.2f} s")
+        assert total < DEMORA_LENTA
+        eolica = carousel_content.DEFAULT_CAROUSEL_DATA['energia_eolica']
+        assert datos['energia_eolica']['titulo'] == eolica['titulo']
+        assert datos['energia_eolica']['imagen_url'].startswith('https://')
+        assert all(d['titulo'] == 'Título generado' for c, d in datos.items() if c != 'energia_eolica')
+        assert 'imagen_url' not in eolica
+    _con_apis_lentas(prueba, temas_lentos=('energía eólica',))
+
+if __name__ == "__main__":
+    test_instantanea_inmutable()
+    test_pagina_no_espera_apis()
+    test_reconstruccion_en_paralelo()
+    test_plazo_por_categoria()
@@ -0,0 +1,193 @@
+"""
+Script para probar el chatbot basado en reglas y medir el costo por consulta
+del buscador de palabras clave precompilado
+"""
+import math
+import time
+import random
+
+from ecosmart_advisor.chatbot import chatbot
+from ecosmart_advisor.chatbot.coincidencias import AutomataPalabras
+from ecosmart_advisor.chatbot.indice import IndiceBM25, raiz, tokenizar
+
+PREGUNTAS = [
+    "como funcionan los paneles fotovoltaicos en invierno",
+    "necesito un aerogenerador para mi casa de campo",
+    "cuanto se puede ahorrar en la factura con energia solar",
+    "que mantenimiento necesita un termotanque",
+    "me conviene comprar baterias de litio",
+    "hay subsidio o financiamiento para instalar placas",
+    "cual es la huella de carbono de una casa",
+    "en cuantos años recupero la inversion",
+    "para que sirve el simulador de la aplicacion",
+    "hola",
+    "quiero saber sobre recetas de cocina",
+]
+
+def _puntuar_original(pregunta_limpia):
+    """Puntuación anterior: todas las palabras contra todos los términos relacionados"""
+    mejores_coincidencias = {}
+    for palabra_clave in chatbot.CONOCIMIENTO_BASE:
+        if palabra_clave.lower() in pregunta_limpia:
+            palabras_pregunta = pregunta_limpia.split()
+            mejores_coincidencias[palabra_clave] = len(palabra_clave.split()) / len(palabras_pregunta) * 0.8
+    for palabra in pregunta_limpia.split():
+        for termino_relacionado, tema in chatbot.get_palabras_relacionadas().items():
+            if palabra == termino_relacionado:
+                mejores_coincidencias[tema] = mejores_coincidencias.get(tema, 0) + 0.6
+            elif termino_relacionado in palabra:
+                mejores_coincidencias[tema] = mejores_coincidencias.get(tema, 0) + 0.3
+    return mejores_coincidencias
+
+def _mejor_tema(puntuaciones):
+    mejor_tema, mejor_puntuacion = None, chatbot.UMBRAL_COINCIDENCIA
+    for tema, puntuacion in puntuaciones.items():
+        if puntuacion > mejor_puntuacion:
+            mejor_tema, mejor_puntuacion = tema, puntuacion
+    return mejor_tema
+
+def test_automata():
+    """Verifica que el autómata encuentre todas las apariciones, también superpuestas"""
+    automata = AutomataPalabras({'sol': 'a', 'solar': 'b', 'lar': 'c', 'ar': 'd', 'paneles solares': 'e'})
+    encontradas = sorted(automata.buscar('paneles solares al sol'))
+    assert encontradas == [(0, 15, 'e'), (8, 11, 'a'), (8, 13, 'b'), (10, 13, 'c'), (11, 13, 'd'), (19, 22, 'a')]
+
+    generador = random.Random(3)
+    patrones = {''.join(generador.choice('abc') for _ in range(generador.randint(1, 4))): i for i in range(40)}
+    automata = AutomataPalabras(patrones)
+    for _ in range(50):
+        texto = ''.join(generador.choice('abc ') for _ in range(30))
+        esperadas = sorted((i, i + len(p), v) for p, v in patrones.items()
+                           for i in range(len(texto)) if texto.startswith(p, i))
+        assert sorted(automata.buscar(texto)) == esperadas
+
+def test_misma_puntuacion():
+    """En preguntas sin acentos ni signos, el tema elegido coincide con el método anterior"""
+    for pregunta in PREGUNTAS:
+        anterior = _puntuar_original(pregunta)
+        nueva = chatbot.puntuar_temas(chatbot.normalizar(pregunta))
+        esperado = _mejor_tema({tema: p for tema, p in anterior.items() if tema in chatbot.CONOCIMIENTO_BASE})
+        assert _mejor_tema(nueva) == esperado, pregunta
+
+def test_acentos_y_signos():
+    """Las palabras clave se encuentran sin importar acentos, mayúsculas ni signos"""
+    eolica = chatbot.CONOCIMIENTO_BASE["energía eólica"]
+    assert chatbot.generar_respuesta_chatbot("¿Qué es la ENERGIA EOLICA?") == eolica
+    assert chatbot.generar_respuesta_chatbot("energía eólica") == eolica
+    assert chatbot.generar_respuesta_chatbot("¿Y las baterías?") == chatbot.CONOCIMIENTO_BASE["baterías"]
+    # Los términos de varias palabras también cuentan
+    assert "termotanque solar" in chatbot.puntuar_temas("quiero agua caliente")
+    # Los temas sin respuesta propia pasan a los casos especiales
+    assert "costos" not in chatbot.puntuar_temas("cuanto cuesta")
+    assert chatbot.generar_respuesta_chatbot("cuánto cuesta un aerogenerador eolico?").startswith("Los")
+
+def test_costo_por_consulta():
+    """Compara el costo por consulta con el de los ciclos anidados anteriores"""
+    repeticiones = 200
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for pregunta in PREGUNTAS:
+            _puntuar_original(pregunta)
+    anterior = (time.perf_counter() - inicio) / (repeticiones * len(PREGUNTAS))
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for pregunta in PREGUNTAS:
+            chatbot.puntuar_temas(chatbot.normalizar(pregunta))
+    nueva = (time.perf_counter() - inicio) / (repeticiones * len(PREGUNTAS))
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for pregunta in PREGUNTAS:
+            chatbot.generar_respuesta_chatbot(pregunta)
+    completa = (time.perf_counter() - inicio) / (repeticiones * len(PREGUNTAS))
+
+    print(f"Puntuación por consulta: {anterior * 1e6:.1f} µs antes, {nueva * 1e6:.1f} µs con el autómata "
+          f"({anterior / nueva:.0f}x); respuesta completa {completa * 1e6:.1f} µs "
+          f"({len(chatbot._AUTOMATA)} estados)")
+    assert nueva < anterior
+
+def _bm25_directo(documentos, consulta, k1=1.2, b=0.75):
+    """BM25 calculado documento por documento, sin índice"""
+    terminos = [tokenizar(titulo) * 3 + tokenizar(texto) for titulo, texto in documentos]
+    promedio = sum(len(t) for t in terminos) / len(terminos)
+    puntajes = []
+    for documento in terminos:
+        puntaje = 0.0
+        for termino in set(tokenizar(consulta)):
+            frecuencia = documento.count(termino)
+            if frecuencia:
+                df = sum(termino in otro for otro in terminos)
+                idf = math.log(1 + (len(terminos) - df + 0.5) / (df + 0.5))
+                puntaje += idf * frecuencia * (k1 + 1) / (frecuencia + k1 * (1 - b + b * len(documento) / promedio))
+        puntajes.append(puntaje)
+    return puntajes
+
+def test_raiz():
+    """Verifica que las variantes de una palabra compartan raíz"""
+    grupos = [["fotovoltaicos", "fotovoltaica", "fotovoltaico"], ["paneles", "panel"], ["solares", "solar"],
+              ["baterias", "bateria"], ["instalar", "instalacion", "instalaciones", "instalado"],
+              ["ahorro", "ahorrar", "ahorrando"], ["mantenimiento", "mantener"], ["calentador", "calentar"]]
+    for grupo in grupos:
+        assert len({raiz(palabra) for palabra in grupo}) == 1, grupo
+    assert raiz("solar") != raiz("sol") and raiz("luces") == "luz"
+    assert tokenizar("¿Cuánto cuesta instalar los PANELES fotovoltaicos?") == ["cuant", "cuest", "instal", "panel", "fotovoltaic"]
+
+def test_indice_bm25():
+    """Compara el índice con el cálculo directo de BM25 y verifica el orden de los resultados"""
+    documentos = [(titulo, respuesta) for titulo, respuesta in chatbot._DOCUMENTOS]
+    indice = IndiceBM25(documentos)
+    for consulta in ["los fotovoltaicos funcionan de noche", "costo del termotanque", "vender energia a la red"]:
+        esperado = _bm25_directo(documentos, consulta)
+        obtenido = indice.puntuar(consulta)
+        assert max(abs(a - b) for a, b in zip(esperado, obtenido)) < 1e-9
+        resultados = indice.buscar(consulta, limite=3)
+        assert resultados[0][0] == max(range(len(esperado)), key=esperado.__getitem__)
+        assert [p for _, p in resultados] == sorted((p for _, p in resultados), reverse=True)
+    assert indice.buscar("recetas de cocina") == []
+
+def test_respuestas_por_indice():
+    """Las preguntas que no resuelven las reglas se responden con el índice"""
+    assert chatbot.generar_respuesta_chatbot("¿Qué es el efecto fotoeléctrico?") == \
+        chatbot.CASOS_ESPECIALES["como funcionan los paneles solares"]
+    assert chatbot.generar_respuesta_chatbot("¿Puedo usar tubos de vacío o colector plano?") == \
+        chatbot.CASOS_ESPECIALES["costo termotanque solar"]
+    assert chatbot.generar_respuesta_chatbot("¿Qué es el net metering?") == chatbot.CONOCIMIENTO_BASE["incentivos"]
+    assert chatbot.generar_respuesta_chatbot("quiero saber sobre recetas de cocina").startswith("Lo siento")
+    resultados = chatbot.buscar_respuestas("paneles fotovoltaicos")
+    assert resultados[0]['titulo'] == "paneles solares" and len(resultados) == 3
+
+def test_respuesta_generica_texto_plano():
+    """La respuesta genérica es texto plano: los widgets la escriben con textContent"""
+    respuesta = chatbot.respuesta_generica("energía para mi casa")
+    assert "<br>" not in respuesta and "\n• " in respuesta
+
+def test_indice_escala():
+    """Con miles de documentos la búsqueda sigue por debajo del milisegundo"""
+    generador = random.Random(11)
+    vocabulario = sorted({t for titulo, texto in chatbot._DOCUMENTOS for t in (titulo + " " + texto).split()})
+    documentos = [(" ".join(generador.sample(vocabulario, 3)), " ".join(generador.choices(vocabulario, k=60)))
+                  for _ in range(5000)]
+    inicio = time.perf_counter()
+    indice = IndiceBM25(documentos)
+    construccion = time.perf_counter() - inicio
+
+    consultas = [" ".join(generador.sample(vocabulario, 5)) for _ in range(200)]
+    inicio = time.perf_counter()
+    for consulta in consultas:
+        indice.buscar(consulta, limite=3)
+    por_consulta = (time.perf_counter() - inicio) / len(consultas)
+    print(f"Índice de {len(indice)} documentos y {len(indice.postings)} términos construido en "
+          f"{construccion * 1000:.0f} ms; {por_consulta * 1e6:.0f} µs por consulta")
+    assert por_consulta < 0.001
+
+if __name__ == "__main__":
+    test_automata()
+    test_misma_puntuacion()
+    test_acentos_y_signos()
+    test_costo_por_consulta()
+    test_raiz()
+    test_indice_bm25()
+    test_respuestas_por_indice()
+    test_respuesta_generica_texto_plano()
+    test_indice_escala()
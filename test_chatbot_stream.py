@@ -0,0 +1,166 @@
+"""
+Script para probar las respuestas del chatbot transmitidas por Server-Sent Events
+"""
+import os
+import json
+import time
+import tempfile
+
+from ecosmart_advisor.app import create_app
+from ecosmart_advisor.app import routes
+from ecosmart_advisor.app.services import http_cliente
+from ecosmart_advisor.app.services import llm_cache
+from ecosmart_advisor.app.services.cache import CacheEscalonada
+from ecosmart_advisor.chatbot import ai_chatbot
+
+DEMORA_FRAGMENTO = 0.1  # Segundos entre fragmentos del stream simulado
+FRAGMENTOS = ["Los paneles solares ", "convierten la radiación ", "en electricidad. " * 12, "Duran 25 años."]
+SUGERENCIAS = ["¿Cuántos paneles necesito?", "¿Cuánto cuestan?", "¿Qué mantenimiento requieren?"]
+
+class StreamSimulado:
+    """Respuesta de Deepseek en modo streaming (líneas SSE con demora)"""
+    status_code = 200
+    text = ''
+
+    def __init__(self, fragmentos):
+        self.fragmentos = fragmentos
+        self.cerrado = False
+
+    def iter_lines(self):
+        for fragmento in self.fragmentos:
+            time.sleep(DEMORA_FRAGMENTO)
+            evento = {'choices': [{'delta': {'content': fragmento}}]}
+            yield b'data: ' + json.dumps(evento, ensure_ascii=False).encode('utf-8')
+            yield b''
+        yield b'data: [DONE]'
+
+    def close(self):
+        self.cerrado = True
+
+class RespuestaSimulada:
+    status_code = 200
+    text = ''
+
+    def json(self):
+        return {'choices': [{'message': {'content': json.dumps(SUGERENCIAS, ensure_ascii=False)}}]}
+
+def _con_stream_simulado(prueba):
+    """Ejecuta la prueba con una caché temporal y la API de Deepseek simulada"""
+    consultas = []
+
+    def post_simulado(url, **kwargs):
+        consultas.append(kwargs)
+        if kwargs.get('stream'):
+            assert kwargs['json']['stream'] is True
+            return StreamSimulado(FRAGMENTOS)
+        # Pedido de sugerencias: sin demora adicional para medir solo el paralelismo
+        return RespuestaSimulada()
+
+    directorio = tempfile.mkdtemp(prefix="ecosmart_test_")
+    originales = (http_cliente.post, llm_cache._cache, ai_chatbot.DEEPSEEK_API_KEY, routes._respuestas_chatbot,
+                  ai_chatbot.CHATBOT_PRECARGA)
+    http_cliente.post = post_simulado
+    ai_chatbot.CHATBOT_PRECARGA = False
+    llm_cache._cache = CacheEscalonada("llm_test", ruta=os.path.join(directorio, "llm.sqlite"))
+    ai_chatbot.DEEPSEEK_API_KEY = 'clave-de-prueba'
+    routes._respuestas_chatbot = CacheEscalonada("chatbot_test", ruta=os.path.join(directorio, "chatbot.sqlite"))
+    llm_cache.limpiar_cache_llm()
+    try:
+        prueba(consultas)
+    finally:
+        (http_cliente.post, llm_cache._cache, ai_chatbot.DEEPSEEK_API_KEY, routes._respuestas_chatbot,
+         ai_chatbot.CHATBOT_PRECARGA) = originales
+
+def _leer_eventos(lineas, inicio=None):
+    """Separa el texto SSE en (evento, datos) registrando cuándo llegó cada uno"""
+    inicio = time.perf_counter() if inicio is None else inicio
+    eventos = []
+    for bloque in lineas:
+        texto = bloque.decode('utf-8') if isinstance(bloque, bytes) else bloque
+        for parte in texto.split('\n\n'):
+            if not parte.strip():
+                continue
+            campos = dict(linea.split(': ', 1) for linea in parte.split('\n'))
+            eventos.append((campos['event'], json.loads(campos['data']), time.perf_counter() - inicio))
+    return eventos
+
+def test_stream_generador():
+    """Los fragmentos llegan a medida que se generan y la respuesta queda en caché"""
+    def prueba(consultas):
+        inicio = time.perf_counter()
+        eventos = []
+        for evento, datos in ai_chatbot.generar_respuesta_ia_stream("¿Cómo funcionan los paneles solares?"):
+            eventos.append((evento, datos, time.perf_counter() - inicio))
+
+        tipos = [evento for evento, _, _ in eventos]
+        assert tipos == ['token'] * len(FRAGMENTOS) + ['sugerencias', 'fin']
+        primero, total = eventos[0][2], eventos[-1][2]
+        print(f"Primer fragmento a los {primero * 1000:.0f} ms, respuesta completa a los {total * 1000:.0f} ms")
+        assert primero < 0.5 and total > DEMORA_FRAGMENTO * len(FRAGMENTOS)
+        assert eventos[-1][1] == {'respuesta': ''.join(FRAGMENTOS), 'origen': 'ia'}
+        assert eventos[-2][1]['sugerencias'] == SUGERENCIAS
+
+        # Las sugerencias se piden apenas hay contexto suficiente, antes de que termine el stream
+        pedido = next(c for c in consultas if not c.get('stream'))
+        contexto = pedido['json']['messages'][1]['content']
+        assert "Duran 25 años" not in contexto
+
+        # Segunda consulta: desde la caché, compartida con la versión sin streaming
+        assert ai_chatbot.generar_respuesta_ia("¿cómo funcionan los paneles solares") == {
+            'respuesta': ''.join(FRAGMENTOS), 'sugerencias': SUGERENCIAS
+        }
+        eventos = list(ai_chatbot.generar_respuesta_ia_stream("Cómo funcionan los paneles solares"))
+        assert eventos[-1][1]['origen'] == 'cache' and len(consultas) == 2
+    _con_stream_simulado(prueba)
+
+def test_stream_fallback():
+    """Sin respuesta de la IA se transmite la respuesta del sistema de reglas"""
+    def prueba(consultas):
+        ai_chatbot.DEEPSEEK_API_KEY = None
+        eventos = list(ai_chatbot.generar_respuesta_ia_stream("¿Qué es un termotanque solar?"))
+        assert [evento for evento, _ in eventos] == ['token', 'sugerencias', 'fin']
+        assert eventos[-1][1]['origen'] == 'reglas' and eventos[0][1]['texto']
+        assert len(eventos[1][1]['sugerencias']) == 3
+        assert consultas == []
+    _con_stream_simulado(prueba)
+
+def test_ruta_stream():
+    """La ruta transmite eventos SSE y el historial se completa en la consulta siguiente"""
+    def prueba(consultas):
+        app = create_app()
+        app.config['TESTING'] = True
+        cliente = app.test_client()
+
+        inicio = time.perf_counter()
+        respuesta = cliente.post('/chatbot/consulta/stream', json={'pregunta': '¿Cómo funcionan los paneles solares?'},
+                                 buffered=False)
+        assert respuesta.mimetype == 'text/event-stream'
+        eventos = _leer_eventos(respuesta.response, inicio)
+        respuesta.close()
+        print(f"Ruta: {len(eventos)} eventos, primer fragmento a los {eventos[0][2] * 1000:.0f} ms")
+        assert eventos[0][0] == 'token' and eventos[0][2] < 0.5
+        assert eventos[-1][0] == 'fin' and eventos[-1][1]['respuesta'] == ''.join(FRAGMENTOS)
+
+        with cliente.session_transaction() as sesion:
+            assert sesion['historial_chatbot'] == [{'rol': 'usuario', 'contenido': '¿Cómo funcionan los paneles solares?'}]
+            assert sesion['respuesta_pendiente']
+
+        # La siguiente consulta envía a la IA el historial con la respuesta transmitida
+        respuesta = cliente.post('/chatbot/consulta', json={'pregunta': '¿Cuánto duran?'})
+        assert respuesta.status_code == 200
+        enviados = [m for c in consultas if not c.get('stream') for m in c['json']['messages']]
+        assert {'role': 'assistant', 'content': ''.join(FRAGMENTOS)} in enviados
+        with cliente.session_transaction() as sesion:
+            historial = sesion['historial_chatbot']
+            assert 'respuesta_pendiente' not in sesion
+        assert [m['rol'] for m in historial] == ['usuario', 'asistente', 'usuario', 'asistente']
+        assert historial[1]['contenido'] == ''.join(FRAGMENTOS)
+
+        vacia = cliente.post('/chatbot/consulta/stream', json={'pregunta': '  '})
+        assert [e for e, _, _ in _leer_eventos(vacia.response)] == ['token', 'sugerencias', 'fin']
+    _con_stream_simulado(prueba)
+
+if __name__ == "__main__":
+    test_stream_generador()
+    test_stream_fallback()
+    test_ruta_stream()
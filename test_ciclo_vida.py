@@ -0,0 +1,65 @@
+"""
+Script para probar el motor de ciclo de vida y flujo de caja
+"""
+import time
+import numpy as np
+
+from ecosmart_advisor.app.services.ciclo_vida import evaluar_ciclo_vida, resumen_ciclo_vida, calcular_tir
+
+def test_casos_analiticos():
+    """Sin degradación ni costos recurrentes, VAN y LCOE tienen fórmula cerrada"""
+    sin_costos = {'degradacion': 0, 'om_anual': 0, 'anio_reemplazo_inversor': 0}
+    evaluacion = evaluar_ciclo_vida(1000.0, 1000.0, precio_kwh=0.2, anios=10, tasa_descuento=0.1,
+                                    escalada_tarifa=0, **sin_costos)
+    anualidad = (1 - 1.1 ** -10) / 0.1
+    assert abs(evaluacion['van'] - (-1000 + 200 * anualidad)) < 1e-6
+    assert abs(evaluacion['lcoe'] - 1000 / (1000 * anualidad)) < 1e-9
+    assert evaluacion['recupero_descontado'] == 8  # 200 x anualidad: 973.7 al año 7, 1067.0 al año 8
+    print(f"VAN: {float(evaluacion['van']):.2f} USD, TIR: {float(evaluacion['tir']) * 100:.2f} %")
+
+    # TIR conocida: invertir 100 y recibir 110 al año siguiente
+    assert abs(calcular_tir(np.array([-100.0, 110.0])) - 0.10) < 1e-9
+    # Sin ingresos no hay TIR
+    assert np.isnan(calcular_tir(np.array([-100.0, -1.0, -1.0])))
+
+    resumen = resumen_ciclo_vida(evaluacion)
+    assert len(resumen['flujo_de_caja']) == 10
+    assert resumen['flujo_de_caja'][0]['ingresos'] == 200
+    assert abs(resumen['tir_porcentaje'] - 15.1) < 0.05
+
+def test_degradacion_y_reemplazo():
+    """La degradación reduce la generación y el reemplazo del inversor aparece en su año"""
+    evaluacion = evaluar_ciclo_vida(6000.0, 7000.0, 'solar')
+    generacion = evaluacion['generacion']
+    assert len(generacion) == 25 and abs(generacion[-1] / generacion[0] - 0.995 ** 24) < 1e-12
+    assert evaluacion['reemplazos'][11] == 6000 * 0.15 and evaluacion['reemplazos'].sum() == 6000 * 0.15
+    assert evaluacion['tarifa'][1] > evaluacion['tarifa'][0]
+    # El termotanque no tiene inversor
+    assert evaluar_ciclo_vida(1200.0, 1500.0, 'termotanque_solar')['reemplazos'].sum() == 0
+
+def test_vectorizado():
+    """Miles de sistemas en una sola llamada, con los mismos resultados que uno por uno"""
+    generador = np.random.default_rng(0)
+    costos = generador.uniform(1000, 20000, 10000)
+    generaciones = costos / 1200 * generador.uniform(900, 1800, 10000)
+
+    inicio = time.perf_counter()
+    evaluacion = evaluar_ciclo_vida(costos, generaciones, 'solar')
+    tiempo = time.perf_counter() - inicio
+    print(f"10.000 sistemas en {tiempo * 1000:.1f} ms")
+    assert tiempo < 1.0
+    assert evaluacion['van'].shape == (10000,) and evaluacion['flujo'].shape == (10000, 25)
+
+    for i in [0, 1234, 9999]:
+        individual = evaluar_ciclo_vida(costos[i], generaciones[i], 'solar')
+        assert abs(individual['van'] - evaluacion['van'][i]) < 1e-6
+        assert abs(individual['tir'] - evaluacion['tir'][i]) < 1e-9
+        # En la TIR el VAN es nulo
+        tasa = evaluacion['tir'][i]
+        flujos = np.concatenate([[-costos[i]], evaluacion['flujo'][i]])
+        assert abs(np.sum(flujos * (1 + tasa) ** -np.arange(26))) < 1e-6 * costos[i]
+
+if __name__ == "__main__":
+    test_casos_analiticos()
+    test_degradacion_y_reemplazo()
+    test_vectorizado()
@@ -0,0 +1,81 @@
+"""
+Script para probar la climatología offline (grilla local con interpolación bilineal)
+"""
+import os
+import time
+import tempfile
+
+# Generar la grilla en un directorio temporal para no tocar la del proyecto
+os.environ.setdefault("CLIMATOLOGIA_RUTA", os.path.join(tempfile.mkdtemp(prefix="ecosmart_test_"), "climatologia_ar.npy"))
+
+from ecosmart_advisor.app.services import climatologia
+
+def test_climatologia():
+    """Verifica valores plausibles, el formato de salida y la latencia de consulta"""
+    inicio = time.perf_counter()
+    climatologia.cargar_grilla()
+    print(f"Carga de la grilla: {(time.perf_counter() - inicio) * 1000:.1f} ms")
+    
+    inicio = time.perf_counter()
+    for _ in range(1000):
+        cordoba = climatologia.obtener_climatologia(-31.42, -64.19, "Córdoba")
+    duracion_us = (time.perf_counter() - inicio) * 1000  # 1000 consultas → µs por consulta
+    print(f"Consulta promedio: {duracion_us:.1f} µs")
+    print(f"Córdoba: {cordoba['radiacion_solar']} kWh/m²/día, "
+          f"{cordoba['velocidad_viento']} m/s, {cordoba['temperatura_promedio']} °C")
+    
+    assert cordoba['fuente'] == 'climatologia'
+    assert cordoba['ubicacion'] == "Córdoba"
+    assert 4.0 < cordoba['radiacion_solar'] < 6.5
+    assert 12 < cordoba['temperatura_promedio'] < 22
+    assert len(cordoba['climatologia_mensual']['radiacion_solar']) == 12
+    # Enero tiene más radiación que julio en el hemisferio sur
+    mensual = cordoba['climatologia_mensual']['radiacion_solar']
+    assert mensual[0] > mensual[6]
+    
+    # La Patagonia es más ventosa y fría que el NEA
+    rio_gallegos = climatologia.obtener_climatologia(-51.62, -69.22)
+    posadas = climatologia.obtener_climatologia(-27.37, -55.9)
+    assert rio_gallegos['velocidad_viento'] > posadas['velocidad_viento']
+    assert rio_gallegos['temperatura_promedio'] < posadas['temperatura_promedio']
+    
+    # Fuera de la grilla no hay datos
+    assert climatologia.obtener_climatologia(40.4, -3.7) is None
+    # Dentro del rectángulo pero lejos de toda estación (Antofagasta, Atlántico Sur) tampoco
+    assert climatologia.obtener_climatologia(-23.65, -70.4) is None
+    assert climatologia.obtener_climatologia(-45.0, -57.0) is None
+    assert climatologia.distancia_estacion_km(-31.42, -64.19) < 5
+    
+    # La consulta vectorizada coincide con la individual
+    lote = climatologia.interpolar([-31.42, -51.62], [-64.19, -69.22])
+    assert lote.shape == (2, len(climatologia.VARIABLES), 12)
+
+def test_construccion_fallida():
+    """Una construcción fallida se recuerda y no se reintenta en cada consulta"""
+    original = (climatologia._grilla, climatologia._fallo_construccion,
+                climatologia.RUTA_GRILLA, climatologia.RUTA_ESTACIONES, climatologia.construir_grilla)
+    llamadas = []
+
+    def construir_fallida(*args, **kwargs):
+        llamadas.append(1)
+        raise OSError("disco lleno")
+
+    try:
+        climatologia._grilla = None
+        climatologia._fallo_construccion = None
+        climatologia.RUTA_GRILLA = os.path.join(tempfile.mkdtemp(prefix="ecosmart_test_"), "grilla.npy")
+        climatologia.construir_grilla = construir_fallida
+        for _ in range(3):
+            try:
+                climatologia.cargar_grilla()
+                assert False, "La grilla no debería estar disponible"
+            except (OSError, RuntimeError):
+                pass
+        assert len(llamadas) == 1
+    finally:
+        (climatologia._grilla, climatologia._fallo_construccion,
+         climatologia.RUTA_GRILLA, climatologia.RUTA_ESTACIONES, climatologia.construir_grilla) = original
+
+if __name__ == "__main__":
+    test_climatologia()
+    test_construccion_fallida()
@@ -0,0 +1,59 @@
+"""
+Script para probar la caché y la agrupación de consultas de geocodificación
+"""
+import os
+import time
+import tempfile
+import threading
+
+# Usar un directorio de caché temporal para no mezclar con datos reales
+os.environ.setdefault("ECOSMART_CACHE_DIR", tempfile.mkdtemp(prefix="ecosmart_test_"))
+
+from ecosmart_advisor.app.services import geocodificacion
+
+def test_geocodificacion_agrupada():
+    """Verifica que consultas simultáneas equivalentes generen una sola llamada a OpenCage"""
+    consultas = []
+    
+    def opencage_simulado(q, limit, api_key):
+        consultas.append(q)
+        time.sleep(0.2)  # Latencia simulada de OpenCage
+        if 'inexistente' in q.lower():
+            return []
+        return [{'formatted': 'Córdoba, Argentina', 'lat': -31.42, 'lng': -64.19, 'confidence': 6}]
+    
+    original = geocodificacion.consultar_opencage
+    geocodificacion.consultar_opencage = opencage_simulado
+    try:
+        geocodificacion._cache_geocode.limpiar()
+        resultados = []
+        variantes = ["Córdoba", "cordoba", "CÓRDOBA ", "Cordoba."]
+        hilos = [
+            threading.Thread(target=lambda q=q: resultados.append(geocodificacion.geocodificar(q, '5', 'clave')))
+            for q in variantes * 4
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        
+        # Una búsqueda repetida sale de la caché
+        inicio = time.perf_counter()
+        geocodificacion.geocodificar("córdoba", '5', 'clave')
+        print(f"Consulta desde caché: {(time.perf_counter() - inicio) * 1000:.2f} ms")
+        
+        # Las búsquedas sin resultados también se guardan
+        assert geocodificacion.geocodificar("Lugar inexistente", '5', 'clave') == []
+        assert geocodificacion.geocodificar("lugar inexistente", '5', 'clave') == []
+    finally:
+        geocodificacion.consultar_opencage = original
+    
+    print(f"Consultas a OpenCage: {len(consultas)}")
+    print(f"Estadísticas: {geocodificacion.estadisticas_geocodificacion()}")
+    
+    assert len(resultados) == 16
+    assert all(r[0]['lat'] == -31.42 for r in resultados)
+    assert len(consultas) == 2
+
+if __name__ == "__main__":
+    test_geocodificacion_agrupada()
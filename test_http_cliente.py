@@ -0,0 +1,125 @@
+"""
+Script para probar el cliente HTTP compartido contra un servidor local
+"""
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from ecosmart_advisor.app.services.http_cliente import ClienteHTTP, ErrorSaturacion
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Mantener las conexiones abiertas
+    fallas_pendientes = 0
+    conexiones = set()
+    posts_recibidos = 0
+    
+    def do_GET(self):
+        _Manejador.conexiones.add(self.client_address)
+        if self.path.startswith("/inestable") and _Manejador.fallas_pendientes > 0:
+            _Manejador.fallas_pendientes -= 1
+            estado, cuerpo = 503, b"{}"
+        else:
+            estado, cuerpo = 200, json.dumps({"ok": True}).encode()
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+    
+    def do_POST(self):
+        # Lee el cuerpo y corta la conexión sin responder
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        _Manejador.posts_recibidos += 1
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+def test_cliente_http():
+    """Verifica la reutilización de conexiones, los reintentos y las métricas"""
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    cliente = ClienteHTTP(reintentos=2, backoff=0.01)
+    
+    try:
+        for _ in range(20):
+            assert cliente.get(f"{base}/datos").json() == {"ok": True}
+        # Todas las peticiones secuenciales usan la misma conexión
+        print(f"Conexiones abiertas para 20 peticiones: {len(_Manejador.conexiones)}")
+        assert len(_Manejador.conexiones) == 1
+        
+        # Los errores transitorios se reintentan
+        _Manejador.fallas_pendientes = 2
+        assert cliente.get(f"{base}/inestable").status_code == 200
+        _Manejador.fallas_pendientes = 5
+        assert cliente.get(f"{base}/inestable").status_code == 503
+    finally:
+        servidor.shutdown()
+    
+    estadisticas = cliente.estadisticas()["127.0.0.1"]
+    print(f"Estadísticas: {estadisticas}")
+    assert estadisticas["reintentos"] == 4
+    assert estadisticas["peticiones"] == 26
+    assert sum(estadisticas["histograma_ms"].values()) == 26
+
+def test_reintentos_post():
+    """Un POST se reintenta si no pudo conectarse, pero no si se cortó después de enviarlo"""
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    cliente = ClienteHTTP(reintentos=2, backoff=0.01)
+    _Manejador.posts_recibidos = 0
+    try:
+        try:
+            cliente.post(f"http://127.0.0.1:{servidor.server_address[1]}/pedido", json={"a": 1})
+            assert False, "la conexión cortada debería propagarse"
+        except requests.exceptions.ConnectionError:
+            pass
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+    print(f"POST cortado después de enviarse: recibido {_Manejador.posts_recibidos} vez")
+    assert _Manejador.posts_recibidos == 1
+
+    # Puerto sin servidor: la conexión falla antes de enviar nada
+    with socket.socket() as libre:
+        libre.bind(("127.0.0.1", 0))
+        puerto = libre.getsockname()[1]
+    try:
+        cliente.post(f"http://127.0.0.1:{puerto}/pedido", json={"a": 1})
+        assert False, "la conexión rechazada debería propagarse"
+    except requests.exceptions.ConnectionError:
+        pass
+    assert cliente.estadisticas()["127.0.0.1"]["reintentos"] == 2
+
+def test_stream_retiene_lugar():
+    """Una respuesta en streaming ocupa su lugar en el límite del host hasta cerrarse"""
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    cliente = ClienteHTTP(timeout=(0.1, 0.2), max_concurrencia=1)
+    try:
+        respuesta = cliente.get(f"{base}/datos", stream=True)
+        try:
+            cliente.get(f"{base}/datos")
+            assert False, "el stream abierto debería ocupar el único lugar"
+        except ErrorSaturacion:
+            pass
+        assert respuesta.json() == {"ok": True}
+        respuesta.close()
+        respuesta.close()  # Cerrar dos veces no libera un lugar de más
+        assert cliente.get(f"{base}/datos").status_code == 200
+        with cliente.get(f"{base}/datos", stream=True) as respuesta:
+            assert respuesta.status_code == 200
+        assert cliente.get(f"{base}/datos").status_code == 200
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+if __name__ == "__main__":
+    test_cliente_http()
+    test_reintentos_post()
+    test_stream_retiene_lugar()
@@ -0,0 +1,168 @@
+"""
+Script para probar las variantes optimizadas de las imágenes del carrusel
+(AVIF/WebP/JPEG en varios anchos, servidas con caché inmutable)
+"""
+import io
+import os
+import tempfile
+
+import pytest
+
+from ecosmart_advisor.app import create_app
+from ecosmart_advisor.app.services import carousel_content
+from ecosmart_advisor.app.services import http_cliente
+from ecosmart_advisor.app.services import imagenes
+from ecosmart_advisor.app.services.cache import CacheEscalonada
+
+URL_REMOTA = "https://images.example/paneles.jpg"
+IMAGEN_LOCAL = "/static/images/carousel/futuro_renovable.jpg"
+
+class RespuestaSimulada:
+    status_code = 200
+    text = ''
+
+    def __init__(self, contenido):
+        self.content = contenido
+
+def _imagen_jpeg(ancho=2000, alto=1200):
+    """JPEG sintético con un degradado (para que la compresión sea realista)"""
+    from PIL import Image
+    imagen = Image.linear_gradient('L').resize((ancho, alto)).convert('RGB')
+    buffer = io.BytesIO()
+    imagen.save(buffer, 'JPEG', quality=95)
+    return buffer.getvalue()
+
+def _con_directorio_temporal(prueba):
+    """Ejecuta la prueba con un directorio de variantes y una caché temporales"""
+    descargas = []
+    contenido = _imagen_jpeg() if imagenes.disponible() else b''
+
+    def get_simulado(url, **kwargs):
+        descargas.append(url)
+        return RespuestaSimulada(contenido)
+
+    directorio = tempfile.mkdtemp(prefix="ecosmart_test_")
+    originales = (imagenes.IMAGENES_DIR, imagenes._variantes, http_cliente.get)
+    imagenes.IMAGENES_DIR = os.path.join(directorio, "imagenes")
+    imagenes._variantes = CacheEscalonada("imagenes_test", ruta=os.path.join(directorio, "imagenes.sqlite"))
+    http_cliente.get = get_simulado
+    try:
+        prueba(descargas, contenido)
+    finally:
+        imagenes.IMAGENES_DIR, imagenes._variantes, http_cliente.get = originales
+
+def test_variantes():
+    """Genera cada formato y ancho una sola vez, con nombres según el contenido"""
+    if not imagenes.disponible():
+        pytest.skip("Pillow no está instalado (pip install \".[imagenes]\")")
+
+    def prueba(descargas, contenido):
+        variantes = imagenes.preparar_imagen(URL_REMOTA)
+        assert variantes['ancho'] == 2000 and variantes['alto'] == 1200
+        anchos = [int(parte.split()[1][:-1]) for parte in variantes['srcset'].split(", ")]
+        assert anchos == sorted(a for a in imagenes.IMAGENES_ANCHOS if a < 2000)
+        assert [f['tipo'] for f in variantes['fuentes']] == [imagenes.TIPOS[e] for e in imagenes.formatos()[:-1]]
+
+        archivos = sorted(os.listdir(imagenes.IMAGENES_DIR))
+        assert len(archivos) == len(anchos) * len(imagenes.formatos())
+        tamanos = {nombre: os.path.getsize(os.path.join(imagenes.IMAGENES_DIR, nombre)) for nombre in archivos}
+        print(f"Original {len(contenido) // 1024} KB; variantes: " +
+              ", ".join(f"{nombre.split('-')[1]} {tamano // 1024} KB" for nombre, tamano in tamanos.items()))
+        assert all(tamano < len(contenido) for tamano in tamanos.values())
+
+        # La segunda vez no se vuelve a descargar ni a codificar
+        assert imagenes.preparar_imagen(URL_REMOTA) == variantes and descargas == [URL_REMOTA]
+
+        # Si se borran los archivos, se regeneran con los mismos nombres
+        for nombre in archivos:
+            os.remove(os.path.join(imagenes.IMAGENES_DIR, nombre))
+        assert imagenes.preparar_imagen(URL_REMOTA) == variantes
+        assert sorted(os.listdir(imagenes.IMAGENES_DIR)) == archivos
+    _con_directorio_temporal(prueba)
+
+def test_imagen_local():
+    """Las imágenes de static/ se procesan desde el disco; las inválidas usan la URL original"""
+    if not imagenes.disponible():
+        pytest.skip("Pillow no está instalado (pip install \".[imagenes]\")")
+
+    def prueba(descargas, contenido):
+        variantes = imagenes.preparar_imagen(IMAGEN_LOCAL)
+        original = os.path.getsize(imagenes._ruta_local(IMAGEN_LOCAL))
+        webp_960 = variantes['fuentes'][-1]['srcset'].split(", ")[1].split()[0]
+        mediana = os.path.getsize(imagenes.ruta_variante(webp_960[len(imagenes.RUTA_IMAGENES):]))
+        print(f"{IMAGEN_LOCAL}: {original // 1024} KB originales, {mediana // 1024} KB en WebP a 960 px")
+        assert mediana < original / 4 and descargas == []
+
+        # Archivos que no son imágenes, inexistentes o fuera de static/
+        assert imagenes.preparar_imagen("/static/images/carousel/energia_solar.jpg") is None
+        assert imagenes.preparar_imagen("/static/images/carousel/no_existe.jpg") is None
+        assert imagenes.preparar_imagen("/static/../services/imagenes.py") is None
+        assert imagenes.preparar_imagen("ftp://imagenes.example/a.jpg") is None
+    _con_directorio_temporal(prueba)
+
+def test_ruta_imagenes():
+    """La ruta /img/ sirve las variantes con caché inmutable y la página usa <picture>"""
+    if not imagenes.disponible():
+        pytest.skip("Pillow no está instalado (pip install \".[imagenes]\")")
+
+    def prueba(descargas, contenido):
+        app = create_app()
+        app.config['TESTING'] = True
+        cliente = app.test_client()
+
+        assert cliente.get('/img/../../etc/passwd').status_code == 404
+        assert cliente.get('/img/0123456789abcdef-960.jpg').status_code == 404
+
+        datos = carousel_content.datos_locales()
+        variantes = imagenes.preparar_imagen(URL_REMOTA)
+        datos['energia_eolica'].update(imagen_url=URL_REMOTA, imagen=variantes)
+
+        respuesta = cliente.get(variantes['src'])
+        assert respuesta.status_code == 200 and respuesta.mimetype == 'image/jpeg'
+        assert respuesta.cache_control.max_age == 365 * 86400 and respuesta.cache_control.immutable
+        respuesta.close()
+
+        originales = (carousel_content._instantanea, carousel_content.CARRUSEL_REFRESCO)
+        carousel_content._instantanea = carousel_content._congelar(datos)
+        carousel_content.CARRUSEL_REFRESCO = False
+        try:
+            html = cliente.get('/').get_data(as_text=True)
+        finally:
+            carousel_content._instantanea, carousel_content.CARRUSEL_REFRESCO = originales
+        assert 'fetchpriority="high"' in html and html.count('loading="lazy"') == 5
+        assert '<picture>' in html and 'type="image/webp"' in html and variantes['srcset'] in html
+        # Sin variantes se usa la imagen original
+        assert 'src="/static/images/carousel/termotanque_solar.jpg"' in html
+    _con_directorio_temporal(prueba)
+
+def test_sin_pillow():
+    """Sin Pillow no se generan variantes y el carrusel usa las URL originales"""
+    originales = (imagenes.Image, carousel_content.UNSPLASH_ACCESS_KEY,
+                  carousel_content._instantanea, carousel_content.CARRUSEL_REFRESCO)
+    imagenes.Image, carousel_content.UNSPLASH_ACCESS_KEY = None, None
+    carousel_content._instantanea = carousel_content._congelar(carousel_content.datos_locales())
+    carousel_content.CARRUSEL_REFRESCO = False
+    try:
+        assert not imagenes.disponible() and imagenes.formatos() == []
+        assert imagenes.preparar_imagen(IMAGEN_LOCAL) is None
+        assert carousel_content.obtener_imagen_categoria('futuro_renovables') == {
+            'imagen_url': IMAGEN_LOCAL, 'imagen': None
+        }
+
+        app = create_app()
+        app.config['TESTING'] = True
+        cliente = app.test_client()
+        assert cliente.get('/img/../../etc/passwd').status_code == 404
+        assert cliente.get('/img/0123456789abcdef-960.jpg').status_code == 404
+        html = cliente.get('/').get_data(as_text=True)
+    finally:
+        (imagenes.Image, carousel_content.UNSPLASH_ACCESS_KEY,
+         carousel_content._instantanea, carousel_content.CARRUSEL_REFRESCO) = originales
+    assert 'fetchpriority="high"' in html and html.count('loading="lazy"') == 5
+    assert '<picture>' not in html and 'src="/static/images/carousel/termotanque_solar.jpg"' in html
+
+if __name__ == "__main__":
+    test_variantes()
+    test_imagen_local()
+    test_ruta_imagenes()
+    test_sin_pillow()
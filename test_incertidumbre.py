@@ -0,0 +1,100 @@
+"""
+Script para probar el modo de incertidumbre (Monte Carlo) del simulador
+"""
+import time
+
+from ecosmart_advisor.app import create_app
+from ecosmart_advisor.app import routes
+from ecosmart_advisor.app.services import simulador
+from ecosmart_advisor.app.services.incertidumbre import simular_monte_carlo, validar_opciones
+
+CLIMA = {'radiacion_solar': 4.6, 'velocidad_viento': 5.5, 'temperatura_promedio': 17.8,
+         'latitud': -34.61, 'longitud': -58.38, 'ubicacion': 'Buenos Aires'}
+
+def test_monte_carlo():
+    """Verifica percentiles, reproducibilidad y tiempo de 10.000 sorteos"""
+    for tipo, capacidad in [('solar', 3.0), ('eolica', 2.0), ('termotanque_solar', 200.0)]:
+        inicio = time.perf_counter()
+        resultado = simular_monte_carlo(tipo, capacidad, CLIMA, 300, muestras=10000, semilla=42)
+        tiempo = (time.perf_counter() - inicio) * 1000
+        print(f"{tipo}: 10.000 sorteos en {tiempo:.1f} ms, "
+              f"generación P10/P50/P90 = {resultado['generacion_anual']['p10']}/"
+              f"{resultado['generacion_anual']['p50']}/{resultado['generacion_anual']['p90']} kWh")
+        assert tiempo < 500
+
+        for clave in ['generacion_anual', 'ahorro_anual_usd', 'retorno_inversion_anos']:
+            p = resultado[clave]
+            # La generación del termotanque se satura con radiación alta
+            assert p['p10'] <= p['p50'] <= p['p90'], clave
+            assert clave == 'generacion_anual' or p['p10'] < p['p90'], clave
+
+        # Misma semilla, mismos sorteos; otra semilla, otros valores
+        assert simular_monte_carlo(tipo, capacidad, CLIMA, 300, muestras=10000, semilla=42) == resultado
+        assert simular_monte_carlo(tipo, capacidad, CLIMA, 300, muestras=10000, semilla=7) != resultado
+
+    # La mediana queda cerca de la estimación puntual
+    puntual = simulador.simular_solar(3.0, CLIMA, 300)['generacion_anual']
+    mediana = simular_monte_carlo('solar', 3.0, CLIMA, 300, semilla=1)['generacion_anual']['p50']
+    assert abs(mediana - puntual) / puntual < 0.02
+
+    # Distribuciones fijas: sin incertidumbre
+    fijas = {nombre: ('fijo', (valor,)) for nombre, valor in [
+        ('precio_kwh', 0.15), ('costo_solar_por_kw', 1200), ('factor_radiacion', 1.0)]}
+    resultado = simular_monte_carlo('solar', 3.0, CLIMA, 300, muestras=100, semilla=1, distribuciones=fijas)
+    assert resultado['generacion_anual']['p10'] == resultado['generacion_anual']['p90']
+    assert abs(resultado['retorno_inversion_anos']['p50'] - 3600 / (puntual * 0.15)) < 0.01
+
+    for argumentos in [{'muestras': 0}, {'distribuciones': {'inflacion': ('normal', (1, 0.1))}},
+                       {'distribuciones': {'precio_kwh': ('gamma', (1, 2))}}]:
+        try:
+            simular_monte_carlo('solar', 3.0, CLIMA, 300, **argumentos)
+            assert False, f"Argumentos aceptados: {argumentos}"
+        except ValueError:
+            pass
+
+def test_simular_instalacion_monte_carlo():
+    """Verifica que el modo sea opcional en simular_instalacion"""
+    original_clima, original_deepseek = simulador.obtener_datos_clima, simulador.USAR_DEEPSEEK
+    simulador.obtener_datos_clima = lambda ubicacion: dict(CLIMA)
+    simulador.USAR_DEEPSEEK = False
+    try:
+        datos = {'tipo_instalacion': 'solar', 'capacidad': 3, 'ubicacion': '-34.61,-58.38', 'consumo_mensual': 300}
+        assert 'incertidumbre' not in simulador.simular_instalacion(dict(datos))
+        # Sin datos se simula con los valores por defecto
+        assert 'error' not in simulador.simular_instalacion(None)
+        resultados = simulador.simular_instalacion(dict(datos, monte_carlo={'muestras': 5000, 'semilla': 3}))
+    finally:
+        simulador.obtener_datos_clima, simulador.USAR_DEEPSEEK = original_clima, original_deepseek
+
+    assert resultados['incertidumbre']['muestras'] == 5000
+    assert resultados['incertidumbre']['ahorro_anual_usd']['p50'] > 0
+
+def test_opciones_invalidas():
+    """La API rechaza con 400 las opciones de Monte Carlo inválidas, sin simular"""
+    app = create_app()
+    app.config['TESTING'] = True
+    cliente = app.test_client()
+    original = routes.simular_instalacion
+    simulaciones = []
+    routes.simular_instalacion = lambda *args: simulaciones.append(args) or {}
+    try:
+        for opciones in ({'muestras': 'abc'}, {'muestras': 10 ** 9}, {'semilla': 'x'}, {'semilla': 1.5},
+                         {'distribuciones': {'precio_kwh': {'tipo': 'normal'}}},
+                         {'distribuciones': {'precio_kwh': ['normal', [0.1]]}},
+                         {'distribuciones': {'precio_kwh': 'normal'}}, {'distribuciones': ['normal']},
+                         {'distribuciones': {'inflacion': ['fijo', [1]]}}):
+            respuesta = cliente.post('/simulador/api', json={
+                'tipo_instalacion': 'solar', 'capacidad': 3, 'ubicacion': '-34.61,-58.38',
+                'consumo_mensual': 300, 'monte_carlo': opciones
+            })
+            assert respuesta.status_code == 400, opciones
+            print(f"{opciones}: {respuesta.get_json()['error']}")
+    finally:
+        routes.simular_instalacion = original
+    assert simulaciones == []
+    assert validar_opciones(True)['distribuciones'] == {}
+
+if __name__ == "__main__":
+    test_monte_carlo()
+    test_simular_instalacion_monte_carlo()
+    test_opciones_invalidas()
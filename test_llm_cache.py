@@ -0,0 +1,184 @@
+"""
+Script para probar la caché de respuestas de Deepseek con claves canónicas
+"""
+import os
+import json
+import tempfile
+
+from ecosmart_advisor.app.services import http_cliente
+from ecosmart_advisor.app.services import llm_cache
+from ecosmart_advisor.app.services import ai_recommender
+from ecosmart_advisor.app.services.cache import CacheEscalonada
+from ecosmart_advisor.chatbot import ai_chatbot
+
+class RespuestaSimulada:
+    def __init__(self, contenido, status_code=200):
+        self.status_code = status_code
+        self.text = contenido
+        self._contenido = contenido
+
+    def json(self):
+        return {'choices': [{'message': {'content': self._contenido}}]}
+
+def _con_api_simulada(prueba, status_code=200):
+    """Ejecuta la prueba con una caché temporal y la API de Deepseek simulada"""
+    consultas = []
+
+    def post_simulado(url, **kwargs):
+        consultas.append(kwargs.get('json') or json.loads(kwargs.get('data')))
+        return RespuestaSimulada(json.dumps({'mejor_opcion': 'solar', 'consulta': len(consultas)}), status_code)
+
+    original_post, original_cache = http_cliente.post, llm_cache._cache
+    http_cliente.post = post_simulado
+    llm_cache._cache = CacheEscalonada("llm_test", ruta=os.path.join(tempfile.mkdtemp(prefix="ecosmart_test_"), "llm.sqlite"))
+    llm_cache.limpiar_cache_llm()
+    try:
+        prueba(consultas)
+    finally:
+        http_cliente.post, llm_cache._cache = original_post, original_cache
+
+def test_canonicalizar():
+    """Verifica la cuantización de los datos que arman los prompts"""
+    assert llm_cache.cuantizar(4.63, 0.1) == 4.6
+    assert llm_cache.cuantizar(337, 25) == 325
+    assert llm_cache.cuantizar(340, 25) == 350
+    datos = llm_cache.canonicalizar({'consumo_mensual': '362', 'clima': {'radiacion_solar': 5.04},
+                                     'tipo_vivienda': 'casa', 'superficie_disponible': 'mucha'})
+    assert datos == {'consumo_mensual': 350, 'clima': {'radiacion_solar': 5.0},
+                     'tipo_vivienda': 'casa', 'superficie_disponible': 'mucha'}
+    assert (llm_cache.clave_consulta('chatbot', '¿Qué es un  panel solar?')
+            == llm_cache.clave_consulta('chatbot', 'qué es un panel SOLAR'))
+    assert llm_cache.clave_consulta('chatbot', 'a') != llm_cache.clave_consulta('diagnostico', 'a')
+
+def test_diagnostico_en_cache():
+    """Diagnósticos casi idénticos comparten la respuesta; los distintos no"""
+    def prueba(consultas):
+        clima = {'radiacion_solar': 4.63, 'velocidad_viento': 5.12, 'temperatura_promedio': 17.8,
+                 'latitud': -34.61, 'longitud': -58.38, 'ubicacion': 'Buenos Aires'}
+        primero = ai_recommender.evaluar_factores_energia_renovable(
+            {'consumo_mensual': 340, 'superficie_disponible': 40, 'objetivo': 'ahorro'}, clima)
+        segundo = ai_recommender.evaluar_factores_energia_renovable(
+            {'consumo_mensual': 355, 'superficie_disponible': 41, 'objetivo': 'ambiental'},
+            dict(clima, radiacion_solar=4.58))
+        assert len(consultas) == 2 and segundo['consulta'] == 2  # El objetivo no coincide
+
+        tercero = ai_recommender.evaluar_factores_energia_renovable(
+            {'consumo_mensual': 352, 'superficie_disponible': 39, 'objetivo': 'ahorro'},
+            dict(clima, radiacion_solar=4.58, temperatura_promedio=17.9))
+        assert len(consultas) == 2
+        assert tercero == primero and primero['consulta'] == 1
+        assert 'Consumo mensual: 350 kWh' in consultas[0]['messages'][1]['content']
+
+        # Modificar la respuesta no altera la caché
+        tercero['mejor_opcion'] = 'eolica'
+        cuarto = ai_recommender.evaluar_factores_energia_renovable(
+            {'consumo_mensual': 340, 'superficie_disponible': 40, 'objetivo': 'ahorro'}, clima)
+        assert cuarto['mejor_opcion'] == 'solar'
+
+        metricas = llm_cache.estadisticas_llm_cache()['espacios']['diagnostico']
+        print(f"Métricas: {metricas}")
+        assert metricas['aciertos'] == 2 and metricas['fallos'] == 2
+    _con_api_simulada(prueba)
+
+def test_errores_no_se_guardan():
+    """Las respuestas con error usan el fallback y no se guardan"""
+    def prueba(consultas):
+        for _ in range(2):
+            resultado = ai_recommender.evaluar_factores_energia_renovable({'consumo_mensual': 300}, {})
+            assert 'consulta' not in resultado
+        assert len(consultas) == 2
+    _con_api_simulada(prueba, status_code=500)
+
+def test_chatbot_y_omision():
+    """Preguntas equivalentes comparten respuesta; la caché se puede omitir y expira"""
+    def prueba(consultas):
+        primera = ai_chatbot.generar_respuesta_ia("¿Qué es un panel solar?")
+        cantidad = len(consultas)  # Respuesta y sugerencias
+        segunda = ai_chatbot.generar_respuesta_ia("  qué es un panel   solar ")
+        assert len(consultas) == cantidad and segunda == primera
+
+        llm_cache.LLM_CACHE_HABILITADA = False
+        try:
+            ai_chatbot.generar_respuesta_ia("¿Qué es un panel solar?")
+            assert len(consultas) == 2 * cantidad
+        finally:
+            llm_cache.LLM_CACHE_HABILITADA = True
+
+        generaciones = []
+        for _ in range(2):
+            llm_cache.consultar('prueba', 'ttl', lambda: generaciones.append(1) or 'valor', ttl=-1)
+        assert len(generaciones) == 2
+        llm_cache.consultar('prueba', 'sin cache', lambda: generaciones.append(1) or 'valor', usar_cache=False)
+        assert llm_cache.estadisticas_llm_cache()['espacios']['prueba']['omitidas'] == 1
+    _con_api_simulada(prueba)
+
+def test_chatbot_por_pregunta():
+    """Las preguntas frecuentes comparten respuesta aunque haya historial"""
+    historial = [{"rol": "usuario", "contenido": "Hola"}, {"rol": "asistente", "contenido": "¡Hola! ¿En qué te ayudo?"}]
+
+    def prueba(consultas):
+        primera = ai_chatbot.generar_respuesta_ia("¿Qué es un termotanque solar?")
+        cantidad = len(consultas)
+        # Pregunta frecuente con historial: misma respuesta, sin consultar a la IA
+        assert ai_chatbot.generar_respuesta_ia("que es un TERMOTANQUE solar", historial) == primera
+        assert len(consultas) == cantidad
+
+        # Pregunta que puede depender de la conversación: se consulta con el historial
+        ai_chatbot.generar_respuesta_ia("¿Y cuánto dura?", historial)
+        assert len(consultas) == cantidad + 1
+        assert consultas[-1]['messages'][1]['content'] == "Hola"
+
+        # Una sugerencia de seguimiento generada por la IA depende de la conversación
+        sugerencia = "¿Cuántos paneles necesito para 300 kWh?"
+        assert not ai_chatbot.pregunta_independiente(sugerencia, historial)
+        ai_chatbot.generar_respuesta_ia(sugerencia, historial)
+        assert len(consultas[-1]['messages']) == 4  # Con historial
+        assert len(consultas) == cantidad + 2
+
+        metricas = llm_cache.estadisticas_llm_cache()['espacios']['chatbot_pregunta']
+        print(f"Métricas por pregunta: {metricas}")
+        assert metricas['aciertos'] == 1 and metricas['fallos'] == 1
+
+        # Cambiar el prompt del sistema invalida las respuestas guardadas por pregunta
+        clave = ai_chatbot.clave_cache_pregunta("¿Qué es un termotanque solar?")
+        original = ai_chatbot.VERSION_PROMPT
+        try:
+            ai_chatbot.VERSION_PROMPT = "otra-version"
+            assert ai_chatbot.clave_cache_pregunta("¿Qué es un termotanque solar?") != clave
+            ai_chatbot.generar_respuesta_ia("¿Qué es un termotanque solar?")
+            assert len(consultas) == cantidad + 3
+        finally:
+            ai_chatbot.VERSION_PROMPT = original
+    _con_api_simulada(prueba)
+
+def test_precarga():
+    """La precarga guarda las preguntas frecuentes una sola vez y por proceso"""
+    def prueba(consultas):
+        original_clave, original_pid = ai_chatbot.DEEPSEEK_API_KEY, ai_chatbot._precarga_pid
+        ai_chatbot.DEEPSEEK_API_KEY = 'clave-de-prueba'
+        try:
+            frecuentes = ai_chatbot.preguntas_frecuentes()
+            assert len(frecuentes) == len({ai_chatbot.clave_pregunta(p) for p in frecuentes})
+            assert ai_chatbot.precargar_respuestas() == len(frecuentes)
+            cantidad = len(consultas)
+            assert ai_chatbot.precargar_respuestas() == 0 and len(consultas) == cantidad
+            print(f"Precarga: {len(frecuentes)} preguntas frecuentes con {cantidad} consultas a la IA")
+
+            ai_chatbot.generar_respuesta_ia("¿Para qué sirve el simulador?", [{"rol": "usuario", "contenido": "Hola"}])
+            assert len(consultas) == cantidad
+
+            ai_chatbot._precarga_pid = None
+            futuro = ai_chatbot.iniciar_precarga()
+            assert futuro is not None and futuro.result(timeout=5) == 0
+            assert ai_chatbot.iniciar_precarga() is None
+        finally:
+            ai_chatbot.DEEPSEEK_API_KEY, ai_chatbot._precarga_pid = original_clave, original_pid
+    _con_api_simulada(prueba)
+
+if __name__ == "__main__":
+    test_canonicalizar()
+    test_diagnostico_en_cache()
+    test_errores_no_se_guardan()
+    test_chatbot_y_omision()
+    test_chatbot_por_pregunta()
+    test_precarga()
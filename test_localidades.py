@@ -0,0 +1,87 @@
+"""
+Script para probar el nomenclador local de localidades
+"""
+import os
+import csv
+import time
+import tempfile
+
+# Guardar las localidades aprendidas en un directorio temporal
+os.environ.setdefault("LOCALIDADES_APRENDIDAS", os.path.join(tempfile.mkdtemp(prefix="ecosmart_test_"), "aprendidas.csv"))
+
+from ecosmart_advisor.app.services import localidades
+from ecosmart_advisor.app.services.localidades import normalizar
+from ecosmart_advisor.app.services.cache import CacheEscalonada
+
+def test_resolver_localidades():
+    """Verifica la resolución local sin acentos, con errores de tipeo y con provincia"""
+    nomenclador = localidades.obtener_nomenclador()
+    print(f"Localidades cargadas: {len(nomenclador)}")
+    
+    inicio = time.perf_counter()
+    for _ in range(1000):
+        cordoba = localidades.resolver_localidad("cordoba", usar_nominatim=False)
+    print(f"Resolución promedio: {(time.perf_counter() - inicio) * 1000:.1f} µs")
+    
+    assert cordoba['nombre'] == "Córdoba"
+    assert abs(cordoba['latitud'] + 31.42) < 0.1
+    
+    # Con errores de tipeo
+    assert localidades.resolver_localidad("Mar del Plta", usar_nominatim=False)['nombre'] == "Mar del Plata"
+    
+    # La provincia desambigua nombres repetidos
+    assert localidades.resolver_localidad("San Martín, Mendoza", usar_nominatim=False)['provincia'] == "Mendoza"
+    assert localidades.resolver_localidad("Mercedes", "Corrientes", usar_nominatim=False)['provincia'] == "Corrientes"
+    
+    # Sugerencias por prefijo ordenadas por población
+    sugerencias = nomenclador.sugerir("san ", limite=3)
+    print(f"Sugerencias para 'san ': {[s['nombre'] for s in sugerencias]}")
+    assert sugerencias[0]['nombre'] == "San Miguel de Tucumán"
+    
+    assert localidades.resolver_localidad("Xyzzy", usar_nominatim=False) is None
+
+def test_aprender_localidad():
+    """Verifica que las localidades obtenidas de Nominatim se incorporen al nomenclador"""
+    consultas = []
+    
+    def nominatim_simulado(ciudad, provincia=None, pais="Argentina"):
+        consultas.append(ciudad)
+        if normalizar(ciudad) == "pueblo fantasma":
+            return None
+        return {'nombre': "Villa Inventada del Sur", 'provincia': 'Buenos Aires', 'latitud': -37.1,
+                'longitud': -58.5, 'poblacion': 0, 'fuente': 'nominatim'}
+    
+    # Otro test puede haber importado el módulo antes de fijar LOCALIDADES_APRENDIDAS:
+    # usar siempre un archivo nuevo para no depender de ejecuciones anteriores
+    directorio = tempfile.mkdtemp(prefix="ecosmart_test_")
+    original = (localidades.geocodificar_nominatim, localidades.RUTA_APRENDIDAS, localidades._desconocidas)
+    localidades.geocodificar_nominatim = nominatim_simulado
+    localidades.RUTA_APRENDIDAS = os.path.join(directorio, "aprendidas.csv")
+    localidades._desconocidas = CacheEscalonada("desconocidas_test", ruta=os.path.join(directorio, "desconocidas.sqlite"))
+    localidades._nomenclador = None
+    try:
+        # Un archivo creado con el encabezado anterior (sin alias) se migra al aprender
+        with open(localidades.RUTA_APRENDIDAS, 'w', encoding='utf-8') as archivo:
+            archivo.write("nombre,provincia,latitud,longitud,poblacion\nVilla Vieja,Chaco,-27.1,-60.2,0\n")
+        primero = localidades.resolver_localidad("Villa Inventada")
+        segundo = localidades.resolver_localidad("villa inventada")
+        assert localidades.resolver_localidad("Villa Vieja", usar_nominatim=False)['provincia'] == "Chaco"
+        with open(localidades.RUTA_APRENDIDAS, encoding='utf-8') as archivo:
+            filas = list(csv.DictReader(archivo))
+        assert [(f['nombre'], f['alias']) for f in filas] == [("Villa Vieja", ""), ("Villa Inventada del Sur", "Villa Inventada")]
+        assert len(localidades.obtener_nomenclador().sugerir("villa inventada")) == 1
+
+        # Los nombres que Nominatim no conoce no se vuelven a consultar
+        assert localidades.resolver_localidad("Pueblo Fantasma") is None
+        assert localidades.resolver_localidad("pueblo fantasma") is None
+    finally:
+        localidades.geocodificar_nominatim, localidades.RUTA_APRENDIDAS, localidades._desconocidas = original
+        localidades._nomenclador = None
+    
+    assert consultas == ["Villa Inventada", "Pueblo Fantasma"]
+    assert primero['fuente'] == 'nominatim' and primero['nombre'] == "Villa Inventada del Sur"
+    assert segundo['fuente'] == 'nomenclador' and segundo['nombre'] == "Villa Inventada del Sur"
+
+if __name__ == "__main__":
+    test_resolver_localidades()
+    test_aprender_localidad()
@@ -0,0 +1,55 @@
+"""
+Script para probar el motor eólico con distribución de Weibull
+"""
+import time
+import numpy as np
+
+from ecosmart_advisor.app.services import motor_eolico
+from ecosmart_advisor.app.services.simulador import simular_eolica
+from ecosmart_advisor.app.services.energia_calculo import calcular_potencial_eolico
+
+def test_motor_eolico():
+    """Verifica la curva de potencia, la integración de Weibull y el cálculo vectorizado"""
+    bordes, potencia = motor_eolico.curva_potencia('domestico')
+    assert motor_eolico.curva_potencia('domestico')[1] is potencia  # Curva en caché
+    assert potencia.max() == 1.0
+    assert potencia[int(2.0 / motor_eolico.PASO_VELOCIDAD)] == 0  # Debajo del arranque
+    assert potencia[int(30.0 / motor_eolico.PASO_VELOCIDAD)] == 0  # Sobre el corte
+    
+    # 1000 sitios x 4 tamaños en una sola llamada
+    velocidades = np.linspace(2.0, 10.0, 1000)
+    inicio = time.perf_counter()
+    resultado = motor_eolico.simular_eolico(velocidades, [1.0, 3.0, 5.0, 10.0], k=2.0)
+    print(f"1000 sitios x 4 tamaños: {(time.perf_counter() - inicio) * 1000:.2f} ms")
+    
+    fc = resultado['factor_capacidad']
+    assert resultado['generacion'].shape == (1000, 4)
+    assert np.all(np.diff(fc) > 0)  # Más viento, más generación
+    assert 0 < fc[0] and fc[-1] < motor_eolico.PERDIDAS_EOLICAS
+    np.testing.assert_allclose(resultado['generacion'][:, 1], 3 * fc * 8760)
+    
+    # Un viento más regular (k alto) rinde menos a baja velocidad media
+    assert motor_eolico.factor_capacidad(4.0, k=3.0) < motor_eolico.factor_capacidad(4.0, k=1.5)
+    # Una torre más alta rinde más
+    assert motor_eolico.factor_capacidad(5.0, altura_buje=30) > motor_eolico.factor_capacidad(5.0, altura_buje=10)
+    print(f"Factor de capacidad a 5 m/s: {float(motor_eolico.factor_capacidad(5.0)) * 100:.1f} %")
+
+def test_simulaciones_eolicas():
+    """Verifica que simular_eolica y calcular_potencial_eolico mantengan su formato"""
+    clima = {'velocidad_viento': 7.5, 'latitud': -51.62, 'longitud': -69.22, 'ubicacion': 'Río Gallegos'}
+    resultados = simular_eolica(3.0, clima, 300)
+    print(f"Generación mensual: {resultados['detalle_mensual']['generacion']}")
+    
+    for clave in ['tipo', 'capacidad_kw', 'generacion_diaria', 'generacion_mensual', 'generacion_anual',
+                  'costo_estimado', 'factor_capacidad', 'factor_viabilidad', 'detalle_viento']:
+        assert clave in resultados
+    assert 15 < resultados['factor_capacidad'] < 50
+    
+    potencial = calcular_potencial_eolico(5.0, 90)
+    assert potencial['viable']
+    assert potencial['generacion_mensual'] > 0
+    assert calcular_potencial_eolico(1.5, 90)['generacion_mensual'] < potencial['generacion_mensual']
+
+if __name__ == "__main__":
+    test_motor_eolico()
+    test_simulaciones_eolicas()
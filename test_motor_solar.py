@@ -0,0 +1,61 @@
+"""
+Script para probar el motor fotovoltaico horario (8760 horas)
+"""
+import time
+import numpy as np
+
+from ecosmart_advisor.app.services import motor_solar
+from ecosmart_advisor.app.services.simulador import simular_solar
+
+# Climatología mensual aproximada de Buenos Aires
+RADIACION_BA = [6.7, 5.9, 4.8, 3.5, 2.6, 2.2, 2.3, 3.1, 4.2, 5.5, 6.4, 6.8]
+TEMPERATURA_BA = [24.5, 23.5, 21.5, 17.8, 14.5, 11.5, 10.8, 12.5, 14.5, 17.5, 20.5, 23.0]
+
+def test_motor_solar():
+    """Verifica el balance energético, la estacionalidad y el dimensionado vectorizado"""
+    capacidades = np.array([1.0, 2.5, 5.0, 10.0])
+    
+    inicio = time.perf_counter()
+    resultado = motor_solar.simular_fv(capacidades, -34.6, RADIACION_BA, TEMPERATURA_BA,
+                                       incluir_horario=True)
+    print(f"Simulación de {len(capacidades)} sistemas: {(time.perf_counter() - inicio) * 1000:.2f} ms")
+    print(f"Rendimiento específico: {resultado['rendimiento_especifico']:.0f} kWh/kWp")
+    print(f"Pérdida por temperatura: {resultado['perdida_temperatura']:.1f} %")
+    
+    assert resultado['horario'].shape == (4, 8760)
+    assert resultado['mensual'].shape == (4, 12)
+    np.testing.assert_allclose(resultado['mensual'].sum(axis=1), resultado['anual'])
+    np.testing.assert_allclose(resultado['anual'] / capacidades, resultado['rendimiento_especifico'])
+    # Valores típicos para la región pampeana
+    assert 1200 < resultado['rendimiento_especifico'] < 1700
+    # En el hemisferio sur enero produce más que junio
+    assert resultado['mensual'][0, 0] > resultado['mensual'][0, 5]
+    # Sin radiación nocturna
+    assert resultado['horario'][0, :5].sum() == 0
+    
+    # Con paneles horizontales la irradiación en el plano coincide con la global
+    horizontal = motor_solar.simular_fv(1.0, -34.6, RADIACION_BA, TEMPERATURA_BA, inclinacion=0)
+    np.testing.assert_allclose(horizontal['irradiacion_plano_mensual'], RADIACION_BA, rtol=0.01)
+    
+    # Un inversor chico recorta la producción
+    recortado = motor_solar.simular_fv(1.0, -34.6, RADIACION_BA, TEMPERATURA_BA, relacion_dc_ac=1.6)
+    assert recortado['perdida_recorte'] > 0
+    assert recortado['anual'] < resultado['anual'][0]
+
+def test_simular_solar_compatible():
+    """Verifica que simular_solar mantenga las claves del resultado"""
+    clima = {'radiacion_solar': 4.5, 'temperatura_promedio': 18, 'latitud': -34.6,
+             'longitud': -58.38, 'ubicacion': 'Buenos Aires'}
+    resultados = simular_solar(3.0, clima, 300)
+    print(f"Generación mensual: {resultados['detalle_mensual']['generacion']}")
+    
+    for clave in ['tipo', 'capacidad_kw', 'superficie_m2', 'generacion_diaria', 'generacion_mensual',
+                  'generacion_anual', 'costo_estimado', 'factor_capacidad', 'eficiencia_sistema',
+                  'detalle_clima']:
+        assert clave in resultados
+    assert len(resultados['detalle_mensual']['generacion']) == 12
+    assert abs(sum(resultados['detalle_mensual']['generacion']) - resultados['generacion_anual']) < 1
+
+if __name__ == "__main__":
+    test_motor_solar()
+    test_simular_solar_compatible()
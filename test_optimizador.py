@@ -0,0 +1,248 @@
+"""
+Script para probar el optimizador de sistemas híbridos (solar, eólica, termotanque y batería)
+"""
+import time
+import itertools
+import numpy as np
+
+from ecosmart_advisor.app.services import simulador
+from ecosmart_advisor.app.services import baterias
+from ecosmart_advisor.app.services import optimizador
+from ecosmart_advisor.app.services import energia_calculo
+from ecosmart_advisor.app.services.ai_engine import analizar_combinacion_optima
+from ecosmart_advisor.app.services.ai_recommender import generar_respuesta_fallback
+from ecosmart_advisor.app.services.cache import CacheLRU
+from ecosmart_advisor.app.services.energia_calculo import calcular_recomendacion, calcular_recomendacion_tradicional
+
+CLIMA_VENTOSO = {'radiacion_solar': 3.1, 'velocidad_viento': 7.5, 'temperatura_promedio': 7.6,
+                 'latitud': -51.62, 'longitud': -69.22}
+CLIMA_SOLEADO = {'radiacion_solar': 5.8, 'velocidad_viento': 3.0, 'temperatura_promedio': 16.9,
+                 'latitud': -24.78, 'longitud': -65.41}
+CLIMA_CORDOBA = {'radiacion_solar': 5.19, 'velocidad_viento': 3.8, 'temperatura_promedio': 18.0,
+                 'latitud': -31.42, 'longitud': -64.18}
+
+def _fuerza_bruta(clima, consumo_mensual, superficie, presupuesto):
+    """Evalúa todas las combinaciones de la tabla, despachando la batería en cada una"""
+    tabla = optimizador.tabla_rendimiento(clima, consumo_mensual, superficie_disponible=superficie)
+    tamanos = tabla['tamanos']
+    consumo_anual = tabla['consumo'].sum()
+    combinaciones = []
+    for i_solar, i_eolica, i_termo, i_bateria in itertools.product(
+            *(range(len(tamanos[t])) for t in optimizador.TECNOLOGIAS)):
+        solar, eolica = tamanos['solar'][i_solar], tamanos['eolica'][i_eolica]
+        litros, bateria = tamanos['termotanque_solar'][i_termo], tamanos['bateria'][i_bateria]
+        costo = optimizador._costo(solar, eolica, litros, bateria)
+        superficie_usada = solar / simulador.POTENCIA_SOLAR_POR_M2 + litros * optimizador.M2_POR_LITRO_TERMOTANQUE
+        if costo <= 0 or costo > presupuesto or superficie_usada > superficie + 1e-9:
+            continue
+        combinaciones.append((solar, eolica, i_termo, bateria, float(costo)))
+
+    solar, eolica, i_termo, bateria, costo = (np.array(x) for x in zip(*combinaciones))
+    generacion = solar[:, None] * tabla['solar'] + eolica[:, None] * tabla['eolica']
+    demanda = (1 - tabla['termotanque'][i_termo] / consumo_anual)[:, None] * tabla['consumo']
+    importacion = np.empty(len(solar))
+    exportacion = np.empty(len(solar))
+    for capacidad in np.unique(bateria):
+        filas = bateria == capacidad
+        if capacidad > 0:
+            despacho = baterias.simular_bateria(generacion[filas], demanda[filas], capacidad)
+            importacion[filas], exportacion[filas] = despacho['importacion_red'], despacho['exportacion_red']
+        else:
+            neto = generacion[filas] - demanda[filas]
+            importacion[filas], exportacion[filas] = np.maximum(-neto, 0).sum(axis=1), np.maximum(neto, 0).sum(axis=1)
+
+    return dict(optimizador._metricas(consumo_anual, importacion, exportacion, costo), costo=costo)
+
+def _frente_ingenuo(puntos):
+    """Frente por comparación de todos contra todos (O(n²)), todo a minimizar"""
+    frente = []
+    for i, punto in enumerate(puntos):
+        dominado = any(np.all(otro <= punto) and np.any(otro < punto) for otro in puntos)
+        repetido = any(np.array_equal(puntos[j], punto) for j in frente)
+        if not dominado and not repetido:
+            frente.append(i)
+    return frente
+
+def test_restricciones():
+    """Verifica que se respeten el presupuesto y la superficie"""
+    for presupuesto, superficie in [(6000, 40), (15000, 15), (None, 100)]:
+        resultado = optimizador.optimizar_sistema_hibrido(CLIMA_SOLEADO, 350, superficie_disponible=superficie,
+                                                          presupuesto=presupuesto)
+        assert resultado['combinaciones']
+        for combinacion in resultado['combinaciones']:
+            assert presupuesto is None or combinacion['costo_total'] <= presupuesto
+            assert combinacion['superficie_m2'] <= superficie
+            assert 0 < combinacion['cobertura'] <= 100
+            assert combinacion['detalle']
+        print(f"Presupuesto {presupuesto}, {superficie} m²: {resultado['combinaciones'][0]['detalle']} "
+              f"({resultado['evaluadas']} evaluadas, {resultado['podadas']} podadas, {resultado['tiempo_ms']} ms)")
+
+    sin_presupuesto = optimizador.optimizar_sistema_hibrido(CLIMA_SOLEADO, 350, presupuesto=100)
+    assert sin_presupuesto['combinaciones'] == []
+
+def test_objetivos():
+    """Verifica que el objetivo cambie la combinación elegida"""
+    elegidas = {}
+    for objetivo in ['cobertura', 'ahorro', 'ambiental']:
+        resultado = optimizador.optimizar_sistema_hibrido(CLIMA_VENTOSO, 350, superficie_disponible=60,
+                                                          presupuesto=20000, objetivo=objetivo)
+        mejor = resultado['combinaciones'][0]
+        elegidas[objetivo] = mejor
+        print(f"{objetivo}: {mejor['detalle']} - cobertura {mejor['cobertura']}%, VAN {mejor['van_usd']} USD")
+
+    # Maximizar el VAN no compra cobertura a cualquier precio
+    assert elegidas['ahorro']['van_usd'] >= elegidas['cobertura']['van_usd']
+    assert elegidas['cobertura']['cobertura'] >= elegidas['ahorro']['cobertura']
+    assert elegidas['ambiental']['co2_evitado'] >= elegidas['cobertura']['co2_evitado']
+    assert elegidas['ahorro']['tamanos'] != elegidas['cobertura']['tamanos']
+
+def test_poda_sin_perdida():
+    """Compara el resultado podado con la evaluación exhaustiva de todas las combinaciones"""
+    for clima, objetivo, presupuesto in [(CLIMA_SOLEADO, 'cobertura', 12000), (CLIMA_VENTOSO, 'ahorro', 15000),
+                                         (CLIMA_SOLEADO, 'ambiental', 9000)]:
+        inicio = time.perf_counter()
+        todas = _fuerza_bruta(clima, 300, 30, presupuesto)
+        total = len(todas['costo'])
+        mejor_valor = float(np.round(todas[optimizador.OBJETIVOS[objetivo]], 1).max())
+        tiempo_bruto = time.perf_counter() - inicio
+        resultado = optimizador.optimizar_sistema_hibrido(clima, 300, superficie_disponible=30,
+                                                          presupuesto=presupuesto, objetivo=objetivo,
+                                                          max_resultados=1)
+        mejor = resultado['combinaciones'][0]
+        print(f"{objetivo}: exhaustivo {total} combinaciones en {tiempo_bruto * 1000:.0f} ms, "
+              f"optimizador {resultado['evaluadas']} evaluadas en {resultado['tiempo_ms']} ms")
+        assert resultado['evaluadas'] + resultado['podadas'] <= total
+        assert abs(mejor[optimizador.OBJETIVOS[objetivo]] - mejor_valor) < 0.051
+
+def test_frente_pareto():
+    """Compara el skyline con la comparación de todos contra todos, con empates"""
+    generador = np.random.default_rng(7)
+    for dimensiones in [2, 3, 4]:
+        puntos = generador.integers(0, 12, size=(400, dimensiones)).astype(float)
+        assert list(optimizador.frente_pareto(puntos)) == _frente_ingenuo(puntos)
+    maximizar = [False, True]
+    puntos = np.array([[1, 5], [2, 6], [2, 4], [3, 6], [1, 5]])
+    assert list(optimizador.frente_pareto(puntos, maximizar)) == [0, 1]
+
+    inicio = time.perf_counter()
+    grandes = generador.random((20000, 4))
+    frente = optimizador.frente_pareto(grandes)
+    print(f"Skyline de 20000 puntos en 4 criterios: {len(frente)} no dominados "
+          f"en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+def test_frente_combinaciones():
+    """Verifica que la poda por cotas no pierda alternativas del frente"""
+    todas = _fuerza_bruta(CLIMA_SOLEADO, 300, 30, 9000)
+    esperado = optimizador.frente_pareto(optimizador._criterios(todas))
+    clave = lambda c: (c['costo_total'], c['cobertura'], c['co2_evitado'])
+    esperadas = sorted((round(float(todas['costo'][i]), 0), round(float(todas['cobertura'][i]), 1),
+                        round(float(todas['co2_evitado'][i]), 1)) for i in esperado)
+
+    resultado = optimizador.calcular_frente_pareto(CLIMA_SOLEADO, 300, superficie_disponible=30, presupuesto=9000)
+    print(f"Frente de {len(resultado['frente'])} alternativas: {resultado['evaluadas']} evaluadas, "
+          f"{resultado['podadas']} podadas de {len(todas['costo'])} en {resultado['tiempo_ms']} ms")
+    assert sorted(clave(c) for c in resultado['frente']) == esperadas
+    costos = [c['costo_total'] for c in resultado['frente']]
+    assert costos == sorted(costos) and costos[-1] <= 9000
+    assert resultado['podadas'] > 0
+
+def test_frente_en_cache():
+    """El frente se calcula una vez por celda, consumo, superficie y presupuesto, despachando pocas baterías"""
+    resultado = optimizador.calcular_frente_pareto(CLIMA_CORDOBA, 300, superficie_disponible=50)
+    sin_bateria, _ = optimizador._evaluar_sin_bateria(
+        optimizador.tabla_rendimiento(CLIMA_CORDOBA, 300, superficie_disponible=50), 50)
+    despachadas = resultado['evaluadas'] - len(sin_bateria['costo'])
+    print(f"Córdoba: {despachadas} baterías despachadas y {resultado['podadas']} podadas "
+          f"en {resultado['tiempo_ms']} ms")
+    assert despachadas < resultado['podadas'] / 4
+
+    opciones = [{'tipo': 'solar'}, {'tipo': 'eolica'}]
+    datos = {'superficie_disponible': 50, 'presupuesto': '15000'}
+    original = energia_calculo._cache_frentes
+    energia_calculo._cache_frentes = CacheLRU()
+    try:
+        inicio = time.perf_counter()
+        primero = energia_calculo.calcular_frente_pareto(opciones, dict(datos), CLIMA_CORDOBA, 300)
+        calculo = time.perf_counter() - inicio
+        # Otra ubicación de la misma celda
+        vecina = dict(CLIMA_CORDOBA, latitud=CLIMA_CORDOBA['latitud'] + 0.01)
+        inicio = time.perf_counter()
+        segundo = energia_calculo.calcular_frente_pareto(opciones, dict(datos), vecina, 300)
+        en_cache = time.perf_counter() - inicio
+        print(f"Frente: {calculo * 1000:.0f} ms calculado, {en_cache * 1000:.1f} ms desde la caché")
+        assert segundo == primero and en_cache < calculo / 10
+        segundo[0]['costo_total'] = -1
+        assert energia_calculo.calcular_frente_pareto(opciones, dict(datos), vecina, 300) == primero
+
+        otro_presupuesto = energia_calculo.calcular_frente_pareto(opciones, dict(datos, presupuesto='8000'),
+                                                                  CLIMA_CORDOBA, 300)
+        assert max(c['costo_total'] for c in otro_presupuesto) <= 8000
+        assert len(energia_calculo._cache_frentes) == 2
+    finally:
+        energia_calculo._cache_frentes = original
+
+def test_integracion():
+    """Verifica analizar_combinacion_optima y las combinaciones de la recomendación"""
+    opciones = [{'tipo': 'solar', 'cobertura': 60}, {'tipo': 'termotanque_solar', 'cobertura': 20}]
+    combinacion = analizar_combinacion_optima(opciones, 350, presupuesto=10000, clima=CLIMA_SOLEADO,
+                                              superficie_disponible=40)
+    assert combinacion['costo_total'] <= 10000
+    assert set(combinacion['sistemas']) <= {'solar', 'termotanque_solar', 'bateria'}
+    assert analizar_combinacion_optima([], 350) is None
+
+    recomendacion = calcular_recomendacion_tradicional(
+        {'consumo_mensual': 350, 'superficie_disponible': 40, 'objetivo': 'ahorro', 'presupuesto': '12000'},
+        CLIMA_VENTOSO
+    )
+    for combinacion in recomendacion['combinaciones']:
+        assert len(combinacion['tipos']) >= 2
+        assert combinacion['costo_total'] <= 12000
+        assert {'tipos', 'cobertura', 'detalle'} <= set(combinacion)
+    assert recomendacion['frente_pareto']
+    assert all(alternativa['costo_total'] <= 12000 for alternativa in recomendacion['frente_pareto'])
+
+def test_combinaciones_del_optimizador():
+    """La IA solo anota las combinaciones dimensionadas; la respuesta de respaldo no se muestra"""
+    datos = {'consumo_mensual': 350, 'superficie_disponible': 40, 'objetivo': 'cobertura'}
+    sugerencia = {
+        'mejor_opcion': 'combinacion',
+        'justificacion': 'Respuesta de la IA',
+        'opciones': {
+            'solar': {'viable': True, 'eficiencia_sistema': 80, 'inclinacion_paneles': 25, 'orientacion': 'Norte',
+                      'cobertura_estimada': 70, 'justificacion': ''},
+            'eolica': {'viable': False, 'cobertura_estimada': 0, 'justificacion': ''},
+            'termotanque_solar': {'viable': True, 'eficiencia_sistema': 70, 'inclinacion_optima': 35,
+                                  'cobertura_estimada': 20, 'justificacion': ''}
+        },
+        'combinacion_recomendada': {'opciones': ['solar', 'termotanque_solar'], 'cobertura_combinada': 99,
+                                    'justificacion': 'Complementa el agua caliente'}
+    }
+    tradicional = calcular_recomendacion_tradicional(dict(datos), CLIMA_SOLEADO)
+    original = energia_calculo.evaluar_factores_energia_renovable
+    try:
+        energia_calculo.evaluar_factores_energia_renovable = lambda *args: sugerencia
+        con_ia = calcular_recomendacion(dict(datos), CLIMA_SOLEADO)
+        energia_calculo.evaluar_factores_energia_renovable = lambda *args: generar_respuesta_fallback()
+        sin_ia = calcular_recomendacion(dict(datos), CLIMA_SOLEADO)
+    finally:
+        energia_calculo.evaluar_factores_energia_renovable = original
+
+    dimensionadas = [{k: v for k, v in c.items() if k != 'justificacion_ia'} for c in con_ia['combinaciones']]
+    assert dimensionadas == tradicional['combinaciones'] and all('tamanos' in c for c in dimensionadas)
+    anotadas = [c for c in con_ia['combinaciones'] if 'justificacion_ia' in c]
+    assert anotadas and all(set(c['tipos']) - {'bateria'} == {'solar', 'termotanque_solar'} for c in anotadas)
+    assert con_ia['principal']['combinacion'] is anotadas[0]
+    assert con_ia['principal']['cobertura'] != 99
+    print(f"Combinación sugerida por la IA: {anotadas[0]['detalle']} ({anotadas[0]['cobertura']}%)")
+
+    assert sin_ia == tradicional and 'justificacion' not in sin_ia
+
+if __name__ == "__main__":
+    test_restricciones()
+    test_objetivos()
+    test_poda_sin_perdida()
+    test_frente_pareto()
+    test_frente_combinaciones()
+    test_frente_en_cache()
+    test_integracion()
+    test_combinaciones_del_optimizador()
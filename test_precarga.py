@@ -0,0 +1,80 @@
+"""
+Script para probar la precarga de la aplicación antes del fork de los workers
+"""
+import gc
+import time
+import multiprocessing
+
+from ecosmart_advisor.app import create_app
+from ecosmart_advisor.app import precarga
+from ecosmart_advisor.app.services import carousel_content
+
+def _primera_pagina(app):
+    """Tiempo de la primera solicitud a la página principal"""
+    cliente = app.test_client()
+    inicio = time.perf_counter()
+    respuesta = cliente.get('/')
+    assert respuesta.status_code == 200
+    return time.perf_counter() - inicio
+
+def test_precalentar():
+    """Las plantillas quedan compiladas y la primera página no paga la compilación"""
+    originales = (carousel_content.CARRUSEL_REFRESCO, carousel_content._instantanea)
+    carousel_content.CARRUSEL_REFRESCO = False
+    try:
+        fria = create_app()
+        assert not fria.jinja_env.auto_reload
+        fria.debug = True
+        assert fria.jinja_env.auto_reload
+        fria.debug = False
+        sin_precarga = _primera_pagina(fria)
+
+        app = create_app()
+        informe = precarga.precalentar(app)
+        con_precarga = _primera_pagina(app)
+    finally:
+        carousel_content.CARRUSEL_REFRESCO, carousel_content._instantanea = originales
+        gc.unfreeze()
+
+    etapas = informe['etapas']
+    print(f"Precarga en {informe['segundos'] * 1000:.0f} ms (plantillas {etapas['plantillas']['segundos'] * 1000:.0f} ms, "
+          f"{informe['objetos_congelados']} objetos congelados); primera página {sin_precarga * 1000:.1f} ms "
+          f"sin precarga y {con_precarga * 1000:.1f} ms con precarga")
+    assert all(etapa['resultado'] for etapa in etapas.values()), etapas
+    assert etapas['plantillas']['resultado'] == len(app.jinja_env.list_templates(extensions=['html']))
+    assert len(app.jinja_env.cache) >= etapas['plantillas']['resultado']
+    assert informe['objetos_congelados'] > 0
+    assert con_precarga < sin_precarga
+
+def _medir_worker(cola):
+    # Lo que haría un worker recién creado: usar los datos heredados
+    from ecosmart_advisor.app.services import localidades, climatologia
+    localidades.obtener_nomenclador()
+    climatologia.cargar_grilla()
+    cola.put(precarga.informe_memoria())
+
+def test_memoria_compartida():
+    """Un proceso creado por fork después de la precarga comparte la mayor parte de su memoria"""
+    original = carousel_content._instantanea
+    try:
+        informe = precarga.precalentar(create_app())
+    finally:
+        carousel_content._instantanea = original
+        gc.unfreeze()
+    if not informe['memoria']:
+        print("/proc/self/smaps_rollup no disponible: no se mide la memoria")
+        return
+
+    contexto = multiprocessing.get_context('fork')
+    cola = contexto.Queue()
+    proceso = contexto.Process(target=_medir_worker, args=(cola,))
+    proceso.start()
+    worker = cola.get(timeout=30)
+    proceso.join(10)
+    print(f"Maestro: {informe['memoria']['rss']} MB; worker: {worker['compartida']} MB compartidos "
+          f"y {worker['privada']} MB propios")
+    assert worker['compartida'] > worker['privada']
+
+if __name__ == "__main__":
+    test_precalentar()
+    test_memoria_compartida()
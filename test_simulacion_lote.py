@@ -0,0 +1,131 @@
+"""
+Script para probar la simulación por lotes (/simulador/api/batch) y el barrido de capacidad (/simulador/api/sweep)
+"""
+import time
+import logging
+
+from ecosmart_advisor.app import create_app
+from ecosmart_advisor.app.services import simulador
+from ecosmart_advisor.app.services.simulacion_lote import simular_lote, barrido_capacidad
+
+CLIMAS = {
+    '-34.61,-58.38': {'radiacion_solar': 4.6, 'velocidad_viento': 4.2, 'temperatura_promedio': 17.8,
+                      'latitud': -34.61, 'longitud': -58.38, 'ubicacion': 'Buenos Aires'},
+    '-51.62,-69.22': {'radiacion_solar': 3.1, 'velocidad_viento': 7.5, 'temperatura_promedio': 7.6,
+                      'latitud': -51.62, 'longitud': -69.22, 'ubicacion': 'Río Gallegos'},
+    '-24.78,-65.41': {'radiacion_solar': 5.8, 'velocidad_viento': 3.0, 'temperatura_promedio': 16.9,
+                      'latitud': -24.78, 'longitud': -65.41, 'ubicacion': 'Salta'},
+}
+
+def _escenarios():
+    escenarios = []
+    for ubicacion in CLIMAS:
+        for capacidad in range(1, 21):
+            escenarios.append({'tipo_instalacion': 'solar', 'capacidad': capacidad,
+                               'ubicacion': ubicacion, 'consumo_mensual': 350})
+            escenarios.append({'tipo_instalacion': 'eolica', 'capacidad': capacidad / 2,
+                               'ubicacion': ubicacion, 'consumo_mensual': 350})
+            escenarios.append({'tipo_instalacion': 'termotanque_solar', 'capacidad': 50 * capacidad,
+                               'ubicacion': ubicacion, 'consumo_mensual': 350})
+    return escenarios
+
+def test_simular_lote():
+    """Verifica que el lote reproduzca simular_instalacion consultando el clima una vez por ubicación"""
+    consultas = []
+
+    def clima_falso(ubicacion):
+        consultas.append(ubicacion)
+        return dict(CLIMAS[ubicacion])
+
+    original_clima, original_deepseek = simulador.obtener_datos_clima, simulador.USAR_DEEPSEEK
+    simulador.obtener_datos_clima = clima_falso
+    simulador.USAR_DEEPSEEK = False
+    nivel = logging.getLogger().manager.disable
+    logging.disable(logging.CRITICAL)  # El bucle individual registra cada paso
+    try:
+        escenarios = _escenarios()
+
+        inicio = time.perf_counter()
+        resultados = simular_lote(escenarios)
+        tiempo_lote = time.perf_counter() - inicio
+        assert len(consultas) == len(CLIMAS)
+
+        consultas.clear()
+        inicio = time.perf_counter()
+        individuales = [simulador.simular_instalacion(dict(e)) for e in escenarios]
+        tiempo_bucle = time.perf_counter() - inicio
+        assert len(consultas) == len(escenarios)
+    finally:
+        simulador.obtener_datos_clima, simulador.USAR_DEEPSEEK = original_clima, original_deepseek
+        logging.disable(nivel)
+
+    print(f"{len(escenarios)} escenarios: lote {tiempo_lote * 1000:.1f} ms, "
+          f"bucle {tiempo_bucle * 1000:.1f} ms")
+
+    assert len(resultados) == len(escenarios)
+    for lote, individual in zip(resultados, individuales):
+        assert 'error' not in lote
+        assert set(lote) == set(individual)
+        assert lote == individual
+
+    assert resultados[0]['tipo'] == 'solar'
+    assert resultados[1]['tipo'] == 'eolica'
+    assert resultados[2]['tipo'] == 'termotanque_solar'
+
+def test_barrido_capacidad():
+    """Verifica que las curvas del barrido coincidan con la simulación individual"""
+    original_clima, original_deepseek = simulador.obtener_datos_clima, simulador.USAR_DEEPSEEK
+    simulador.obtener_datos_clima = lambda ubicacion: dict(CLIMAS[ubicacion])
+    simulador.USAR_DEEPSEEK = False
+    try:
+        inicio = time.perf_counter()
+        barrido = barrido_capacidad('-51.62,-69.22', 350, rangos={
+            'solar': {'min': 0.5, 'max': 20, 'paso': 0.5},
+            'eolica': (1, 5, 1),
+            'termotanque_solar': (100, 300, 100)
+        })
+        print(f"Barrido de {len(barrido['curvas']['solar']['capacidades'])} puntos solares: "
+              f"{(time.perf_counter() - inicio) * 1000:.1f} ms")
+        individual = simulador.simular_instalacion({'tipo_instalacion': 'eolica', 'capacidad': 3,
+                                                     'ubicacion': '-51.62,-69.22', 'consumo_mensual': 350})
+    finally:
+        simulador.obtener_datos_clima, simulador.USAR_DEEPSEEK = original_clima, original_deepseek
+
+    solar = barrido['curvas']['solar']
+    assert len(solar['capacidades']) == 40 and solar['capacidades'][-1] == 20
+    assert all(len(solar[clave]) == 40 for clave in ['generacion_anual', 'cobertura', 'retorno_inversion_anos'])
+    assert all(a < b for a, b in zip(solar['generacion_anual'], solar['generacion_anual'][1:]))
+    assert max(solar['cobertura']) == 100
+
+    eolica = barrido['curvas']['eolica']
+    assert eolica['capacidades'] == [1, 2, 3, 4, 5]
+    assert abs(eolica['generacion_anual'][2] - individual['generacion_anual']) < 0.1
+    # La simulación individual redondea la generación antes de calcular el retorno
+    assert abs(eolica['retorno_inversion_anos'][2] - individual['retorno_inversion_anos']) < 0.1
+    assert barrido['curvas']['termotanque_solar']['unidad'] == 'litros'
+
+    for rangos in [{'solar': (5, 1, 1)}, {'solar': (0.001, 1000, 0.001)}, {'solar': (1, 'inf', 1)}, {'solar': (1, 5, 'nan')}, {'nuclear': (1, 2, 1)}, ['solar']]:
+        try:
+            barrido_capacidad('-51.62,-69.22', 350, rangos=rangos)
+            assert False, f"Rango aceptado: {rangos}"
+        except ValueError:
+            pass
+
+def test_endpoint_lote():
+    """Verifica el endpoint con datos inválidos (sin tocar servicios externos)"""
+    app = create_app()
+    cliente = app.test_client()
+
+    respuesta = cliente.post('/simulador/api/batch', json={'escenarios': []})
+    assert respuesta.status_code == 400
+    respuesta = cliente.post('/simulador/api/batch', data='no es json')
+    assert respuesta.status_code == 400
+    respuesta = cliente.post('/simulador/api/sweep', json={'rangos': {'solar': [2, 1, 1]}})
+    assert respuesta.status_code == 400
+    respuesta = cliente.post('/simulador/api/sweep', json={'rangos': {'solar': [1, 'inf', 1]}})
+    assert respuesta.status_code == 400
+
+if __name__ == "__main__":
+    test_simular_lote()
+    test_barrido_capacidad()
+    test_endpoint_lote()
@@ -0,0 +1,165 @@
+"""
+Script para probar las consultas a la IA con plazo (respaldo inmediato y respuesta tardía en caché)
+"""
+import os
+import json
+import time
+import tempfile
+
+from ecosmart_advisor.app.services import energia_calculo
+from ecosmart_advisor.app.services import http_cliente
+from ecosmart_advisor.app.services import llm_cache
+from ecosmart_advisor.app.services import simulador
+from ecosmart_advisor.app.services import tareas
+from ecosmart_advisor.app.services.cache import CacheEscalonada, CacheLRU
+from ecosmart_advisor.app.services.energia_calculo import calcular_recomendacion
+
+DEMORA = 0.8  # Segundos que tarda la IA simulada
+DEMORA_DIAGNOSTICO = 2.5  # Mayor que el cálculo tradicional que se hace mientras tanto
+
+CLIMA = {'radiacion_solar': 4.6, 'velocidad_viento': 4.2, 'temperatura_promedio': 17.8,
+         'latitud': -34.61, 'longitud': -58.38, 'ubicacion': 'Buenos Aires'}
+
+RESPUESTA_DIAGNOSTICO = {
+    'mejor_opcion': 'solar',
+    'justificacion': 'Respuesta de la IA',
+    'opciones': {
+        'solar': {'viable': True, 'eficiencia_sistema': 80, 'inclinacion_paneles': 30, 'orientacion': 'Norte',
+                  'cobertura_estimada': 60, 'justificacion': ''},
+        'eolica': {'viable': False, 'potencia_recomendada': 2, 'cobertura_estimada': 10, 'justificacion': ''},
+        'termotanque_solar': {'viable': False, 'eficiencia_sistema': 70, 'cobertura_estimada': 20, 'justificacion': ''}
+    }
+}
+
+class RespuestaSimulada:
+    status_code = 200
+    text = ''
+
+    def __init__(self, contenido):
+        self._contenido = contenido
+
+    def json(self):
+        return {'choices': [{'message': {'content': self._contenido}}]}
+
+def _post_lento(url, **kwargs):
+    payload = kwargs.get('json') or json.loads(kwargs.get('data'))
+    if 'mejor_opcion' in payload['messages'][1]['content']:
+        time.sleep(DEMORA_DIAGNOSTICO)
+        return RespuestaSimulada(json.dumps(RESPUESTA_DIAGNOSTICO))
+    time.sleep(DEMORA)
+    return RespuestaSimulada(json.dumps({'recomendacion_principal': 'Recomendación de la IA', 'consejos': []}))
+
+def _esperar_en_cache(espacio):
+    """Espera a que la consulta que siguió en segundo plano guarde su respuesta"""
+    for _ in range(100):
+        if llm_cache.estadisticas_llm_cache()['espacios'].get(espacio, {}).get('fallos'):
+            return
+        time.sleep(0.05)
+
+def _con_ia_lenta(prueba):
+    original_post, original_cache = http_cliente.post, llm_cache._cache
+    original_clima, original_deepseek = simulador.obtener_datos_clima, simulador.USAR_DEEPSEEK
+    http_cliente.post = _post_lento
+    llm_cache._cache = CacheEscalonada("llm_test", ruta=os.path.join(tempfile.mkdtemp(prefix="ecosmart_test_"), "llm.sqlite"))
+    simulador.obtener_datos_clima = lambda ubicacion: dict(CLIMA)
+    simulador.USAR_DEEPSEEK = True
+    try:
+        prueba()
+    finally:
+        http_cliente.post, llm_cache._cache = original_post, original_cache
+        simulador.obtener_datos_clima, simulador.USAR_DEEPSEEK = original_clima, original_deepseek
+
+def test_ejecutar_con_plazo():
+    """El respaldo se devuelve al vencer el plazo y la tarea sigue en segundo plano"""
+    terminadas = []
+
+    def lenta():
+        time.sleep(0.3)
+        terminadas.append(1)
+        return 'ia'
+
+    inicio = time.perf_counter()
+    assert tareas.ejecutar_con_plazo(lenta, plazo=0.05, respaldo=lambda: 'reglas') == 'reglas'
+    assert time.perf_counter() - inicio < 0.2
+    assert tareas.ejecutar_con_plazo(lenta, plazo=2) == 'ia'
+    time.sleep(0.35)
+    assert len(terminadas) == 2
+    assert tareas.ejecutar_con_plazo(lambda: 1 / 0, plazo=1, respaldo=lambda: 'reglas') == 'reglas'
+    metricas = tareas.estadisticas_tareas()
+    assert metricas['vencidas'] >= 1 and metricas['errores'] >= 1
+
+def test_simulacion_con_plazo():
+    """La simulación no espera a la IA más allá del plazo y la respuesta tardía queda en caché"""
+    def prueba():
+        datos = {'tipo_instalacion': 'solar', 'capacidad': 3, 'ubicacion': '-34.61,-58.38', 'consumo_mensual': 350}
+        inicio = time.perf_counter()
+        resultados = simulador.simular_instalacion(dict(datos), limite=tareas.limite_desde(0.2))
+        demora = time.perf_counter() - inicio
+        print(f"Simulación con plazo de 0.2 s: {demora * 1000:.0f} ms (IA de {DEMORA} s)")
+        assert demora < DEMORA
+        assert resultados['recomendaciones']['recomendacion_principal'] != 'Recomendación de la IA'
+
+        _esperar_en_cache('simulacion')
+        inicio = time.perf_counter()
+        resultados = simulador.simular_instalacion(dict(datos), limite=tareas.limite_desde(0.2))
+        assert resultados['recomendaciones']['recomendacion_principal'] == 'Recomendación de la IA'
+        print(f"Simulación con la respuesta tardía en caché: {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    _con_ia_lenta(prueba)
+
+def test_diagnostico_con_plazo():
+    """El diagnóstico usa el método tradicional si la IA no llega a tiempo"""
+    def prueba():
+        datos = {'consumo_mensual': 350, 'superficie_disponible': 40, 'objetivo': 'ahorro', 'tipo_vivienda': 'casa'}
+        inicio = time.perf_counter()
+        recomendacion = calcular_recomendacion(dict(datos), dict(CLIMA), limite=tareas.limite_desde(0.1))
+        demora = time.perf_counter() - inicio
+        print(f"Diagnóstico con plazo de 0.1 s: {demora * 1000:.0f} ms")
+        assert demora < DEMORA_DIAGNOSTICO
+        assert 'justificacion' not in recomendacion
+        assert recomendacion['opciones']
+
+        _esperar_en_cache('diagnostico')
+        recomendacion = calcular_recomendacion(dict(datos), dict(CLIMA), limite=tareas.limite_desde(0.1))
+        assert recomendacion['justificacion'] == 'Respuesta de la IA'
+    _con_ia_lenta(prueba)
+
+def test_diagnostico_calcula_mientras_espera():
+    """El frente y las combinaciones se calculan una vez, mientras la IA responde"""
+    eventos = []
+    frente_original = energia_calculo.calcular_frente_pareto
+
+    def post_ia(url, **kwargs):
+        time.sleep(DEMORA)
+        eventos.append(('ia', time.perf_counter()))
+        return RespuestaSimulada(json.dumps(RESPUESTA_DIAGNOSTICO))
+
+    def frente_registrado(*args):
+        frente = frente_original(*args)
+        eventos.append(('frente', time.perf_counter()))
+        return frente
+
+    def prueba():
+        http_cliente.post = post_ia
+        datos = {'consumo_mensual': 350, 'superficie_disponible': 40, 'objetivo': 'ahorro', 'tipo_vivienda': 'casa'}
+        inicio = time.perf_counter()
+        recomendacion = calcular_recomendacion(dict(datos), dict(CLIMA), limite=tareas.limite_desde(5))
+        demora = time.perf_counter() - inicio
+        print(f"Diagnóstico con la IA a {DEMORA} s: {demora * 1000:.0f} ms")
+        assert recomendacion['justificacion'] == 'Respuesta de la IA' and recomendacion['frente_pareto']
+        assert [evento for evento, _ in eventos] == ['frente', 'ia']
+        # Después de la respuesta de la IA solo se arma el resultado
+        assert time.perf_counter() - eventos[-1][1] < 0.1
+
+    originales = (energia_calculo._cache_frentes, energia_calculo.calcular_frente_pareto)
+    energia_calculo._cache_frentes = CacheLRU()
+    energia_calculo.calcular_frente_pareto = frente_registrado
+    try:
+        _con_ia_lenta(prueba)
+    finally:
+        energia_calculo._cache_frentes, energia_calculo.calcular_frente_pareto = originales
+
+if __name__ == "__main__":
+    test_ejecutar_con_plazo()
+    test_simulacion_con_plazo()
+    test_diagnostico_con_plazo()
+    test_diagnostico_calcula_mientras_espera()